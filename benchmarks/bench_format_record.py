@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the format_record text log format.
+
+Logs 10k records to a text sink writing to an in-memory stream, with and
+without a bound payload, using the previous format_record implementation and
+the precompiled one. Only the end-to-end time is reported: the payload is
+pretty-printed by the previous format function but only when rendered by
+the current one, so timing the format function alone is not comparable.
+
+Usage:
+    python benchmarks/bench_format_record.py [-n NUMBER]
+
+"""
+import argparse
+import io
+import time
+from pprint import pformat
+
+from loguru import logger
+from mvc_demo.core.loguru_logs import format_record, set_log_extras
+
+
+PAYLOAD = {
+    "count": 2,
+    "users": [
+        {"age": 87, "is_active": True, "name": "Nick"},
+        {"age": 27, "is_active": True, "name": "Alex"},
+    ],
+}
+
+
+def legacy_format_record(record):
+    """Previous format_record implementation, kept for comparison."""
+    format_string = "<green>{extra[datetime]}</green> | "
+    format_string += "<green>{extra[app_name]}</green> | "
+    format_string += "<green>{extra[host]}</green> | "
+    format_string += "<green>{extra[pid]}</green> | "
+    format_string += "<green>{extra[request_id]}</green> | "
+    format_string += "<level>{level: <8}</level> | "
+    format_string += "<cyan>{name}</cyan>:"
+    format_string += "<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
+    format_string += "<level>{message}</level>"
+
+    if record["extra"].get("payload") is not None:
+        record["extra"]["payload"] = pformat(
+            record["extra"]["payload"], indent=4, compact=True, width=88
+        )
+        format_string += "\n<level>{extra[payload]}</level>"
+
+    format_string += "{exception}\n"
+
+    return format_string
+
+
+def bench(formatter, number, payload):
+    """Return the time in seconds spent logging number records."""
+    logger.remove()
+    logger.configure(patcher=set_log_extras)
+    logger.add(io.StringIO(), format=formatter, colorize=False)
+    log = logger.bind(payload=payload) if payload is not None else logger
+
+    start = time.perf_counter()
+    for i in range(number):
+        log.info("Received data {}", i)
+    return time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=10000)
+    args = parser.parse_args()
+
+    print("records: {0:d}".format(args.number))
+    for label, payload in (("no payload", None), ("payload", PAYLOAD)):
+        before = bench(legacy_format_record, args.number, payload)
+        after = bench(format_record, args.number, payload)
+        print(
+            "{0:10s} before: {1:7.3f}s  after: {2:7.3f}s ({3:.2f}x)".format(
+                label, before, after, before / after
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Benchmark for the stdlib to loguru InterceptHandler bridge.
+
+Compares the previous handler, which looked the level up with
+logger.level() and walked the Python frames to find the caller, with the
+current one, configured as by global_log_config: without a level, the
+stdlib loggers being gated by their own level. Records are logged at INFO
+through a stdlib logger of level INFO to a loguru sink writing to an
+in-memory stream, i.e. the emitted path. Records below the logger level
+are dropped by the stdlib logger before either handler is called, so
+they are not measured.
+
+Usage:
+    python benchmarks/bench_intercept_handler.py [-n NUMBER] [-r REPEAT]
+
+"""
+import argparse
+import io
+import logging
+import time
+
+from loguru import logger
+from mvc_demo.core.loguru_logs import InterceptHandler
+
+
+class LegacyInterceptHandler(logging.Handler):
+    """Previous InterceptHandler implementation, kept for comparison."""
+
+    def emit(self, record):
+        """Log the stdlib record with loguru."""
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        frame, depth = logging.currentframe(), 2
+        while frame.f_code.co_filename == logging.__file__:
+            frame = frame.f_back
+            depth += 1
+
+        logger.opt(depth=depth, exception=record.exc_info).log(
+            level, record.getMessage()
+        )
+
+
+def bench(handler, number):
+    """Return the average cost of one stdlib log call in microseconds."""
+    stdlib_logger = logging.getLogger("bench.intercept")
+    stdlib_logger.propagate = False
+    # Set by the level controller of the application.
+    stdlib_logger.setLevel(logging.INFO)
+    stdlib_logger.handlers = [handler]
+
+    start = time.perf_counter()
+    for i in range(number):
+        stdlib_logger.info("GET /api/ready %s", i)
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=50000)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(
+        io.StringIO(),
+        level="INFO",
+        format="{name}:{function}:{line} {message}",
+    )
+
+    print("records: {0:d}".format(args.number))
+    # Both created without a level, as in global_log_config.
+    before, after = float("inf"), float("inf")
+    for _ in range(args.repeat):
+        # Best of the runs, alternated so both see the same noise.
+        before = min(before, bench(LegacyInterceptHandler(), args.number))
+        after = min(
+            after, bench(InterceptHandler(level=logging.NOTSET), args.number)
+        )
+    print(
+        "emitted  before: {0:6.2f} us/record  after: {1:6.2f} us/record "
+        "({2:.2f}x)".format(before, after, before / after)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Throughput benchmark for the RedisClient auto-batching mode.
+
+Runs concurrent coroutines issuing GET commands through RedisClient, one
+round trip per command and then auto-batched, and explicit pipelines for
+reference. Commands are served by a minimal in-memory Redis stand-in
+speaking RESP on localhost. It adds a simulated network round trip time to
+every read, so no Redis server is needed.
+
+Usage:
+    python benchmarks/bench_redis_batching.py [-n NUMBER] [-c CONCURRENCY]
+        [--rtt MILLISECONDS]
+
+"""
+import argparse
+import asyncio
+import time
+
+import aioredis
+import mvc_demo.config  # noqa: F401, loads the app first, avoids a cycle.
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils.redis import CommandBatcher
+
+
+class RedisStandIn(object):
+    """In-memory RESP server implementing PING, GET and SET."""
+
+    def __init__(self, rtt: float):
+        """Initialize RedisStandIn class object instance."""
+        self.rtt = rtt
+        self.data = {}
+        self.reads = 0
+
+    async def handle(self, reader, writer):
+        """Serve a client connection."""
+        buffer = b""
+        while True:
+            chunk = await reader.read(64 * 1024)
+            if not chunk:
+                break
+            self.reads += 1
+            commands, buffer = self.parse(buffer + chunk)
+            if self.rtt:
+                await asyncio.sleep(self.rtt)
+            writer.write(b"".join(map(self.execute, commands)))
+            await writer.drain()
+        writer.close()
+
+    @staticmethod
+    def parse(buffer: bytes):
+        """Split the complete RESP arrays of the buffer into commands."""
+        commands = []
+        position = 0
+        while True:
+            start = position
+            end = buffer.find(b"\r\n", position)
+            if end < 0 or buffer[position : position + 1] != b"*":
+                return commands, buffer[start:]
+            count = int(buffer[position + 1 : end])
+            position = end + 2
+            args = []
+            for _ in range(count):
+                end = buffer.find(b"\r\n", position)
+                if end < 0:
+                    return commands, buffer[start:]
+                size = int(buffer[position + 1 : end])
+                position = end + 2
+                if len(buffer) < position + size + 2:
+                    return commands, buffer[start:]
+                args.append(buffer[position : position + size])
+                position += size + 2
+            commands.append(args)
+
+    def execute(self, args) -> bytes:
+        """Return the RESP reply of a command."""
+        command = args[0].upper()
+        if command == b"PING":
+            return b"+PONG\r\n"
+        elif command == b"SET":
+            self.data[args[1]] = args[2]
+            return b"+OK\r\n"
+        elif command == b"GET":
+            value = self.data.get(args[1])
+            if value is None:
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return b"-ERR unknown command\r\n"
+
+
+async def run_workers(number, concurrency, work):
+    """Run work(count) in concurrent workers, return the elapsed time."""
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(work(number // concurrency) for _ in range(concurrency))
+    )
+    return time.perf_counter() - started
+
+
+async def commands(count):
+    """Issue GET commands one at a time."""
+    for index in range(count):
+        await RedisClient.get("key:{0:d}".format(index % 100))
+
+
+async def pipelines(count):
+    """Issue GET commands in an explicit pipeline."""
+    async with RedisClient.pipeline() as pipe:
+        for index in range(count):
+            pipe.get("key:{0:d}".format(index % 100))
+        await pipe.execute()
+
+
+async def bench(args):
+    """Run the scenarios and print the results."""
+    stand_in = RedisStandIn(args.rtt / 1000)
+    server = await asyncio.start_server(stand_in.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    RedisClient.redis_client = aioredis.from_url(
+        "redis://127.0.0.1:{0:d}".format(port), encoding="utf-8"
+    )
+    for index in range(100):
+        await RedisClient.set("key:{0:d}".format(index), "value")
+
+    print("commands:    {0:d}".format(args.number))
+    print("concurrency: {0:d}".format(args.concurrency))
+    print("rtt:         {0:.2f} ms".format(args.rtt))
+    for name, batcher, work in (
+        ("unbatched", None, commands),
+        ("auto-batch", CommandBatcher(RedisClient.redis_client), commands),
+        ("pipeline", None, pipelines),
+    ):
+        RedisClient.batcher = batcher
+        reads = stand_in.reads
+        elapsed = await run_workers(args.number, args.concurrency, work)
+        print(
+            "{0:12s} {1:10.0f} commands/s {2:8d} server reads".format(
+                name + ":", args.number / elapsed, stand_in.reads - reads
+            )
+        )
+
+    RedisClient.batcher = None
+    await RedisClient.close_redis_client()
+    server.close()
+    await server.wait_closed()
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--number", type=int, default=20000)
+    parser.add_argument("-c", "--concurrency", type=int, default=100)
+    parser.add_argument("--rtt", type=float, default=0.2)
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,16 @@ from mvc_demo.app.exceptions import (
     HTTPException,
     http_exception_handler,
 )
-from mvc_demo.core.loguru_logs import global_log_config
+from mvc_demo.app.middlewares import (
+    AccessLogMiddleware,
+    RateLimitMiddleware,
+    TailLogMiddleware,
+)
+from mvc_demo.core.loguru_logs import (
+    global_log_config,
+    flush_logs,
+    get_request_log_buffer,
+)
 
 global_log_config(
     log_level=logging.getLevelName(settings.LOG_LEVEL),
@@ -39,7 +48,8 @@ async def on_startup():
 async def on_shutdown():
     """Fastapi shutdown event handler.
 
-    Destroys RedisClient and AiohttpClient session.
+    Destroys RedisClient and AiohttpClient session, and writes the buffered
+    log records.
 
     """
     log.debug("Execute FastAPI shutdown event handler.")
@@ -48,6 +58,7 @@ async def on_shutdown():
         await RedisClient.close_redis_client()
 
     await AiohttpClient.close_aiohttp_client()
+    flush_logs()
 
 
 def get_app():
@@ -72,7 +83,30 @@ def get_app():
     # Register global exception handler for custom HTTPException.
     app.add_exception_handler(HTTPException, http_exception_handler)
 
-    # Register middlewares
+    # Register middlewares, the last one added is the outermost. The logging
+    # middlewares run inside CorrelationIdMiddleware to get the request id.
+    if settings.RATE_LIMIT:
+        app.add_middleware(
+            RateLimitMiddleware,
+            default=settings.RATE_LIMIT_DEFAULT,
+            routes=settings.RATE_LIMIT_ROUTES,
+            client_header=settings.RATE_LIMIT_CLIENT_HEADER,
+            trusted_proxies=settings.RATE_LIMIT_TRUSTED_PROXIES,
+        )
+    if get_request_log_buffer() is not None:
+        app.add_middleware(
+            TailLogMiddleware,
+            buffer=get_request_log_buffer(),
+            slow_ms=settings.LOG_TAIL_SLOW_MS,
+        )
+    if settings.LOG_ACCESS:
+        # Replaces the uvicorn access log, also used under gunicorn.
+        logging.getLogger("uvicorn.access").disabled = True
+        app.add_middleware(
+            AccessLogMiddleware,
+            sample_rate=settings.LOG_ACCESS_SAMPLE_RATE,
+            slow_ms=settings.LOG_ACCESS_SLOW_MS,
+        )
     app.add_middleware(CorrelationIdMiddleware, header_name="X-Request-ID")
 
     return app
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Admin controller."""
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header
+from loguru import logger
+from mvc_demo.config import settings
+from mvc_demo.app.models import (
+    ErrorResponse,
+    LogLevelRequest,
+    LogLevelResponse,
+)
+from mvc_demo.app.exceptions import HTTPException
+from mvc_demo.core import loguru_logs  # Module import, avoids a cycle.
+
+router = APIRouter()
+log = logger
+
+
+async def verify_admin_token(authorization: Optional[str] = Header(None)):
+    """Check the admin bearer token of the request.
+
+    Args:
+        authorization(Optional[str]): Authorization request header.
+
+    Raises:
+        HTTPException: If the admin endpoints are disabled (403) or the token
+            is missing or wrong (401).
+
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            content=ErrorResponse(
+                code=403, message="Admin endpoints are disabled"
+            ).dict(exclude_none=True),
+        )
+
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(
+        token.encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            content=ErrorResponse(code=401, message="Invalid admin token").dict(
+                exclude_none=True
+            ),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def configured_log_levels():
+    """Return the log level controller of the process.
+
+    Raises:
+        HTTPException: If the logs are not configured yet (503).
+
+    """
+    log_levels = loguru_logs.get_log_levels()
+    if log_levels is None:
+        raise HTTPException(
+            status_code=503,
+            content=ErrorResponse(
+                code=503, message="Log levels are not configured yet"
+            ).dict(exclude_none=True),
+        )
+    return log_levels
+
+
+@router.get(
+    "/admin/log-level",
+    tags=["admin"],
+    response_model=LogLevelResponse,
+    summary="Get the log levels.",
+    status_code=200,
+    responses={
+        401: {"model": ErrorResponse},
+        403: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
+    },
+    dependencies=[Depends(verify_admin_token)],
+)
+async def get_log_level():
+    """Return the default log level and the levels set per logger.
+
+    Requires the ADMIN_TOKEN bearer token.
+    \f
+
+    Returns:
+        response (LogLevelResponse): LogLevelResponse model object instance.
+
+    Raises:
+        HTTPException: If the logs are not configured yet.
+
+    """
+    return LogLevelResponse(**configured_log_levels().to_dict())
+
+
+@router.put(
+    "/admin/log-level",
+    tags=["admin"],
+    response_model=LogLevelResponse,
+    summary="Change the log levels in every worker.",
+    status_code=200,
+    responses={
+        400: {"model": ErrorResponse},
+        401: {"model": ErrorResponse},
+        403: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
+    },
+    dependencies=[Depends(verify_admin_token)],
+)
+async def put_log_level(request: LogLevelRequest):
+    """Change the default log level and/or the levels of some loggers.
+
+    The change is applied by this worker right away and by every other
+    gunicorn worker shortly after, without restart.
+    \f
+
+    Args:
+        request (LogLevelRequest): LogLevelRequest model object instance.
+
+    Returns:
+        response (LogLevelResponse): LogLevelResponse model object instance.
+
+    Raises:
+        HTTPException: If a level or logger name is invalid, or the logs
+            are not configured yet.
+
+    """
+    log_levels = configured_log_levels()
+    try:
+        loguru_logs.set_log_levels(request.default, request.loggers)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=400,
+            content=ErrorResponse(code=400, message=str(exc)).dict(
+                exclude_none=True
+            ),
+        )
+
+    levels = log_levels.to_dict()
+    log.warning("Log levels changed: {}", levels)
+    return LogLevelResponse(**levels)
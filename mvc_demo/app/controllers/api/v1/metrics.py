@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Metrics controller."""
+import os
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils.circuit_breaker import STATES
+from mvc_demo.config import settings
+from mvc_demo.core import loguru_logs  # Module import, avoids a cycle.
+from mvc_demo.core.log_metrics import format_prometheus
+
+router = APIRouter()
+
+
+def _redis_metrics(labels: dict) -> str:
+    """Render the Redis pool, cache and breaker metrics for Prometheus."""
+    stats = RedisClient.pool_stats()
+    common = ",".join(
+        '{0:s}="{1!s}"'.format(key, value) for key, value in labels.items()
+    )
+    lines = [
+        "# HELP redis_pool_connections Redis pool connections by state.",
+        "# TYPE redis_pool_connections gauge",
+    ]
+    for state in ("in_use", "idle"):
+        lines.append(
+            'redis_pool_connections{{{0:s},state="{1:s}"}} {2:d}'.format(
+                common, state, stats[state]
+            )
+        )
+    samples = [
+        (
+            "redis_pool_waiters",
+            "gauge",
+            "Coroutines waiting for a Redis pool connection.",
+            stats["waiters"],
+        ),
+        (
+            "redis_pool_max_connections",
+            "gauge",
+            "Redis pool size.",
+            stats["max_connections"],
+        ),
+    ]
+    if RedisClient.cache is not None:
+        cache = RedisClient.cache.stats()
+        samples.extend(
+            (
+                "redis_cache_{0:s}".format(name),
+                kind,
+                help_text,
+                cache[key],
+            )
+            for name, key, kind, help_text in (
+                ("hits_total", "hits", "counter", "Redis cache hits."),
+                ("misses_total", "misses", "counter", "Redis cache misses."),
+                (
+                    "evictions_total",
+                    "evictions",
+                    "counter",
+                    "Redis cache evictions.",
+                ),
+                (
+                    "invalidations_total",
+                    "invalidations",
+                    "counter",
+                    "Redis cache invalidations.",
+                ),
+                ("entries", "entries", "gauge", "Redis cache entries."),
+                ("bytes", "size", "gauge", "Redis cache estimated size."),
+            )
+        )
+    if RedisClient.breaker is not None:
+        breaker = RedisClient.breaker.stats()
+        lines.append(
+            "# HELP redis_circuit_state Redis circuit breaker state, 1 if "
+            "current."
+        )
+        lines.append("# TYPE redis_circuit_state gauge")
+        for state in STATES:
+            lines.append(
+                'redis_circuit_state{{{0:s},state="{1:s}"}} {2:d}'.format(
+                    common, state, int(state == breaker["state"])
+                )
+            )
+        lines.append(
+            "# HELP redis_circuit_transitions_total Redis circuit breaker "
+            "transitions by target state."
+        )
+        lines.append("# TYPE redis_circuit_transitions_total counter")
+        for state in STATES:
+            lines.append(
+                "redis_circuit_transitions_total{{{0:s},state="
+                '"{1:s}"}} {2:d}'.format(
+                    common, state, breaker["transitions"][state]
+                )
+            )
+        samples.append(
+            (
+                "redis_circuit_rejected_total",
+                "counter",
+                "Redis commands rejected by the circuit breaker.",
+                breaker["rejected"],
+            )
+        )
+    for name, kind, help_text, value in samples:
+        lines.append("# HELP {0:s} {1:s}".format(name, help_text))
+        lines.append("# TYPE {0:s} {1:s}".format(name, kind))
+        lines.append("{0:s}{{{1:s}}} {2:d}".format(name, common, value))
+    return "\n".join(lines) + "\n"
+
+
+@router.get(
+    "/metrics",
+    tags=["metrics"],
+    response_class=PlainTextResponse,
+    summary="Log pipeline and Redis metrics.",
+    status_code=200,
+)
+async def get_metrics():
+    """Return the application metrics in the Prometheus text format.
+
+    Records, bytes, dropped records and sink write latency per level. When
+    Redis is enabled, the connections in use and idle and the waiters of
+    its connection pool, the client-side cache counters and the circuit
+    breaker state and transitions. Every gunicorn worker serves its own
+    metrics, labelled with its process id.
+    \f
+
+    Returns:
+        response (PlainTextResponse): Prometheus text exposition format.
+
+    """
+    labels = {"pid": os.getpid()}
+    content = format_prometheus(loguru_logs.get_log_metrics(), labels=labels)
+    if settings.USE_REDIS and RedisClient.redis_client is not None:
+        content += _redis_metrics(labels)
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
@@ -15,6 +15,7 @@ log = logger
     "/ready",
     tags=["ready"],
     response_model=ReadyResponse,
+    response_model_exclude_none=True,
     summary="Simple health check.",
     status_code=200,
     responses={502: {"model": ErrorResponse}},
@@ -25,7 +26,8 @@ async def readiness_check():
     If the application is up and running then this endpoint will return simple
     response with status ok. Moreover, if it has Redis enabled then connection
     to it will be tested. If Redis ping fails, then this endpoint will return
-    502 HTTP error.
+    502 HTTP error. The state of the Redis circuit breaker, when enabled, is
+    returned too, an open breaker fails the ping right away.
     \f
 
     Returns:
@@ -39,12 +41,19 @@ async def readiness_check():
     """
     log.info("Started GET /ready")
 
+    breaker = RedisClient.breaker if settings.USE_REDIS else None
     if settings.USE_REDIS and not await RedisClient.ping():
         log.error("Could not connect to Redis")
+        message = "Could not connect to Redis"
+        if breaker is not None and breaker.state == "open":
+            message = "Redis circuit breaker is open"
         raise HTTPException(
             status_code=502,
-            content=ErrorResponse(
-                code=502, message="Could not connect to Redis"
-            ).dict(exclude_none=True),
+            content=ErrorResponse(code=502, message=message).dict(
+                exclude_none=True
+            ),
         )
-    return ReadyResponse(status="ok")
+    return ReadyResponse(
+        status="ok",
+        redis_circuit=breaker.state if breaker is not None else None,
+    )
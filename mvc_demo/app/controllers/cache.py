@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+"""Redis backed cache of the route responses."""
+import asyncio
+import hashlib
+import inspect
+import math
+import time
+import uuid
+from functools import wraps
+from random import random
+from typing import NamedTuple, Optional, Sequence
+
+import orjson
+from aioredis.exceptions import RedisError
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from loguru import logger
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils.redis import Script
+from starlette.concurrency import run_in_threadpool
+
+log = logger
+
+# Prefix of the Redis keys of the cached responses.
+KEY_PREFIX = "mvc_demo:route:"
+# Response header telling whether the response was served from the cache.
+CACHE_HEADER = "X-Cache"
+# Deletes the lock only if still held by the caller.
+UNLOCK = Script(
+    """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+)
+
+
+class CacheEntry(NamedTuple):
+    """Cached response.
+
+    Attributes:
+        status_code (int): Response status code.
+        headers (list): Response headers, as (name, value) pairs.
+        body (bytes): Response body.
+        expires (float): Time the response stops being fresh, since epoch.
+        delta (float): Time in seconds it took to compute the response.
+
+    """
+
+    status_code: int
+    headers: list
+    body: bytes
+    expires: float
+    delta: float
+
+    def pack(self) -> bytes:
+        """Return the entry serialized for Redis."""
+        meta = orjson.dumps(
+            [self.status_code, self.headers, self.expires, self.delta]
+        )
+        # JSON escapes line feeds, the first one ends the metadata.
+        return meta + b"\n" + self.body
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "CacheEntry":
+        """Return the entry of data read from Redis."""
+        meta, _, body = bytes(data).partition(b"\n")
+        status_code, headers, expires, delta = orjson.loads(meta)
+        return cls(status_code, headers, body, expires, delta)
+
+    def response(self, state: str) -> Response:
+        """Return the response of the entry, with the CACHE_HEADER."""
+        response = Response(content=self.body, status_code=self.status_code)
+        response.raw_headers.extend(
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in self.headers
+        )
+        response.raw_headers.append(
+            (CACHE_HEADER.lower().encode("latin-1"), state.encode())
+        )
+        return response
+
+
+class RouteCache(object):
+    """Cache the responses of a route in Redis, shared by every process.
+
+    Responses are cached ``ttl`` seconds, by path, query and ``vary``
+    request headers, then served stale ``stale_ttl`` more seconds while
+    a background task computes them again (stale-while-revalidate).
+
+    Concurrent misses of a key are coalesced, one computation per process
+    shared by its requests, and at most one across processes, holding a
+    Redis lock, the other processes wait for the response to be cached.
+
+    Fresh responses are computed again in the background before they
+    expire, with a probability growing as the expiration gets closer and
+    the computation takes longer (XFetch). ``beta`` above 1 favors earlier
+    computations.
+
+    Redis failures do not fail the requests, the route is then called
+    directly.
+
+    Args:
+        ttl (float): Time in seconds responses are fresh.
+        stale_ttl (float): Time in seconds responses are served stale after
+            ``ttl``, while being computed again.
+        vary (Sequence[str]): Request headers the responses depend on.
+        beta (float): Early computation factor, 0 disables them.
+        lock_timeout (float): Maximum time in seconds a computation holds
+            the lock, and other processes wait for it.
+        poll_interval (float): Time in seconds between two checks of the
+            cache while waiting for another process.
+
+    Attributes:
+        hits (int): Number of fresh responses served from the cache.
+        stale (int): Number of stale responses served from the cache.
+        misses (int): Number of responses computed for a request.
+        refreshes (int): Number of responses computed in the background.
+
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float = 0,
+        vary: Sequence[str] = (),
+        beta: float = 1.0,
+        lock_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+    ):
+        """Initialize RouteCache class object instance."""
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.vary = [header.lower() for header in vary]
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.refreshes = 0
+        # Computation task by key, shared by the concurrent requests.
+        self._computing = {}
+
+    def key(self, request: Request) -> str:
+        """Return the Redis key of the response of a request.
+
+        Args:
+            request (Request): Route request.
+
+        Returns:
+            str: Redis db key, the path followed by the digest of the query
+                and ``vary`` headers.
+
+        """
+        digest = hashlib.sha1()
+        for name, value in sorted(request.query_params.multi_items()):
+            digest.update("{0:s}={1:s}&".format(name, value).encode())
+        for name in self.vary:
+            value = request.headers.get(name, "")
+            digest.update("\n{0:s}:{1:s}".format(name, value).encode())
+        return "{0:s}{1:s}:{2:s}:{3:s}".format(
+            KEY_PREFIX, request.method, request.url.path, digest.hexdigest()
+        )
+
+    async def serve(self, request: Request, compute) -> Response:
+        """Return the cached response of a request, or compute it.
+
+        Args:
+            request (Request): Route request.
+            compute (Callable): Coroutine function returning the response.
+
+        Returns:
+            Response: Cached or computed response.
+
+        """
+        key = self.key(request)
+        try:
+            data = await RedisClient.get(key, codec="raw")
+        except RedisError as ex:
+            log.warning("Route cache unavailable: {!r}", ex)
+            return await compute()
+
+        if data is not None:
+            entry = CacheEntry.unpack(data)
+            now = time.time()
+            if now < entry.expires:
+                if self._early(entry, now):
+                    self._refresh(key, compute)
+                self.hits += 1
+                return entry.response("hit")
+            self._refresh(key, compute)
+            self.stale += 1
+            return entry.response("stale")
+
+        self.misses += 1
+        task = self._compute(key, compute, wait=True)
+        entry, response = await asyncio.shield(task)
+        if entry is not None:
+            return entry.response("miss")
+        elif response is not None and hasattr(response, "body"):
+            # Not cacheable, e.g. an error, shared by the concurrent requests.
+            return response
+        return await compute()
+
+    def _early(self, entry: CacheEntry, now: float) -> bool:
+        """Whether to compute a fresh entry again, see XFetch."""
+        if not self.beta or not entry.delta:
+            return False
+        # -log(random) is exponentially distributed, of mean 1.
+        gap = -entry.delta * self.beta * math.log(1.0 - random())
+        return now + gap >= entry.expires
+
+    def _refresh(self, key: str, compute):
+        """Compute an entry again in the background, unless in progress."""
+        if key not in self._computing:
+            self.refreshes += 1
+            task = self._compute(key, compute, wait=False)
+            task.add_done_callback(self._refreshed)
+
+    def _refreshed(self, task: asyncio.Task):
+        """Log the failure of a background computation."""
+        if not task.cancelled() and task.exception() is not None:
+            log.opt(exception=task.exception()).error(
+                "Route cache refresh failed"
+            )
+
+    def _compute(self, key: str, compute, wait: bool) -> asyncio.Task:
+        """Return the task computing an entry, shared by concurrent callers.
+
+        Args:
+            key (str): Redis db key.
+            compute (Callable): Coroutine function returning the response.
+            wait (bool): Wait for another process holding the lock, instead
+                of giving up.
+
+        Returns:
+            asyncio.Task: Resolved with the entry, None if not cacheable,
+                and the computed response, None if not computed.
+
+        """
+        task = self._computing.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(
+                self._locked(key, compute, wait)
+            )
+            self._computing[key] = task
+            task.add_done_callback(lambda _: self._computing.pop(key, None))
+        return task
+
+    async def _locked(self, key: str, compute, wait: bool) -> tuple:
+        """Compute and cache an entry, holding the lock of its key."""
+        lock = key + ":lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        try:
+            while not await RedisClient.set(
+                lock, token, codec="raw", ex=self.lock_timeout, nx=True
+            ):
+                if not wait:
+                    return None, None
+                elif time.monotonic() >= deadline:
+                    # Computed for too long, or lost, compute anyway.
+                    break
+                await asyncio.sleep(self.poll_interval)
+                data = await RedisClient.get(key, codec="raw")
+                if data is not None:
+                    return CacheEntry.unpack(data), None
+        except RedisError as ex:
+            log.warning("Route cache lock unavailable: {!r}", ex)
+            return None, None
+
+        try:
+            started = time.monotonic()
+            response = await compute()
+            entry = self._entry(response, time.monotonic() - started)
+            if entry is not None:
+                try:
+                    await RedisClient.set(
+                        key,
+                        entry.pack(),
+                        codec="raw",
+                        ex=self.ttl + self.stale_ttl,
+                    )
+                except RedisError as ex:
+                    log.warning("Route cache unavailable: {!r}", ex)
+            return entry, response
+        finally:
+            try:
+                await RedisClient.evalsha(UNLOCK, [lock], [token])
+            except RedisError:
+                # Expires on its own.
+                pass
+
+    def _entry(self, response: Response, delta: float) -> Optional[CacheEntry]:
+        """Return the entry of a response, None if not cacheable."""
+        if response.status_code != 200 or not hasattr(response, "body"):
+            return None
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in response.raw_headers
+            if name not in (b"content-length", b"set-cookie")
+        ]
+        return CacheEntry(
+            response.status_code,
+            headers,
+            response.body,
+            time.time() + self.ttl,
+            delta,
+        )
+
+
+def cached(
+    ttl: float,
+    stale_ttl: float = 0,
+    vary: Sequence[str] = (),
+    beta: float = 1.0,
+    lock_timeout: float = 10.0,
+):
+    """Cache the responses of a GET route in Redis, see RouteCache.
+
+    Only successful responses are cached, without their cookies. Values
+    returned by the route, other than responses, are rendered as JSON. When
+    Redis is disabled, the route is called directly.
+
+    Example:
+        @router.get("/items")
+        @cached(ttl=60, stale_ttl=300, vary=["Accept-Language"])
+        async def list_items(page: int = 1):
+            ...
+
+    Args:
+        ttl (float): Time in seconds responses are fresh.
+        stale_ttl (float): Time in seconds responses are served stale after
+            ``ttl``, while being computed again.
+        vary (Sequence[str]): Request headers the responses depend on.
+        beta (float): Early computation factor, 0 disables them.
+        lock_timeout (float): Maximum time in seconds a computation holds
+            the lock, and other processes wait for it.
+
+    Returns:
+        Callable: Route decorator.
+
+    """
+    cache = RouteCache(
+        ttl,
+        stale_ttl=stale_ttl,
+        vary=vary,
+        beta=beta,
+        lock_timeout=lock_timeout,
+    )
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        request_name = next(
+            (
+                name
+                for name, parameter in signature.parameters.items()
+                if parameter.annotation is Request
+            ),
+            None,
+        )
+        parameters = list(signature.parameters.values())
+        if request_name is None:
+            # Requested from FastAPI for the cache only.
+            request_name = "_cached_request"
+            parameters.append(
+                inspect.Parameter(
+                    request_name,
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Request,
+                )
+            )
+
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request = kwargs[request_name]
+            if request_name == "_cached_request":
+                del kwargs[request_name]
+
+            async def compute():
+                if asyncio.iscoroutinefunction(endpoint):
+                    response = await endpoint(*args, **kwargs)
+                else:
+                    response = await run_in_threadpool(
+                        endpoint, *args, **kwargs
+                    )
+                if isinstance(response, Response):
+                    return response
+                return JSONResponse(content=jsonable_encoder(response))
+
+            if request.method != "GET" or RedisClient.redis_client is None:
+                return await compute()
+            return await cache.serve(request, compute)
+
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
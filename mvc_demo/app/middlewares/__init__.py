@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""This project was generated with fastapi-mvc."""
+from .access_log import AccessLogMiddleware
+from .rate_limit import RateLimitMiddleware
+from .tail_log import TailLogMiddleware
+
+__all__ = (
+    AccessLogMiddleware,
+    RateLimitMiddleware,
+    TailLogMiddleware,
+)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Structured access log middleware."""
+import random
+import time
+from typing import Optional
+
+from loguru import logger
+
+log = logger
+
+
+class AccessLogMiddleware(object):
+    """Pure ASGI middleware logging one structured record per request.
+
+    Status and body size are collected from the response messages, so
+    nothing is formatted as text before reaching loguru. The record holds
+    in its extra the ``method``, ``route`` template, raw ``path``,
+    ``status``, response ``bytes`` and ``duration_ns``, the correlation id
+    is added by the loguru patcher as for any record logged while handling
+    the request.
+
+    Successful requests (status below 400) are logged with probability
+    ``sample_rate``. Failed requests and requests slower than ``slow_ms``
+    are always logged, the slow ones at WARNING level.
+
+    Args:
+        app (ASGIApp): Wrapped ASGI application.
+        sample_rate (float): Fraction of successful requests to log.
+        slow_ms (float, optional): Duration in milliseconds over which a
+            request is always logged. None disables it.
+
+    """
+
+    def __init__(
+        self, app, sample_rate: float = 1.0, slow_ms: Optional[float] = None
+    ):
+        """Initialize AccessLogMiddleware class object instance."""
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ns = None if slow_ms is None else int(slow_ms * 1e6)
+        # Endpoint -> route template, filled on first match.
+        self._routes = {}
+
+    async def __call__(self, scope, receive, send):
+        """Handle an ASGI request and log it once the response is sent."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        response = [500, 0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                response[1] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._log(scope, response[0], response[1], start)
+
+    def _log(self, scope, status: int, size: int, start: int):
+        """Log the access record, unless sampled out."""
+        duration = time.perf_counter_ns() - start
+        slow = self.slow_ns is not None and duration >= self.slow_ns
+        if status < 400 and not slow and not self._sampled():
+            return
+
+        log.log(
+            "WARNING" if slow else "INFO",
+            "{method} {path} {status}",
+            method=scope["method"],
+            route=self._route_template(scope),
+            path=scope["path"],
+            status=status,
+            bytes=size,
+            duration_ns=duration,
+        )
+
+    def _sampled(self) -> bool:
+        """Whether a successful request is picked by the sample rate."""
+        if self.sample_rate >= 1.0:
+            return True
+        return random.random() < self.sample_rate
+
+    def _route_template(self, scope) -> Optional[str]:
+        """Return the path template of the route which handled the request.
+
+        Returns:
+            str, optional: Template, e.g. "/api/items/{item_id}", None if no
+                route matched.
+
+        """
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return None
+
+        template = self._routes.get(endpoint)
+        if template is None:
+            router = scope.get("router")
+            for route in getattr(router, "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    template = self._routes[endpoint] = route.path
+                    break
+
+        return template
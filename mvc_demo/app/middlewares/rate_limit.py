@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""Distributed rate limiting middleware."""
+import math
+from collections import OrderedDict
+from time import monotonic
+from typing import Dict, NamedTuple, Optional
+
+import orjson
+from aioredis.exceptions import RedisError
+from loguru import logger
+from mvc_demo.app.models import ErrorResponse
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils.redis import Script
+
+log = logger
+
+# Prefix of the Redis keys of the limits.
+KEY_PREFIX = "mvc_demo:ratelimit:"
+# Seconds of the named periods of the limits.
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+# Generic cell rate algorithm: the key holds the theoretical arrival time of
+# the next request, in milliseconds of the Redis clock. A request is allowed
+# unless it comes more than the period before it.
+GCRA = Script(
+    """
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local time = redis.call("TIME")
+local now = time[1] * 1000 + time[2] / 1000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = math.max(tonumber(redis.call("GET", KEYS[1])) or now, now)
+local allow_at = tat + interval - period
+if allow_at > now then
+    return {0, math.ceil(allow_at - now)}
+end
+tat = tat + interval
+local expire = math.ceil(tat - now)
+redis.call("SET", KEYS[1], string.format("%.17g", tat), "PX", expire)
+return {1, 0}
+"""
+)
+
+
+class Limit(NamedTuple):
+    """Rate limit, at most ``count`` requests per ``period`` seconds.
+
+    Attributes:
+        count (int): Number of requests.
+        period (float): Duration in seconds.
+
+    """
+
+    count: int
+    period: float
+
+    @classmethod
+    def parse(cls, value: str) -> "Limit":
+        """Return the limit of a string, e.g. "100/minute" or "10/30".
+
+        Args:
+            value (str): Number of requests, then a slash and the period, in
+                seconds or one of PERIODS.
+
+        Returns:
+            Limit: Limit object instance.
+
+        Raises:
+            ValueError: If the string is not a valid limit.
+
+        """
+        count, _, period = value.partition("/")
+        try:
+            limit = cls(
+                int(count), PERIODS.get(period.strip()) or float(period)
+            )
+        except ValueError:
+            limit = None
+        if limit is None or limit.count < 1 or limit.period <= 0:
+            raise ValueError(
+                "Invalid rate limit '{0:s}', expected e.g. 100/minute".format(
+                    value
+                )
+            )
+        return limit
+
+
+class TokenBucket(object):
+    """In-process token bucket, refilled at the rate of a limit.
+
+    Args:
+        limit (Limit): Capacity and refill rate of the bucket.
+
+    """
+
+    def __init__(self, limit: Limit):
+        """Initialize TokenBucket class object instance."""
+        self.capacity = limit.count
+        self.rate = limit.count / limit.period
+        self.tokens = float(limit.count)
+        self.updated = monotonic()
+
+    def take(self) -> float:
+        """Take a token.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the time in seconds
+                until the next one.
+
+        """
+        now = monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimitMiddleware(object):
+    """Pure ASGI middleware limiting the request rate of every client.
+
+    The limits hold across the processes and hosts sharing the Redis db.
+    Each is checked by one GCRA script, run atomically by Redis with its own
+    clock, see RedisClient.evalsha. Requests over the limit get a 429 status
+    and a ``Retry-After`` header.
+
+    Every process also keeps a token bucket per client and limit, holding
+    what the process alone may let through. Requests finding it empty are
+    over the shared limit too and are rejected without calling Redis.
+
+    Clients are told apart by the ``client_header`` request header, e.g. an
+    API key set by a gateway, and by their address without it. The header
+    must be written by a trusted proxy, clients can send any value. For a
+    list header such as ``X-Forwarded-For``, where every proxy appends the
+    address it received the request from, the address appended by the
+    outermost of the ``trusted_proxies`` is used, i.e. the entry
+    ``trusted_proxies`` from the right. Requests under one of the ``routes``
+    path prefixes, the longest first, are counted against the limit of
+    that prefix, the others against the ``default`` limit. A None limit
+    disables it.
+
+    If Redis is disabled or failing, requests allowed by the token buckets
+    go through (fail open).
+
+    Args:
+        app (ASGIApp): Wrapped ASGI application.
+        default (str, optional): Limit of every client, e.g. "100/minute".
+        routes (Dict[str, str], optional): Limits by path prefix.
+        client_header (str, optional): Request header identifying clients.
+        trusted_proxies (int): Number of proxies appending to the
+            ``client_header`` list in front of the application.
+        max_buckets (int): Maximum number of token buckets kept, the least
+            recently used are dropped first.
+
+    Raises:
+        ValueError: If a limit is not valid.
+
+    """
+
+    def __init__(
+        self,
+        app,
+        default: Optional[str] = None,
+        routes: Dict[str, Optional[str]] = None,
+        client_header: Optional[str] = None,
+        trusted_proxies: int = 1,
+        max_buckets: int = 10000,
+    ):
+        """Initialize RateLimitMiddleware class object instance."""
+        self.app = app
+        self.default = Limit.parse(default) if default else None
+        # Longest first, the first match wins.
+        self.routes = [
+            (prefix, Limit.parse(limit) if limit else None)
+            for prefix, limit in sorted(
+                (routes or {}).items(), key=lambda item: -len(item[0])
+            )
+        ]
+        self.client_header = (
+            client_header.lower().encode("latin-1") if client_header else None
+        )
+        self.trusted_proxies = max(trusted_proxies, 1)
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._failing = False
+
+    async def __call__(self, scope, receive, send):
+        """Handle an ASGI request, unless over the limit."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        prefix, limit = self._limit(scope["path"])
+        if limit is not None:
+            key = "{0:s}{1:s}:{2:s}".format(
+                KEY_PREFIX, prefix, self._client(scope)
+            )
+            retry_after = await self._retry_after(key, limit)
+            if retry_after:
+                await self._reject(retry_after, send)
+                return
+
+        await self.app(scope, receive, send)
+
+    def _limit(self, path: str) -> tuple:
+        """Return the prefix and limit of a request path."""
+        for prefix, limit in self.routes:
+            if path.startswith(prefix):
+                return prefix, limit
+        return "", self.default
+
+    def _client(self, scope) -> str:
+        """Return the identifier of the client of a request."""
+        if self.client_header is not None:
+            for name, value in scope["headers"]:
+                if name == self.client_header:
+                    # The entries left of the trusted ones are the client's.
+                    entries = value.decode("latin-1").split(",")
+                    index = max(len(entries) - self.trusted_proxies, 0)
+                    return entries[index].strip()
+        client = scope.get("client")
+        return client[0] if client else ""
+
+    async def _retry_after(self, key: str, limit: Limit) -> float:
+        """Return 0 if a request is allowed, else when to retry in seconds."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(limit)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        retry_after = bucket.take()
+        if retry_after or RedisClient.redis_client is None:
+            return retry_after
+
+        period = limit.period * 1000
+        try:
+            allowed, retry_ms = await RedisClient.evalsha(
+                GCRA, [key], [period / limit.count, period]
+            )
+        except RedisError as ex:
+            if not self._failing:
+                log.warning("Rate limits unavailable, not enforced: {!r}", ex)
+                self._failing = True
+            return 0.0
+        if self._failing:
+            log.info("Rate limits enforced again")
+            self._failing = False
+        return 0.0 if allowed else retry_ms / 1000
+
+    async def _reject(self, retry_after: float, send):
+        """Send the 429 response."""
+        body = orjson.dumps(
+            ErrorResponse(code=429, message="Too many requests").dict(
+                exclude_none=True
+            )
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(retry_after)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
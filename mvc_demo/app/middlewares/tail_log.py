@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Tail based request log buffering middleware."""
+import time
+from typing import Optional
+
+from asgi_correlation_id.context import correlation_id
+from mvc_demo.core.log_tailbuffer import RequestLogBuffer
+
+
+class TailLogMiddleware(object):
+    """Pure ASGI middleware deciding what to do with buffered debug logs.
+
+    Starts buffering the low level records of every HTTP request in a
+    RequestLogBuffer, then writes them if the request failed with a 5xx
+    status or an exception, or took longer than ``slow_ms``, and drops them
+    otherwise. Must run inside CorrelationIdMiddleware, requests are keyed
+    by their correlation id.
+
+    Args:
+        app (ASGIApp): Wrapped ASGI application.
+        buffer (RequestLogBuffer): Buffer used as loguru handlers filter.
+        slow_ms (float, optional): Duration in milliseconds over which the
+            records of a successful request are written. None disables it.
+
+    """
+
+    def __init__(
+        self,
+        app,
+        buffer: RequestLogBuffer,
+        slow_ms: Optional[float] = None,
+    ):
+        """Initialize TailLogMiddleware class object instance."""
+        self.app = app
+        self.buffer = buffer
+        self.slow_ns = None if slow_ms is None else int(slow_ms * 1e6)
+
+    async def __call__(self, scope, receive, send):
+        """Handle an ASGI request and flush or discard its debug logs."""
+        request_id = correlation_id.get()
+        if scope["type"] != "http" or request_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        self.buffer.begin(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            self.buffer.flush(request_id)
+            raise
+
+        duration = time.perf_counter_ns() - start
+        if status[0] >= 500 or (
+            self.slow_ns is not None and duration >= self.slow_ns
+        ):
+            self.buffer.flush(request_id)
+        else:
+            self.buffer.discard(request_id)
@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 """This project was generated with fastapi-mvc."""
+from .log_level import LogLevelRequest, LogLevelResponse
 from .ready import ReadyResponse
 from .response import ErrorResponse
 
 __all__ = (
+    LogLevelRequest,
+    LogLevelResponse,
     ReadyResponse,
     ErrorResponse,
 )
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Log level models."""
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+
+class LogLevelRequest(BaseModel):
+    """Log level change request model definition.
+
+    Attributes:
+        default(Optional[str]): New default level name, e.g. "DEBUG". None
+            keeps the current one.
+        loggers(Dict[str, Optional[str]]): Level names by logger or module
+            name, "OFF" disables a logger and None restores the default level.
+
+    Raises:
+        pydantic.error_wrappers.ValidationError: If any of provided attribute
+            doesn't pass type validation.
+
+    """
+
+    default: Optional[str]
+    loggers: Dict[str, Optional[str]] = {}
+
+    class Config:
+        """Config sub-class needed to extend/override the generated JSON schema.
+
+        More details can be found in pydantic documentation:
+        https://pydantic-docs.helpmanual.io/usage/schema/#schema-customization
+
+        """
+
+        @staticmethod
+        def schema_extra(schema: Dict[str, Any]) -> None:
+            """Post-process the generated schema.
+
+            Mathod can have one or two positional arguments. The first will be
+            the schema dictionary. The second, if accepted, will be the model
+            class. The callable is expected to mutate the schema dictionary
+            in-place; the return value is not used.
+
+            Args:
+                schema(Dict[str, Any]): The schema dictionary.
+
+            """
+            # Override schema description, by default is taken from docstring.
+            schema["description"] = "Log level change request model."
+
+
+class LogLevelResponse(BaseModel):
+    """Log level response model definition.
+
+    Attributes:
+        default(str): Default level name.
+        loggers(Dict[str, str]): Level names by logger or module name.
+
+    Raises:
+        pydantic.error_wrappers.ValidationError: If any of provided attribute
+            doesn't pass type validation.
+
+    """
+
+    default: str
+    loggers: Dict[str, str]
+
+    class Config:
+        """Config sub-class needed to extend/override the generated JSON schema.
+
+        More details can be found in pydantic documentation:
+        https://pydantic-docs.helpmanual.io/usage/schema/#schema-customization
+
+        """
+
+        @staticmethod
+        def schema_extra(schema: Dict[str, Any]) -> None:
+            """Post-process the generated schema.
+
+            Mathod can have one or two positional arguments. The first will be
+            the schema dictionary. The second, if accepted, will be the model
+            class. The callable is expected to mutate the schema dictionary
+            in-place; the return value is not used.
+
+            Args:
+                schema(Dict[str, Any]): The schema dictionary.
+
+            """
+            # Override schema description, by default is taken from docstring.
+            schema["description"] = "Log level response model."
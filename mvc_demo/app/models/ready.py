@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """Ready model."""
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from pydantic import BaseModel
 
@@ -13,6 +13,8 @@ class ReadyResponse(BaseModel):
             coerced using str(v), bytes and bytearray are converted using
             v.decode(), enums inheriting from str are converted using
             v.value, and all other types cause an error.
+        redis_circuit(str, optional): State of the Redis circuit breaker,
+            "closed", "half_open" or "open", when enabled.
 
     Raises:
         pydantic.error_wrappers.ValidationError: If any of provided attribute
@@ -21,6 +23,7 @@ class ReadyResponse(BaseModel):
     """
 
     status: str
+    redis_circuit: Optional[str] = None
 
     class Config:
         """Config sub-class needed to extend/override the generated JSON schema.
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""Circuit breaker failing Redis calls fast while Redis is unreachable."""
+import logging
+from collections import deque
+from time import monotonic
+
+import aioredis
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATES = (CLOSED, HALF_OPEN, OPEN)
+
+# Number of buckets of the failure rate window.
+BUCKETS = 10
+
+
+class CircuitOpenError(aioredis.ConnectionError):
+    """Call rejected without trying, the circuit breaker is open."""
+
+
+class CircuitBreaker(object):
+    """Stop calling a failing service, then probe it until it recovers.
+
+    Closed, calls go through and their outcome is counted over a sliding
+    window of ``window`` seconds. The breaker opens once at least
+    ``min_calls`` calls were made in the window and the rate of failed
+    ones reaches ``failure_rate``. Open, every call fails right away with
+    CircuitOpenError, until ``cooldown`` seconds elapsed. Half-open, up to
+    ``probes`` concurrent calls go through as probes, the others are still
+    rejected. The breaker closes after ``probes`` successful probes, and
+    opens again on the first failed one.
+
+    Only the ``exceptions`` count as failures, e.g. connection errors and
+    timeouts. Other errors, such as command errors, prove the service is
+    reachable and count as successes. Cancelled calls are not counted.
+
+    Args:
+        name (str): Name of the protected service, used in log messages.
+        failure_rate (float): Rate of failed calls opening the breaker,
+            between 0 and 1.
+        min_calls (int): Minimum number of calls in the window before the
+            failure rate is considered.
+        window (float): Duration in seconds of the failure rate window.
+        cooldown (float): Time in seconds the breaker stays open.
+        probes (int): Number of probe calls of the half-open state.
+        exceptions (Tuple[type]): Exceptions counting as failures.
+
+    Attributes:
+        state (str): One of CLOSED, HALF_OPEN or OPEN.
+        transitions (Dict[str, int]): Number of transitions to every state.
+        rejected (int): Number of calls rejected with CircuitOpenError.
+        log (logging.Logger): Logging handler for this class.
+
+    """
+
+    log: logging.Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        name: str = "redis",
+        failure_rate: float = 0.5,
+        min_calls: int = 20,
+        window: float = 10.0,
+        cooldown: float = 5.0,
+        probes: int = 1,
+        exceptions=(aioredis.ConnectionError, aioredis.TimeoutError),
+    ):
+        """Initialize CircuitBreaker class object instance."""
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.probes = probes
+        self.exceptions = exceptions
+        self.state = CLOSED
+        self.transitions = dict.fromkeys(STATES, 0)
+        self.rejected = 0
+        # Start time, number of calls and of failed calls of every bucket.
+        self._buckets = deque()
+        self._opened_at = 0.0
+        self._probing = 0
+        self._probed = 0
+
+    async def call(self, func, *args):
+        """Call a coroutine function, unless the breaker is open.
+
+        Args:
+            func (Callable): Coroutine function calling the service.
+            *args: Function arguments.
+
+        Returns:
+            response: Function result.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with every
+                probe in flight.
+
+        """
+        probe = self._acquire()
+        try:
+            result = await func(*args)
+        except self.exceptions:
+            self._record(probe, failed=True)
+            raise
+        except Exception:
+            self._record(probe, failed=False)
+            raise
+        except BaseException:
+            # Cancelled, the outcome is unknown.
+            if probe:
+                self._probing -= 1
+            raise
+        self._record(probe, failed=False)
+        return result
+
+    def check(self):
+        """Fail fast if a call would be rejected now.
+
+        Raises:
+            CircuitOpenError: If the breaker is open and cooling down.
+
+        """
+        if self.state == OPEN and monotonic() - self._opened_at < self.cooldown:
+            self.rejected += 1
+            raise CircuitOpenError(
+                "Circuit breaker of {0:s} is open".format(self.name)
+            )
+
+    def stats(self) -> dict:
+        """Return the breaker state and counters.
+
+        Returns:
+            dict: Current ``state``, number of ``transitions`` to every state
+                and number of ``rejected`` calls.
+
+        """
+        return {
+            "state": self.state,
+            "transitions": dict(self.transitions),
+            "rejected": self.rejected,
+        }
+
+    def _acquire(self) -> bool:
+        """Let a call through, return whether it is a probe."""
+        if self.state == OPEN:
+            self.check()
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing >= self.probes:
+                self.rejected += 1
+                raise CircuitOpenError(
+                    "Circuit breaker of {0:s} is half-open".format(self.name)
+                )
+            self._probing += 1
+            return True
+        return False
+
+    def _record(self, probe: bool, failed: bool):
+        """Count the outcome of a call and change state if needed."""
+        if probe:
+            self._probing -= 1
+            if self.state != HALF_OPEN:
+                return
+            elif failed:
+                self._open()
+            else:
+                self._probed += 1
+                if self._probed >= self.probes:
+                    self._transition(CLOSED)
+            return
+        elif self.state != CLOSED:
+            # Sent before the breaker opened.
+            return
+
+        now = monotonic()
+        bucket_size = self.window / BUCKETS
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] + bucket_size <= now:
+            self._buckets.append([now, 0, 0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        bucket[2] += failed
+
+        if failed:
+            calls = sum(bucket[1] for bucket in self._buckets)
+            failures = sum(bucket[2] for bucket in self._buckets)
+            if calls >= self.min_calls:
+                if failures >= self.failure_rate * calls:
+                    self._open()
+
+    def _open(self):
+        """Open the breaker, starting the cooldown."""
+        self._opened_at = monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        """Change state, resetting the counters of the new state."""
+        self.log.log(
+            logging.WARNING if state == OPEN else logging.INFO,
+            "Circuit breaker of {0:s} is {1:s}, was {2:s}".format(
+                self.name, state, self.state
+            ),
+        )
+        self.state = state
+        self.transitions[state] += 1
+        self._buckets.clear()
+        self._probed = 0
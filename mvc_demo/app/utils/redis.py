@@ -1,13 +1,139 @@
 # -*- coding: utf-8 -*-
 """Redis client class utility."""
+import asyncio
+import hashlib
 import logging
+from contextlib import asynccontextmanager
+from functools import partial
 
 import aioredis
 import aioredis.sentinel
-from aioredis.exceptions import RedisError
+from aioredis.connection import BlockingConnectionPool, ConnectionPool
+from aioredis.exceptions import NoScriptError, RedisError
+from mvc_demo.app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from mvc_demo.app.utils.redis_cache import ClientSideCache
+from mvc_demo.app.utils.redis_cluster import RedisCluster
+from mvc_demo.app.utils.redis_codec import Codecs, RawCodec
 from mvc_demo.config import redis as redis_conf
 
 
+class CommandBatcher(object):
+    """Send the Redis commands issued in the same event loop tick at once.
+
+    Commands submitted by concurrent coroutines are queued until the event
+    loop runs the callbacks scheduled during the current iteration, then
+    sent as a single non-transactional pipeline, i.e. one round trip and one
+    pooled connection for the whole batch. Every caller gets its own result,
+    or the error of its own command. A connection failure fails the whole
+    batch.
+
+    Args:
+        redis_client (aioredis.Redis): Redis client object instance.
+        max_batch (int): Maximum number of commands in one pipeline, a full
+            batch is sent right away.
+
+    Attributes:
+        batches (int): Number of pipelines sent.
+        commands (int): Number of commands sent.
+
+    """
+
+    def __init__(self, redis_client: aioredis.Redis, max_batch: int = 512):
+        """Initialize CommandBatcher class object instance."""
+        self.redis_client = redis_client
+        self.max_batch = max_batch
+        self.batches = 0
+        self.commands = 0
+        self._pending = []
+        self._scheduled = False
+        # Strong references, the event loop only keeps weak ones to tasks.
+        self._tasks = set()
+
+    def submit(self, command: str, *args) -> asyncio.Future:
+        """Queue a command for the next batch.
+
+        Args:
+            command (str): aioredis.Redis command method name, e.g. "get".
+            *args: Command arguments.
+
+        Returns:
+            asyncio.Future: Resolved with the command response.
+
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((command, args, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self._flush)
+        return future
+
+    def _flush(self):
+        """Send the queued commands in a background task."""
+        self._scheduled = False
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list):
+        """Send a batch and resolve the future of every command."""
+        self.batches += 1
+        self.commands += len(batch)
+        try:
+            if len(batch) == 1:
+                command, args, _ = batch[0]
+                results = [await getattr(self.redis_client, command)(*args)]
+            else:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for command, args, _ in batch:
+                    getattr(pipe, command)(*args)
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as ex:
+            results = [ex] * len(batch)
+
+        for (_, _, future), result in zip(batch, results):
+            # The caller may have been cancelled meanwhile.
+            if future.done():
+                continue
+            elif isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class Script(object):
+    """Lua script run by its SHA1 digest, see RedisClient.evalsha.
+
+    Args:
+        source (str): Lua source code.
+
+    Attributes:
+        source (str): Lua source code.
+        sha (str): Hex SHA1 digest of the source code.
+
+    """
+
+    def __init__(self, source: str):
+        """Initialize Script class object instance."""
+        self.source = source
+        self.sha = hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+# Commands sent to the replicas when REDIS_READ_FROM_REPLICAS is enabled.
+READ_COMMANDS = frozenset(("get", "exists", "lrange", "mget", "hmget"))
+
+
+class BlockingSentinelConnectionPool(
+    aioredis.sentinel.SentinelConnectionPool, BlockingConnectionPool
+):
+    """Sentinel backed connection pool waiting for a connection when full."""
+
+
 class RedisClient(object):
     """Redis client utility.
 
@@ -15,26 +141,90 @@ class RedisClient(object):
 
     Attributes:
         redis_client (aioredis.Redis, optional): Redis client object instance.
+        replica_client (aioredis.Redis, optional): Sentinel replicas client
+            object instance, when REDIS_READ_FROM_REPLICAS is enabled.
         log (logging.Logger): Logging handler for this class.
         base_redis_init_kwargs (dict): Common kwargs regardless other Redis
             configuration
         connection_kwargs (dict, optional): Extra kwargs for Redis object init.
+        batcher (CommandBatcher, optional): Batches the commands of concurrent
+            coroutines, when REDIS_AUTO_BATCH is enabled.
+        replica_batcher (CommandBatcher, optional): Batches the commands sent
+            to the replicas.
+        cache (ClientSideCache, optional): Caches the GET responses, when
+            REDIS_CACHE is enabled.
+        codecs (Codecs): Encode the values written and decode the values
+            read, by key prefix.
+        breaker (CircuitBreaker, optional): Fails the commands fast while
+            Redis is unreachable, when REDIS_CIRCUIT_BREAKER is enabled.
+            Rejected commands raise CircuitOpenError, without logging.
 
     """
 
     redis_client: aioredis.Redis = None
+    replica_client: aioredis.Redis = None
     log: logging.Logger = logging.getLogger(__name__)
     base_redis_init_kwargs: dict = {
         "encoding": "utf-8",
         "port": redis_conf.REDIS_PORT,
     }
     connection_kwargs: dict = {}
+    batcher: CommandBatcher = None
+    replica_batcher: CommandBatcher = None
+    cache: ClientSideCache = None
+    codecs: Codecs = Codecs()
+    breaker: CircuitBreaker = None
+
+    @classmethod
+    def _pool_kwargs(cls):
+        """Return the connection pool kwargs of the configuration.
+
+        Returns:
+            dict: Pool size, timeouts, keepalive and health check settings.
+
+        """
+        pool_kwargs = {
+            "max_connections": redis_conf.REDIS_MAX_CONNECTIONS,
+            "socket_connect_timeout": redis_conf.REDIS_CONNECT_TIMEOUT,
+            "socket_timeout": redis_conf.REDIS_SOCKET_TIMEOUT,
+            "socket_keepalive": redis_conf.REDIS_KEEPALIVE,
+            "health_check_interval": redis_conf.REDIS_HEALTH_CHECK_INTERVAL,
+        }
+        if redis_conf.REDIS_BLOCKING_POOL:
+            pool_kwargs["timeout"] = redis_conf.REDIS_POOL_TIMEOUT
+        return pool_kwargs
+
+    @classmethod
+    def _addresses(cls, entries):
+        """Return the node addresses of a configuration list.
+
+        Args:
+            entries (List[str]): Addresses as "host:port", or "host" for the
+                default port.
+
+        Returns:
+            List[Tuple[str, int]]: Host and port of every node, or of the
+                configured host if empty.
+
+        """
+        addresses = []
+        for entry in entries:
+            host, _, port = entry.rpartition(":")
+            if host and port.isdigit():
+                addresses.append((host, int(port)))
+            else:
+                addresses.append((entry, redis_conf.REDIS_PORT))
+        return addresses or [(redis_conf.REDIS_HOST, redis_conf.REDIS_PORT)]
 
     @classmethod
     def open_redis_client(cls):
         """Create Redis client session object instance.
 
-        Based on configuration create either Redis client or Redis Sentinel.
+        Based on configuration create either Redis client, Redis Sentinel or
+        Redis Cluster. All use connection pools sized and tuned by the
+        configuration, one per node with Redis Cluster. With
+        Sentinel, a second client reads from the replicas when
+        REDIS_READ_FROM_REPLICAS is enabled.
 
         Returns:
             aioredis.Redis: Redis object instance.
@@ -48,17 +238,96 @@ class RedisClient(object):
                     "password": redis_conf.REDIS_PASSWORD,
                 }
 
+            pool_kwargs = cls._pool_kwargs()
             if redis_conf.REDIS_USE_SENTINEL:
+                sentinel_kwargs = {
+                    key: value
+                    for key, value in pool_kwargs.items()
+                    if key.startswith("socket_")
+                }
+                sentinel_kwargs.update(cls.connection_kwargs)
                 sentinel = aioredis.sentinel.Sentinel(
-                    [(redis_conf.REDIS_HOST, redis_conf.REDIS_PORT)],
-                    sentinel_kwargs=cls.connection_kwargs,
+                    cls._addresses(redis_conf.REDIS_SENTINELS),
+                    sentinel_kwargs=sentinel_kwargs,
+                )
+                if redis_conf.REDIS_BLOCKING_POOL:
+                    pool_class = BlockingSentinelConnectionPool
+                else:
+                    pool_class = aioredis.sentinel.SentinelConnectionPool
+                cls.redis_client = sentinel.master_for(
+                    redis_conf.REDIS_SENTINEL_SERVICE,
+                    connection_pool_class=pool_class,
+                    **pool_kwargs,
+                )
+                if redis_conf.REDIS_READ_FROM_REPLICAS:
+                    # Every connection picks the next replica, or the master
+                    # if none is reachable.
+                    cls.replica_client = sentinel.slave_for(
+                        redis_conf.REDIS_SENTINEL_SERVICE,
+                        connection_pool_class=pool_class,
+                        **pool_kwargs,
+                    )
+            elif redis_conf.REDIS_USE_CLUSTER:
+                tracking = redis_conf.REDIS_CACHE_INVALIDATION == "tracking"
+                if redis_conf.REDIS_CACHE and tracking:
+                    raise ValueError(
+                        "Redis Cluster supports the pubsub cache invalidation"
+                        " only"
+                    )
+                cls.base_redis_init_kwargs.update(cls.connection_kwargs)
+                node_kwargs = dict(cls.base_redis_init_kwargs)
+                node_kwargs.pop("port", None)
+                if redis_conf.REDIS_BLOCKING_POOL:
+                    pool_class = BlockingConnectionPool
+                else:
+                    pool_class = ConnectionPool
+                cls.redis_client = RedisCluster(
+                    cls._addresses(redis_conf.REDIS_CLUSTER_NODES),
+                    connection_pool_class=pool_class,
+                    **node_kwargs,
+                    **pool_kwargs,
                 )
-                cls.redis_client = sentinel.master_for("mymaster")
             else:
                 cls.base_redis_init_kwargs.update(cls.connection_kwargs)
-                cls.redis_client = aioredis.from_url(
-                    "redis://{0:s}".format(redis_conf.REDIS_HOST),
-                    **cls.base_redis_init_kwargs,
+                if redis_conf.REDIS_BLOCKING_POOL:
+                    pool_class = BlockingConnectionPool
+                else:
+                    pool_class = ConnectionPool
+                cls.redis_client = aioredis.Redis(
+                    connection_pool=pool_class.from_url(
+                        "redis://{0:s}".format(redis_conf.REDIS_HOST),
+                        **cls.base_redis_init_kwargs,
+                        **pool_kwargs,
+                    )
+                )
+
+            if redis_conf.REDIS_AUTO_BATCH:
+                cls.batcher = CommandBatcher(cls.redis_client)
+                if cls.replica_client is not None:
+                    cls.replica_batcher = CommandBatcher(cls.replica_client)
+            if redis_conf.REDIS_CACHE:
+                cls.cache = ClientSideCache(
+                    cls.redis_client,
+                    max_size=redis_conf.REDIS_CACHE_MAX_SIZE,
+                    ttl=redis_conf.REDIS_CACHE_TTL,
+                    invalidation=redis_conf.REDIS_CACHE_INVALIDATION,
+                    channel=redis_conf.REDIS_CACHE_CHANNEL,
+                    prefixes=redis_conf.REDIS_CACHE_PREFIXES,
+                )
+            cls.codecs = Codecs(
+                default=redis_conf.REDIS_CODEC,
+                prefixes=redis_conf.REDIS_CODEC_PREFIXES,
+                threshold=redis_conf.REDIS_COMPRESSION_THRESHOLD,
+                compression=redis_conf.REDIS_COMPRESSION,
+                level=redis_conf.REDIS_COMPRESSION_LEVEL,
+            )
+            if redis_conf.REDIS_CIRCUIT_BREAKER:
+                cls.breaker = CircuitBreaker(
+                    failure_rate=redis_conf.REDIS_CIRCUIT_FAILURE_RATE,
+                    min_calls=redis_conf.REDIS_CIRCUIT_MIN_CALLS,
+                    window=redis_conf.REDIS_CIRCUIT_WINDOW,
+                    cooldown=redis_conf.REDIS_CIRCUIT_COOLDOWN,
+                    probes=redis_conf.REDIS_CIRCUIT_PROBES,
                 )
 
         return cls.redis_client
@@ -68,7 +337,200 @@ class RedisClient(object):
         """Close Redis client."""
         if cls.redis_client:
             cls.log.debug("Closing Redis client")
+            if cls.cache is not None:
+                await cls.cache.close()
             await cls.redis_client.close()
+            if not isinstance(cls.redis_client, RedisCluster):
+                await cls.redis_client.connection_pool.disconnect()
+        if cls.replica_client:
+            await cls.replica_client.close()
+            await cls.replica_client.connection_pool.disconnect()
+
+    @classmethod
+    def pool_stats(cls):
+        """Return the usage gauges of the Redis client connection pool.
+
+        With Redis Cluster, the gauges of the node pools are summed.
+
+        Returns:
+            dict: Number of connections ``in_use`` and ``idle``, number of
+                ``waiters`` blocked on an exhausted pool, and the
+                ``max_connections`` of the pool.
+
+        """
+        if isinstance(cls.redis_client, RedisCluster):
+            pools = cls.redis_client.connection_pools
+        else:
+            pools = [cls.redis_client.connection_pool]
+        stats = dict.fromkeys(
+            ("in_use", "idle", "waiters", "max_connections"), 0
+        )
+        for pool in pools:
+            if isinstance(pool, BlockingConnectionPool):
+                # The queue holds idle connections, and None placeholders for
+                # the connections not created yet. Waiters block on its
+                # getters.
+                queue = pool.pool
+                stats["idle"] += sum(
+                    connection is not None for connection in queue._queue
+                )
+                stats["in_use"] += pool.max_connections - queue.qsize()
+                stats["waiters"] += sum(
+                    not waiter.done() for waiter in queue._getters
+                )
+            else:
+                stats["idle"] += len(pool._available_connections)
+                stats["in_use"] += len(pool._in_use_connections)
+            stats["max_connections"] += pool.max_connections
+        return stats
+
+    @classmethod
+    async def _call(cls, func, *args):
+        """Call a coroutine function through the circuit breaker, if enabled.
+
+        Args:
+            func (Callable): Coroutine function sending commands.
+            *args: Function arguments.
+
+        Returns:
+            response: Function result.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+
+        """
+        if cls.breaker is None:
+            return await func(*args)
+        return await cls.breaker.call(func, *args)
+
+    @classmethod
+    async def _execute(cls, command, *args):
+        """Execute a command right away, or in the next batch if enabled.
+
+        Read-only commands are sent to the replicas when enabled, then to the
+        master if the replicas are unreachable. Commands fail fast while the
+        circuit breaker is open.
+
+        Args:
+            command (str): aioredis.Redis command method name, e.g. "get".
+            *args: Command arguments.
+
+        Returns:
+            response: Redis command response.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing command.
+            CircuitOpenError: If the circuit breaker is open.
+
+        """
+        return await cls._call(cls._dispatch, command, *args)
+
+    @classmethod
+    async def _execute_master(cls, command, *args):
+        """Execute a command on the master only, see _execute.
+
+        Reads filling the client-side cache must not see a lagging replica,
+        the invalidations come from the master and a stale value read after
+        the invalidation would be cached until its TTL expires.
+
+        """
+        return await cls._call(
+            partial(cls._dispatch, master=True), command, *args
+        )
+
+    @classmethod
+    async def _dispatch(cls, command, *args, master=False):
+        """Send a command to the replicas or the master, see _execute."""
+        replicas = cls.replica_client is not None and not master
+        if replicas and command in READ_COMMANDS:
+            try:
+                if cls.replica_batcher is not None:
+                    return await cls.replica_batcher.submit(command, *args)
+                return await getattr(cls.replica_client, command)(*args)
+            except (aioredis.ConnectionError, aioredis.TimeoutError) as ex:
+                cls.log.warning(
+                    "Redis replicas unavailable, reading from the master: "
+                    "{0!r}".format(ex)
+                )
+
+        if cls.batcher is not None:
+            return await cls.batcher.submit(command, *args)
+        return await getattr(cls.redis_client, command)(*args)
+
+    @classmethod
+    async def _written(cls, *keys):
+        """Invalidate written keys in the client-side cache, if enabled."""
+        if cls.cache is not None:
+            for key in keys:
+                cls.cache.invalidate(key)
+                await cls.cache.publish(key)
+
+    @classmethod
+    def _encode(cls, key, value, codec=None):
+        """Return the bytes stored for the value of a key."""
+        return cls.codecs.for_key(key, codec).encode(value)
+
+    @classmethod
+    def _decode(cls, key, data, codec=None):
+        """Return the value of the bytes read from a key, None if missing."""
+        if data is None:
+            return None
+        return cls.codecs.for_key(key, codec).decode(data)
+
+    @classmethod
+    def _decode_all(cls, key, values, codec=None):
+        """Return the values of the list or hash elements read from a key."""
+        codec = cls.codecs.for_key(key, codec)
+        if isinstance(codec, RawCodec):
+            # Nothing to decode, spare the copy.
+            return values
+        return [None if data is None else codec.decode(data) for data in values]
+
+    @classmethod
+    @asynccontextmanager
+    async def pipeline(cls, transaction=False):
+        """Queue Redis commands and send them in a single round trip.
+
+        Commands are queued on the yielded pipeline and sent by its execute
+        method, which returns their responses in order. Commands still
+        queued when the block exits are sent then, through the circuit
+        breaker.
+
+        Example:
+            async with RedisClient.pipeline() as pipe:
+                pipe.set("key", "value")
+                pipe.get("key")
+                responses = await pipe.execute()
+
+        Args:
+            transaction (bool): Whether to wrap the commands in MULTI/EXEC.
+
+        Yields:
+            aioredis.client.Pipeline: Redis pipeline object instance.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing
+                commands.
+
+        """
+        redis_client = cls.redis_client
+
+        cls.log.debug("Preform Redis pipeline")
+        if cls.breaker is not None:
+            cls.breaker.check()
+        async with redis_client.pipeline(transaction=transaction) as pipe:
+            yield pipe
+            if len(pipe):
+                try:
+                    await cls._call(pipe.execute)
+                except CircuitOpenError:
+                    raise
+                except RedisError as ex:
+                    cls.log.exception(
+                        "Redis pipeline finished with exception",
+                        exc_info=(type(ex), ex, ex.__traceback__),
+                    )
+                    raise ex
 
     @classmethod
     async def ping(cls):
@@ -88,7 +550,9 @@ class RedisClient(object):
 
         cls.log.debug("Preform Redis PING command")
         try:
-            return await redis_client.ping()
+            return await cls._call(redis_client.ping)
+        except CircuitOpenError:
+            return False
         except RedisError as ex:
             cls.log.exception(
                 "Redis PING command finished with exception",
@@ -97,15 +561,21 @@ class RedisClient(object):
             return False
 
     @classmethod
-    async def set(cls, key, value):
+    async def set(cls, key, value, codec=None, ex=None, nx=False):
         """Execute Redis SET command.
 
         Set key to hold the string value. If key already holds a value, it is
-        overwritten, regardless of its type.
+        overwritten, regardless of its type. The key is invalidated in the
+        client-side cache when REDIS_CACHE is enabled.
 
         Args:
             key (str): Redis db key.
             value (str): Value to be set.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
+            ex (float, optional): Expire time in seconds, with millisecond
+                precision.
+            nx (bool): Only set the key if it does not already exist.
 
         Returns:
             response: Redis SET command response, for more info
@@ -115,32 +585,45 @@ class RedisClient(object):
             aioredis.RedisError: If Redis client failed while executing command.
 
         """
-        redis_client = cls.redis_client
-
         cls.log.debug(
             "Preform Redis SET command, key: {}, value: {}".format(key, value)
         )
         try:
-            await redis_client.set(key, value)
-        except RedisError as ex:
+            args = [key, cls._encode(key, value, codec)]
+            if ex is not None or nx:
+                # Positional ex, px and nx arguments of aioredis.Redis.set.
+                px = int(ex * 1000) if ex is not None else None
+                args.extend((None, px, nx))
+            response = await cls._execute("set", *args)
+            await cls._written(key)
+            return response
+        except CircuitOpenError:
+            raise
+        except RedisError as exc:
             cls.log.exception(
                 "Redis SET command finished with exception",
-                exc_info=(type(ex), ex, ex.__traceback__),
+                exc_info=(type(exc), exc, exc.__traceback__),
             )
-            raise ex
+            raise exc
+        finally:
+            if cls.cache is not None:
+                cls.cache.invalidate(key)
 
     @classmethod
-    async def rpush(cls, key, value):
+    async def rpush(cls, key, value, codec=None):
         """Execute Redis RPUSH command.
 
         Insert all the specified values at the tail of the list stored at key.
         If key does not exist, it is created as empty list before performing
         the push operation. When key holds a value that is not a list, an
-        error is returned.
+        error is returned. The key is invalidated in the client-side cache
+        when REDIS_CACHE is enabled.
 
         Args:
             key (str): Redis db key.
             value (str, list): Single or multiple values to append.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
 
         Returns:
             response: Length of the list after the push operation.
@@ -149,43 +632,55 @@ class RedisClient(object):
             aioredis.RedisError: If Redis client failed while executing command.
 
         """
-        redis_client = cls.redis_client
-
         cls.log.debug(
             "Preform Redis RPUSH command, key: {}, value: {}".format(key, value)
         )
         try:
-            await redis_client.rpush(key, value)
+            if isinstance(value, (list, tuple)):
+                value = [cls._encode(key, item, codec) for item in value]
+            else:
+                value = cls._encode(key, value, codec)
+            await cls._execute("rpush", key, value)
+            await cls._written(key)
+        except CircuitOpenError:
+            raise
         except RedisError as ex:
             cls.log.exception(
                 "Redis RPUSH command finished with exception",
                 exc_info=(type(ex), ex, ex.__traceback__),
             )
             raise ex
+        finally:
+            if cls.cache is not None:
+                cls.cache.invalidate(key)
 
     @classmethod
-    async def exists(cls, key):
+    async def exists(cls, key, *keys):
         """Execute Redis EXISTS command.
 
-        Returns if key exists.
+        Returns if key exists, or how many of the keys exist.
 
         Args:
             key (str): Redis db key.
+            *keys (str): More Redis db keys.
 
         Returns:
-            response: Boolean whether key exists in Redis db.
+            response: Number of existing keys, i.e. whether key exists in
+                Redis db for a single key.
 
         Raises:
             aioredis.RedisError: If Redis client failed while executing command.
 
         """
-        redis_client = cls.redis_client
-
         cls.log.debug(
-            "Preform Redis EXISTS command, key: {}, exists".format(key)
+            "Preform Redis EXISTS command, key: {}, exists".format(
+                (key,) + keys if keys else key
+            )
         )
         try:
-            return await redis_client.exists(key)
+            return await cls._execute("exists", key, *keys)
+        except CircuitOpenError:
+            raise
         except RedisError as ex:
             cls.log.exception(
                 "Redis EXISTS command finished with exception",
@@ -194,15 +689,18 @@ class RedisClient(object):
             raise ex
 
     @classmethod
-    async def get(cls, key):
+    async def get(cls, key, codec=None):
         """Execute Redis GET command.
 
         Get the value of key. If the key does not exist the special value None
         is returned. An error is returned if the value stored at key is not a
-        string, because GET only handles string values.
+        string, because GET only handles string values. Responses are served
+        from the client-side cache when REDIS_CACHE is enabled.
 
         Args:
             key (str): Redis db key.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
 
         Returns:
             response: Value of key.
@@ -211,11 +709,17 @@ class RedisClient(object):
             aioredis.RedisError: If Redis client failed while executing command.
 
         """
-        redis_client = cls.redis_client
-
         cls.log.debug("Preform Redis GET command, key: {}".format(key))
         try:
-            return await redis_client.get(key)
+            if cls.cache is not None:
+                data = await cls.cache.get(
+                    key, partial(cls._execute_master, "get", key)
+                )
+            else:
+                data = await cls._execute("get", key)
+            return cls._decode(key, data, codec)
+        except CircuitOpenError:
+            raise
         except RedisError as ex:
             cls.log.exception(
                 "Redis GET command finished with exception",
@@ -224,7 +728,7 @@ class RedisClient(object):
             raise ex
 
     @classmethod
-    async def lrange(cls, key, start, end):
+    async def lrange(cls, key, start, end, codec=None):
         """Execute Redis LRANGE command.
 
         Returns the specified elements of the list stored at key. The offsets
@@ -238,6 +742,8 @@ class RedisClient(object):
             key (str): Redis db key.
             start (int): Start offset value.
             end (int): End offset value.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
 
         Returns:
             response: Returns the specified elements of the list stored at key.
@@ -246,8 +752,6 @@ class RedisClient(object):
             aioredis.RedisError: If Redis client failed while executing command.
 
         """
-        redis_client = cls.redis_client
-
         cls.log.debug(
             "Preform Redis LRANGE command, key: {}, start: {}, end: {}".format(
                 key,
@@ -256,10 +760,359 @@ class RedisClient(object):
             )
         )
         try:
-            return await redis_client.lrange(key, start, end)
+            values = await cls._execute("lrange", key, start, end)
+            return cls._decode_all(key, values, codec)
+        except CircuitOpenError:
+            raise
+        except RedisError as ex:
+            cls.log.exception(
+                "Redis LRANGE command finished with exception",
+                exc_info=(type(ex), ex, ex.__traceback__),
+            )
+            raise ex
+
+    @classmethod
+    async def mget(cls, keys, codec=None):
+        """Execute Redis MGET command.
+
+        Returns the values of all specified keys, in a single round trip. For
+        every key that does not hold a string value or does not exist, the
+        special value None is returned.
+
+        Args:
+            keys (list): Redis db keys.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
+
+        Returns:
+            response: List of the values of keys, in order.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing command.
+
+        """
+        cls.log.debug("Preform Redis MGET command, keys: {}".format(keys))
+        try:
+            keys = list(keys)
+            values = await cls._execute("mget", keys)
+            return [
+                cls._decode(key, value, codec)
+                for key, value in zip(keys, values)
+            ]
+        except CircuitOpenError:
+            raise
+        except RedisError as ex:
+            cls.log.exception(
+                "Redis MGET command finished with exception",
+                exc_info=(type(ex), ex, ex.__traceback__),
+            )
+            raise ex
+
+    @classmethod
+    async def mset(cls, mapping, codec=None):
+        """Execute Redis MSET command.
+
+        Sets the given keys to their respective values, in a single round
+        trip. Existing values are overwritten. The keys are invalidated in
+        the client-side cache when REDIS_CACHE is enabled.
+
+        Args:
+            mapping (dict): Values to be set, by Redis db key.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
+
+        Returns:
+            response: Always True, MSET can not fail.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing command.
+
+        """
+        cls.log.debug("Preform Redis MSET command, mapping: {}".format(mapping))
+        try:
+            encoded = {
+                key: cls._encode(key, value, codec)
+                for key, value in mapping.items()
+            }
+            response = await cls._execute("mset", encoded)
+            await cls._written(*mapping)
+            return response
+        except CircuitOpenError:
+            raise
+        except RedisError as ex:
+            cls.log.exception(
+                "Redis MSET command finished with exception",
+                exc_info=(type(ex), ex, ex.__traceback__),
+            )
+            raise ex
+        finally:
+            if cls.cache is not None:
+                for key in mapping:
+                    cls.cache.invalidate(key)
+
+    @classmethod
+    async def hmget(cls, key, fields, codec=None):
+        """Execute Redis HMGET command.
+
+        Returns the values associated with the specified fields in the hash
+        stored at key. For every field that does not exist in the hash, None
+        is returned.
+
+        Args:
+            key (str): Redis db key.
+            fields (list): Hash fields.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
+
+        Returns:
+            response: List of the values of fields, in order.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing command.
+
+        """
+        cls.log.debug(
+            "Preform Redis HMGET command, key: {}, fields: {}".format(
+                key, fields
+            )
+        )
+        try:
+            values = await cls._execute("hmget", key, list(fields))
+            return cls._decode_all(key, values, codec)
+        except CircuitOpenError:
+            raise
+        except RedisError as ex:
+            cls.log.exception(
+                "Redis HMGET command finished with exception",
+                exc_info=(type(ex), ex, ex.__traceback__),
+            )
+            raise ex
+
+    @classmethod
+    async def hset(cls, key, mapping, codec=None):
+        """Execute Redis HSET command.
+
+        Sets the specified fields to their respective values in the hash
+        stored at key. If key does not exist, a new key holding a hash is
+        created.
+
+        Args:
+            key (str): Redis db key.
+            mapping (dict): Values to be set, by hash field.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
+
+        Returns:
+            response: Number of fields that were added.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing command.
+
+        """
+        cls.log.debug(
+            "Preform Redis HSET command, key: {}, mapping: {}".format(
+                key, mapping
+            )
+        )
+        try:
+            encoded = {
+                field: cls._encode(key, value, codec)
+                for field, value in mapping.items()
+            }
+            response = await cls._execute("hset", key, None, None, encoded)
+            await cls._written(key)
+            return response
+        except CircuitOpenError:
+            raise
+        except RedisError as ex:
+            cls.log.exception(
+                "Redis HSET command finished with exception",
+                exc_info=(type(ex), ex, ex.__traceback__),
+            )
+            raise ex
+        finally:
+            if cls.cache is not None:
+                cls.cache.invalidate(key)
+
+    @classmethod
+    async def scan_iter(cls, match=None, count=None):
+        """Iterate the keyspace with Redis SCAN commands.
+
+        Keys are fetched in pages of about count keys, so the whole keyspace
+        is never held in memory. A key may be returned more than once, and
+        keys added or removed during the iteration may be missed. With Redis
+        Cluster, every primary node is scanned in turn.
+
+        Args:
+            match (str, optional): Glob-style pattern the keys must match.
+            count (int, optional): Hint of the number of keys per page.
+
+        Yields:
+            str: Redis db key.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing command.
+
+        """
+        cls.log.debug(
+            "Preform Redis SCAN commands, match: {}, count: {}".format(
+                match, count
+            )
+        )
+        try:
+            if isinstance(cls.redis_client, RedisCluster):
+                nodes = await cls.redis_client.primary_nodes()
+            else:
+                nodes = [cls.redis_client]
+            # Cursors are only valid on the node that returned them.
+            for node in nodes:
+                cursor = 0
+                while True:
+                    cursor, keys = await cls._call(
+                        node.scan, cursor, match, count
+                    )
+                    for key in keys:
+                        yield key
+                    if not cursor:
+                        break
+        except CircuitOpenError:
+            raise
+        except RedisError as ex:
+            cls.log.exception(
+                "Redis SCAN command finished with exception",
+                exc_info=(type(ex), ex, ex.__traceback__),
+            )
+            raise ex
+
+    @classmethod
+    async def hscan_iter(cls, key, match=None, count=None, codec=None):
+        """Iterate the fields of a hash with Redis HSCAN commands.
+
+        Fields are fetched in pages of about count fields, with the same
+        guarantees as scan_iter.
+
+        Args:
+            key (str): Redis db key.
+            match (str, optional): Glob-style pattern the fields must match.
+            count (int, optional): Hint of the number of fields per page.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
+
+        Yields:
+            tuple: Hash field and its value.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing command.
+
+        """
+        cls.log.debug(
+            "Preform Redis HSCAN commands, key: {}, match: {}, "
+            "count: {}".format(key, match, count)
+        )
+        try:
+            cursor = 0
+            while True:
+                # Not sent to the replicas, cursors are node specific.
+                cursor, fields = await cls._call(
+                    cls.redis_client.hscan, key, cursor, match, count
+                )
+                for field, value in fields.items():
+                    yield field, cls._decode(key, value, codec)
+                if not cursor:
+                    break
+        except CircuitOpenError:
+            raise
+        except RedisError as ex:
+            cls.log.exception(
+                "Redis HSCAN command finished with exception",
+                exc_info=(type(ex), ex, ex.__traceback__),
+            )
+            raise ex
+
+    @classmethod
+    async def lrange_iter(cls, key, chunk_size=1000, codec=None):
+        """Iterate the elements of a list with chunked Redis LRANGE commands.
+
+        At most chunk_size elements are held in memory at once. Elements
+        pushed or popped at the head of the list during the iteration shift
+        the following chunks.
+
+        Args:
+            key (str): Redis db key.
+            chunk_size (int): Number of elements fetched per command.
+            codec (str | Codec, optional): Value codec, the codec of the key
+                prefix if None, see REDIS_CODEC_PREFIXES.
+
+        Yields:
+            str: List element.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing command.
+
+        """
+        cls.log.debug(
+            "Preform Redis LRANGE commands, key: {}, chunk_size: {}".format(
+                key, chunk_size
+            )
+        )
+        try:
+            start = 0
+            while True:
+                end = start + chunk_size - 1
+                values = await cls._execute("lrange", key, start, end)
+                for value in cls._decode_all(key, values, codec):
+                    yield value
+                if len(values) < chunk_size:
+                    break
+                start += chunk_size
+        except CircuitOpenError:
+            raise
         except RedisError as ex:
             cls.log.exception(
                 "Redis LRANGE command finished with exception",
                 exc_info=(type(ex), ex, ex.__traceback__),
             )
             raise ex
+
+    @classmethod
+    async def evalsha(cls, script, keys=(), args=()):
+        """Execute Redis EVALSHA command.
+
+        Runs a Lua script by its digest, sending its source only when Redis
+        does not know it yet, e.g. after a restart or a failover. The EVAL
+        command sent then caches the script for the following calls.
+
+        Args:
+            script (Script): Lua script.
+            keys (list): Redis db keys accessed by the script.
+            args (list): Additional script arguments.
+
+        Returns:
+            response: Value returned by the script.
+
+        Raises:
+            aioredis.RedisError: If Redis client failed while executing command.
+
+        """
+        cls.log.debug(
+            "Preform Redis EVALSHA command, sha: {}, keys: {}".format(
+                script.sha, keys
+            )
+        )
+        try:
+            try:
+                return await cls._execute(
+                    "evalsha", script.sha, len(keys), *keys, *args
+                )
+            except NoScriptError:
+                return await cls._execute(
+                    "eval", script.source, len(keys), *keys, *args
+                )
+        except CircuitOpenError:
+            raise
+        except RedisError as ex:
+            cls.log.exception(
+                "Redis EVALSHA command finished with exception",
+                exc_info=(type(ex), ex, ex.__traceback__),
+            )
+            raise ex
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""Client-side cache of the RedisClient GET responses."""
+import asyncio
+import logging
+import sys
+from collections import OrderedDict
+from time import monotonic
+
+import aioredis
+
+# Channel of the Redis server-assisted client-side caching invalidations.
+TRACKING_CHANNEL = "__redis__:invalidate"
+
+
+def _cache_key(key) -> str:
+    """Return the cache key of a Redis key or an invalidation message key."""
+    return key.decode() if isinstance(key, bytes) else key
+
+
+class ClientSideCache(object):
+    """In-process LRU cache of GET responses, invalidated by Redis.
+
+    Values read through the cache are kept until their key is invalidated,
+    their TTL elapses or they are evicted, least recently used first, to
+    keep the estimated memory used under ``max_size`` bytes.
+
+    Invalidations are received by a background task on a dedicated pub/sub
+    connection. With the ``tracking`` mode, a second dedicated connection
+    enables Redis client-side caching in broadcasting mode, redirected to
+    it, so the server reports every write of the tracked key prefixes, from
+    any client. aioredis only speaks RESP2, which cannot receive the RESP3
+    invalidation push messages inline. With the ``pubsub`` mode, writers
+    publish the written keys to ``channel`` instead, which only covers the
+    writes made through RedisClient.
+
+    Nothing is cached until the invalidation connections are set up, nor
+    while they are down. The cache is cleared when they are lost, as
+    invalidations may have been missed, and they are set up again after
+    ``retry_interval``.
+
+    Args:
+        redis_client (aioredis.Redis): Redis client object instance.
+        max_size (int): Maximum estimated size of the cached keys and values
+            in bytes.
+        ttl (float, optional): Maximum time in seconds a value is cached.
+        invalidation (str): Either "tracking" or "pubsub".
+        channel (str): Invalidation channel of the ``pubsub`` mode.
+        prefixes (List[str]): Key prefixes tracked by the ``tracking`` mode,
+            every key if empty.
+        check_interval (float): Time in seconds between two checks of the
+            tracking connection.
+        retry_interval (float): Time in seconds to wait before setting up
+            lost invalidation connections again.
+
+    Attributes:
+        hits (int): Number of GET responses served from the cache.
+        misses (int): Number of GET commands sent to Redis.
+        evictions (int): Number of values evicted to honor ``max_size``.
+        invalidations (int): Number of cached values invalidated.
+        size (int): Estimated size of the cached keys and values in bytes.
+        ready (bool): Whether invalidations are received, i.e. values are
+            cached.
+        log (logging.Logger): Logging handler for this class.
+
+    """
+
+    log: logging.Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        max_size: int,
+        ttl: float = None,
+        invalidation: str = "tracking",
+        channel: str = "mvc_demo:invalidate",
+        prefixes=(),
+        check_interval: float = 1.0,
+        retry_interval: float = 1.0,
+    ):
+        """Initialize ClientSideCache class object instance."""
+        if invalidation not in ("tracking", "pubsub"):
+            raise ValueError(
+                "Unknown cache invalidation: {0:s}".format(invalidation)
+            )
+        self.redis_client = redis_client
+        self.max_size = max_size
+        self.ttl = ttl
+        self.invalidation = invalidation
+        self.channel = (
+            TRACKING_CHANNEL if invalidation == "tracking" else channel
+        )
+        self.prefixes = list(prefixes)
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.size = 0
+        self.ready = False
+        # Per key, the value, its estimated size and its expiration time.
+        self._entries = OrderedDict()
+        # Per key, the token of the GET in flight whose value may be cached.
+        self._fetching = {}
+        self._task = None
+
+    async def get(self, key, fetch):
+        """Return the cached value of a key, or fetch and cache it.
+
+        Args:
+            key (str): Redis db key.
+            fetch (Callable): Coroutine function sending the GET command.
+
+        Returns:
+            response: Value of key.
+
+        """
+        self._start()
+        if not self.ready:
+            return await fetch()
+
+        key = _cache_key(key)
+        now = monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[2] > now:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            self._remove(key)
+
+        self.misses += 1
+        # An invalidation received while the command is in flight drops the
+        # token, the response may then be stale and is not cached.
+        token = object()
+        self._fetching[key] = token
+        try:
+            value = await fetch()
+        finally:
+            cacheable = self._fetching.get(key) is token
+            if cacheable:
+                del self._fetching[key]
+        if cacheable:
+            self._store(key, value, now)
+        return value
+
+    def invalidate(self, key):
+        """Drop the cached value of a key, e.g. after writing it.
+
+        Args:
+            key (str): Redis db key.
+
+        """
+        key = _cache_key(key)
+        self._fetching.pop(key, None)
+        if key in self._entries:
+            self._remove(key)
+            self.invalidations += 1
+
+    async def publish(self, key):
+        """Publish a key written by this process, with the ``pubsub`` mode.
+
+        Args:
+            key (str): Redis db key.
+
+        """
+        if self.invalidation == "pubsub":
+            await self.redis_client.publish(self.channel, key)
+
+    def clear(self):
+        """Drop every cached value."""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._fetching.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        """Return the cache counters.
+
+        Returns:
+            dict: Number of ``hits``, ``misses``, ``evictions``,
+                ``invalidations`` and cached ``entries``, and their estimated
+                ``size`` in bytes.
+
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "size": self.size,
+        }
+
+    async def close(self):
+        """Stop receiving invalidations and drop every cached value."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.clear()
+
+    def _store(self, key, value, now):
+        """Cache a value, evicting the least recently used ones if needed."""
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_size:
+            return
+        if key in self._entries:
+            self._remove(key)
+        expires = now + self.ttl if self.ttl else float("inf")
+        self._entries[key] = (value, size, expires)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted, _) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def _remove(self, key):
+        """Drop a cached value."""
+        _, size, _ = self._entries.pop(key)
+        self.size -= size
+
+    def _start(self):
+        """Start the invalidation listener task, unless already running."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    def _on_message(self, message):
+        """Apply an invalidation message."""
+        keys = message["data"]
+        if keys is None:
+            # Sent by the tracking mode when the database is flushed.
+            self.clear()
+        elif isinstance(keys, list):
+            for key in keys:
+                self.invalidate(key)
+        else:
+            self.invalidate(keys)
+
+    async def _listen(self):
+        """Receive the invalidations, set up again when connections fail."""
+        while True:
+            pubsub = self.redis_client.pubsub()
+            tracker = None
+            try:
+                if self.invalidation == "tracking":
+                    # The tracking redirection targets this connection.
+                    await pubsub.execute_command("CLIENT", "ID")
+                    redirect = await pubsub.parse_response()
+                await pubsub.subscribe(self.channel)
+
+                if self.invalidation == "tracking":
+                    tracker = self.redis_client.client()
+                    tracker_id = await tracker.client_id()
+                    prefixes = []
+                    for prefix in self.prefixes:
+                        prefixes.extend(("PREFIX", prefix))
+                    await tracker.execute_command(
+                        "CLIENT",
+                        "TRACKING",
+                        "ON",
+                        "REDIRECT",
+                        redirect,
+                        "BCAST",
+                        *prefixes,
+                    )
+
+                self.ready = True
+                self.log.debug("Redis client-side cache is ready")
+                checked = monotonic()
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=self.check_interval,
+                    )
+                    if message is not None:
+                        self._on_message(message)
+                    if tracker is None:
+                        continue
+                    elif monotonic() - checked >= self.check_interval:
+                        checked = monotonic()
+                        # A reconnected tracking connection tracks nothing.
+                        if await tracker.client_id() != tracker_id:
+                            raise aioredis.ConnectionError(
+                                "Redis tracking connection was reset"
+                            )
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                self.log.warning(
+                    "Redis client-side cache invalidations lost: {0!r}".format(
+                        ex
+                    )
+                )
+            finally:
+                self.ready = False
+                self.clear()
+                await self._disconnect(pubsub, tracker)
+            await asyncio.sleep(self.retry_interval)
+
+    @staticmethod
+    async def _disconnect(pubsub, tracker):
+        """Close the invalidation connections, ignoring errors."""
+        try:
+            await pubsub.reset()
+            if tracker is not None:
+                # Not reused by the pool, its tracking stays enabled.
+                if tracker.connection is not None:
+                    await tracker.connection.disconnect()
+                await tracker.close()
+        except Exception:  # pragma: no cover
+            pass
@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+"""Redis Cluster client routing the commands by key slot."""
+import asyncio
+import binascii
+import logging
+import random
+from collections import defaultdict
+from functools import partial
+
+import aioredis
+from aioredis.connection import ConnectionPool
+from aioredis.exceptions import RedisError, ResponseError
+
+# Number of hash slots of a Redis Cluster.
+SLOTS = 16384
+
+# Multi-key commands split by slot.
+MULTI_KEY_COMMANDS = frozenset(("exists", "delete", "mget", "mset"))
+# Commands whose keys follow the script and the number of keys.
+SCRIPT_COMMANDS = frozenset(("eval", "evalsha"))
+
+
+class ClusterError(RedisError):
+    """Command not routable to a Redis Cluster node."""
+
+
+def key_slot(key) -> int:
+    """Return the hash slot of a key.
+
+    Only the hash tag of the key is hashed, the part between the first "{"
+    and the next "}", if not empty, so related keys can share a slot.
+
+    Args:
+        key (str): Redis db key.
+
+    Returns:
+        int: Hash slot, the CRC16 (XMODEM) of the key modulo 16384.
+
+    """
+    if isinstance(key, str):
+        key = key.encode()
+    elif not isinstance(key, bytes):
+        key = str(key).encode()
+    start = key.find(b"{")
+    if start >= 0:
+        end = key.find(b"}", start + 1)
+        if end > start + 1:
+            first = start + 1
+            key = key[first:end]
+    return binascii.crc_hqx(key, 0) % SLOTS
+
+
+def _routing_key(command, args):
+    """Return the key routing a command, its first key argument."""
+    if command in SCRIPT_COMMANDS:
+        # The script or its digest, then the number of keys and the keys.
+        # Scripts without keys run on any node.
+        return args[2] if int(args[1]) else args[0]
+    key = args[0]
+    if isinstance(key, dict):
+        return next(iter(key))
+    elif isinstance(key, (list, tuple)):
+        return key[0]
+    return key
+
+
+def _keys(args):
+    """Return the keys of a multi-key command."""
+    if isinstance(args[0], dict):
+        return list(args[0])
+    elif isinstance(args[0], (list, tuple)):
+        return list(args[0]) + list(args[1:])
+    return list(args)
+
+
+def _redirection(error):
+    """Return the kind, slot and node address of a redirection error."""
+    kind, _, location = str(error).partition(" ")
+    if kind not in ("MOVED", "ASK"):
+        return None
+    slot, _, address = location.partition(" ")
+    host, _, port = address.rpartition(":")
+    return kind, int(slot), (host, int(port))
+
+
+class RedisCluster(object):
+    """Redis Cluster client, with a connection pool per node.
+
+    Commands are sent to the node serving the hash slot of their first key,
+    looked up in a slot map loaded with CLUSTER SLOTS on first use. MOVED
+    redirections update the slot and refresh the whole map in the
+    background. ASK redirections, during slot migrations, send the command
+    once to the importing node, after ASKING, without updating the map.
+    Connection errors refresh the map for the next commands but are not
+    retried, the command may have been applied.
+
+    Single key commands are the aioredis.Redis methods of the same name.
+    Multi-key commands are split by slot, the parts are sent in parallel to
+    their nodes.
+
+    Args:
+        startup_nodes (List[Tuple[str, int]]): Addresses of cluster nodes
+            to load the slot map from.
+        max_redirects (int): Maximum number of redirections followed by a
+            command.
+        connection_pool_class (Type[ConnectionPool]): Pool class of the
+            nodes.
+        **connection_kwargs: Pool and connection kwargs of the nodes.
+
+    Attributes:
+        slots (List[Tuple[str, int]]): Node address of every slot.
+        nodes (Dict[Tuple[str, int], aioredis.Redis]): Node clients.
+        log (logging.Logger): Logging handler for this class.
+
+    """
+
+    log: logging.Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        startup_nodes,
+        max_redirects: int = 5,
+        connection_pool_class=ConnectionPool,
+        **connection_kwargs,
+    ):
+        """Initialize RedisCluster class object instance."""
+        self.startup_nodes = list(startup_nodes)
+        self.max_redirects = max_redirects
+        self.connection_pool_class = connection_pool_class
+        self.connection_kwargs = connection_kwargs
+        self.slots = None
+        self.nodes = {}
+        self._refresh_task = None
+
+    def __await__(self):
+        """Return the client, the slots are loaded on first use."""
+        return self.initialize().__await__()
+
+    async def initialize(self):
+        """Return the client, for compatibility with aioredis.Redis."""
+        return self
+
+    def __getattr__(self, command):
+        """Return a single key command sender, routed by its key."""
+        if command.startswith("_"):
+            raise AttributeError(command)
+        return partial(self.execute, command)
+
+    @property
+    def connection_pools(self):
+        """List[ConnectionPool]: Connection pool of every node."""
+        return [node.connection_pool for node in self.nodes.values()]
+
+    def node(self, address) -> aioredis.Redis:
+        """Return the client of a node, created on first use.
+
+        Args:
+            address (Tuple[str, int]): Node host and port.
+
+        Returns:
+            aioredis.Redis: Node client object instance.
+
+        """
+        node = self.nodes.get(address)
+        if node is None:
+            host, port = address
+            node = aioredis.Redis(
+                connection_pool=self.connection_pool_class(
+                    host=host, port=port, **self.connection_kwargs
+                )
+            )
+            self.nodes[address] = node
+        return node
+
+    async def refresh_slots(self):
+        """Load the slot map from the first reachable known node.
+
+        Raises:
+            aioredis.ConnectionError: If no node could be reached.
+
+        """
+        known = list(dict.fromkeys(self.startup_nodes + list(self.nodes)))
+        error = None
+        for address in known:
+            try:
+                response = await self.node(address).execute_command(
+                    "CLUSTER", "SLOTS"
+                )
+            except (aioredis.ConnectionError, aioredis.TimeoutError) as ex:
+                error = ex
+                continue
+            slots = [None] * SLOTS
+            for start, end, primary, *_ in response:
+                host = primary[0]
+                if isinstance(host, bytes):
+                    host = host.decode()
+                # Nodes may announce an empty host, i.e. their own address.
+                node = (host or address[0], int(primary[1]))
+                stop = end + 1
+                slots[start:stop] = [node] * (stop - start)
+            self.slots = slots
+            return
+        raise aioredis.ConnectionError(
+            "No Redis Cluster node reachable: {0!r}".format(error)
+        )
+
+    def _schedule_refresh(self):
+        """Refresh the slot map in the background, unless already pending."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(
+                self._refresh_quietly()
+            )
+
+    async def _refresh_quietly(self):
+        """Refresh the slot map, logging failures."""
+        try:
+            await self.refresh_slots()
+        except aioredis.RedisError as ex:
+            self.log.warning(
+                "Redis Cluster slots refresh failed: {0!r}".format(ex)
+            )
+
+    async def node_for(self, key):
+        """Return the address of the node serving a key.
+
+        Args:
+            key (str): Redis db key.
+
+        Returns:
+            Tuple[str, int]: Node host and port.
+
+        Raises:
+            ClusterError: If the slot of the key is not served.
+
+        """
+        if self.slots is None:
+            await self.refresh_slots()
+        address = self.slots[key_slot(key)]
+        if address is None:
+            raise ClusterError(
+                "Hash slot {0:d} is not served".format(key_slot(key))
+            )
+        return address
+
+    async def primary_nodes(self):
+        """Return the clients of the nodes serving slots.
+
+        Returns:
+            List[aioredis.Redis]: Node client object instances.
+
+        """
+        if self.slots is None:
+            await self.refresh_slots()
+        addresses = dict.fromkeys(self.slots)
+        addresses.pop(None, None)
+        return [self.node(address) for address in addresses]
+
+    async def execute(self, command, *args):
+        """Send a command to the node serving its first key.
+
+        Args:
+            command (str): aioredis.Redis command method name, e.g. "get".
+            *args: Command arguments, starting with the key.
+
+        Returns:
+            response: Redis command response.
+
+        Raises:
+            aioredis.RedisError: If the command failed.
+            ClusterError: If the command was redirected more than
+                ``max_redirects`` times.
+
+        """
+        address = await self.node_for(_routing_key(command, args))
+        asking = False
+        for _ in range(self.max_redirects + 1):
+            node = self.node(address)
+            try:
+                if asking:
+                    pipe = node.pipeline(transaction=False)
+                    pipe.execute_command("ASKING")
+                    getattr(pipe, command)(*args)
+                    _, response = await pipe.execute(raise_on_error=False)
+                    if isinstance(response, Exception):
+                        raise response
+                    return response
+                return await getattr(node, command)(*args)
+            except ResponseError as ex:
+                redirection = _redirection(ex)
+                if redirection is None:
+                    raise
+                kind, slot, address = redirection
+                asking = kind == "ASK"
+                if not asking:
+                    self.slots[slot] = address
+                    self._schedule_refresh()
+            except (aioredis.ConnectionError, aioredis.TimeoutError):
+                self._schedule_refresh()
+                raise
+        raise ClusterError(
+            "Too many Redis Cluster redirections for {0:s}".format(command)
+        )
+
+    def pipeline(self, transaction: bool = False):
+        """Return a pipeline sending its commands to their nodes in parallel.
+
+        Args:
+            transaction (bool): Not supported across nodes, must be False.
+
+        Returns:
+            ClusterPipeline: Cluster pipeline object instance.
+
+        Raises:
+            ValueError: If a transaction is requested.
+
+        """
+        if transaction:
+            raise ValueError("Redis Cluster pipelines can not be transactions")
+        return ClusterPipeline(self)
+
+    async def _split(self, command, keys, *args):
+        """Send a multi-key command once per slot, in parallel."""
+        by_slot = defaultdict(list)
+        for key in keys:
+            by_slot[key_slot(key)].append(key)
+        pipe = self.pipeline()
+        for group in by_slot.values():
+            getattr(pipe, command)(*group, *args)
+        return by_slot.values(), await pipe.execute()
+
+    async def exists(self, *keys):
+        """Return the number of existing keys."""
+        _, counts = await self._split("exists", keys)
+        return sum(counts)
+
+    async def delete(self, *keys):
+        """Delete keys, return the number of keys deleted."""
+        _, counts = await self._split("delete", keys)
+        return sum(counts)
+
+    async def mget(self, keys, *args):
+        """Return the values of keys, in order."""
+        keys = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+        keys.extend(args)
+        groups, responses = await self._split("mget", keys)
+        values = {}
+        for group, response in zip(groups, responses):
+            values.update(zip(group, response))
+        return [values[key] for key in keys]
+
+    async def mset(self, mapping):
+        """Set keys to values, atomically per slot."""
+        by_slot = defaultdict(dict)
+        for key, value in mapping.items():
+            by_slot[key_slot(key)][key] = value
+        pipe = self.pipeline()
+        for group in by_slot.values():
+            pipe.mset(group)
+        return all(await pipe.execute())
+
+    async def ping(self):
+        """Ping every node serving slots."""
+        responses = await asyncio.gather(
+            *(node.ping() for node in await self.primary_nodes())
+        )
+        return all(responses)
+
+    def pubsub(self, **kwargs):
+        """Return a pub/sub of a startup node, messages are cluster wide."""
+        return self.node(self.startup_nodes[0]).pubsub(**kwargs)
+
+    async def publish(self, channel, message):
+        """Publish a message, to every subscriber of the cluster."""
+        return await self.node(random.choice(self.startup_nodes)).publish(
+            channel, message
+        )
+
+    async def close(self):
+        """Disconnect every node."""
+        for pool in self.connection_pools:
+            await pool.disconnect()
+
+
+class ClusterPipeline(object):
+    """Queue commands and send them grouped by node, in parallel.
+
+    Every node gets its commands in a single non-transactional pipeline.
+    Redirected commands are then sent again one by one. Multi-key commands
+    spanning several slots are split, see RedisCluster, after the commands
+    queued before them completed.
+
+    Args:
+        cluster (RedisCluster): Redis Cluster client object instance.
+
+    """
+
+    def __init__(self, cluster: RedisCluster):
+        """Initialize ClusterPipeline class object instance."""
+        self.cluster = cluster
+        self.commands = []
+
+    def __getattr__(self, command):
+        """Return a queuing function of a command."""
+        if command.startswith("_"):
+            raise AttributeError(command)
+
+        def queue(*args):
+            self.commands.append((command, args))
+            return self
+
+        return queue
+
+    def __len__(self):
+        """Return the number of queued commands."""
+        return len(self.commands)
+
+    async def __aenter__(self):
+        """Return the pipeline."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Forget the queued commands."""
+        self.commands = []
+
+    async def execute(self, raise_on_error: bool = True):
+        """Send the queued commands.
+
+        Args:
+            raise_on_error (bool): Raise the first command error, instead of
+                returning it in place of the command response.
+
+        Returns:
+            list: Command responses, in order.
+
+        Raises:
+            aioredis.RedisError: If a command failed and ``raise_on_error``.
+
+        """
+        commands, self.commands = self.commands, []
+        responses = [None] * len(commands)
+        by_node = defaultdict(list)
+        for index, (command, args) in enumerate(commands):
+            if command in MULTI_KEY_COMMANDS:
+                slots = {key_slot(key) for key in _keys(args)}
+                if len(slots) > 1:
+                    # Sent once the commands queued before it completed, to
+                    # keep their order.
+                    await self._send_nodes(by_node, commands, responses)
+                    by_node.clear()
+                    await self._send_split(index, commands, responses)
+                    continue
+            address = await self.cluster.node_for(_routing_key(command, args))
+            by_node[address].append(index)
+        await self._send_nodes(by_node, commands, responses)
+        if raise_on_error:
+            for response in responses:
+                if isinstance(response, Exception):
+                    raise response
+        return responses
+
+    async def _send_nodes(self, by_node, commands, responses):
+        """Send the commands grouped by node, in parallel."""
+        await asyncio.gather(
+            *(
+                self._send(address, indexes, commands, responses)
+                for address, indexes in by_node.items()
+            )
+        )
+
+    async def _send(self, address, indexes, commands, responses):
+        """Send the commands of a node, then the redirected ones again."""
+        pipe = self.cluster.node(address).pipeline(transaction=False)
+        for index in indexes:
+            command, args = commands[index]
+            getattr(pipe, command)(*args)
+        try:
+            results = await pipe.execute(raise_on_error=False)
+        except (aioredis.ConnectionError, aioredis.TimeoutError) as ex:
+            self.cluster._schedule_refresh()
+            results = [ex] * len(indexes)
+
+        for index, result in zip(indexes, results):
+            if isinstance(result, ResponseError) and _redirection(result):
+                command, args = commands[index]
+                try:
+                    result = await self.cluster.execute(command, *args)
+                except aioredis.RedisError as ex:
+                    result = ex
+            responses[index] = result
+
+    async def _send_split(self, index, commands, responses):
+        """Send a multi-key command spanning several slots."""
+        command, args = commands[index]
+        try:
+            responses[index] = await getattr(self.cluster, command)(*args)
+        except aioredis.RedisError as ex:
+            responses[index] = ex
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""Codecs of the values stored by RedisClient."""
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict
+
+import orjson
+from aioredis.exceptions import DataError
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# First byte of the framed values. Never the first byte of UTF-8 text, JSON
+# or msgpack data, 0xC1 is neither a valid UTF-8 byte nor a msgpack type.
+HEADER = b"\xc1"
+# Second byte of the framed values, how the payload is stored.
+STORED = b"\x00"
+ZLIB = b"\x01"
+ZSTD = b"\x02"
+COMPRESSIONS = {"zlib": ZLIB, "zstd": ZSTD}
+_DECOMPRESSION_ERRORS = (zlib.error,)
+if zstandard is not None:
+    _DECOMPRESSION_ERRORS += (zstandard.ZstdError,)
+
+
+def _to_bytes(value) -> bytes:
+    """Return the bytes of a value, the way aioredis encodes arguments."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    elif isinstance(value, bool):
+        raise DataError(
+            "Invalid input of type: 'bool'. Convert to a bytes, string, int "
+            "or float first."
+        )
+    elif isinstance(value, (int, float)):
+        return repr(value).encode()
+    elif isinstance(value, str):
+        return value.encode("utf-8")
+    raise DataError(
+        "Invalid input of type: '{0:s}'. Convert to a bytes, string, int or "
+        "float first.".format(type(value).__name__)
+    )
+
+
+class Codec(ABC):
+    """Turn values into the bytes stored in Redis, and back.
+
+    Attributes:
+        name (str): Codec name, see CODECS.
+
+    """
+
+    name: str = None
+
+    @abstractmethod
+    def encode(self, value) -> bytes:
+        """Return the bytes stored in Redis for a value.
+
+        Args:
+            value: Value to be stored.
+
+        Returns:
+            bytes: Encoded value.
+
+        Raises:
+            aioredis.DataError: If the value can not be encoded.
+
+        """
+
+    @abstractmethod
+    def decode(self, data):
+        """Return the value of bytes read from Redis.
+
+        Args:
+            data (bytes): Encoded value, never None.
+
+        Returns:
+            Decoded value.
+
+        Raises:
+            aioredis.DataError: If data is not a value encoded by this codec.
+
+        """
+
+
+class RawCodec(Codec):
+    """Store bytes, strings and numbers as is, read back bytes undecoded."""
+
+    name = "raw"
+
+    def encode(self, value):
+        """Return the value, encoded by aioredis."""
+        return value
+
+    def decode(self, data):
+        """Return data unchanged."""
+        return data
+
+
+class JSONCodec(Codec):
+    """Serialize values as JSON with orjson."""
+
+    name = "json"
+
+    def encode(self, value) -> bytes:
+        """Return the JSON document of a value."""
+        try:
+            return orjson.dumps(value)
+        except TypeError as ex:
+            raise DataError(str(ex)) from ex
+
+    def decode(self, data):
+        """Return the value of a JSON document."""
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as ex:
+            raise DataError(str(ex)) from ex
+
+
+class MsgpackCodec(Codec):
+    """Serialize values with msgpack, more compact than JSON.
+
+    Raises:
+        ValueError: If msgpack is not installed.
+
+    """
+
+    name = "msgpack"
+
+    def __init__(self):
+        """Initialize MsgpackCodec class object instance."""
+        if msgpack is None:
+            raise ValueError("The msgpack Redis codec requires msgpack")
+
+    def encode(self, value) -> bytes:
+        """Return the msgpack data of a value."""
+        try:
+            return msgpack.packb(value)
+        except TypeError as ex:
+            raise DataError(str(ex)) from ex
+
+    def decode(self, data):
+        """Return the value of msgpack data."""
+        try:
+            return msgpack.unpackb(data)
+        except (ValueError, msgpack.FormatError, msgpack.StackError) as ex:
+            raise DataError(str(ex)) from ex
+
+
+CODECS = {codec.name: codec for codec in (RawCodec, JSONCodec, MsgpackCodec)}
+
+
+class CompressedCodec(Codec):
+    """Compress the values of a codec above a size threshold.
+
+    Compressed values are framed, i.e. prefixed by the HEADER byte and the
+    compression method byte. Other values are stored as encoded by the codec,
+    unless they start with the HEADER byte themselves, which only raw values
+    can, they are then framed with the STORED method. So values written
+    before compression was enabled, or below the threshold, read back as is.
+
+    Args:
+        codec (Codec): Codec encoding the values before compression.
+        threshold (int): Minimum size in bytes of the encoded values to
+            compress.
+        compression (str): Either "zlib" or "zstd".
+        level (int): Compression level.
+
+    Raises:
+        ValueError: If the compression method is unknown or unavailable.
+
+    """
+
+    def __init__(
+        self,
+        codec: Codec,
+        threshold: int,
+        compression: str = "zlib",
+        level: int = 1,
+    ):
+        """Initialize CompressedCodec class object instance."""
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                "Invalid Redis compression '{0:s}', expected: {1:s}".format(
+                    compression, ", ".join(COMPRESSIONS)
+                )
+            )
+        elif compression == "zstd" and zstandard is None:
+            raise ValueError("The zstd Redis compression requires zstandard")
+        self.codec = codec
+        self.name = codec.name
+        self.threshold = threshold
+        self.compression = compression
+        self.level = level
+
+    def encode(self, value) -> bytes:
+        """Return the encoded value, compressed if large enough."""
+        data = _to_bytes(self.codec.encode(value))
+        if len(data) >= self.threshold:
+            if self.compression == "zstd":
+                compressor = zstandard.ZstdCompressor(level=self.level)
+                compressed = compressor.compress(data)
+            else:
+                compressed = zlib.compress(data, self.level)
+            # Not worth it for incompressible data.
+            if len(compressed) + 2 < len(data):
+                return HEADER + COMPRESSIONS[self.compression] + compressed
+        if data[:1] == HEADER:
+            return HEADER + STORED + data
+        return data
+
+    def decode(self, data):
+        """Return the value of framed or plain data."""
+        if data[:1] != HEADER:
+            return self.codec.decode(data)
+
+        method = data[1:2]
+        # Sliced without copy, the decompressors take memoryviews.
+        payload = memoryview(data)[2:]
+        try:
+            if method == ZLIB:
+                payload = zlib.decompress(payload)
+            elif method == ZSTD and zstandard is not None:
+                payload = zstandard.ZstdDecompressor().decompress(payload)
+            elif method == STORED:
+                payload = bytes(payload)
+            else:
+                raise DataError(
+                    "Unsupported Redis value compression method {0!r}".format(
+                        method
+                    )
+                )
+        except _DECOMPRESSION_ERRORS as ex:
+            raise DataError(str(ex)) from ex
+        return self.codec.decode(payload)
+
+
+class Codecs(object):
+    """Codecs of the Redis values, chosen by key prefix.
+
+    Values whose key starts with one of the prefixes use the codec of the
+    longest of them, the others the default codec. Every codec compresses
+    its values above the threshold, if set.
+
+    Args:
+        default (str): Name of the default codec, see CODECS.
+        prefixes (Dict[str, str]): Codec names by key prefix.
+        threshold (int): Minimum size in bytes of the values to compress,
+            0 disables the compression.
+        compression (str): Either "zlib" or "zstd".
+        level (int): Compression level.
+
+    Raises:
+        ValueError: If a codec or the compression method is unknown or
+            unavailable.
+
+    """
+
+    def __init__(
+        self,
+        default: str = "raw",
+        prefixes: Dict[str, str] = None,
+        threshold: int = 0,
+        compression: str = "zlib",
+        level: int = 1,
+    ):
+        """Initialize Codecs class object instance."""
+        self.threshold = threshold
+        self.compression = compression
+        self.level = level
+        self._codecs = {}
+        self.default = self.get(default)
+        # Longest first, the first match wins.
+        self.prefixes = [
+            (prefix, self.get(name))
+            for prefix, name in sorted(
+                (prefixes or {}).items(), key=lambda item: -len(item[0])
+            )
+        ]
+
+    def get(self, name: str) -> Codec:
+        """Return a codec by name.
+
+        Args:
+            name (str): Codec name, see CODECS.
+
+        Returns:
+            Codec: Codec object instance.
+
+        Raises:
+            ValueError: If the codec is unknown or unavailable.
+
+        """
+        try:
+            return self._codecs[name]
+        except KeyError:
+            pass
+        if name not in CODECS:
+            raise ValueError(
+                "Invalid Redis codec '{0:s}', expected: {1:s}".format(
+                    name, ", ".join(CODECS)
+                )
+            )
+        codec = CODECS[name]()
+        if self.threshold:
+            codec = CompressedCodec(
+                codec, self.threshold, self.compression, self.level
+            )
+        self._codecs[name] = codec
+        return codec
+
+    def for_key(self, key, codec=None) -> Codec:
+        """Return the codec of a key.
+
+        Args:
+            key (str): Redis db key.
+            codec (str | Codec, optional): Codec chosen by the caller, the
+                codec of the key prefix or the default one if None.
+
+        Returns:
+            Codec: Codec object instance.
+
+        """
+        if isinstance(codec, Codec):
+            return codec
+        elif codec is not None:
+            return self.get(codec)
+        if isinstance(key, bytes):
+            key = key.decode("utf-8", "replace")
+        for prefix, prefixed in self.prefixes:
+            if key.startswith(prefix):
+                return prefixed
+        return self.default
@@ -3,6 +3,7 @@
 import logging
 
 import click
+from mvc_demo.cli.commands.logs import logs
 from mvc_demo.cli.commands.serve import serve
 
 
@@ -29,3 +30,4 @@ def cli(**options):
 
 
 cli.add_command(serve)
+cli.add_command(logs)
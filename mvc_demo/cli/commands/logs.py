@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""mvc-demo CLI logs commands."""
+import os
+from datetime import datetime
+
+import click
+from mvc_demo.config import settings
+from mvc_demo.core.log_binary import decode_stream
+from mvc_demo.core.log_files import (
+    INDEX_SUFFIX,
+    PARTIAL_SUFFIX,
+    open_segment,
+)
+from mvc_demo.core.log_index import find_records
+
+
+def open_log(path):
+    """Open a log file for binary reading, decompressing rotated segments.
+
+    Args:
+        path(str): Log file path, ".gz" and ".zst" files are decompressed.
+
+    Returns:
+        BinaryIO: Readable binary stream.
+
+    Raises:
+        click.ClickException: If the file requires zstandard, which is not
+            installed.
+
+    """
+    try:
+        return open_segment(path)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+
+
+def log_paths(paths):
+    """Expand log directories to the log files they hold, sorted by name.
+
+    Args:
+        paths(Iterable[str]): Log file and directory paths, the directory of
+            the LOG_FILE setting when empty.
+
+    Returns:
+        List[str]: Log file paths, without sidecar index files.
+
+    Raises:
+        click.UsageError: If no path is given and LOG_FILE is not set.
+
+    """
+    if not paths:
+        if not settings.LOG_FILE:
+            raise click.UsageError(
+                "No log file given and FASTAPI_LOG_FILE is not set."
+            )
+        paths = [os.path.dirname(os.path.abspath(settings.LOG_FILE))]
+
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for name in sorted(os.listdir(path)):
+            # Sidecar indexes, and the ones being written, and compressed
+            # segments being written.
+            if name.endswith((INDEX_SUFFIX, ".tmp", PARTIAL_SUFFIX)):
+                continue
+            name = os.path.join(path, name)
+            if os.path.isfile(name):
+                files.append(name)
+    return files
+
+
+def parse_time(ctx, param, value):
+    """Parse an ISO 8601 time option, naive times are local times."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).astimezone()
+    except ValueError:
+        raise click.BadParameter(
+            "'{value}' is not an ISO 8601 time.".format(value=value)
+        )
+
+
+@click.group()
+def logs():
+    """mvc-demo CLI logs commands."""
+    pass
+
+
+@logs.command()
+@click.option(
+    "-o",
+    "--output",
+    help="Write the JSON lines to a file instead of the standard output.",
+    type=click.File("wb"),
+    default="-",
+    required=False,
+)
+@click.argument(
+    "files",
+    nargs=-1,
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+)
+def decode(output, files):
+    """Convert binary logs (FASTAPI_LOG_BINARY) to JSON lines.
+
+    Reads the FILES in order, or the standard input when none is given, and
+    writes the JSON lines as records are decoded.
+    """
+
+    def write(data):
+        output.write(data)
+        output.flush()
+
+    stdin = click.get_binary_stream("stdin")
+    for path in files or ["-"]:
+        source = stdin if path == "-" else open_log(path)
+        try:
+            decode_stream(source, write)
+        except ValueError as exc:
+            raise click.ClickException(
+                "{path}: {error}".format(path=path, error=exc)
+            )
+        finally:
+            if source is not stdin:
+                source.close()
+
+
+@logs.command()
+@click.option(
+    "-r",
+    "--request-id",
+    help="Only show the records of this request id.",
+    type=click.STRING,
+    required=False,
+)
+@click.option(
+    "--since",
+    help="Only show the records from this ISO 8601 time.",
+    type=click.STRING,
+    callback=parse_time,
+    required=False,
+)
+@click.option(
+    "--until",
+    help="Only show the records up to this ISO 8601 time.",
+    type=click.STRING,
+    callback=parse_time,
+    required=False,
+)
+@click.option(
+    "--save/--no-save",
+    help="Write the index of the rotated log files indexed on demand.",
+    default=True,
+    show_default=True,
+)
+@click.option(
+    "-o",
+    "--output",
+    help="Write the JSON lines to a file instead of the standard output.",
+    type=click.File("wb"),
+    default="-",
+    required=False,
+)
+@click.argument(
+    "paths",
+    nargs=-1,
+    type=click.Path(exists=True, readable=True),
+)
+def find(request_id, since, until, save, output, paths):
+    """Find the JSON log records of a request and/or a time range.
+
+    Searches the PATHS log files and directories in name order, the
+    directory of FASTAPI_LOG_FILE when none is given. Rotated log files are
+    indexed on first search, or when rotated with FASTAPI_LOG_INDEX, so only
+    the matching lines are read afterwards.
+    """
+    if request_id is None and since is None and until is None:
+        raise click.UsageError(
+            "At least one of --request-id, --since or --until is required."
+        )
+
+    try:
+        for line in find_records(
+            log_paths(paths), request_id, since, until, save=save
+        ):
+            output.write(line)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    output.flush()
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 """Application configuration."""
+from typing import Dict, List, Optional
+
 from pydantic import BaseSettings
 from mvc_demo.version import __version__
 
@@ -17,6 +19,41 @@ class Application(BaseSettings):
         FASTAPI_VERSION
         FASTAPI_DOCS_URL
         FASTAPI_USE_REDIS
+        FASTAPI_LOG_LEVEL
+        FASTAPI_JSON_LOGS
+        FASTAPI_LOG_BUFFER_RECORDS
+        FASTAPI_LOG_FLUSH_BYTES
+        FASTAPI_LOG_FLUSH_INTERVAL
+        FASTAPI_LOG_OVERFLOW_POLICY
+        FASTAPI_LOG_JSON_FIELDS
+        FASTAPI_LOG_BINARY
+        FASTAPI_LOG_RATE_LIMITS
+        FASTAPI_LOG_RATE_LIMIT_BURST
+        FASTAPI_LOG_RATE_LIMIT_SUMMARY_INTERVAL
+        FASTAPI_LOG_EXCEPTION_WINDOW
+        FASTAPI_LOG_EXCEPTION_RENDER_BUDGET
+        FASTAPI_LOG_AGGREGATOR_SOCKET
+        FASTAPI_LOG_FILE
+        FASTAPI_LOG_ROTATION
+        FASTAPI_LOG_COMPRESSION
+        FASTAPI_LOG_RETENTION_COUNT
+        FASTAPI_LOG_RETENTION_BYTES
+        FASTAPI_LOG_INDEX
+        FASTAPI_LOG_METRICS_INTERVAL
+        FASTAPI_LOG_ACCESS
+        FASTAPI_LOG_ACCESS_SAMPLE_RATE
+        FASTAPI_LOG_ACCESS_SLOW_MS
+        FASTAPI_LOG_TAIL_BUFFER
+        FASTAPI_LOG_TAIL_BUFFER_RECORDS
+        FASTAPI_LOG_TAIL_BUFFER_TOTAL
+        FASTAPI_LOG_TAIL_SLOW_MS
+        FASTAPI_LOG_LEVELS_FILE
+        FASTAPI_ADMIN_TOKEN
+        FASTAPI_RATE_LIMIT
+        FASTAPI_RATE_LIMIT_DEFAULT
+        FASTAPI_RATE_LIMIT_ROUTES
+        FASTAPI_RATE_LIMIT_CLIENT_HEADER
+        FASTAPI_RATE_LIMIT_TRUSTED_PROXIES
 
     Attributes:
         DEBUG(bool): FastAPI logging level. You should disable this for
@@ -25,6 +62,96 @@ class Application(BaseSettings):
         VERSION(str): Application version.
         DOCS_URL(str): Path where swagger ui will be served at.
         USE_REDIS(bool): Whether or not to use Redis.
+        LOG_LEVEL(str): Minimum level of the emitted log records.
+        JSON_LOGS(bool): Whether to emit JSON lines instead of text logs.
+        LOG_BUFFER_RECORDS(int): Maximum number of JSON log records waiting
+            in memory for the background writer.
+        LOG_FLUSH_BYTES(int): Buffered size in bytes which triggers a write.
+        LOG_FLUSH_INTERVAL(float): Maximum time in seconds a JSON log record
+            waits in memory before being written.
+        LOG_OVERFLOW_POLICY(str): What to do when the log buffer is full,
+            one of "block", "drop-oldest" or "drop-debug".
+        LOG_JSON_FIELDS(List[str]): Record fields written in JSON logs, for
+            example ["time", "level.name", "message", "extra.request_id"].
+            See mvc_demo.core.log_serializer.RECORD_FIELDS, defaults to
+            mvc_demo.core.log_serializer.DEFAULT_FIELDS.
+        LOG_BINARY(bool): Write JSON logs in the compact binary format of
+            mvc_demo.core.log_binary instead of JSON lines, with the
+            LOG_JSON_FIELDS fields. `mvc-demo logs decode` converts it back
+            to JSON lines. Not supported with LOG_AGGREGATOR_SOCKET.
+        LOG_RATE_LIMITS(Dict[str, float]): Records per second allowed for
+            each log call site, keyed by level name, logger name or
+            "<logger name>:<level name>", for example
+            {"ERROR": 1, "mvc_demo.app.utils.redis": 0.2}. Empty disables
+            rate limiting.
+        LOG_RATE_LIMIT_BURST(int): Records allowed in a burst per call site.
+        LOG_RATE_LIMIT_SUMMARY_INTERVAL(float): Minimum time in seconds
+            between two "suppressed N similar messages" records of the same
+            call site. The last records of a flood are reported once this
+            interval elapsed, or when the logs are flushed.
+        LOG_EXCEPTION_WINDOW(float): Time window in seconds in which only
+            the first occurrence of an exception, identified by its type and
+            traceback frames, is logged with its full traceback. Repeats are
+            logged with a short reference and a count. None disables it.
+        LOG_EXCEPTION_RENDER_BUDGET(float): Full diagnosed tracebacks
+            rendered per second at most, the others get a plain traceback.
+        LOG_AGGREGATOR_SOCKET(str): Unix socket path of the log aggregator
+            run by the gunicorn master. When set, workers send their log
+            records to the master which does all the writing. None writes
+            logs to stdout from every process.
+        LOG_FILE(str): Log file path. When set, logs are written to rotated
+            segments of this file instead of stdout. Without the log
+            aggregator every process writes its own segments.
+        LOG_ROTATION(str): When to rotate the log file, a size, a duration or
+            both comma separated, for example "100 MB", "1 h" or
+            "100 MB, 1 d".
+        LOG_COMPRESSION(str): Compression of rotated log files, "gzip",
+            "zstd" (requires zstandard) or None.
+        LOG_RETENTION_COUNT(int): Number of rotated log files to keep.
+        LOG_RETENTION_BYTES(int): Total size in bytes of rotated log files to
+            keep. None does not limit it.
+        LOG_INDEX(bool): Write a request id and time index next to every
+            rotated JSON lines log file, used by "mvc-demo logs find".
+            Indexes are otherwise built on demand by the command.
+        LOG_METRICS_INTERVAL(float): Interval in seconds between two logs of
+            the log pipeline metrics, records, bytes, drops and sink latency
+            per level, also served by /api/metrics. None disables the logs.
+        LOG_ACCESS(bool): Log requests with the structured access log
+            middleware instead of the gunicorn and uvicorn access logs.
+        LOG_ACCESS_SAMPLE_RATE(float): Fraction of successful requests
+            written to the access log, failed requests are always written.
+        LOG_ACCESS_SLOW_MS(float): Duration in milliseconds over which a
+            request is always written to the access log, at WARNING level.
+            None disables it.
+        LOG_TAIL_BUFFER(bool): Keep the records below LOG_LEVEL logged while
+            handling a request in memory, and write them only if the request
+            fails with a 5xx status or an exception, or is slower than
+            LOG_TAIL_SLOW_MS.
+        LOG_TAIL_BUFFER_RECORDS(int): Maximum number of buffered records per
+            request, the oldest are dropped first.
+        LOG_TAIL_BUFFER_TOTAL(int): Maximum number of buffered records for
+            all requests together.
+        LOG_TAIL_SLOW_MS(float): Duration in milliseconds over which the
+            buffered records of a successful request are written. None
+            disables it.
+        LOG_LEVELS_FILE(str): State file holding the log levels changed at
+            runtime, shared by the gunicorn workers. Defaults to a file named
+            after the gunicorn master pid in the temporary directory.
+        ADMIN_TOKEN(str): Bearer token required by the admin endpoints. None
+            disables them.
+        RATE_LIMIT(bool): Limit the request rate of every client, across the
+            processes sharing the Redis db, see RateLimitMiddleware.
+        RATE_LIMIT_DEFAULT(str): Limit of every client, e.g. "100/minute".
+            None disables it.
+        RATE_LIMIT_ROUTES(Dict[str, str]): Limits by path prefix, replacing
+            the default one under it, e.g. {"/api/search": "10/second"}.
+            A None limit disables it.
+        RATE_LIMIT_CLIENT_HEADER(str): Request header identifying clients,
+            written by a trusted proxy, e.g. X-Forwarded-For. Clients are
+            identified by their address if None.
+        RATE_LIMIT_TRUSTED_PROXIES(int): Number of trusted proxies appending
+            to RATE_LIMIT_CLIENT_HEADER, the entry this far from the right
+            identifies clients, the entries left of it are sent by them.
 
     """
 
@@ -37,6 +164,39 @@ class Application(BaseSettings):
     # separate file in this submodule.
     LOG_LEVEL: str = "DEBUG"
     JSON_LOGS: bool = False
+    LOG_BUFFER_RECORDS: int = 10000
+    LOG_FLUSH_BYTES: int = 64 * 1024
+    LOG_FLUSH_INTERVAL: float = 0.5
+    LOG_OVERFLOW_POLICY: str = "block"
+    LOG_JSON_FIELDS: List[str] = None
+    LOG_BINARY: bool = False
+    LOG_RATE_LIMITS: Dict[str, float] = {}
+    LOG_RATE_LIMIT_BURST: int = 10
+    LOG_RATE_LIMIT_SUMMARY_INTERVAL: float = 10.0
+    LOG_EXCEPTION_WINDOW: float = 60.0
+    LOG_EXCEPTION_RENDER_BUDGET: float = 10.0
+    LOG_AGGREGATOR_SOCKET: str = None
+    LOG_FILE: str = None
+    LOG_ROTATION: str = "100 MB"
+    LOG_COMPRESSION: str = "gzip"
+    LOG_RETENTION_COUNT: int = 10
+    LOG_RETENTION_BYTES: int = None
+    LOG_INDEX: bool = False
+    LOG_METRICS_INTERVAL: float = 60.0
+    LOG_ACCESS: bool = False
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0
+    LOG_ACCESS_SLOW_MS: float = None
+    LOG_TAIL_BUFFER: bool = False
+    LOG_TAIL_BUFFER_RECORDS: int = 200
+    LOG_TAIL_BUFFER_TOTAL: int = 10000
+    LOG_TAIL_SLOW_MS: float = 1000.0
+    LOG_LEVELS_FILE: str = None
+    ADMIN_TOKEN: str = None
+    RATE_LIMIT: bool = False
+    RATE_LIMIT_DEFAULT: str = "100/minute"
+    RATE_LIMIT_ROUTES: Dict[str, Optional[str]] = {}
+    RATE_LIMIT_CLIENT_HEADER: str = None
+    RATE_LIMIT_TRUSTED_PROXIES: int = 1
 
     class Config:
         """Config sub-class needed to customize BaseSettings settings.
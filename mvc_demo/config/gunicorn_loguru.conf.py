@@ -197,23 +197,51 @@ proc_name = None
 #
 #       A callable that accepts the same arguments as after_fork
 #
+#   post_worker_init - Called just after a worker has initialized the
+#       application.
+#
+#       A callable that takes a worker instance as the sole argument.
+#
 #   pre_exec - Called just prior to forking off a secondary
 #       master process during things like config reloading.
 #
 #       A callable that takes a server instance as the sole argument.
 #
+#   worker_exit - Called just after a worker has been exited, in the
+#       worker process.
+#
+#       A callable that takes a server and worker instance
+#       as arguments.
+#
+#   on_exit - Called just before exiting Gunicorn.
+#
+#       A callable that takes a server instance as the sole argument.
+#
 
 
 def post_fork(server, worker):
     """Execute after a worker is forked."""
     server.log.info("Worker spawned (pid: %s)", worker.pid)
 
+    from mvc_demo.core.loguru_logs import detach_log_aggregator
+
+    detach_log_aggregator()
+
 
 def pre_fork(server, worker):
     """Execute before a worker is forked."""
     pass
 
 
+def post_worker_init(worker):
+    """Execute after a worker has initialized the application."""
+    from mvc_demo.core.loguru_logs import install_log_level_signal
+
+    # Log levels changed at runtime are sent to the master with SIGUSR1,
+    # which forwards it to every worker.
+    install_log_level_signal(worker.ppid)
+
+
 def pre_exec(server):
     """Execute before a new master process is forked."""
     server.log.info("Forked child, re-executing.")
@@ -223,6 +251,10 @@ def when_ready(server):
     """Execute just after the server is started."""
     server.log.info("Server is ready. Spawning workers")
 
+    from mvc_demo.core.loguru_logs import start_log_aggregator
+
+    start_log_aggregator()
+
 
 def worker_int(worker):
     """Execute just after a worker exited on SIGINT or SIGQUIT."""
@@ -251,3 +283,21 @@ def worker_int(worker):
 def worker_abort(worker):
     """Execute when worker received the SIGABRT signal."""
     worker.log.info("worker received SIGABRT signal")
+
+    from mvc_demo.core.loguru_logs import close_logs
+
+    close_logs()
+
+
+def worker_exit(server, worker):
+    """Execute just after a worker exited, in the worker process."""
+    from mvc_demo.core.loguru_logs import close_logs
+
+    close_logs()
+
+
+def on_exit(server):
+    """Execute just before the master process exits."""
+    from mvc_demo.core.loguru_logs import stop_log_aggregator
+
+    stop_log_aggregator()
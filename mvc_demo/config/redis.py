@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 """Redis configuration."""
+from typing import Dict, List
+
 from pydantic import BaseSettings
 
 
@@ -16,6 +18,36 @@ class Redis(BaseSettings):
         FASTAPI_REDIS_USERNAME
         FASTAPI_REDIS_PASSWORD
         FASTAPI_REDIS_USE_SENTINEL
+        FASTAPI_REDIS_SENTINELS
+        FASTAPI_REDIS_SENTINEL_SERVICE
+        FASTAPI_REDIS_READ_FROM_REPLICAS
+        FASTAPI_REDIS_USE_CLUSTER
+        FASTAPI_REDIS_CLUSTER_NODES
+        FASTAPI_REDIS_AUTO_BATCH
+        FASTAPI_REDIS_MAX_CONNECTIONS
+        FASTAPI_REDIS_BLOCKING_POOL
+        FASTAPI_REDIS_POOL_TIMEOUT
+        FASTAPI_REDIS_CONNECT_TIMEOUT
+        FASTAPI_REDIS_SOCKET_TIMEOUT
+        FASTAPI_REDIS_KEEPALIVE
+        FASTAPI_REDIS_HEALTH_CHECK_INTERVAL
+        FASTAPI_REDIS_CACHE
+        FASTAPI_REDIS_CACHE_MAX_SIZE
+        FASTAPI_REDIS_CACHE_TTL
+        FASTAPI_REDIS_CACHE_INVALIDATION
+        FASTAPI_REDIS_CACHE_CHANNEL
+        FASTAPI_REDIS_CACHE_PREFIXES
+        FASTAPI_REDIS_CODEC
+        FASTAPI_REDIS_CODEC_PREFIXES
+        FASTAPI_REDIS_COMPRESSION_THRESHOLD
+        FASTAPI_REDIS_COMPRESSION
+        FASTAPI_REDIS_COMPRESSION_LEVEL
+        FASTAPI_REDIS_CIRCUIT_BREAKER
+        FASTAPI_REDIS_CIRCUIT_FAILURE_RATE
+        FASTAPI_REDIS_CIRCUIT_MIN_CALLS
+        FASTAPI_REDIS_CIRCUIT_WINDOW
+        FASTAPI_REDIS_CIRCUIT_COOLDOWN
+        FASTAPI_REDIS_CIRCUIT_PROBES
 
     Attributes:
         REDIS_HOTS(str): Redis host.
@@ -23,6 +55,64 @@ class Redis(BaseSettings):
         REDIS_USERNAME(str): Redis username.
         REDIS_PASSWORD(str): Redis password.
         REDIS_USE_SENTINEL(bool): If provided Redis config is for Sentinel.
+        REDIS_SENTINELS(List[str]): Sentinel addresses as "host:port", the
+            port defaults to REDIS_PORT. Only REDIS_HOST if empty.
+        REDIS_SENTINEL_SERVICE(str): Name of the service monitored by
+            Sentinel.
+        REDIS_READ_FROM_REPLICAS(bool): With Sentinel, send the read-only
+            commands to the replicas, round robin, falling back to the
+            master. Replicas may lag behind the master. GET commands served
+            by REDIS_CACHE are always sent to the master.
+        REDIS_USE_CLUSTER(bool): If provided Redis config is for a Redis
+            Cluster.
+        REDIS_CLUSTER_NODES(List[str]): Addresses as "host:port" of cluster
+            nodes to discover the cluster from, the port defaults to
+            REDIS_PORT. Only REDIS_HOST if empty.
+        REDIS_AUTO_BATCH(bool): Send the RedisClient commands issued in the
+            same event loop tick by concurrent coroutines as one pipeline.
+        REDIS_MAX_CONNECTIONS(int): Maximum number of connections of the pool,
+            per process.
+        REDIS_BLOCKING_POOL(bool): Wait for a connection to be released when
+            the pool is exhausted, instead of failing right away.
+        REDIS_POOL_TIMEOUT(float): Seconds to wait for a connection of a
+            blocking pool, None waits forever.
+        REDIS_CONNECT_TIMEOUT(float): Connect timeout in seconds.
+        REDIS_SOCKET_TIMEOUT(float): Read and write timeout in seconds.
+        REDIS_KEEPALIVE(bool): Enable TCP keepalive on the connections.
+        REDIS_HEALTH_CHECK_INTERVAL(int): Seconds a connection may stay idle
+            before it is checked with a PING when taken from the pool, 0
+            disables the checks.
+        REDIS_CACHE(bool): Cache the RedisClient GET responses in process.
+        REDIS_CACHE_MAX_SIZE(int): Maximum estimated size of the cached keys
+            and values in bytes, per process.
+        REDIS_CACHE_TTL(float): Maximum time in seconds a value is cached,
+            None or 0 caches values until invalidated or evicted.
+        REDIS_CACHE_INVALIDATION(str): Either "tracking", the Redis server
+            reports every write of the cached keys, or "pubsub", RedisClient
+            publishes the keys it writes to REDIS_CACHE_CHANNEL.
+        REDIS_CACHE_CHANNEL(str): Invalidation channel of the "pubsub" mode.
+        REDIS_CACHE_PREFIXES(List[str]): Key prefixes tracked by the
+            "tracking" mode, every key if empty.
+        REDIS_CODEC(str): Codec of the RedisClient values, "raw" stores and
+            reads back bytes as is, "json" and "msgpack" serialize them.
+        REDIS_CODEC_PREFIXES(Dict[str, str]): Codec names by key prefix,
+            overriding REDIS_CODEC, the longest matching prefix wins.
+        REDIS_COMPRESSION_THRESHOLD(int): Minimum size in bytes of the
+            encoded values to compress, 0 disables the compression.
+        REDIS_COMPRESSION(str): Compression method, "zlib" or "zstd", which
+            requires zstandard.
+        REDIS_COMPRESSION_LEVEL(int): Compression level.
+        REDIS_CIRCUIT_BREAKER(bool): Fail the RedisClient commands fast while
+            Redis is unreachable, instead of waiting for the timeouts.
+        REDIS_CIRCUIT_FAILURE_RATE(float): Rate of commands failing with
+            connection errors or timeouts opening the circuit breaker.
+        REDIS_CIRCUIT_MIN_CALLS(int): Minimum number of commands in the
+            window before the failure rate is considered.
+        REDIS_CIRCUIT_WINDOW(float): Failure rate window in seconds.
+        REDIS_CIRCUIT_COOLDOWN(float): Seconds the circuit breaker stays open
+            before probing Redis.
+        REDIS_CIRCUIT_PROBES(int): Number of successful probe commands
+            closing the circuit breaker, also sent concurrently at most.
 
     """
 
@@ -31,6 +121,36 @@ class Redis(BaseSettings):
     REDIS_USERNAME: str = None
     REDIS_PASSWORD: str = None
     REDIS_USE_SENTINEL: bool = False
+    REDIS_SENTINELS: List[str] = []
+    REDIS_SENTINEL_SERVICE: str = "mymaster"
+    REDIS_READ_FROM_REPLICAS: bool = False
+    REDIS_USE_CLUSTER: bool = False
+    REDIS_CLUSTER_NODES: List[str] = []
+    REDIS_AUTO_BATCH: bool = False
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_BLOCKING_POOL: bool = True
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_CONNECT_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_KEEPALIVE: bool = True
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    REDIS_CACHE: bool = False
+    REDIS_CACHE_MAX_SIZE: int = 16777216
+    REDIS_CACHE_TTL: float = 60.0
+    REDIS_CACHE_INVALIDATION: str = "tracking"
+    REDIS_CACHE_CHANNEL: str = "mvc_demo:invalidate"
+    REDIS_CACHE_PREFIXES: List[str] = []
+    REDIS_CODEC: str = "raw"
+    REDIS_CODEC_PREFIXES: Dict[str, str] = {}
+    REDIS_COMPRESSION_THRESHOLD: int = 0
+    REDIS_COMPRESSION: str = "zlib"
+    REDIS_COMPRESSION_LEVEL: int = 1
+    REDIS_CIRCUIT_BREAKER: bool = False
+    REDIS_CIRCUIT_FAILURE_RATE: float = 0.5
+    REDIS_CIRCUIT_MIN_CALLS: int = 20
+    REDIS_CIRCUIT_WINDOW: float = 10.0
+    REDIS_CIRCUIT_COOLDOWN: float = 5.0
+    REDIS_CIRCUIT_PROBES: int = 1
 
     class Config:
         """Config sub-class needed to customize BaseSettings settings.
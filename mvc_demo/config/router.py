@@ -3,8 +3,10 @@
 In this file all application endpoints are being defined.
 """
 from fastapi import APIRouter
-from mvc_demo.app.controllers.api.v1 import ready
+from mvc_demo.app.controllers.api.v1 import admin, metrics, ready
 
 router = APIRouter(prefix="/api")
 
 router.include_router(ready.router, tags=["ready"])
+router.include_router(admin.router, tags=["admin"])
+router.include_router(metrics.router, tags=["metrics"])
@@ -0,0 +1,307 @@
+"""Centralized log aggregation from gunicorn workers over a Unix socket."""
+import os
+import selectors
+import socket
+import sys
+import threading
+import time
+import traceback
+import weakref
+from typing import Optional
+
+# Every aggregator stream alive in this process, reset after fork.
+_STREAMS = weakref.WeakSet()
+
+READ_SIZE = 256 * 1024
+# Maximum size of the incomplete line kept per connection, longer lines are
+# written in pieces.
+MAX_PENDING = 1024 * 1024
+
+
+class LogAggregator(object):
+    """Receive log lines from worker processes and write them in one place.
+
+    Runs a daemon thread in the gunicorn master (or any dedicated process)
+    listening on a Unix socket. Workers send newline terminated records
+    through an AggregatorStream. Only complete lines are written, so lines
+    from different workers never interleave, and all the lines received in
+    one select round are written with a single write. Records spanning
+    several lines, e.g. text records with a traceback, can get lines of
+    other workers in between, JSON and binary records are one line each.
+
+    Back-pressure is end to end: when the output stream is slow the
+    aggregator stops reading, the socket buffers fill up, the sends of the
+    worker log writer threads block and their bounded buffers apply their
+    overflow policy.
+
+    Args:
+        path (str): Unix socket path to listen on.
+        stream (BinaryIO, optional): Binary stream to write to. Defaults to
+            the process stdout.
+
+    Attributes:
+        received (int): Number of bytes received from workers.
+        connections (int): Number of currently connected workers.
+        split_lines (int): Number of lines longer than MAX_PENDING, written
+            in pieces.
+
+    """
+
+    def __init__(self, path: str, stream=None):
+        """Initialize LogAggregator class object instance."""
+        self.path = path
+        self.stream = stream if stream is not None else sys.stdout.buffer
+        self.received = 0
+        self.connections = 0
+        self.split_lines = 0
+        self._listener: Optional[socket.socket] = None
+        self._wakeup = None
+        self._thread: Optional[threading.Thread] = None
+        self._selector = None
+
+    def start(self):
+        """Bind the socket and start the aggregator thread."""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        self._listener.listen(128)
+        self._listener.setblocking(False)
+        self._wakeup = socket.socketpair()
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        self._selector.register(self._wakeup[0], selectors.EVENT_READ)
+
+        self._thread = threading.Thread(
+            target=self._run, name="log-aggregator", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Write the pending lines and stop the aggregator thread.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds.
+
+        """
+        if self._thread is None:
+            return
+
+        self._wakeup[1].send(b"\0")
+        self._thread.join(timeout)
+        self._thread = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def close_inherited(self):
+        """Close the sockets inherited by a forked child process.
+
+        The aggregator thread only runs in the process which started it,
+        the socket file is left in place for it.
+        """
+        if self._selector is None:
+            return
+
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._wakeup[1].close()
+        self._selector.close()
+        self._selector = None
+        self._thread = None
+
+    def _run(self):
+        """Run the aggregator thread main loop."""
+        selector = self._selector
+        running = True
+
+        while running:
+            lines = []
+            for key, _ in selector.select(timeout=1.0):
+                if key.fileobj is self._listener:
+                    self._accept()
+                elif key.fileobj is self._wakeup[0]:
+                    running = False
+                else:
+                    self._receive(key, lines)
+
+            if lines:
+                self._write(b"".join(lines))
+
+        self._shutdown()
+
+    def _accept(self):
+        """Accept a new worker connection."""
+        try:
+            conn, _ = self._listener.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        # Bytes received after the last complete line of this connection.
+        self._selector.register(conn, selectors.EVENT_READ, bytearray())
+        self.connections += 1
+
+    def _receive(self, key, lines: list) -> bool:
+        """Read from a worker connection and collect its complete lines.
+
+        Returns:
+            bool: Whether data was read, False once nothing is available or
+                the connection was closed.
+
+        """
+        conn, pending = key.fileobj, key.data
+        try:
+            data = conn.recv(READ_SIZE)
+        except BlockingIOError:
+            return False
+        except OSError:
+            data = b""
+
+        if not data:
+            if pending:
+                lines.append(bytes(pending) + b"\n")
+                pending.clear()
+            self._selector.unregister(conn)
+            conn.close()
+            self.connections -= 1
+            return False
+
+        self.received += len(data)
+        pending += data
+        end = pending.rfind(b"\n") + 1
+        if end:
+            lines.append(bytes(pending[:end]))
+            del pending[:end]
+        if len(pending) > MAX_PENDING:
+            # Bounded memory per connection, the line is split.
+            lines.append(bytes(pending) + b"\n")
+            pending.clear()
+            self.split_lines += 1
+        return True
+
+    def _write(self, data: bytes):
+        """Write aggregated lines to the output stream."""
+        try:
+            self.stream.write(data)
+            self.stream.flush()
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+
+    def _shutdown(self):
+        """Drain the connections and close every socket."""
+        lines = []
+        for key in list(self._selector.get_map().values()):
+            if isinstance(key.data, bytearray):
+                while self._receive(key, lines):
+                    pass
+                if key.data:
+                    lines.append(bytes(key.data) + b"\n")
+
+        if lines:
+            self._write(b"".join(lines))
+
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._wakeup[1].close()
+        self._selector.close()
+
+
+class AggregatorStream(object):
+    """Binary stream sending log lines to a LogAggregator.
+
+    Used as the stream of the worker log writer. The connection is opened
+    lazily and re-opened after fork, so every process gets its own. While
+    the aggregator can not be reached, lines are written to the fallback
+    stream and the connection is retried every ``retry_interval`` seconds.
+
+    Sends block when the aggregator falls behind, which is how it pushes
+    back on the workers, see LogAggregator.
+
+    Args:
+        path (str): Unix socket path of the aggregator.
+        fallback (BinaryIO, optional): Stream used while the aggregator can
+            not be reached. Defaults to the process stdout.
+        retry_interval (float): Minimum time in seconds between two
+            connection attempts.
+
+    Attributes:
+        fallbacks (int): Number of writes sent to the fallback stream.
+
+    """
+
+    def __init__(self, path: str, fallback=None, retry_interval: float = 1.0):
+        """Initialize AggregatorStream class object instance."""
+        self.path = path
+        self.fallback = fallback if fallback is not None else sys.stdout.buffer
+        self.retry_interval = retry_interval
+        self.fallbacks = 0
+        self._sock: Optional[socket.socket] = None
+        self._next_attempt = 0.0
+        _STREAMS.add(self)
+
+    def write(self, data: bytes):
+        """Send data to the aggregator, or the fallback stream.
+
+        Only the data not sent yet goes to the fallback stream when the
+        connection fails, records are never written twice.
+
+        Args:
+            data (bytes): Newline terminated log records.
+
+        """
+        sock = self._sock or self._connect()
+        if sock is not None:
+            view = memoryview(data)
+            try:
+                while view:
+                    sent = sock.send(view)
+                    view = view[sent:]
+                return
+            except OSError:
+                self.close()
+                data = view.tobytes()
+
+        self.fallbacks += 1
+        self.fallback.write(data)
+        self.fallback.flush()
+
+    def flush(self):
+        """Flush the stream, sends are not buffered."""
+        pass
+
+    def close(self):
+        """Close the connection to the aggregator."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            self._next_attempt = time.monotonic() + self.retry_interval
+
+    def _connect(self) -> Optional[socket.socket]:
+        """Connect to the aggregator, unless the last attempt is too recent."""
+        if time.monotonic() < self._next_attempt:
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            self._next_attempt = time.monotonic() + self.retry_interval
+            return None
+
+        self._sock = sock
+        return sock
+
+
+def _reset_streams_after_fork():
+    """Drop the aggregator connections inherited from the parent process."""
+    for stream in list(_STREAMS):
+        if stream._sock is not None:
+            stream._sock.close()
+            stream._sock = None
+        stream._next_attempt = 0.0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_streams_after_fork)
@@ -0,0 +1,649 @@
+"""Compact binary wire format for loguru records.
+
+A binary log stream is a sequence of frames, each one made of a type byte,
+the writing process id (u32), the payload length (u32), the payload and a
+newline trailer. Integers are little-endian. Frames of several processes
+can be interleaved in one stream, e.g. gunicorn workers sharing stdout, the
+decoder keeps a separate state per process id.
+
+* ``H`` header: magic, format version and the record schema, i.e. the
+  list of (kind, name) columns. Resets the string dictionary.
+* ``S`` strings: interned string definitions, the id of the first string
+  (u32) followed by u32 length prefixed UTF-8 strings, with sequential ids.
+* ``R`` record: the fixed size values packed in one struct (numbers,
+  string ids, lengths of the variable length values), then the variable
+  length values (messages, tracebacks, extra values as JSON array).
+
+Repeated strings, such as level, logger, module, function, file, process
+and thread names and the extra keys, are written once per segment then
+referenced by id. Every rotated log file starts with a header and a
+snapshot of the dictionary, so it can be decoded on its own.
+"""
+import operator
+import os
+import struct
+import threading
+import weakref
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List
+
+import orjson
+from mvc_demo.core.log_serializer import (
+    DEFAULT_FIELDS,
+    GROUP_ATTRIBUTES,
+    extra_extractor,
+    json_default,
+    public_extra,
+    select_fields,
+)
+
+MAGIC = b"MVCLOG"
+VERSION = 1
+
+FRAME_HEADER = b"H"
+FRAME_STRINGS = b"S"
+FRAME_RECORD = b"R"
+_FRAME_TYPES = (FRAME_HEADER, FRAME_STRINGS, FRAME_RECORD)
+
+_FRAME = struct.Struct("<cII")
+_TRAILER = b"\n"
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+# Column kinds, as struct format characters of their fixed size part.
+KIND_TIME = "t"  # Microseconds since epoch (q) and UTC offset seconds (i).
+KIND_FLOAT = "d"
+KIND_INT = "q"
+KIND_UINT = "Q"
+KIND_SYMBOL = "s"  # Interned string id (I).
+KIND_STRING = "S"  # Length (I), then the UTF-8 bytes.
+KIND_EXTRA = "x"  # Interned keys id (I), length (I), values JSON array.
+_KIND_FORMATS = {
+    KIND_TIME: "qi",
+    KIND_FLOAT: "d",
+    KIND_INT: "q",
+    KIND_UINT: "Q",
+    KIND_SYMBOL: "I",
+    KIND_STRING: "I",
+    KIND_EXTRA: "II",
+}
+
+# Symbol id of None, and symbol id or string length of an inline string
+# once the dictionary is full, or of a None string.
+_NONE_SYMBOL = 0
+_INLINE = _NONE_STRING = 0xFFFFFFFF
+_KEYS_SEPARATOR = "\0"
+
+_COLUMN_KINDS = {
+    "elapsed": KIND_FLOAT,
+    "message": KIND_STRING,
+    "name": KIND_SYMBOL,
+    "module": KIND_SYMBOL,
+    "function": KIND_SYMBOL,
+    "line": KIND_INT,
+    "level.name": KIND_SYMBOL,
+    "level.no": KIND_INT,
+    "process.id": KIND_INT,
+    "process.name": KIND_SYMBOL,
+    "thread.id": KIND_UINT,
+    "thread.name": KIND_SYMBOL,
+    "file.name": KIND_SYMBOL,
+    "file.path": KIND_SYMBOL,
+}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# UTC offset in seconds by record timezone.
+_OFFSETS = {}
+
+# Every encoder alive in this process, reset after fork.
+_ENCODERS = weakref.WeakSet()
+
+
+def _frame(kind: bytes, pid: int, payload: bytes) -> bytes:
+    """Return a frame of a process."""
+    return b"".join((_FRAME.pack(kind, pid, len(payload)), payload, _TRAILER))
+
+
+def _utc_offset(time: datetime) -> int:
+    """Return the UTC offset of a record time in seconds."""
+    try:
+        return _OFFSETS[time.tzinfo]
+    except KeyError:
+        offset = _OFFSETS[time.tzinfo] = int(time.utcoffset().total_seconds())
+        return offset
+
+
+def _columns(fields: Iterable[str]) -> list:
+    """Turn the field allow-list into (kind, name, extractors) columns.
+
+    Extractors of string columns take the record and the formatted message,
+    the others the record only.
+    """
+    fields = tuple(fields)
+    columns = []
+    for field, attributes in select_fields(fields).items():
+        if field == "time":
+            extractors = (
+                lambda record: round(record["time"].timestamp() * 1000000),
+                lambda record: _utc_offset(record["time"]),
+            )
+            columns.append((KIND_TIME, field, extractors))
+        elif field == "extra":
+            extract = (
+                public_extra
+                if attributes is None
+                else extra_extractor(tuple(attributes))
+            )
+            extractors = (
+                (lambda get: lambda record: _KEYS_SEPARATOR.join(get(record)))(
+                    extract
+                ),
+                (
+                    lambda get: lambda record, message: orjson.dumps(
+                        list(get(record).values()), default=json_default
+                    )
+                )(extract),
+            )
+            columns.append((KIND_EXTRA, field, extractors))
+        elif field == "exception":
+            continue
+        elif field in GROUP_ATTRIBUTES:
+            for attribute in attributes or GROUP_ATTRIBUTES[field]:
+                name = "{0:s}.{1:s}".format(field, attribute)
+                extract = (lambda key, get: lambda record: get(record[key]))(
+                    field, operator.attrgetter(attribute)
+                )
+                columns.append((_COLUMN_KINDS[name], name, (extract,)))
+        elif field == "elapsed":
+            extract = lambda record: record["elapsed"].total_seconds()  # noqa
+            columns.append((KIND_FLOAT, field, (extract,)))
+        elif field == "message":
+            extract = lambda record, message: record["message"]  # noqa
+            columns.append((KIND_STRING, field, (extract,)))
+        else:
+            extract = operator.itemgetter(field)
+            columns.append((_COLUMN_KINDS[field], field, (extract,)))
+
+    if "exception" in fields:
+        # Last like in JSON lines, rendered from the formatted message.
+        columns.append((KIND_STRING, "exception", (_exception,)))
+    return columns
+
+
+def _exception(record, message):
+    """Return the traceback rendered after the record message, if any."""
+    if record["exception"]:
+        start = len(record["message"]) + 1
+        return message[start:]
+    return None
+
+
+def _layout(kinds: Iterable[str]) -> tuple:
+    """Return the record struct and the value index of every column.
+
+    The fixed size part of a record holds the numbers, then the symbol ids,
+    then the string lengths, each group in column order. Time columns take
+    two numbers, extra columns a symbol (the keys) and a string (the values
+    as a JSON array).
+
+    Returns:
+        tuple: Record struct, number of numbers and symbols, and the index
+            of the column values in their group.
+
+    """
+    kinds = tuple(kinds)
+    numbers, symbols, strings = [], 0, 0
+    indexes = []
+    for kind in kinds:
+        if kind == KIND_SYMBOL:
+            indexes.append(symbols)
+            symbols += 1
+        elif kind == KIND_STRING:
+            indexes.append(strings)
+            strings += 1
+        elif kind == KIND_EXTRA:
+            indexes.append((symbols, strings))
+            symbols += 1
+            strings += 1
+        else:
+            indexes.append(len(numbers))
+            numbers += _KIND_FORMATS[kind]
+
+    fmt = "<{0:s}{1:s}{2:s}".format(
+        "".join(numbers), "I" * symbols, "I" * strings
+    )
+    return struct.Struct(fmt), len(numbers), symbols, indexes
+
+
+def _schema(columns: list) -> bytes:
+    """Return the header frame payload for a list of columns."""
+    parts = [MAGIC, bytes((VERSION,)), _U16.pack(len(columns))]
+    for kind, name, _ in columns:
+        encoded = name.encode("utf-8")
+        parts += [kind.encode("ascii"), _U16.pack(len(encoded)), encoded]
+    return b"".join(parts)
+
+
+class BinaryRecordEncoder(object):
+    """Serializer turning loguru messages into binary record frames.
+
+    Drop-in replacement of the JSON serializer built by
+    build_record_serializer, for the same field allow-list. The returned
+    bytes hold the header frame on first use, the definitions of the
+    strings seen for the first time, and the record frame.
+
+    Args:
+        fields (Iterable[str]): Field allow-list, see RECORD_FIELDS.
+        max_strings (int): Dictionary size, further strings are written
+            inline in every record.
+
+    Raises:
+        ValueError: If the allow-list holds an unknown field.
+
+    """
+
+    def __init__(
+        self,
+        fields: Iterable[str] = DEFAULT_FIELDS,
+        max_strings: int = 65536,
+    ):
+        """Initialize BinaryRecordEncoder class object instance."""
+        self.max_strings = max_strings
+        columns = _columns(fields)
+        self._schema = _schema(columns)
+        self._struct = _layout(kind for kind, _, _ in columns)[0]
+
+        self._numbers, self._symbol_values, self._strings = [], [], []
+        for kind, _, extractors in columns:
+            if kind == KIND_SYMBOL:
+                self._symbol_values.append(extractors[0])
+            elif kind == KIND_STRING:
+                self._strings.append(extractors[0])
+            elif kind == KIND_EXTRA:
+                self._symbol_values.append(extractors[0])
+                self._strings.append(extractors[1])
+            else:
+                self._numbers.extend(extractors)
+
+        self._lock = threading.Lock()
+        self._init_state()
+        _ENCODERS.add(self)
+
+    def _init_state(self):
+        """Forget the strings and the header written so far."""
+        self._pid = os.getpid()
+        # None is interned as the reserved id.
+        self._symbols = {None: _NONE_SYMBOL}
+        self._new = []
+        self._started = False
+
+    def __call__(self, message) -> bytes:
+        """Encode a loguru message.
+
+        Args:
+            message (loguru.Message): Formatted message holding the record,
+                formatted with "{message}".
+
+        Returns:
+            bytes: Frames to append to the binary log stream.
+
+        """
+        record = message.record
+        numbers = [extract(record) for extract in self._numbers]
+        values = [extract(record) for extract in self._symbol_values]
+
+        chunks = []
+        lengths = []
+        for extract in self._strings:
+            value = extract(record, message)
+            if value is None:
+                lengths.append(_NONE_STRING)
+                continue
+            elif value.__class__ is str:
+                value = value.encode("utf-8")
+            lengths.append(len(value))
+            chunks.append(value)
+
+        frames = []
+        with self._lock:
+            symbols = self._symbols
+            ids = [symbols.get(value) for value in values]
+            if None in ids:
+                inline = self._intern(values, ids)
+                if inline:
+                    chunks[:0] = inline
+
+            if not self._started:
+                self._started = True
+                frames.append(_frame(FRAME_HEADER, self._pid, self._schema))
+            if self._new:
+                frames.append(self._strings_frame(self._new))
+                self._new = []
+
+        chunks.insert(0, self._struct.pack(*numbers, *ids, *lengths))
+        frames.append(_frame(FRAME_RECORD, self._pid, b"".join(chunks)))
+        return b"".join(frames)
+
+    def header(self) -> bytes:
+        """Return the frames starting a new segment of the stream.
+
+        Used as RotatingFileStream header, every log file starts with the
+        schema and the whole dictionary.
+
+        Returns:
+            bytes: Header frame and strings frame.
+
+        """
+        with self._lock:
+            self._started = True
+            frames = [_frame(FRAME_HEADER, self._pid, self._schema)]
+            if len(self._symbols) > 1:
+                strings = [
+                    value for value in self._symbols if value is not None
+                ]
+                frames.append(self._strings_frame(strings))
+        return b"".join(frames)
+
+    def _intern(self, values: list, ids: list) -> list:
+        """Assign ids to new strings, must be called with the lock held.
+
+        Returns:
+            list: Chunks of the strings written inline once the dictionary
+                is full.
+
+        """
+        inline = []
+        for index, value in enumerate(values):
+            if ids[index] is not None:
+                continue
+            elif len(self._symbols) > self.max_strings:
+                encoded = value.encode("utf-8")
+                inline += [_U32.pack(len(encoded)), encoded]
+                ids[index] = _INLINE
+            else:
+                ids[index] = self._symbols[value] = len(self._symbols)
+                self._new.append(value)
+        return inline
+
+    def _strings_frame(self, strings: List[str]) -> bytes:
+        """Return a strings frame defining the given strings."""
+        parts = [_U32.pack(self._symbols[strings[0]])]
+        for value in strings:
+            encoded = value.encode("utf-8")
+            parts += [_U32.pack(len(encoded)), encoded]
+        return _frame(FRAME_STRINGS, self._pid, b"".join(parts))
+
+
+class _ProcessState(object):
+    """Schema and dictionary of one process of a binary log stream."""
+
+    __slots__ = ("columns", "struct", "numbers", "symbols", "strings")
+
+    def __init__(self, columns: list):
+        self.struct, self.numbers, self.symbols, indexes = _layout(
+            kind for kind, _ in columns
+        )
+        self.columns = [
+            (kind, name.partition("."), index)
+            for (kind, name), index in zip(columns, indexes)
+        ]
+        self.strings = [None]
+
+
+class BinaryLogDecoder(object):
+    """Incremental decoder of binary log streams.
+
+    Data can be fed in chunks of any size, e.g. read from a pipe, the
+    records of the complete frames are returned as they are decoded. The
+    NUL bytes of a preallocated, not yet sealed, log file end the stream.
+
+    Attributes:
+        records (int): Number of records decoded.
+
+    """
+
+    def __init__(self):
+        """Initialize BinaryLogDecoder class object instance."""
+        self.records = 0
+        self._buffer = bytearray()
+        self._processes = {}
+        self._timezones = {}
+        self._ended = False
+
+    def feed(self, data: bytes) -> List[dict]:
+        """Decode the complete frames available after appending data.
+
+        Args:
+            data (bytes): Next chunk of the stream.
+
+        Returns:
+            List[dict]: Decoded records, with the same structure as the JSON
+                serializer output.
+
+        Raises:
+            ValueError: If the stream is not a valid binary log stream.
+
+        """
+        if self._ended:
+            return []
+        self._buffer += data
+
+        records = []
+        buffer = self._buffer
+        offset = 0
+        while len(buffer) - offset >= _FRAME.size:
+            if buffer[offset] == 0:
+                self._ended = True
+                break
+
+            kind, pid, length = _FRAME.unpack_from(buffer, offset)
+            if kind not in _FRAME_TYPES:
+                raise ValueError(
+                    "Unknown binary log frame type: {0!r}".format(kind)
+                )
+
+            end = offset + _FRAME.size + length
+            if len(buffer) <= end:
+                break
+            elif buffer[end] != _TRAILER[0]:
+                raise ValueError(
+                    "Invalid binary log frame at offset {0:d}".format(offset)
+                )
+
+            start = offset + _FRAME.size
+            payload = bytes(buffer[start:end])
+            offset = end + 1
+            if kind == FRAME_RECORD:
+                records.append(self._record(self._state(pid), payload))
+            elif kind == FRAME_STRINGS:
+                self._strings(self._state(pid), payload)
+            else:
+                self._processes[pid] = _ProcessState(self._header(payload))
+
+        del buffer[:offset]
+        self.records += len(records)
+        return records
+
+    def close(self):
+        """Check that the stream did not end in the middle of a frame.
+
+        Raises:
+            ValueError: If the stream is truncated.
+
+        """
+        if self._buffer and not self._ended:
+            raise ValueError("Truncated binary log stream")
+
+    def _state(self, pid: int) -> _ProcessState:
+        """Return the state of a process, which must have sent a header."""
+        try:
+            return self._processes[pid]
+        except KeyError:
+            raise ValueError(
+                "Binary log frame of process {0:d} before its header".format(
+                    pid
+                )
+            )
+
+    @staticmethod
+    def _header(payload: bytes) -> list:
+        """Parse a header frame payload into (kind, name) columns."""
+        if not payload.startswith(MAGIC):
+            raise ValueError("Not a binary log stream")
+        offset = len(MAGIC)
+        if payload[offset] != VERSION:
+            raise ValueError(
+                "Unsupported binary log version: {0:d}".format(payload[offset])
+            )
+
+        (count,) = _U16.unpack_from(payload, offset + 1)
+        offset += 1 + _U16.size
+        columns = []
+        for _ in range(count):
+            kind = chr(payload[offset])
+            (length,) = _U16.unpack_from(payload, offset + 1)
+            offset += 1 + _U16.size
+            end = offset + length
+            name = payload[offset:end].decode("utf-8")
+            offset = end
+            if kind not in _KIND_FORMATS:
+                raise ValueError(
+                    "Unknown binary log column kind: {0!r}".format(kind)
+                )
+            columns.append((kind, name))
+        return columns
+
+    @staticmethod
+    def _strings(state: _ProcessState, payload: bytes):
+        """Apply a strings frame payload to the dictionary of a process."""
+        (first,) = _U32.unpack_from(payload, 0)
+        del state.strings[first:]
+        if len(state.strings) != first:
+            raise ValueError("Missing binary log string definitions")
+
+        offset = _U32.size
+        while offset < len(payload):
+            (length,) = _U32.unpack_from(payload, offset)
+            offset += _U32.size
+            end = offset + length
+            state.strings.append(payload[offset:end].decode("utf-8"))
+            offset = end
+
+    def _record(self, state: _ProcessState, payload: bytes) -> dict:
+        """Decode a record frame payload."""
+        values = state.struct.unpack_from(payload, 0)
+        numbers_end = state.numbers
+        symbols_end = numbers_end + state.symbols
+        numbers = values[:numbers_end]
+        lengths = values[symbols_end:]
+        offset = state.struct.size
+
+        # Inline symbols, then strings, follow the fixed part.
+        symbols = []
+        for symbol in values[numbers_end:symbols_end]:
+            if symbol == _INLINE:
+                (length,) = _U32.unpack_from(payload, offset)
+                offset += _U32.size
+                end = offset + length
+                symbols.append(payload[offset:end].decode("utf-8"))
+                offset = end
+            else:
+                symbols.append(state.strings[symbol])
+
+        strings = []
+        for length in lengths:
+            if length == _NONE_STRING:
+                strings.append(None)
+            else:
+                end = offset + length
+                strings.append(payload[offset:end])
+                offset = end
+
+        record = {}
+        for kind, (field, _, attribute), index in state.columns:
+            if kind == KIND_SYMBOL:
+                value = symbols[index]
+            elif kind == KIND_STRING:
+                value = strings[index]
+                if value is None:
+                    continue
+                value = value.decode("utf-8")
+            elif kind == KIND_TIME:
+                value = self._time(numbers[index], numbers[index + 1])
+            elif kind == KIND_EXTRA:
+                keys, extra = symbols[index[0]], strings[index[1]]
+                value = dict(
+                    zip(keys.split(_KEYS_SEPARATOR), orjson.loads(extra))
+                )
+            else:
+                value = numbers[index]
+
+            if attribute:
+                record.setdefault(field, {})[attribute] = value
+            else:
+                record[field] = value
+
+        return record
+
+    def _time(self, micros: int, offset: int) -> str:
+        """Return the ISO 8601 time of a record, in its original timezone."""
+        try:
+            tz = self._timezones[offset]
+        except KeyError:
+            tz = self._timezones[offset] = timezone(timedelta(seconds=offset))
+        moment = _EPOCH + timedelta(microseconds=micros)
+        return moment.astimezone(tz).isoformat()
+
+
+def dumps_record(record: dict) -> bytes:
+    """Serialize a decoded record as a JSON line.
+
+    Args:
+        record (dict): Record returned by BinaryLogDecoder.
+
+    Returns:
+        bytes: JSON line, including the trailing newline.
+
+    """
+    return orjson.dumps(record, default=json_default) + b"\n"
+
+
+def decode_stream(
+    source, write: Callable[[bytes], None], chunk_size: int = 64 * 1024
+) -> int:
+    """Convert a binary log stream to JSON lines as it is read.
+
+    Args:
+        source (BinaryIO): Binary log stream.
+        write (Callable): Called with each batch of JSON lines.
+        chunk_size (int): Read size.
+
+    Returns:
+        int: Number of records converted.
+
+    Raises:
+        ValueError: If the stream is not a valid binary log stream.
+
+    """
+    decoder = BinaryLogDecoder()
+    while True:
+        data = source.read(chunk_size)
+        if not data:
+            break
+        records = decoder.feed(data)
+        if records:
+            write(b"".join(dumps_record(record) for record in records))
+
+    decoder.close()
+    return decoder.records
+
+
+def _reset_encoders_after_fork():
+    """Start new streams in forked children, with their own process id."""
+    for encoder in list(_ENCODERS):
+        encoder._lock = threading.Lock()
+        encoder._init_state()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_encoders_after_fork)
@@ -0,0 +1,184 @@
+"""Exception fingerprinting and traceback deduplication for loguru."""
+import hashlib
+import threading
+import time
+import traceback
+
+
+def exception_fingerprint(exc_type, tb) -> str:
+    """Return a stable fingerprint of an exception type and traceback.
+
+    The fingerprint only depends on the exception type and the frames of the
+    traceback (file, line, function), not on the exception message, so it is
+    the same in every worker process for the same failure.
+
+    Args:
+        exc_type (type): Exception class.
+        tb (types.TracebackType, optional): Exception traceback.
+
+    Returns:
+        str: 12 hexadecimal characters.
+
+    """
+    digest = hashlib.blake2b(digest_size=6)
+    digest.update(
+        "{0:s}.{1:s}".format(
+            exc_type.__module__, exc_type.__qualname__
+        ).encode()
+    )
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        digest.update(
+            "|{0:s}:{1:d}:{2:s}".format(
+                code.co_filename, tb.tb_lineno, code.co_name
+            ).encode()
+        )
+        tb = tb.tb_next
+    return digest.hexdigest()
+
+
+class _Seen(object):
+    """Occurrences of a fingerprint in the current window."""
+
+    __slots__ = ("started", "count")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.count = 0
+
+
+class ExceptionFingerprinter(object):
+    """Loguru filter rendering each distinct exception once per window.
+
+    Records holding an exception get its fingerprint in
+    ``extra["exception_id"]``. The first occurrence of a fingerprint in a
+    ``window`` seconds time window keeps its exception, so handlers render
+    the full diagnosed traceback. Repeats drop it and get a short reference
+    appended to their message instead, ``extra["exception_count"]`` holds
+    the number of occurrences in the window so far.
+
+    Diagnosed rendering is also limited to ``budget`` records per second
+    for all fingerprints together. First occurrences over the budget get a
+    plain traceback, which does not inspect variables, in their message.
+
+    Records are never rejected. Use it as the last filter of the handler,
+    after the filters which may reject them, so only written records are
+    accounted.
+
+    Args:
+        window (float): Time window in seconds.
+        budget (float): Diagnosed tracebacks allowed per second.
+        max_fingerprints (int): Number of fingerprints tracked, older ones
+            are forgotten first.
+
+    Attributes:
+        deduplicated (int): Number of tracebacks replaced by a reference.
+        over_budget (int): Number of tracebacks rendered plain.
+
+    """
+
+    def __init__(
+        self,
+        window: float = 60.0,
+        budget: float = 10.0,
+        max_fingerprints: int = 1000,
+    ):
+        """Initialize ExceptionFingerprinter class object instance."""
+        self.window = window
+        self.budget = budget
+        self.max_fingerprints = max_fingerprints
+        self.deduplicated = 0
+        self.over_budget = 0
+
+        self._lock = threading.Lock()
+        self._seen = {}
+        self._tokens = budget
+        self._updated = time.monotonic()
+
+    def __call__(self, record) -> bool:
+        """Fingerprint the record exception and deduplicate its traceback.
+
+        Args:
+            record (dict): Loguru record.
+
+        Returns:
+            bool: Always True, the record is written.
+
+        """
+        exception = record["exception"]
+        if exception is None or exception.type is None:
+            return True
+
+        fingerprint = exception_fingerprint(exception.type, exception.traceback)
+        first, count, render = self._account(fingerprint)
+
+        record["extra"]["exception_id"] = fingerprint
+        record["extra"]["exception_count"] = count
+        if first and render:
+            return True
+
+        record["exception"] = None
+        if first:
+            record["message"] = "{0:s}\n{1:s}".format(
+                record["message"],
+                "".join(
+                    traceback.format_exception(
+                        exception.type, exception.value, exception.traceback
+                    )
+                ).rstrip("\n"),
+            )
+        else:
+            record["message"] = "{0:s} [{1:s}: {2!s}, {3:s} x{4:d}]".format(
+                record["message"],
+                exception.type.__name__,
+                exception.value,
+                fingerprint,
+                count,
+            )
+        return True
+
+    def _account(self, fingerprint: str):
+        """Count an occurrence and take a render token if it is the first.
+
+        Returns:
+            tuple: Whether it is the first occurrence in the window, the
+                number of occurrences in the window, and whether the
+                diagnosed rendering budget allows it.
+
+        """
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen.get(fingerprint)
+            if seen is None or now - seen.started >= self.window:
+                if seen is None and len(self._seen) >= self.max_fingerprints:
+                    self._forget(now)
+                seen = self._seen[fingerprint] = _Seen(now)
+            seen.count += 1
+            if seen.count > 1:
+                self.deduplicated += 1
+                return False, seen.count, False
+
+            self._tokens = min(
+                self.budget, self._tokens + (now - self._updated) * self.budget
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True, 1, True
+
+            self.over_budget += 1
+            return True, 1, False
+
+    def _forget(self, now: float):
+        """Drop expired fingerprints, or the oldest half if none expired."""
+        expired = [
+            key
+            for key, seen in self._seen.items()
+            if now - seen.started >= self.window
+        ]
+        if not expired:
+            # Dicts keep insertion order, the first entries are the oldest.
+            oldest = len(self._seen) // 2 or 1
+            expired = list(self._seen)[:oldest]
+        for key in expired:
+            del self._seen[key]
@@ -0,0 +1,598 @@
+"""Preallocated rotating log files with background compression."""
+import gzip
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import sys
+import threading
+import time
+import traceback
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from typing import BinaryIO, Callable, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+# Suffix of the sidecar index of a segment, see mvc_demo.core.log_index.
+INDEX_SUFFIX = ".idx"
+# Suffix of a compressed segment being written, see compress_segment.
+PARTIAL_SUFFIX = ".part"
+
+# Bytes preallocated at once when rotation is not size based.
+PREALLOCATE_CHUNK = 8 * 1024 * 1024
+
+_SIZE_UNITS = {
+    "b": 1,
+    "kb": 1000,
+    "mb": 1000 ** 2,
+    "gb": 1000 ** 3,
+    "kib": 1024,
+    "mib": 1024 ** 2,
+    "gib": 1024 ** 3,
+}
+_TIME_UNITS = {
+    "s": 1,
+    "m": 60,
+    "min": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 604800,
+}
+_ROTATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]+)\s*$")
+
+# Every file stream alive in this process, reset after fork.
+_STREAMS = weakref.WeakSet()
+
+
+def parse_rotation(value: str) -> Tuple[Optional[int], Optional[float]]:
+    """Parse a rotation specification.
+
+    Args:
+        value (str): Size and/or time condition, comma separated, for
+            example "100 MB", "1 h" or "100 MB, 1 d". Sizes use B, KB, MB,
+            GB or KiB, MiB, GiB, durations s, m, h, d or w.
+
+    Returns:
+        tuple: Maximum segment size in bytes and maximum segment age in
+            seconds, None when not limited.
+
+    Raises:
+        ValueError: If the specification can not be parsed.
+
+    """
+    max_bytes = interval = None
+
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        match = _ROTATION_RE.match(part)
+        unit = match.group(2).lower() if match else None
+        if unit in _SIZE_UNITS:
+            max_bytes = int(float(match.group(1)) * _SIZE_UNITS[unit])
+        elif unit in _TIME_UNITS:
+            interval = float(match.group(1)) * _TIME_UNITS[unit]
+        else:
+            raise ValueError("Invalid log rotation: '{0:s}'".format(part))
+
+    return max_bytes, interval
+
+
+def content_size(path: str) -> int:
+    """Return the size of a segment without its preallocated tail.
+
+    Only needed for active segments, or segments left behind by a process
+    which exited before sealing them, the tail is made of NUL bytes.
+
+    Args:
+        path (str): Segment path.
+
+    Returns:
+        int: Content size in bytes.
+
+    """
+    with open(path, "rb") as segment:
+        end = segment.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 64 * 1024)
+            segment.seek(start)
+            block = segment.read(end - start).rstrip(b"\0")
+            if block:
+                return start + len(block)
+            end = start
+
+    return 0
+
+
+def index_path(path: str) -> str:
+    """Return the sidecar index path of a segment, compressed or not.
+
+    Args:
+        path (str): Segment path.
+
+    Returns:
+        str: Segment path without its compression suffix, with INDEX_SUFFIX.
+
+    """
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if path.endswith(suffix):
+            path = path[: -len(suffix)]
+            break
+    return path + INDEX_SUFFIX
+
+
+def open_segment(path: str) -> BinaryIO:
+    """Open a segment for binary reading, decompressing it if needed.
+
+    Args:
+        path (str): Segment path, ".gz" and ".zst" files are decompressed.
+
+    Returns:
+        BinaryIO: Readable binary stream.
+
+    Raises:
+        ValueError: If the segment requires zstandard, which is not
+            installed.
+
+    """
+    if path.endswith(COMPRESSION_SUFFIXES["gzip"]):
+        return gzip.open(path, "rb")
+    elif path.endswith(COMPRESSION_SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise ValueError(
+                "Decompressing '{0:s}' requires zstandard".format(path)
+            )
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+
+    return open(path, "rb")
+
+
+def _process_alive(pid: int) -> bool:
+    """Whether a process is running, assumed when it can not be checked."""
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Owned by another user.
+        pass
+    return True
+
+
+def _ignore_interrupts():
+    """Leave Ctrl+C and gunicorn shutdowns to the parent process."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def compress_segment(path: str, compression: str) -> str:
+    """Compress a sealed segment and remove the original.
+
+    Runs in the compression process pool, see RotatingFileStream.
+
+    Args:
+        path (str): Segment path.
+        compression (str): Compression method, one of COMPRESSION_SUFFIXES.
+
+    Returns:
+        str: Compressed segment path.
+
+    """
+    target = path + COMPRESSION_SUFFIXES[compression]
+    # Not a segment name until complete, so retention never counts it.
+    temporary = target + PARTIAL_SUFFIX
+    with open(path, "rb") as source:
+        if compression == "zstd":
+            with open(temporary, "wb") as output:
+                zstandard.ZstdCompressor().copy_stream(source, output)
+        else:
+            with gzip.open(temporary, "wb", compresslevel=6) as output:
+                shutil.copyfileobj(source, output, 1024 * 1024)
+
+    os.replace(temporary, target)
+    os.unlink(path)
+    return target
+
+
+def finish_segment(
+    path: str,
+    compression: Optional[str] = None,
+    indexer: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Index then compress a sealed segment.
+
+    Runs in the compression process pool, see RotatingFileStream. Indexing
+    failures are reported but do not prevent the compression.
+
+    Args:
+        path (str): Segment path.
+        compression (str, optional): Compression method, one of
+            COMPRESSION_SUFFIXES.
+        indexer (Callable, optional): Called with the segment path.
+
+    Returns:
+        str: Final segment path.
+
+    """
+    if indexer is not None:
+        try:
+            indexer(path)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+    if compression:
+        return compress_segment(path, compression)
+    return path
+
+
+class RotatingFileStream(object):
+    """Binary stream writing log lines to rotated, preallocated segments.
+
+    The active segment is preallocated, in ``max_bytes`` or PREALLOCATE_CHUNK
+    steps, so appending never has to grow the file, and truncated to its
+    content when sealed. Segments are rotated when the next write would
+    exceed ``max_bytes`` or ``interval`` seconds after they were opened.
+    Sealed segments are renamed after their opening time, compressed in a
+    separate process and pruned by count and total size.
+
+    Rotation happens in the thread calling write, i.e. the log writer or
+    log aggregator thread, never in the event loop.
+
+    When ``per_process`` is set, e.g. gunicorn workers writing without the
+    log aggregator, the process id is part of the segment names so every
+    process writes its own files. Active segments left behind by processes
+    which exited are sealed by the first process opening its own.
+
+    Retention skips the sealed segments still being compressed or indexed,
+    by this process or, with ``per_process``, by another running one.
+
+    When ``header`` is given, every segment starts with the bytes it
+    returns, e.g. the schema and dictionary of the binary log format.
+    When ``indexer`` is given, it is called with every sealed segment path,
+    before compression and in the compression process, e.g. to write its
+    sidecar index. Sidecar indexes are pruned with their segments.
+
+    Args:
+        path (str): Active segment path, e.g. "logs/mvc-demo.log".
+        max_bytes (int, optional): Maximum segment size.
+        interval (float, optional): Maximum segment age in seconds.
+        compression (str, optional): One of COMPRESSION_SUFFIXES, None keeps
+            sealed segments uncompressed.
+        retention_count (int, optional): Number of sealed segments to keep.
+        retention_bytes (int, optional): Total size of sealed segments to
+            keep.
+        per_process (bool): Whether to add the process id to segment names.
+        header (Callable, optional): Called for the first bytes of every
+            segment.
+        indexer (Callable, optional): Picklable function called with the
+            path of every sealed segment.
+
+    Attributes:
+        rotations (int): Number of segments sealed by this process.
+
+    Raises:
+        ValueError: If the compression method is unknown or unavailable.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: Optional[int] = None,
+        interval: Optional[float] = None,
+        compression: Optional[str] = "gzip",
+        retention_count: Optional[int] = None,
+        retention_bytes: Optional[int] = None,
+        per_process: bool = False,
+        header: Optional[Callable[[], bytes]] = None,
+        indexer: Optional[Callable[[str], None]] = None,
+    ):
+        """Initialize RotatingFileStream class object instance."""
+        if compression and compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(
+                "Invalid log compression '{0:s}', expected: {1:s}".format(
+                    compression, ", ".join(COMPRESSION_SUFFIXES)
+                )
+            )
+        elif compression == "zstd" and zstandard is None:
+            raise ValueError("zstd log compression requires zstandard")
+
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.compression = compression
+        self.retention_count = retention_count
+        self.retention_bytes = retention_bytes
+        self.per_process = per_process
+        self.header = header
+        self.indexer = indexer
+        self.rotations = 0
+
+        self._directory, name = os.path.split(self.path)
+        self._stem, self._suffix = os.path.splitext(name)
+        self._segment_re = re.compile(
+            r"^{0:s}\.\d{{8}}-\d{{6}}-\d{{6}}(?:\.(\d+))?{1:s}({2:s})?$".format(
+                re.escape(self._stem),
+                re.escape(self._suffix),
+                "|".join(map(re.escape, COMPRESSION_SUFFIXES.values())),
+            )
+        )
+        self._active_re = re.compile(
+            r"^{0:s}\.(\d+){1:s}$".format(
+                re.escape(self._stem), re.escape(self._suffix)
+            )
+        )
+        self._lock = threading.Lock()
+        self._init_state()
+        _STREAMS.add(self)
+
+    def _init_state(self):
+        """Forget the active segment and the compression pool."""
+        self._fd: Optional[int] = None
+        self._offset = 0
+        self._allocated = 0
+        self._opened_at = 0.0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Sealed segments submitted to the compression pool, not finished.
+        self._pending = set()
+        self._orphans_sealed = False
+
+    @property
+    def active_path(self) -> str:
+        """str: Path of the segment currently written by this process."""
+        if not self.per_process:
+            return self.path
+        return os.path.join(
+            self._directory,
+            "{0:s}.{1:d}{2:s}".format(self._stem, os.getpid(), self._suffix),
+        )
+
+    def write(self, data: bytes):
+        """Append data to the active segment, rotating it if needed.
+
+        Args:
+            data (bytes): Newline terminated log records.
+
+        """
+        with self._lock:
+            if self._fd is None:
+                self._open()
+            elif self._should_rotate(len(data)):
+                self._seal()
+                self._open()
+
+            self._append(data)
+
+    def flush(self):
+        """Flush the stream, writes are not buffered."""
+        pass
+
+    def close(self):
+        """Seal the active segment and wait for pending compressions."""
+        with self._lock:
+            if self._fd is not None:
+                self._seal()
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _should_rotate(self, size: int) -> bool:
+        """Whether the active segment must be sealed before writing size."""
+        if self._offset and self.max_bytes:
+            if self._offset + size > self.max_bytes:
+                return True
+        if self.interval:
+            return time.time() - self._opened_at >= self.interval
+        return False
+
+    def _open(self):
+        """Open the active segment, sealing one left behind first."""
+        os.makedirs(self._directory, exist_ok=True)
+        path = self.active_path
+        if os.path.exists(path):
+            self._seal_left_behind(path, os.getpid())
+        if self.per_process and not self._orphans_sealed:
+            self._orphans_sealed = True
+            self._seal_orphans()
+
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._offset = 0
+        self._allocated = 0
+        # Segment names hold the opening time, keep them unique.
+        self._opened_at = max(time.time(), self._opened_at + 1e-6)
+
+        if self.header is not None:
+            self._append(self.header())
+
+    def _seal_orphans(self):
+        """Seal the active segments of the processes which exited."""
+        for entry in os.scandir(self._directory):
+            match = self._active_re.match(entry.name)
+            if match is not None:
+                pid = int(match.group(1))
+                if pid != os.getpid() and not _process_alive(pid):
+                    self._seal_left_behind(entry.path, pid)
+
+    def _seal_left_behind(self, path: str, pid: int):
+        """Seal an active segment left behind by a process which exited.
+
+        Args:
+            path (str): Active segment path.
+            pid (int): Id of the process which wrote it.
+
+        """
+        try:
+            opened_at = os.stat(path).st_mtime
+            target = self._sealed_path(opened_at, pid)
+            # Renamed first, only one of the processes sealing it gets it.
+            os.rename(path, target)
+        except FileNotFoundError:
+            return
+
+        size = content_size(target)
+        if size:
+            os.truncate(target, size)
+            self.rotations += 1
+            self._finish(target)
+        else:
+            os.unlink(target)
+
+    def _append(self, data: bytes):
+        """Write data at the end of the active segment."""
+        end = self._offset + len(data)
+        if end > self._allocated:
+            self._preallocate(end)
+
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(self._fd, view, self._offset)
+            self._offset += written
+            view = view[written:]
+
+    def _preallocate(self, end: int):
+        """Reserve disk space for the active segment up to at least end."""
+        size = max(end, self._allocated + (self.max_bytes or PREALLOCATE_CHUNK))
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(
+                    self._fd, self._allocated, size - self._allocated
+                )
+            except OSError:
+                # Not supported by the filesystem, writes extend the file.
+                pass
+        self._allocated = size
+
+    def _seal(self):
+        """Truncate, close and rotate out the active segment."""
+        os.ftruncate(self._fd, self._offset)
+        os.close(self._fd)
+        self._fd = None
+
+        path = self.active_path
+        if self._offset:
+            self._rotate_out(path, self._opened_at)
+        else:
+            os.unlink(path)
+
+    def _sealed_path(self, opened_at: float, pid: int) -> str:
+        """Return the path of a sealed segment, named after its opening."""
+        name = "{0:s}.{1:s}{2:s}{3:s}".format(
+            self._stem,
+            datetime.fromtimestamp(opened_at).strftime("%Y%m%d-%H%M%S-%f"),
+            ".{0:d}".format(pid) if self.per_process else "",
+            self._suffix,
+        )
+        return os.path.join(self._directory, name)
+
+    def _rotate_out(self, path: str, opened_at: float):
+        """Rename a sealed segment and schedule its compression."""
+        target = self._sealed_path(opened_at, os.getpid())
+        os.rename(path, target)
+        self.rotations += 1
+        self._finish(target)
+
+    def _finish(self, target: str):
+        """Schedule the compression of a sealed segment."""
+        if self.compression or self.indexer:
+            job = (finish_segment, target, self.compression, self.indexer)
+            self._pending.add(target)
+            try:
+                future = self._compression_pool().submit(*job)
+            except BrokenProcessPool:
+                self._executor = None
+                future = self._compression_pool().submit(*job)
+            except RuntimeError:
+                # Closed at exit, after the interpreter shutdown started no
+                # process pool accepts work, finish in this process.
+                try:
+                    finish_segment(*job[1:])
+                finally:
+                    self._pending.discard(target)
+                self.apply_retention()
+                return
+            future.add_done_callback(partial(self._compressed, target))
+        else:
+            self.apply_retention()
+
+    def _compression_pool(self) -> ProcessPoolExecutor:
+        """Return the compression process pool, created on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_ignore_interrupts,
+            )
+        return self._executor
+
+    def _compressed(self, target: str, future):
+        """Report compression failures and prune old segments."""
+        self._pending.discard(target)
+        error = future.exception()
+        if error is not None:
+            traceback.print_exception(
+                type(error), error, error.__traceback__, file=sys.stderr
+            )
+        self.apply_retention()
+
+    def apply_retention(self):
+        """Remove the oldest sealed segments over the retention limits."""
+        if not self.retention_count and not self.retention_bytes:
+            return
+
+        finished = not self.compression and not self.indexer
+        segments = []
+        for entry in os.scandir(self._directory):
+            match = self._segment_re.match(entry.name)
+            if match is None:
+                continue
+            elif not finished and match.group(2) is None:
+                # Still read by a compression pool, counted once finished.
+                if self._finishing(entry.path, match.group(1)):
+                    continue
+            try:
+                segments.append((entry.name, entry.stat().st_size))
+            except FileNotFoundError:
+                continue
+
+        # Names start with the opening time, newest first.
+        segments.sort(reverse=True)
+        total = 0
+        for index, (name, size) in enumerate(segments):
+            total += size
+            if (self.retention_count and index >= self.retention_count) or (
+                self.retention_bytes and total > self.retention_bytes
+            ):
+                path = os.path.join(self._directory, name)
+                for stale in (path, index_path(path)):
+                    try:
+                        os.unlink(stale)
+                    except FileNotFoundError:
+                        pass
+
+    def _finishing(self, path: str, pid: Optional[str]) -> bool:
+        """Whether a sealed segment is being compressed or indexed."""
+        if path in self._pending:
+            return True
+        elif pid is None or int(pid) == os.getpid():
+            return False
+        return _process_alive(int(pid))
+
+
+def _reset_streams_after_fork():
+    """Drop the segments and compression pools inherited from the parent."""
+    for stream in list(_STREAMS):
+        if stream._fd is not None:
+            os.close(stream._fd)
+        stream._lock = threading.Lock()
+        stream._init_state()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_streams_after_fork)
@@ -0,0 +1,475 @@
+"""Request id and time index of JSON lines log segments."""
+import bisect
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+import zlib
+from array import array
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from mvc_demo.core.log_files import (
+    INDEX_SUFFIX,
+    content_size,
+    index_path,
+    open_segment,
+)
+
+MAGIC = b"MVCIDX\x00\x01"
+# Segments are split in line aligned blocks of at least BLOCK_SIZE bytes,
+# the index holds the time range of every block.
+BLOCK_SIZE = 1024 * 1024
+
+# Magic, content size, number of request id entries, number of blocks. The
+# arrays which follow are in the native byte order, the index is rebuilt
+# when it cannot be read.
+_HEADER = struct.Struct("=8sQQQ")
+# Entries are sorted as a single integer, hash then offset.
+_OFFSET_BITS = 40
+_OFFSET_MASK = (1 << _OFFSET_BITS) - 1
+# Both keys are only found as object keys, quotes are escaped in strings.
+# Request ids holding escaped characters are not indexed.
+_REQUEST_ID_RE = re.compile(rb'"request_id":"([^"\\]{1,256})"')
+_TIME_RE = re.compile(rb'"time":"([^"]{1,64})"')
+# Sealed segments are named after their opening time and never change.
+_SEALED_RE = re.compile(r"\.\d{8}-\d{6}-\d{6}(\.\d+)?(\.|$)")
+
+
+def _hash(key: bytes) -> int:
+    """Return the 32 bits hash of a JSON encoded request id."""
+    return zlib.crc32(key)
+
+
+def _request_id_key(request_id: str) -> bytes:
+    """Return a request id as it is written in JSON lines, without quotes."""
+    return json.dumps(request_id, ensure_ascii=False).encode("utf-8")[1:-1]
+
+
+def _parse_time(value: bytes) -> Optional[float]:
+    """Return the timestamp of an ISO 8601 record time, None if invalid."""
+    try:
+        return datetime.fromisoformat(value.decode("utf-8")).timestamp()
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def _line_time(line: bytes) -> Optional[float]:
+    """Return the timestamp of a JSON line record, None if it has none."""
+    match = _TIME_RE.search(line)
+    return _parse_time(match.group(1)) if match else None
+
+
+class SegmentIndex(object):
+    """Sorted request id hashes and block time ranges of a segment.
+
+    Request ids are stored as 32 bits hashes sorted with the offset of the
+    line they were found in, so a lookup is a binary search. Hash collisions
+    are possible, matching lines must be checked. Indexes loaded from a
+    sidecar file are memory-mapped, not read.
+
+    Args:
+        size (int): Size of the indexed segment content.
+        hashes (Sequence[int]): Sorted request id hashes.
+        offsets (Sequence[int]): Line offsets, in the same order.
+        block_starts (Sequence[int]): Block offsets.
+        block_min (Sequence[float]): Earliest record time of every block.
+        block_max (Sequence[float]): Latest record time of every block.
+
+    """
+
+    def __init__(
+        self, size, hashes, offsets, block_starts, block_min, block_max
+    ):
+        """Initialize SegmentIndex class object instance."""
+        self.size = size
+        self.hashes = hashes
+        self.offsets = offsets
+        self.block_starts = block_starts
+        self.block_min = block_min
+        self.block_max = block_max
+        self._mmap = None
+
+    @classmethod
+    def build(cls, path: str) -> "SegmentIndex":
+        """Index a segment, compressed or not.
+
+        Args:
+            path (str): Segment path.
+
+        Returns:
+            SegmentIndex: Index object instance.
+
+        Raises:
+            ValueError: If the segment requires zstandard, which is not
+                installed.
+
+        """
+        if index_path(path) != path + INDEX_SUFFIX:
+            with open_segment(path) as source, tempfile.TemporaryFile() as copy:
+                shutil.copyfileobj(source, copy, 1024 * 1024)
+                return cls._scan(copy, copy.tell())
+
+        with open(path, "rb") as segment:
+            return cls._scan(segment, content_size(path))
+
+    @classmethod
+    def _scan(cls, segment, size: int) -> "SegmentIndex":
+        """Index the first size bytes of an open segment."""
+        entries = []
+        blocks = (array("Q"), array("d"), array("d"))
+        if not size:
+            return cls(0, array("I"), array("Q"), *blocks)
+
+        # Hot loop, about a million matches per 400 MB.
+        key, shift = _hash, _OFFSET_BITS
+        with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                end = mm.find(b"\n", start + BLOCK_SIZE - 1, size)
+                end = size if end < 0 else end + 1
+                block = mm[start:end]
+                # Offset of the line start, rfind returns -1 on the first.
+                base, line = start + 1, block.rfind
+                entries += [
+                    key(m[1]) << shift | base + line(b"\n", 0, m.start())
+                    for m in _REQUEST_ID_RE.finditer(block)
+                ]
+
+                times = _TIME_RE.findall(block)
+                if not times:
+                    earliest, latest = math.inf, -math.inf
+                else:
+                    # Records of a segment share the same UTC offset.
+                    earliest = _parse_time(min(times))
+                    latest = _parse_time(max(times))
+                    if earliest is None or latest is None:
+                        earliest, latest = -math.inf, math.inf
+                for values, value in zip(blocks, (start, earliest, latest)):
+                    values.append(value)
+                start = end
+
+        entries.sort()
+        return cls(
+            size,
+            array("I", [entry >> _OFFSET_BITS for entry in entries]),
+            array("Q", [entry & _OFFSET_MASK for entry in entries]),
+            *blocks,
+        )
+
+    def _arrays(self) -> tuple:
+        """Return the index arrays, in sidecar file order."""
+        # The 4 bytes hashes are last, the other arrays stay 8 bytes aligned.
+        return (
+            self.offsets,
+            self.block_starts,
+            self.block_min,
+            self.block_max,
+            self.hashes,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "SegmentIndex":
+        """Memory-map a sidecar index file.
+
+        Args:
+            path (str): Sidecar index path.
+
+        Returns:
+            SegmentIndex: Index object instance.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not a valid index.
+
+        """
+        with open(path, "rb") as sidecar:
+            mm = mmap.mmap(sidecar.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, size, entries, blocks = _HEADER.unpack_from(mm)
+        except struct.error:
+            magic = None
+        if magic != MAGIC or len(mm) != _HEADER.size + 12 * entries + (
+            24 * blocks
+        ):
+            mm.close()
+            raise ValueError("Invalid log index: '{0:s}'".format(path))
+
+        views = {}
+        start = _HEADER.size
+        for name, count, kind in (
+            ("offsets", entries, "Q"),
+            ("block_starts", blocks, "Q"),
+            ("block_min", blocks, "d"),
+            ("block_max", blocks, "d"),
+            ("hashes", entries, "I"),
+        ):
+            end = start + count * (4 if kind == "I" else 8)
+            views[name] = memoryview(mm)[start:end].cast(kind)
+            start = end
+
+        index = cls(size, **views)
+        index._mmap = mm
+        return index
+
+    def save(self, path: str):
+        """Write the index to a sidecar file, atomically.
+
+        Args:
+            path (str): Sidecar index path.
+
+        """
+        temporary = "{0:s}.{1:d}.tmp".format(path, os.getpid())
+        with open(temporary, "wb") as sidecar:
+            sidecar.write(
+                _HEADER.pack(
+                    MAGIC, self.size, len(self.hashes), len(self.block_starts)
+                )
+            )
+            for values in self._arrays():
+                sidecar.write(values)
+        os.replace(temporary, path)
+
+    def close(self):
+        """Unmap the sidecar file of a loaded index."""
+        if self._mmap is None:
+            return
+        for values in self._arrays():
+            values.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def find(self, request_id: str) -> List[int]:
+        """Return the offsets of the lines which may hold a request id.
+
+        Args:
+            request_id (str): Request id.
+
+        Returns:
+            List[int]: Sorted line offsets.
+
+        """
+        key = _hash(_request_id_key(request_id))
+        low = bisect.bisect_left(self.hashes, key)
+        high = bisect.bisect_right(self.hashes, key, low)
+        return sorted(set(self.offsets[low:high]))
+
+    def ranges(
+        self, since: Optional[float] = None, until: Optional[float] = None
+    ) -> List[Tuple[int, int]]:
+        """Return the byte ranges of the blocks overlapping a time range.
+
+        Args:
+            since (float, optional): Earliest timestamp.
+            until (float, optional): Latest timestamp.
+
+        Returns:
+            List[Tuple[int, int]]: Sorted, merged (start, end) byte ranges.
+
+        """
+        since = -math.inf if since is None else since
+        until = math.inf if until is None else until
+        ranges = []
+        for block, start in enumerate(self.block_starts):
+            if self.block_min[block] > until or self.block_max[block] < since:
+                continue
+            if block + 1 < len(self.block_starts):
+                end = self.block_starts[block + 1]
+            else:
+                end = self.size
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+
+def index_segment(path: str):
+    """Write the sidecar index of a sealed segment.
+
+    Used as RotatingFileStream indexer, in the compression process.
+
+    Args:
+        path (str): Segment path.
+
+    """
+    SegmentIndex.build(path).save(index_path(path))
+
+
+def segment_index(path: str, save: bool = True) -> SegmentIndex:
+    """Return the index of a segment, from its sidecar file if up to date.
+
+    Args:
+        path (str): Segment path.
+        save (bool): Whether to write the sidecar file of sealed segments
+            indexed on demand. Active segments are never saved.
+
+    Returns:
+        SegmentIndex: Index object instance.
+
+    Raises:
+        ValueError: If the segment requires zstandard, which is not
+            installed.
+
+    """
+    sidecar = index_path(path)
+    compressed = sidecar != path + INDEX_SUFFIX
+    sealed = _SEALED_RE.search(os.path.basename(path)) is not None
+    if sealed:
+        try:
+            index = SegmentIndex.load(sidecar)
+        except (OSError, ValueError):
+            pass
+        else:
+            if compressed or index.size == os.path.getsize(path):
+                return index
+            index.close()
+
+    index = SegmentIndex.build(path)
+    if sealed and save:
+        try:
+            index.save(sidecar)
+        except OSError:
+            # Read-only log directory, the index is only used once.
+            pass
+    return index
+
+
+class _ForwardReader(object):
+    """Read increasing byte ranges of a decompressed segment."""
+
+    def __init__(self, stream, chunk_size: int = 64 * 1024):
+        """Initialize _ForwardReader class object instance."""
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._start = 0
+        self._buffer = b""
+
+    def __call__(self, start: int, end: Optional[int] = None) -> bytes:
+        """Return the bytes from start to end, or to the end of the line."""
+        skip = start - self._start
+        if not 0 <= skip <= len(self._buffer):
+            self._stream.seek(start)
+            self._buffer = b""
+        else:
+            self._buffer = self._buffer[skip:]
+        self._start = start
+        size = None if end is None else end - start
+
+        searched = 0
+        while True:
+            if end is None:
+                stop = self._buffer.find(b"\n", searched)
+                if stop >= 0:
+                    return self._buffer[:stop] + b"\n"
+                searched = len(self._buffer)
+            elif len(self._buffer) >= size:
+                return self._buffer[:size]
+            chunk = self._stream.read(self._chunk_size)
+            if not chunk:
+                return self._buffer
+            self._buffer += chunk
+
+
+def _segment_lines(
+    read: Callable, index: SegmentIndex, request_id, since, until
+) -> Iterator[bytes]:
+    """Yield the candidate lines of a segment, before the time filter."""
+    ranges = index.ranges(since, until)
+    if request_id is None:
+        for start, end in ranges:
+            yield from read(start, end).splitlines(keepends=True)
+        return
+
+    needle = b'"request_id":"' + _request_id_key(request_id) + b'"'
+    starts = [start for start, _ in ranges]
+    for offset in index.find(request_id):
+        block = bisect.bisect_right(starts, offset) - 1
+        if block < 0 or offset >= ranges[block][1]:
+            continue
+        line = read(offset)
+        # Hash collision, or the id of a nested object.
+        if needle in line:
+            yield line
+
+
+def find_records(
+    paths: Iterable[str],
+    request_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    save: bool = True,
+) -> Iterator[bytes]:
+    """Yield the JSON lines of a request and/or time range.
+
+    Segments are indexed on demand, see segment_index. Only the blocks of
+    the time range are read, and for a request id only the lines of the
+    index. Uncompressed segments are memory-mapped, compressed segments are
+    decompressed up to the last line read.
+
+    Args:
+        paths (Iterable[str]): Segment paths, in output order.
+        request_id (str, optional): Request id.
+        since (datetime, optional): Earliest record time, aware.
+        until (datetime, optional): Latest record time, aware.
+        save (bool): Whether to write the sidecar index files.
+
+    Yields:
+        bytes: Newline terminated JSON lines.
+
+    Raises:
+        ValueError: If a segment requires zstandard, which is not
+            installed.
+
+    """
+    since = since.timestamp() if since else None
+    until = until.timestamp() if until else None
+
+    for path in paths:
+        index = segment_index(path, save=save)
+        try:
+            if index_path(path) != path + INDEX_SUFFIX:
+                with open_segment(path) as stream:
+                    lines = _segment_lines(
+                        _ForwardReader(stream), index, request_id, since, until
+                    )
+                    yield from _time_filter(lines, since, until)
+            elif index.size:
+                with open(path, "rb") as segment, mmap.mmap(
+                    segment.fileno(), 0, access=mmap.ACCESS_READ
+                ) as mm:
+
+                    def read(start, end=None, size=index.size):
+                        if end is None:
+                            # The last line of an active segment may be
+                            # partially written.
+                            end = mm.find(b"\n", start, size) + 1 or size
+                        return mm[start:end]
+
+                    lines = _segment_lines(
+                        read, index, request_id, since, until
+                    )
+                    yield from _time_filter(lines, since, until)
+        finally:
+            index.close()
+
+
+def _time_filter(
+    lines: Iterable[bytes], since: Optional[float], until: Optional[float]
+) -> Iterator[bytes]:
+    """Yield the lines of records in a time range."""
+    if since is None and until is None:
+        yield from lines
+        return
+
+    since = -math.inf if since is None else since
+    until = math.inf if until is None else until
+    for line in lines:
+        timestamp = _line_time(line)
+        if timestamp is not None and since <= timestamp <= until:
+            yield line
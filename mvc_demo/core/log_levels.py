@@ -0,0 +1,285 @@
+"""Runtime log level control per logger or module."""
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, Optional, Sequence, Union
+
+from loguru import logger
+
+OFF = "OFF"
+
+# Loguru levels unknown to the stdlib logging module.
+_LOGURU_LEVELS = {"TRACE": 5, "SUCCESS": 25}
+_LEVEL_NAMES = {
+    **logging._levelToName,
+    **{no: name for name, no in _LOGURU_LEVELS.items()},
+}
+# Stdlib level which disables a logger.
+_STDLIB_OFF = logging.CRITICAL + 1
+
+
+def parse_level(level: Union[str, int]) -> Optional[int]:
+    """Turn a level name or number into a level number.
+
+    Args:
+        level (Union[str, int]): Level number, stdlib or loguru level name,
+            or OFF.
+
+    Returns:
+        int, optional: Level number, None for OFF.
+
+    Raises:
+        ValueError: If the level is unknown.
+
+    """
+    if isinstance(level, int):
+        return level
+
+    name = level.strip().upper()
+    if name == OFF:
+        return None
+    elif name.isdigit():
+        return int(name)
+    elif name in logging._nameToLevel:
+        return logging._nameToLevel[name]
+    elif name in _LOGURU_LEVELS:
+        return _LOGURU_LEVELS[name]
+
+    raise ValueError("Unknown log level: '{0:s}'".format(level))
+
+
+def level_name(levelno: Optional[int]) -> str:
+    """Return the name of a level number, OFF for None."""
+    if levelno is None:
+        return OFF
+    return _LEVEL_NAMES.get(levelno, str(levelno))
+
+
+class LogLevelController(object):
+    """Change the level of loggers and modules at runtime.
+
+    Every loguru and stdlib logger gets the default level, unless a level is
+    set for it or for one of its parents (dotted names). Levels are applied
+    so that filtered records are not even created whenever possible:
+
+    * Loguru modules switched OFF are disabled with ``logger.disable``,
+      except the ``keep_enabled`` ones, e.g. the module logging the bridged
+      stdlib records: loguru checks it before the record gets the stdlib
+      logger name. Their records are dropped by the filter instead.
+    * Stdlib loggers get their level with ``Logger.setLevel``.
+    * Loguru handlers get the lowest level in use as their level, the
+      ``on_min_level`` callback is called when it changes.
+    * The controller itself is a loguru filter dropping the records under
+      the level of their module, only those above the lowest level in use
+      reach it.
+
+    When ``buffered`` is set, e.g. with the request log buffer, records
+    under the levels are still needed: stdlib loggers are set no higher than
+    DEBUG and the lowest level reported is TRACE.
+
+    Args:
+        default (int): Default level number.
+        buffered (bool): Whether records under the levels must be created.
+        on_min_level (Callable, optional): Called with the new lowest level
+            in use when it changes.
+        keep_enabled (Sequence[str]): Loguru modules never disabled.
+
+    """
+
+    def __init__(
+        self,
+        default: int,
+        buffered: bool = False,
+        on_min_level: Optional[Callable[[int], None]] = None,
+        keep_enabled: Sequence[str] = (),
+    ):
+        """Initialize LogLevelController class object instance."""
+        self.default = default
+        self.buffered = buffered
+        self.on_min_level = on_min_level
+        self.keep_enabled = tuple(keep_enabled)
+        # Logger name -> level number, None when switched OFF.
+        self.loggers: Dict[str, Optional[int]] = {}
+
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._stdlib = set()
+
+    def __call__(self, record) -> bool:
+        """Return whether the record is at or above the level of its module.
+
+        Args:
+            record (dict): Loguru record.
+
+        Returns:
+            bool: False if the record must be dropped.
+
+        """
+        name = record["name"]
+        try:
+            levelno = self._cache[name]
+        except KeyError:
+            levelno = self._cache[name] = self.level_for(name)
+        return levelno is not None and record["level"].no >= levelno
+
+    @property
+    def min_level(self) -> int:
+        """int: Lowest level in use, handlers must accept records from it."""
+        if self.buffered:
+            return _LOGURU_LEVELS["TRACE"]
+        levels = [no for no in self.loggers.values() if no is not None]
+        return min([self.default] + levels)
+
+    def level_for(self, name: Optional[str]) -> Optional[int]:
+        """Resolve the level of a logger or module name.
+
+        Args:
+            name (str, optional): Logger or module name.
+
+        Returns:
+            int, optional: Level number, None when switched OFF.
+
+        """
+        if name and self.loggers:
+            parts = name.split(".")
+            for end in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:end])
+                if prefix in self.loggers:
+                    return self.loggers[prefix]
+
+        return self.default
+
+    def set_levels(
+        self,
+        default: Optional[Union[str, int]] = None,
+        loggers: Optional[Dict[str, Optional[Union[str, int]]]] = None,
+    ):
+        """Change the default level and/or the levels of some loggers.
+
+        Args:
+            default (Union[str, int], optional): New default level, can not
+                be OFF. None keeps the current one.
+            loggers (Dict[str, Union[str, int]], optional): Levels by logger
+                or module name, a None level restores the default one.
+
+        Raises:
+            ValueError: If a level or logger name is invalid.
+
+        """
+        new_default = self.default
+        if default is not None:
+            new_default = parse_level(default)
+            if new_default is None:
+                raise ValueError("The default log level can not be OFF")
+
+        new_loggers = dict(self.loggers)
+        for name, level in (loggers or {}).items():
+            if not name:
+                raise ValueError("Use the default level for all loggers")
+            elif level is None:
+                new_loggers.pop(name, None)
+            else:
+                new_loggers[name] = parse_level(level)
+
+        self._apply(new_default, new_loggers)
+
+    def reset(self, default: Union[str, int]):
+        """Restore the default level for every logger.
+
+        Args:
+            default (Union[str, int]): New default level.
+
+        """
+        self._apply(parse_level(default), {})
+
+    def to_dict(self) -> dict:
+        """Return the levels by name, e.g. for a state file or a response.
+
+        Returns:
+            dict: Default level name and level names by logger.
+
+        """
+        return {
+            "default": level_name(self.default),
+            "loggers": {
+                name: level_name(no) for name, no in self.loggers.items()
+            },
+        }
+
+    def save(self, path: str):
+        """Write the levels to a JSON state file, atomically.
+
+        Args:
+            path (str): State file path.
+
+        """
+        tmp = "{0:s}.{1:d}.tmp".format(path, os.getpid())
+        with open(tmp, "w") as state:
+            json.dump(self.to_dict(), state)
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> bool:
+        """Apply the levels of a JSON state file, written by save.
+
+        Args:
+            path (str): State file path.
+
+        Returns:
+            bool: Whether the state file exists.
+
+        Raises:
+            ValueError: If the state file holds invalid levels.
+
+        """
+        try:
+            with open(path) as state:
+                levels = json.load(state)
+        except FileNotFoundError:
+            return False
+
+        loggers = {
+            name: parse_level(level)
+            for name, level in levels.get("loggers", {}).items()
+        }
+        self._apply(parse_level(levels["default"]), loggers)
+        return True
+
+    def _apply(self, default: int, loggers: Dict[str, Optional[int]]):
+        """Switch to new levels and apply them to loguru and stdlib."""
+        with self._lock:
+            previous_min = self.min_level
+            previous = self.loggers
+
+            self.default, self.loggers = default, loggers
+            self._cache = {}
+
+            for name in previous:
+                if previous[name] is None and loggers.get(name, 0) is not None:
+                    logger.enable(name)
+            for name, levelno in loggers.items():
+                if levelno is None:
+                    logger.disable(name)
+            for name in self.keep_enabled:
+                if self.level_for(name) is None:
+                    logger.enable(name)
+
+            logging.root.setLevel(self._stdlib_level(default))
+            for name in self._stdlib - set(loggers):
+                logging.getLogger(name).setLevel(logging.NOTSET)
+            for name, levelno in loggers.items():
+                logging.getLogger(name).setLevel(self._stdlib_level(levelno))
+            self._stdlib = set(loggers)
+
+            min_level = self.min_level
+
+        if min_level != previous_min and self.on_min_level is not None:
+            self.on_min_level(min_level)
+
+    def _stdlib_level(self, levelno: Optional[int]) -> int:
+        """Return the stdlib logger level for a level number."""
+        if levelno is None:
+            return _STDLIB_OFF
+        elif self.buffered:
+            return min(levelno, logging.DEBUG)
+        return levelno
@@ -0,0 +1,262 @@
+"""Records, bytes, drops and sink latency metrics of the log pipeline."""
+import bisect
+import logging
+import os
+import threading
+import weakref
+from time import perf_counter
+from typing import Callable, Dict, Mapping, Optional
+
+# Upper bounds in seconds of the sink latency histogram buckets.
+LATENCY_BUCKETS = (
+    0.000001,
+    0.0000025,
+    0.000005,
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.01,
+    0.1,
+)
+
+# Names of the loguru levels unknown to logging, by level number.
+_LEVEL_NAMES = {5: "TRACE", 25: "SUCCESS"}
+
+# Every metrics object alive in this process, reset after fork.
+_METRICS = weakref.WeakSet()
+
+
+class _LevelStats(object):
+    """Counters of a single level."""
+
+    __slots__ = ("no", "records", "bytes", "latency", "latency_sum")
+
+    def __init__(self, no: int, buckets: int):
+        self.no = no
+        self.records = 0
+        self.bytes = 0
+        # Not cumulative, the last bucket counts the slower writes.
+        self.latency = [0] * (buckets + 1)
+        self.latency_sum = 0.0
+
+
+class LogMetrics(object):
+    """Per level counters and write latency histograms of the log sinks.
+
+    Sinks call observe once per record with its level, its size and the
+    time spent in the sink. Loguru serializes the calls of a handler, so
+    the counters are not locked. Records dropped by the pipeline, e.g. by
+    the rate limiter before the sink or by the batched writer after it, are
+    passed to snapshot.
+
+    When ``report_interval`` is set, ``report`` is called in a short lived
+    thread at most once per interval, from the first record observed after
+    the interval elapsed, e.g. to log the metrics. Idle processes do not
+    report.
+
+    Args:
+        buckets (Tuple[float]): Latency histogram upper bounds in seconds.
+        report_interval (float, optional): Minimum time in seconds between
+            two reports.
+        report (Callable, optional): Called without arguments to report.
+
+    """
+
+    def __init__(
+        self,
+        buckets=LATENCY_BUCKETS,
+        report_interval: Optional[float] = None,
+        report: Optional[Callable[[], None]] = None,
+    ):
+        """Initialize LogMetrics class object instance."""
+        self.buckets = tuple(buckets)
+        self.report_interval = report_interval
+        self.report = report
+        self.reset()
+        _METRICS.add(self)
+
+    def reset(self):
+        """Forget every counter."""
+        self._levels: Dict[str, _LevelStats] = {}
+        self._reported: Optional[float] = None
+
+    def observe(self, level, size: int, start: float, end: float):
+        """Account a record written by a sink.
+
+        Args:
+            level: Loguru record level, with ``name`` and ``no`` attributes.
+            size (int): Bytes written.
+            start (float): time.perf_counter before the write.
+            end (float): time.perf_counter after the write.
+
+        """
+        stats = self._levels.get(level.name)
+        new = stats is None
+        if new:
+            stats = _LevelStats(level.no, len(self.buckets))
+        elapsed = end - start
+        stats.records += 1
+        stats.bytes += size
+        stats.latency[bisect.bisect_left(self.buckets, elapsed)] += 1
+        stats.latency_sum += elapsed
+        if new:
+            # Published once counted, snapshot may run in another thread.
+            self._levels[level.name] = stats
+
+        if not self.report_interval or self.report is None:
+            return
+        elif self._reported is None:
+            self._reported = end
+        elif end - self._reported >= self.report_interval:
+            self._reported = end
+            # Sinks must not log, the handler lock is held.
+            threading.Thread(
+                target=self.report, name="log-metrics", daemon=True
+            ).start()
+
+    def snapshot(self, dropped: Optional[Mapping[int, int]] = None) -> dict:
+        """Return the counters of every level.
+
+        Args:
+            dropped (Mapping[int, int], optional): Records dropped by the
+                log pipeline, by level number.
+
+        Returns:
+            dict: Per level name, the number of ``records``, ``bytes`` and
+                ``dropped`` records and the ``latency`` histogram, holding
+                cumulative ``buckets`` as (upper bound, count) pairs, and the
+                ``sum`` and ``count`` of the write latencies. Levels without
+                records written have a zero latency ``count``.
+
+        """
+        dropped = dict(dropped or {})
+        levels = {}
+        level_stats = list(self._levels.items())
+        for no in set(dropped).difference(stats.no for _, stats in level_stats):
+            name = _LEVEL_NAMES.get(no) or logging.getLevelName(no)
+            level_stats.append((name, _LevelStats(no, len(self.buckets))))
+        for name, stats in level_stats:
+            cumulative = 0
+            buckets = []
+            bounds = self.buckets + (float("inf"),)
+            for bound, count in zip(bounds, stats.latency):
+                cumulative += count
+                buckets.append((bound, cumulative))
+            levels[name] = {
+                "records": stats.records,
+                "bytes": stats.bytes,
+                "dropped": dropped.pop(stats.no, 0),
+                "latency": {
+                    "buckets": buckets,
+                    "sum": stats.latency_sum,
+                    "count": cumulative,
+                },
+            }
+        return levels
+
+
+def format_prometheus(levels: dict, labels: Optional[dict] = None) -> str:
+    """Render a LogMetrics snapshot in the Prometheus text format.
+
+    Args:
+        levels (dict): LogMetrics snapshot.
+        labels (dict, optional): Labels added to every sample, e.g. the
+            process id.
+
+    Returns:
+        str: Prometheus text exposition format, version 0.0.4.
+
+    """
+    common = "".join(
+        '{0:s}="{1!s}",'.format(key, value)
+        for key, value in (labels or {}).items()
+    )
+    lines = []
+    for name, key, help_text in (
+        ("log_records_total", "records", "Log records handled by the sinks."),
+        ("log_bytes_total", "bytes", "Log bytes handled by the sinks."),
+        (
+            "log_dropped_total",
+            "dropped",
+            "Log records dropped by the log pipeline.",
+        ),
+        ("log_sink_seconds", "latency", "Log sink write latency."),
+    ):
+        kind = "histogram" if key == "latency" else "counter"
+        lines.append("# HELP {0:s} {1:s}".format(name, help_text))
+        lines.append("# TYPE {0:s} {1:s}".format(name, kind))
+        for level, stats in levels.items():
+            label = '{0:s}level="{1:s}"'.format(common, level)
+            if kind == "counter":
+                lines.append(
+                    "{0:s}{{{1:s}}} {2:d}".format(name, label, stats[key])
+                )
+                continue
+            latency = stats[key]
+            for bound, count in latency["buckets"]:
+                lines.append(
+                    '{0:s}_bucket{{{1:s},le="{2:s}"}} {3:d}'.format(
+                        name,
+                        label,
+                        "+Inf" if bound == float("inf") else repr(bound),
+                        count,
+                    )
+                )
+            lines.append(
+                "{0:s}_sum{{{1:s}}} {2!r}".format(name, label, latency["sum"])
+            )
+            lines.append(
+                "{0:s}_count{{{1:s}}} {2:d}".format(
+                    name, label, latency["count"]
+                )
+            )
+    return "\n".join(lines) + "\n"
+
+
+class MeteredStream(object):
+    """Text stream wrapper accounting the loguru messages written to it.
+
+    Loguru still handles it as a stream sink, colors included.
+
+    Args:
+        stream (TextIO): Wrapped stream, e.g. sys.stdout.
+        metrics (LogMetrics): Metrics object instance.
+
+    """
+
+    def __init__(self, stream, metrics: LogMetrics):
+        """Initialize MeteredStream class object instance."""
+        self.stream = stream
+        self.metrics = metrics
+
+    def write(self, message):
+        """Write and flush a message, then account it.
+
+        Args:
+            message (loguru.Message): Formatted message.
+
+        """
+        start = perf_counter()
+        self.stream.write(message)
+        self.stream.flush()
+        end = perf_counter()
+        size = len(message) if message.isascii() else len(message.encode())
+        self.metrics.observe(message.record["level"], size, start, end)
+
+    def isatty(self) -> bool:
+        """Whether the wrapped stream is a terminal, for colorization."""
+        return self.stream.isatty()
+
+
+def _reset_metrics_after_fork():
+    """Forget the records of the parent process."""
+    for metrics in list(_METRICS):
+        metrics.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_metrics_after_fork)
@@ -0,0 +1,274 @@
+"""Per call site rate limiting filter for loguru handlers."""
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from loguru import logger
+
+
+# Record keys locating a call site.
+_SITE_KEYS = ("name", "function", "line", "module", "file", "level")
+
+
+class _Bucket(object):
+    """Token bucket state of a single call site."""
+
+    __slots__ = (
+        "rate",
+        "tokens",
+        "updated",
+        "suppressed",
+        "reported",
+        "record",
+    )
+
+    def __init__(self, rate: float, burst: float, now: float, record):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = now
+        self.suppressed = 0
+        self.reported = now
+        # Call site of the summaries, not the whole record which may hold a
+        # traceback.
+        self.record = {key: record[key] for key in _SITE_KEYS}
+
+
+class CallSiteRateLimiter(object):
+    """Loguru filter rate limiting records per call site.
+
+    Every call site (module, function, line, level) gets its own token
+    bucket, so a flood of identical records, e.g. a failing Redis ping on
+    every readiness probe, is capped without hiding other messages. Records
+    over the limit are dropped and counted. A "suppressed N similar
+    messages" record is emitted from the same call site at most once every
+    ``summary_interval`` seconds while records are being dropped. A timer
+    thread, running while records are being dropped, reports the last ones
+    once the flood ends, and ``flush`` reports them right away, e.g. on
+    shutdown.
+
+    Limits are records per second, keyed by any of:
+
+    * ``"<logger name>:<LEVEL>"`` - one level of a logger and its children.
+    * ``"<logger name>"`` - every level of a logger and its children.
+    * ``"<LEVEL>"`` - a level, for all loggers.
+
+    The most specific key wins, call sites without a matching key are not
+    limited.
+
+    The same instance can be used as filter of several handlers, each
+    record is only accounted once.
+
+    Args:
+        limits (Dict[str, float]): Allowed records per second per call site.
+        burst (float): Bucket capacity, records allowed in a burst.
+        summary_interval (float): Minimum time in seconds between two
+            summaries of the same call site.
+
+    Attributes:
+        suppressed (int): Number of records dropped so far.
+        dropped_levels (Counter): Number of records dropped by level number.
+
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, float],
+        burst: float = 10,
+        summary_interval: float = 10.0,
+    ):
+        """Initialize CallSiteRateLimiter class object instance."""
+        self.burst = burst
+        self.summary_interval = summary_interval
+        self.suppressed = 0
+        self.dropped_levels = Counter()
+
+        self._level_limits = {}
+        self._name_limits = {}
+        for key, rate in limits.items():
+            name, _, level = key.rpartition(":")
+            if not name:
+                try:
+                    logger.level(level)
+                except ValueError:
+                    name, level = level, None
+                else:
+                    name = None
+            if name is None:
+                self._level_limits[level] = float(rate)
+            else:
+                self._name_limits[(name, level)] = float(rate)
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._local = threading.local()
+        self._timer = None
+
+    def __call__(self, record) -> bool:
+        """Return whether the record is within its call site limit.
+
+        Args:
+            record (dict): Loguru record.
+
+        Returns:
+            bool: False if the record must be dropped.
+
+        """
+        local = self._local
+        if getattr(local, "emitting", False):
+            return True
+        elif getattr(local, "record", None) is record:
+            return local.allowed
+
+        allowed, summary = self._consume(record)
+        local.record, local.allowed = record, allowed
+        if summary:
+            self._emit_summary(record, summary)
+        if not allowed:
+            self._start_timer()
+
+        return allowed
+
+    def flush(self, due_only: bool = False):
+        """Report the records suppressed and not reported yet.
+
+        Args:
+            due_only (bool): Only report the call sites whose last summary
+                is at least ``summary_interval`` seconds old.
+
+        """
+        now = time.monotonic()
+        summaries = []
+        with self._lock:
+            for bucket in self._buckets.values():
+                if not bucket or not bucket.suppressed:
+                    continue
+                elif due_only and (
+                    now - bucket.reported < self.summary_interval
+                ):
+                    continue
+                summaries.append((bucket.record, bucket.suppressed))
+                bucket.suppressed = 0
+                bucket.reported = now
+        for record, count in summaries:
+            self._emit_summary(record, count)
+
+    def close(self):
+        """Stop the timer and report the records suppressed so far."""
+        with self._lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        self.flush()
+
+    def limit_for(self, name: Optional[str], level: str) -> Optional[float]:
+        """Resolve the rate limit of a logger name and level.
+
+        Args:
+            name (str, optional): Logger name of the record.
+            level (str): Level name of the record.
+
+        Returns:
+            float, optional: Records per second, None if not limited.
+
+        """
+        if name:
+            parts = name.split(".")
+            for end in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:end])
+                for key in ((prefix, level), (prefix, None)):
+                    if key in self._name_limits:
+                        return self._name_limits[key]
+
+        return self._level_limits.get(level)
+
+    def _consume(self, record):
+        """Take a token from the record call site bucket.
+
+        Returns:
+            tuple: Whether the record is allowed and the number of suppressed
+                records to report, 0 if no summary is due.
+
+        """
+        level = record["level"]
+        site = (record["name"], record["function"], record["line"], level.no)
+        bucket = self._buckets.get(site)
+        if bucket is False:
+            return True, 0
+
+        now = time.monotonic()
+        with self._lock:
+            if bucket is None:
+                rate = self.limit_for(record["name"], level.name)
+                if rate is None:
+                    self._buckets[site] = False
+                    return True, 0
+                bucket = self._buckets.setdefault(
+                    site, _Bucket(rate, self.burst, now, record)
+                )
+
+            bucket.tokens = min(
+                self.burst,
+                bucket.tokens + (now - bucket.updated) * bucket.rate,
+            )
+            bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                allowed = True
+            else:
+                bucket.suppressed += 1
+                self.suppressed += 1
+                self.dropped_levels[record["level"].no] += 1
+                allowed = False
+
+            summary = 0
+            if bucket.suppressed and (
+                now - bucket.reported >= self.summary_interval
+            ):
+                summary, bucket.suppressed = bucket.suppressed, 0
+                bucket.reported = now
+
+        return allowed, summary
+
+    def _start_timer(self):
+        """Start the summary timer thread, unless running."""
+        with self._lock:
+            # Not alive in a forked child either.
+            if self._timer is not None and self._timer.is_alive():
+                return
+            self._timer = threading.Timer(self.summary_interval, self._on_timer)
+            self._timer.name = "log-ratelimit"
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self):
+        """Report the due summaries, again later while some are pending."""
+        self.flush(due_only=True)
+        with self._lock:
+            self._timer = None
+            pending = any(
+                bucket and bucket.suppressed
+                for bucket in self._buckets.values()
+            )
+        if pending:
+            self._start_timer()
+
+    def _emit_summary(self, record, count: int):
+        """Log the number of records suppressed at the record call site."""
+        site = {key: record[key] for key in _SITE_KEYS if key != "level"}
+        level = record["level"]
+        # Records bridged with a numeric level have no registered level name.
+        level_id = (
+            level.no if level.name == "Level %d" % level.no else level.name
+        )
+
+        self._local.emitting = True
+        try:
+            logger.patch(lambda summary: summary.update(site)).log(
+                level_id,
+                "Suppressed {0:d} similar messages from {1}:{2}:{3}".format(
+                    count, record["name"], record["function"], record["line"]
+                ),
+            )
+        finally:
+            self._local.emitting = False
@@ -0,0 +1,228 @@
+"""Schema-driven JSON serializer for loguru records."""
+from datetime import datetime, timedelta
+from typing import Callable, Iterable
+
+import orjson
+
+# Record fields which can be selected in the serializer allow-list. Grouped
+# fields (level, process, thread, file) can also be selected one attribute at
+# a time with a dotted name, e.g. "level.name". Single extra keys are
+# selected with "extra.<key>".
+RECORD_FIELDS = (
+    "time",
+    "elapsed",
+    "level",
+    "message",
+    "name",
+    "module",
+    "function",
+    "line",
+    "process",
+    "thread",
+    "file",
+    "exception",
+    "extra",
+)
+# Attributes of the grouped fields.
+GROUP_ATTRIBUTES = {
+    "level": ("name", "no"),
+    "process": ("id", "name"),
+    "thread": ("id", "name"),
+    "file": ("name", "path"),
+}
+
+DEFAULT_FIELDS = (
+    "time",
+    "elapsed",
+    "level",
+    "message",
+    "name",
+    "module",
+    "function",
+    "line",
+    "process",
+    "thread",
+    "file.path",
+    "exception",
+    "extra",
+)
+
+
+def json_default(obj):
+    """Serialize the values orjson does not support natively.
+
+    Args:
+        obj (Any): Value orjson can not serialize.
+
+    Returns:
+        Union[float, str]: Seconds of timedeltas, ISO 8601 datetimes, and
+            the string of other values.
+
+    """
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    elif isinstance(obj, datetime):
+        # Loguru uses a datetime subclass which orjson does not handle.
+        return obj.isoformat()
+    return str(obj)
+
+
+def _group_extractor(field: str, attributes: tuple) -> Callable:
+    """Return a callable extracting some attributes of a grouped field."""
+
+    def extract(record):
+        value = record[field]
+        return {
+            attribute: getattr(value, attribute) for attribute in attributes
+        }
+
+    return extract
+
+
+def public_extra(record) -> dict:
+    """Return the record extra without the keys private to other sinks.
+
+    Extra keys starting with an underscore, e.g. the lazily pretty-printed
+    payload of the text format, are not serialized.
+
+    Args:
+        record (dict): Loguru record.
+
+    Returns:
+        dict: Public extra keys and values.
+
+    """
+    extra = record["extra"]
+    for key in extra:
+        if key[:1] == "_":
+            return {k: v for k, v in extra.items() if k[:1] != "_"}
+    return extra
+
+
+def extra_extractor(keys: tuple) -> Callable:
+    """Return a callable extracting the selected extra keys.
+
+    Args:
+        keys (tuple): Selected extra keys.
+
+    Returns:
+        Callable: Called with a loguru record, returns the selected keys
+            present in its extra.
+
+    """
+
+    def extract(record):
+        extra = record["extra"]
+        return {key: extra[key] for key in keys if key in extra}
+
+    return extract
+
+
+def select_fields(fields: Iterable[str]) -> dict:
+    """Validate the field allow-list and group it by record field.
+
+    Args:
+        fields (Iterable[str]): Field allow-list.
+
+    Returns:
+        dict: Selected attributes or extra keys by record field, in output
+            order. None selects all of them.
+
+    Raises:
+        ValueError: If the allow-list holds an unknown field.
+
+    """
+    selected = {}
+
+    for name in fields:
+        field, _, attribute = name.partition(".")
+        known = GROUP_ATTRIBUTES.get(field, ())
+        if field not in RECORD_FIELDS:
+            raise ValueError("Unknown log record field: '{0:s}'".format(name))
+        elif attribute and field != "extra" and attribute not in known:
+            raise ValueError("Unknown log record field: '{0:s}'".format(name))
+
+        if not attribute:
+            selected[field] = None
+        elif field not in selected:
+            selected[field] = [attribute]
+        elif selected[field] is not None and attribute not in selected[field]:
+            selected[field].append(attribute)
+
+    return selected
+
+
+def _compile_fields(fields: Iterable[str]) -> list:
+    """Turn the field allow-list into a list of (key, extractor) pairs.
+
+    Args:
+        fields (Iterable[str]): Field allow-list.
+
+    Returns:
+        list: Field extractors in output order, without the exception field
+            which is rendered by the serializer itself.
+
+    Raises:
+        ValueError: If the allow-list holds an unknown field.
+
+    """
+    extractors = []
+    for field, attributes in select_fields(fields).items():
+        if field == "exception":
+            continue
+        elif field == "time":
+            extractor = lambda record: record["time"].isoformat()  # noqa
+        elif field == "elapsed":
+            extractor = lambda record: record["elapsed"].total_seconds()  # noqa
+        elif field == "extra" and attributes is None:
+            extractor = public_extra
+        elif field == "extra":
+            extractor = extra_extractor(tuple(attributes))
+        elif field in GROUP_ATTRIBUTES:
+            extractor = _group_extractor(
+                field, tuple(attributes or GROUP_ATTRIBUTES[field])
+            )
+        else:
+            extractor = (lambda key: lambda record: record[key])(field)
+        extractors.append((field, extractor))
+
+    return extractors
+
+
+def build_record_serializer(
+    fields: Iterable[str] = DEFAULT_FIELDS,
+) -> Callable:
+    """Build a serializer turning loguru messages into JSON lines.
+
+    The allow-list is compiled once into a fixed list of field extractors,
+    so serializing a record only walks the selected fields and encodes them
+    straight to bytes.
+
+    Args:
+        fields (Iterable[str]): Field allow-list, see RECORD_FIELDS.
+
+    Returns:
+        Callable: Function taking a loguru message and returning the
+            serialized record as bytes, including the trailing newline.
+
+    Raises:
+        ValueError: If the allow-list holds an unknown field.
+
+    """
+    fields = tuple(fields)
+    extractors = _compile_fields(fields)
+    with_exception = "exception" in fields
+
+    option = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+
+    def serialize(message) -> bytes:
+        record = message.record
+        rec = {key: extract(record) for key, extract in extractors}
+        if with_exception and record["exception"]:
+            # The sink format is "{message}", loguru appends the rendered
+            # traceback after a newline.
+            start = len(record["message"]) + 1
+            rec["exception"] = message[start:]
+        return orjson.dumps(rec, default=json_default, option=option)
+
+    return serialize
@@ -0,0 +1,169 @@
+"""Per request buffering of low level log records."""
+import threading
+from collections import Counter, deque
+from typing import Callable, Optional
+
+from asgi_correlation_id.context import correlation_id
+from loguru import logger
+
+
+class RequestLogBuffer(object):
+    """Loguru filter holding low level records until the request outcome.
+
+    Records below ``levelno``, or rejected by ``level_filter`` when given,
+    logged while handling a request are kept in memory, keyed by the request
+    correlation id, instead of being written. When the request ends,
+    ``flush`` replays them through every handler, e.g. for failed or slow
+    requests, or ``discard`` drops them. Such records logged outside of a
+    request are dropped right away, the others pass through.
+
+    Memory is bounded per request, the oldest records of a request are
+    dropped first, and for all requests together, new records are dropped
+    once ``max_records`` are buffered. Records discarded at the end of a
+    request are filtered out like records under their level, they are not
+    counted as dropped.
+
+    The same instance can be used as filter of several handlers, each
+    record is only buffered once.
+
+    Args:
+        levelno (int): Level number from which records are not buffered.
+        max_request_records (int): Maximum number of records per request.
+        max_records (int): Maximum number of records for all requests.
+        level_filter (Callable, optional): Loguru filter deciding which
+            records pass through, replaces the ``levelno`` comparison, e.g.
+            a LogLevelController.
+
+    Attributes:
+        dropped (int): Number of records dropped by the buffer bounds.
+        dropped_levels (Counter): Number of records dropped by the buffer
+            bounds, by level number.
+
+    """
+
+    def __init__(
+        self,
+        levelno: int,
+        max_request_records: int = 200,
+        max_records: int = 10000,
+        level_filter: Optional[Callable] = None,
+    ):
+        """Initialize RequestLogBuffer class object instance."""
+        self.levelno = levelno
+        self.level_filter = level_filter
+        self.max_request_records = max_request_records
+        self.max_records = max_records
+        self.dropped = 0
+        self.dropped_levels = Counter()
+
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._total = 0
+        self._local = threading.local()
+
+    def __call__(self, record) -> bool:
+        """Buffer low level records of the current request.
+
+        Args:
+            record (dict): Loguru record.
+
+        Returns:
+            bool: True if the record must be written now.
+
+        """
+        if self.level_filter is not None:
+            if self.level_filter(record):
+                return True
+        elif record["level"].no >= self.levelno:
+            return True
+
+        local = self._local
+        if getattr(local, "replaying", False):
+            return True
+        elif getattr(local, "record", None) is record:
+            return False
+
+        local.record = record
+        request_id = correlation_id.get()
+        if request_id is not None:
+            self._append(request_id, record)
+        return False
+
+    def begin(self, request_id: str):
+        """Start buffering the records of a request.
+
+        Args:
+            request_id (str): Request correlation id.
+
+        """
+        with self._lock:
+            self._requests.setdefault(request_id, deque())
+
+    def discard(self, request_id: str) -> int:
+        """Drop the records buffered for a request.
+
+        Args:
+            request_id (str): Request correlation id.
+
+        Returns:
+            int: Number of records dropped.
+
+        """
+        return len(self._pop(request_id))
+
+    def flush(self, request_id: str) -> int:
+        """Write the records buffered for a request, in logging order.
+
+        Args:
+            request_id (str): Request correlation id.
+
+        Returns:
+            int: Number of records written.
+
+        """
+        records = self._pop(request_id)
+
+        self._local.replaying = True
+        try:
+            for record in records:
+                # The original record replaces the new one as a whole,
+                # including its time, call site and extra.
+                logger.patch(lambda new, old=record: new.update(old)).log(
+                    record["level"].no, record["message"]
+                )
+        finally:
+            self._local.replaying = False
+
+        return len(records)
+
+    @property
+    def buffered(self) -> int:
+        """int: Number of records currently buffered."""
+        return self._total
+
+    def _append(self, request_id: str, record):
+        """Buffer a record if its request is tracked and within bounds."""
+        with self._lock:
+            records: Optional[deque] = self._requests.get(request_id)
+            if records is None:
+                return
+
+            if len(records) >= self.max_request_records:
+                oldest = records.popleft()
+                self._total -= 1
+                self.dropped += 1
+                self.dropped_levels[oldest["level"].no] += 1
+            if self._total >= self.max_records:
+                self.dropped += 1
+                self.dropped_levels[record["level"].no] += 1
+                return
+
+            records.append(record)
+            self._total += 1
+
+    def _pop(self, request_id: str) -> deque:
+        """Stop tracking a request and return its records."""
+        with self._lock:
+            records = self._requests.pop(request_id, None) or deque()
+            self._total -= len(records)
+        return records
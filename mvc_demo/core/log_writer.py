@@ -0,0 +1,266 @@
+"""Batched background writer for log sinks."""
+import logging
+import os
+import sys
+import threading
+import traceback
+import weakref
+from collections import Counter, deque
+from typing import Optional
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop-oldest"
+OVERFLOW_DROP_DEBUG = "drop-debug"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_DEBUG)
+
+# Every writer alive in this process, re-initialized after fork.
+_WRITERS = weakref.WeakSet()
+
+
+class BatchedLogWriter(object):
+    """Buffer serialized log records and write them from a dedicated thread.
+
+    Callers only append already serialized records to a bounded in-memory
+    buffer. A daemon writer thread drains the buffer with a single large
+    write whenever it holds ``flush_bytes`` or ``flush_interval`` seconds
+    have elapsed, so the event-loop thread never blocks on a write syscall.
+
+    When the buffer holds ``max_records`` records the overflow policy
+    decides what happens to new ones:
+
+    * ``block`` - wait until the writer thread makes room.
+    * ``drop-oldest`` - discard the oldest buffered record.
+    * ``drop-debug`` - discard incoming records below INFO, block for the
+      others.
+
+    Args:
+        stream (BinaryIO, optional): Binary stream to write to. Defaults to
+            the process stdout.
+        max_records (int): Maximum number of buffered records.
+        flush_bytes (int): Buffered size which triggers a flush.
+        flush_interval (float): Maximum time in seconds a record waits in
+            the buffer.
+        overflow (str): Overflow policy, one of OVERFLOW_POLICIES.
+
+    Attributes:
+        dropped (int): Number of records discarded by the overflow policy or
+            lost in a failed write.
+        dropped_levels (Counter): Number of records dropped by level number.
+        flushed (int): Number of records written to the stream.
+        flushes (int): Number of writes issued to the stream.
+        written_bytes (int): Number of bytes written to the stream.
+
+    """
+
+    def __init__(
+        self,
+        stream=None,
+        max_records: int = 10000,
+        flush_bytes: int = 64 * 1024,
+        flush_interval: float = 0.5,
+        overflow: str = OVERFLOW_BLOCK,
+    ):
+        """Initialize BatchedLogWriter class object instance."""
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                "Invalid overflow policy '{0:s}', expected: {1:s}".format(
+                    overflow, ", ".join(OVERFLOW_POLICIES)
+                )
+            )
+
+        self.stream = stream if stream is not None else sys.stdout.buffer
+        self.max_records = max_records
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self._drop_debug = overflow == OVERFLOW_DROP_DEBUG
+
+        self.dropped = 0
+        self.dropped_levels = Counter()
+        self.flushed = 0
+        self.flushes = 0
+        self.written_bytes = 0
+
+        self._init_state()
+        _WRITERS.add(self)
+
+    def _init_state(self):
+        """(Re)create the buffer, synchronization primitives and thread."""
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._drained = threading.Condition(self._lock)
+        self._buffer = deque()
+        self._buffered_bytes = 0
+        # Flush requests and completions, used by flush() to wait for the
+        # writer thread.
+        self._requested = 0
+        self._completed = 0
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _start(self):
+        """Start the writer thread. Must be called with the lock held."""
+        self._closing = False
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, data: bytes, levelno: int = logging.INFO) -> bool:
+        """Append a serialized record to the buffer.
+
+        Args:
+            data (bytes): Serialized record, including the line terminator.
+            levelno (int): Record level number, used by the drop-debug
+                overflow policy.
+
+        Returns:
+            bool: Whether the record was buffered.
+
+        """
+        with self._lock:
+            if self._thread is None:
+                self._start()
+
+            if len(self._buffer) >= self.max_records:
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    old, old_levelno = self._buffer.popleft()
+                    self._buffered_bytes -= len(old)
+                    self.dropped += 1
+                    self.dropped_levels[old_levelno] += 1
+                elif self._drop_debug and levelno < logging.INFO:
+                    self.dropped += 1
+                    self.dropped_levels[levelno] += 1
+                    return False
+                else:
+                    self._not_empty.notify()
+                    while len(self._buffer) >= self.max_records:
+                        self._not_full.wait()
+
+            self._buffer.append((data, levelno))
+            self._buffered_bytes += len(data)
+            if self._buffered_bytes >= self.flush_bytes:
+                self._not_empty.notify()
+
+        return True
+
+    def write(self, message):
+        """Loguru sink interface, buffer an already formatted message.
+
+        Args:
+            message (loguru.Message): Formatted message, a str subclass which
+                holds the record in its ``record`` attribute.
+
+        """
+        self.put(str(message).encode("utf-8"), message.record["level"].no)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every record buffered so far has been written.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds.
+
+        Returns:
+            bool: Whether the buffer was drained before the timeout.
+
+        """
+        with self._lock:
+            if self._thread is None:
+                return not self._buffer
+            self._requested += 1
+            target = self._requested
+            self._not_empty.notify()
+            return self._drained.wait_for(
+                lambda: self._completed >= target, timeout=timeout
+            )
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """Write the remaining records and stop the writer thread.
+
+        The writer is restarted transparently if records are put after it
+        has been closed.
+
+        Args:
+            timeout (float, optional): Maximum time to wait in seconds.
+
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._closing = True
+            self._not_empty.notify()
+
+        thread.join(timeout)
+
+        with self._lock:
+            if self._thread is thread and not thread.is_alive():
+                self._thread = None
+
+    def _run(self):
+        """Writer thread main loop."""
+        while True:
+            with self._lock:
+                self._not_empty.wait_for(
+                    self._should_write, timeout=self.flush_interval
+                )
+                batch, self._buffer = self._buffer, deque()
+                self._buffered_bytes = 0
+                requested = self._requested
+                closing = self._closing
+                self._not_full.notify_all()
+
+            written = self._write_batch(batch) if batch else 0
+
+            with self._lock:
+                if written:
+                    self.flushed += len(batch)
+                    self.flushes += 1
+                    self.written_bytes += written
+                elif batch:
+                    self.dropped += len(batch)
+                    self.dropped_levels.update(levelno for _, levelno in batch)
+                self._completed = requested
+                self._drained.notify_all()
+
+            if closing:
+                return
+
+    def _should_write(self) -> bool:
+        """Whether the writer thread should write without waiting more."""
+        if self._closing or self._requested > self._completed:
+            return True
+        return self._buffered_bytes >= self.flush_bytes
+
+    def _write_batch(self, batch) -> int:
+        """Write a batch of records to the stream with a single write.
+
+        Returns:
+            int: Number of bytes written, 0 if the write failed.
+
+        """
+        data = b"".join(record for record, _ in batch)
+        try:
+            self.stream.write(data)
+            self.stream.flush()
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            return 0
+
+        return len(data)
+
+
+def _reinit_writers_after_fork():
+    """Reset writers inherited from the parent process.
+
+    Threads do not survive fork and locks may have been held by them. The
+    records still buffered are written by the parent, the child starts with
+    an empty buffer and a fresh writer thread on first use.
+    """
+    for writer in list(_WRITERS):
+        writer._init_state()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_writers_after_fork)
@@ -1,21 +1,37 @@
 """Loguru utils file."""
+import atexit
 import logging
 import os
 import platform
+import signal
+import tempfile
+import threading
+from collections import Counter
 from datetime import datetime, timezone
 from pprint import pformat
 from sys import stdout
-from typing import Union
+from time import perf_counter
+from typing import Callable, Dict, Optional, Union
 
 from asgi_correlation_id.context import correlation_id
 from gunicorn.glogging import Logger
 from loguru import logger
+from loguru._recattrs import RecordFile
 from mvc_demo.config.application import settings
-
-try:
-    from orjson import dumps
-except Exception as ex:
-    from json import dumps
+from mvc_demo.core.log_aggregator import AggregatorStream, LogAggregator
+from mvc_demo.core.log_binary import BinaryRecordEncoder
+from mvc_demo.core.log_exceptions import ExceptionFingerprinter
+from mvc_demo.core.log_files import RotatingFileStream, parse_rotation
+from mvc_demo.core.log_index import index_segment
+from mvc_demo.core.log_levels import LogLevelController, parse_level
+from mvc_demo.core.log_metrics import LogMetrics, MeteredStream
+from mvc_demo.core.log_ratelimit import CallSiteRateLimiter
+from mvc_demo.core.log_tailbuffer import RequestLogBuffer
+from mvc_demo.core.log_serializer import (
+    DEFAULT_FIELDS,
+    build_record_serializer,
+)
+from mvc_demo.core.log_writer import BatchedLogWriter
 
 # References
 # Solution comes from:
@@ -25,23 +41,55 @@ except Exception as ex:
 #   https://loguru.readthedocs.io/en/stable/api/logger.html#sink
 
 
+def _static_log_extras() -> dict:
+    """Compute the log extras that stay the same for the whole process.
+
+    Returns:
+        dict: Host, pid and application name of the current process.
+
+    """
+    return {
+        "host": os.getenv(
+            "HOSTNAME", os.getenv("COMPUTERNAME", platform.node())
+        ).split(".")[0],
+        "pid": os.getpid(),
+        "app_name": settings.PROJECT_NAME,
+    }
+
+
+# Precomputed once per process, set_log_extras runs for every log record.
+_STATIC_LOG_EXTRAS = _static_log_extras()
+
+
+def refresh_static_log_extras():
+    """Recompute the precomputed log extras of the current process.
+
+    Called automatically in forked children (gunicorn workers), so they
+    report their own pid instead of the one inherited from the master.
+    """
+    global _STATIC_LOG_EXTRAS
+    _STATIC_LOG_EXTRAS = _static_log_extras()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=refresh_static_log_extras)
+
+
 def set_log_extras(record):
-    """set_log_extras [summary].
+    """Add the extra fields used by the log formats to the record.
 
-    [extended_summary]
+    Host, pid and app_name come from a block precomputed once per process,
+    only the datetime and the request id are evaluated for every record.
 
     Args:
-        record ([type]): [description]
+        record (dict): Loguru record being patched.
+
     """
-    record["extra"]["datetime"] = datetime.now(
-        timezone.utc
-    )  # Log datetime in UTC time zone, even if server is using another timezone
-    record["extra"]["host"] = os.getenv(
-        "HOSTNAME", os.getenv("COMPUTERNAME", platform.node())
-    ).split(".")[0]
-    record["extra"]["pid"] = os.getpid()
-    record["extra"]["request_id"] = correlation_id.get()
-    record["extra"]["app_name"] = settings.PROJECT_NAME
+    extra = record["extra"]
+    extra.update(_STATIC_LOG_EXTRAS)
+    # Log datetime in UTC time zone, even if server is using another timezone
+    extra["datetime"] = datetime.now(timezone.utc)
+    extra["request_id"] = correlation_id.get()
 
 
 #
@@ -79,38 +127,129 @@ class StubbedGunicornLogger(Logger):
         self.access_logger.setLevel(self.loglevel)
 
 
-class InterceptHandler(logging.Handler):
-    """InterceptHandler [summary].
+# Stdlib level names which exist in loguru with the same severity.
+_LOGURU_LEVELS = {
+    name: name for name in ("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG")
+}
 
-    [extended_summary]
+# LogRecord being bridged by the current thread, read by the bridge patcher.
+_bridged = threading.local()
+
+# RecordFile objects by source path, shared by every record of a file.
+_record_files = {}
+
+
+def _patch_bridged_record(record):
+    """Take the caller information from the bridged stdlib LogRecord.
+
+    The record name is the stdlib logger name, so stdlib loggers such as
+    "uvicorn.access" can be filtered by name like loguru modules.
 
     Args:
-        logging ([type]): [description]
+        record (dict): Loguru record being patched.
+
     """
+    log_record = _bridged.record
+    path = log_record.pathname
+    try:
+        record["file"] = _record_files[path]
+    except KeyError:
+        record["file"] = _record_files.setdefault(
+            path, RecordFile(log_record.filename, path)
+        )
+    record["name"] = log_record.name
+    record["module"] = log_record.module
+    record["function"] = log_record.funcName
+    record["line"] = log_record.lineno
 
-    def emit(self, record):
-        """Emit [summary].
 
-        [extended_summary]
+# Created once, logger.patch() returns a new logger on every call.
+_bridge_logger = logger.patch(_patch_bridged_record)
+
+
+class InterceptHandler(logging.Handler):
+    """Logging handler forwarding stdlib records to loguru.
+
+    Used for the gunicorn, uvicorn and aiohttp loggers. The loguru level is
+    looked up in a precomputed map and the caller information is copied
+    from the LogRecord instead of walking the Python frames. Created without
+    a level by global_log_config, stdlib loggers are gated by their own
+    level, set by LogLevelController, before their message is formatted.
+    """
+
+    def emit(self, record):
+        """Log the stdlib record with loguru.
 
         Args:
-            record ([type]): [description]
+            record (logging.LogRecord): Record to forward.
         """
-        # Get corresponding Loguru level if it exists
+        level = _LOGURU_LEVELS.get(record.levelname, record.levelno)
+
+        bridge = _bridge_logger
+        if record.exc_info:
+            bridge = bridge.opt(exception=record.exc_info)
+
+        _bridged.record = record
         try:
-            level = logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
-
-        # Find caller from where originated the logged message
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
-            frame = frame.f_back
-            depth += 1
-
-        logger.opt(depth=depth, exception=record.exc_info).log(
-            level, record.getMessage()
-        )
+            bridge.log(level, record.getMessage())
+        finally:
+            _bridged.record = None
+
+
+class PrettyPayload(object):
+    """Pretty-printed view of a payload bound to a log record.
+
+    The payload is only pretty-printed when a sink actually renders it, and
+    at most once per record however many sinks render it. The original
+    payload object is left untouched in the record for the other sinks.
+
+    Args:
+        payload (Any): Payload bound with logger.bind(payload=...).
+
+    """
+
+    __slots__ = ("payload", "_text")
+
+    def __init__(self, payload):
+        """Initialize PrettyPayload class object instance."""
+        self.payload = payload
+        self._text = None
+
+    def __str__(self):
+        """Return the pretty-printed payload."""
+        if self._text is None:
+            self._text = pformat(self.payload, indent=4, compact=True, width=88)
+        return self._text
+
+    def __format__(self, format_spec):
+        """Format the pretty-printed payload."""
+        return format(str(self), format_spec)
+
+
+# Extra key holding the PrettyPayload of a record, private to format_record.
+PRETTY_PAYLOAD_KEY = "_pretty_payload"
+
+_FORMAT_PREFIX = (
+    "<green>{extra[datetime]}</green> | "
+    "<green>{extra[app_name]}</green> | "
+    "<green>{extra[host]}</green> | "
+    "<green>{extra[pid]}</green> | "
+    "<green>{extra[request_id]}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:"
+    "<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
+    "<level>{message}</level>"
+)
+_FORMAT_PAYLOAD = "\n<level>{extra[%s]}</level>" % PRETTY_PAYLOAD_KEY
+
+# Format variants keyed by (has payload, has exception), the rendered
+# traceback already ends with a newline.
+_FORMATS = {
+    (False, False): _FORMAT_PREFIX + "\n",
+    (True, False): _FORMAT_PREFIX + _FORMAT_PAYLOAD + "\n",
+    (False, True): _FORMAT_PREFIX + "\n{exception}",
+    (True, True): _FORMAT_PREFIX + _FORMAT_PAYLOAD + "\n{exception}",
+}
 
 
 def format_record(record: dict) -> str:
@@ -120,85 +259,473 @@ def format_record(record: dict) -> str:
     >>> [   {   'count': 2,
     >>>         'users': [   {'age': 87, 'is_active': True, 'name': 'Nick'},
     >>>                      {'age': 27, 'is_active': True, 'name': 'Alex'}]}]
+
+    The format strings are built once, this only picks the variant matching
+    the record. The payload is pretty-printed lazily, see PrettyPayload.
     """
-    format_string = "<green>{extra[datetime]}</green> | "
-    format_string += "<green>{extra[app_name]}</green> | "
-    format_string += "<green>{extra[host]}</green> | "
-    format_string += "<green>{extra[pid]}</green> | "
-    format_string += "<green>{extra[request_id]}</green> | "
-    format_string += "<level>{level: <8}</level> | "
-    format_string += "<cyan>{name}</cyan>:"
-    format_string += "<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
-    format_string += "<level>{message}</level>"
+    extra = record["extra"]
 
     # This is to nice print data, like:
     # logger.bind(payload=dataobject).info("Received data")
-    if record["extra"].get("payload") is not None:
-        record["extra"]["payload"] = pformat(
-            record["extra"]["payload"], indent=4, compact=True, width=88
+    payload = extra.get("payload")
+    if payload is not None and PRETTY_PAYLOAD_KEY not in extra:
+        extra[PRETTY_PAYLOAD_KEY] = PrettyPayload(payload)
+
+    return _FORMATS[payload is not None, record["exception"] is not None]
+
+
+def orjson_log_sink(msg):
+    """Serialize the record and hand it to the log writer.
+
+    Records are serialized as JSON lines, or binary frames with LOG_BINARY.
+    They are written by the batched writer thread (see get_log_writer), the
+    caller never blocks on the write syscall.
+
+    Args:
+        msg (loguru.Message): Formatted message holding the record.
+    """
+    start = perf_counter()
+    data = _serialize_record(msg)
+    level = msg.record["level"]
+    get_log_writer().put(data, level.no)
+    _log_metrics.observe(level, len(data), start, perf_counter())
+
+
+def text_log_sink(msg):
+    """Encode the formatted record and hand it to the log writer.
+
+    Used for text logs sent to the log aggregator or LOG_FILE.
+
+    Args:
+        msg (loguru.Message): Formatted message holding the record.
+    """
+    start = perf_counter()
+    data = msg.encode("utf-8")
+    level = msg.record["level"]
+    get_log_writer().put(data, level.no)
+    _log_metrics.observe(level, len(data), start, perf_counter())
+
+
+# Replaced by global_log_config with the serializer for the configured
+# field allow-list and format.
+_serialize_record = build_record_serializer()
+
+_log_writer = None
+
+# Records, bytes and write latency of the sinks above, and of stdout.
+_log_metrics = LogMetrics()
+
+
+def get_log_metrics() -> dict:
+    """Return the log pipeline metrics of this process.
+
+    Returns:
+        dict: LogMetrics snapshot, including the records dropped by the rate
+            limiter, the bounds of the request log buffer and the log
+            writer.
+
+    """
+    dropped = Counter()
+    for stage in (_log_rate_limiter, _request_log_buffer, _log_writer):
+        if stage is not None:
+            dropped.update(stage.dropped_levels)
+    return _log_metrics.snapshot(dropped)
+
+
+def _report_log_metrics():
+    """Log the log pipeline metrics of this process."""
+    levels = {}
+    for name, stats in get_log_metrics().items():
+        latency = stats["latency"]
+        # No write yet for the levels with dropped records only.
+        mean = latency["sum"] / latency["count"] if latency["count"] else 0.0
+        levels[name] = {
+            "records": stats["records"],
+            "bytes": stats["bytes"],
+            "dropped": stats["dropped"],
+            "latency_us": round(mean * 1e6, 1),
+        }
+    logger.bind(log_metrics=levels).info(
+        "Log metrics: {}",
+        ", ".join(
+            "{0:s} {1[records]:d} records {1[bytes]:d} bytes {1[dropped]:d}"
+            " dropped {1[latency_us]}us".format(name, stats)
+            for name, stats in levels.items()
+        ),
+    )
+
+
+def _segment_header() -> bytes:
+    """Return the first bytes of every log file segment of this process."""
+    header = getattr(_serialize_record, "header", None)
+    return header() if header is not None else b""
+
+
+def _log_file_stream(per_process: bool) -> RotatingFileStream:
+    """Create the rotating LOG_FILE stream from the application settings.
+
+    Args:
+        per_process (bool): Whether every process writes its own segments,
+            which start with the binary format header with LOG_BINARY.
+            Sealed JSON lines segments are indexed with LOG_INDEX.
+
+    Returns:
+        RotatingFileStream: Stream object instance, closed at exit.
+
+    """
+    max_bytes, interval = parse_rotation(settings.LOG_ROTATION or "")
+    # Binary segments have no JSON lines to index.
+    indexed = settings.LOG_INDEX and not (per_process and settings.LOG_BINARY)
+    stream = RotatingFileStream(
+        settings.LOG_FILE,
+        max_bytes=max_bytes,
+        interval=interval,
+        compression=settings.LOG_COMPRESSION,
+        retention_count=settings.LOG_RETENTION_COUNT,
+        retention_bytes=settings.LOG_RETENTION_BYTES,
+        per_process=per_process,
+        header=_segment_header if per_process else None,
+        indexer=index_segment if indexed else None,
+    )
+    atexit.register(stream.close)
+    return stream
+
+
+def get_log_writer() -> BatchedLogWriter:
+    """Return the batched writer used by the log sinks.
+
+    The writer is created on first use from the application settings. It
+    writes to the log aggregator when LOG_AGGREGATOR_SOCKET is set, to
+    LOG_FILE when set, to stdout otherwise.
+
+    Returns:
+        BatchedLogWriter: Writer object instance.
+
+    """
+    global _log_writer
+
+    if _log_writer is None:
+        stream = None
+        if settings.LOG_AGGREGATOR_SOCKET:
+            stream = AggregatorStream(settings.LOG_AGGREGATOR_SOCKET)
+        elif settings.LOG_FILE:
+            stream = _log_file_stream(per_process=True)
+
+        _log_writer = BatchedLogWriter(
+            stream=stream,
+            max_records=settings.LOG_BUFFER_RECORDS,
+            flush_bytes=settings.LOG_FLUSH_BYTES,
+            flush_interval=settings.LOG_FLUSH_INTERVAL,
+            overflow=settings.LOG_OVERFLOW_POLICY,
         )
-        format_string += "\n<level>{extra[payload]}</level>"
+        atexit.register(_log_writer.close)
 
-    format_string += "{exception}\n"
+    return _log_writer
 
-    return format_string
 
+def flush_logs(timeout: Optional[float] = 5.0):
+    """Write every log record buffered so far.
 
-def orjson_log_sink(msg):
-    """orjson_log_sink [summary].
+    The records suppressed by the call site rate limiter and not reported
+    yet are reported first.
 
-    [extended_summary]
+    Args:
+        timeout (float, optional): Maximum time to wait in seconds.
+
+    """
+    if _log_rate_limiter is not None:
+        _log_rate_limiter.flush()
+    if _log_writer is not None:
+        _log_writer.flush(timeout)
+
+
+def close_logs(timeout: Optional[float] = 5.0):
+    """Write the remaining log records and stop the writer thread.
 
     Args:
-        msg ([type]): [description]
-    """
-    r = msg.record
-    rec = {
-        "elapsed": r["elapsed"].total_seconds(),
-        "time": r["time"].isoformat(),
-        "level": {
-            "name": r["level"].name,
-            "no": r["level"].no,
-        },
-        "process": {"id": r["process"].id, "name": r["process"].name},
-        "thread": {"id": r["thread"].id, "name": r["thread"].name},
-        "file": r["file"].path,
-    }
+        timeout (float, optional): Maximum time to wait in seconds.
+
+    """
+    if _log_rate_limiter is not None:
+        _log_rate_limiter.close()
+    if _log_writer is not None:
+        _log_writer.close(timeout)
+
+
+_log_aggregator = None
+
+
+def start_log_aggregator() -> Optional[LogAggregator]:
+    """Start the log aggregator if LOG_AGGREGATOR_SOCKET is set.
 
-    if r["exception"]:
-        rec["exception"] = str(msg)
+    Meant for the gunicorn master ``when_ready`` hook, workers forked
+    afterwards send their records to it.
 
-    for k, v in r.items():
-        print(k, type(v), v)
-        if k in rec:
-            continue
-        rec[k] = v
+    Returns:
+        LogAggregator, optional: Started aggregator, None if disabled.
+
+    """
+    global _log_aggregator
+
+    if settings.LOG_AGGREGATOR_SOCKET and _log_aggregator is None:
+        stream = (
+            _log_file_stream(per_process=False) if settings.LOG_FILE else None
+        )
+        _log_aggregator = LogAggregator(
+            settings.LOG_AGGREGATOR_SOCKET, stream=stream
+        )
+        _log_aggregator.start()
+
+    return _log_aggregator
+
+
+def detach_log_aggregator():
+    """Close the log aggregator sockets inherited by a forked worker.
+
+    Meant for the gunicorn ``post_fork`` hook.
+    """
+    global _log_aggregator
+
+    if _log_aggregator is not None:
+        _log_aggregator.close_inherited()
+        _log_aggregator = None
+
+
+def stop_log_aggregator(timeout: Optional[float] = 5.0):
+    """Write the remaining records and stop the log aggregator.
+
+    The records of the current process are sent first. Meant for the
+    gunicorn master ``on_exit`` hook.
+
+    Args:
+        timeout (float, optional): Maximum time to wait in seconds.
+
+    """
+    global _log_aggregator
+
+    close_logs(timeout)
+    if _log_aggregator is not None:
+        _log_aggregator.stop(timeout)
+        if isinstance(_log_aggregator.stream, RotatingFileStream):
+            _log_aggregator.stream.close()
+        _log_aggregator = None
+
+
+_request_log_buffer = None
+
+
+def get_request_log_buffer() -> Optional[RequestLogBuffer]:
+    """Return the request log buffer, None unless LOG_TAIL_BUFFER is set.
 
-    print(dumps(rec), flush=True)
+    Returns:
+        RequestLogBuffer, optional: Buffer configured by global_log_config.
+
+    """
+    return _request_log_buffer
+
+
+def _chain_filters(*filters) -> Optional[Callable]:
+    """Combine loguru filters, the record passes if every filter allows it.
+
+    Args:
+        *filters (Callable, optional): Filters in evaluation order, None
+            values are skipped.
+
+    Returns:
+        Callable, optional: Combined filter, None if there is none.
+
+    """
+    filters = tuple(f for f in filters if f is not None)
+    if len(filters) < 2:
+        return filters[0] if filters else None
+
+    def chained(record):
+        for log_filter in filters:
+            if not log_filter(record):
+                return False
+        return True
+
+    return chained
+
+
+def _log_handlers(json: bool, level: int, log_filter) -> list:
+    """Build the loguru handlers configuration.
+
+    Args:
+        json (bool): Whether to write JSON lines instead of text logs.
+        level (int): Handlers level, the lowest level in use.
+        log_filter (Callable, optional): Handlers filter.
+
+    Returns:
+        list: Handlers for logger.configure.
+
+    """
+    if json:
+        return [
+            {
+                # Records are serialized by orjson_log_sink itself and
+                # written by the batched writer thread.
+                "sink": orjson_log_sink,
+                "format": "{message}",
+                "level": level,
+                "filter": log_filter,
+                "diagnose": True,
+                "backtrace": True,
+            }
+        ]
+    elif settings.LOG_AGGREGATOR_SOCKET or settings.LOG_FILE:
+        return [
+            {
+                # Formatted lines are sent to the aggregator or the log file
+                # by the batched writer thread.
+                "sink": text_log_sink,
+                "format": format_record,
+                "level": level,
+                "filter": log_filter,
+                "diagnose": True,
+                "backtrace": True,
+            }
+        ]
+
+    return [
+        {
+            "sink": MeteredStream(stdout, _log_metrics),
+            "serialize": False,
+            "format": format_record,
+            "level": level,
+            "filter": log_filter,
+            "diagnose": True,
+            "backtrace": True,
+            "enqueue": True,
+        }
+    ]
+
+
+_log_levels = None
+_log_rate_limiter = None
+_master_pid = None
+
+
+def get_log_levels() -> Optional[LogLevelController]:
+    """Return the log level controller configured by global_log_config.
+
+    Returns:
+        LogLevelController, optional: Controller object instance.
+
+    """
+    return _log_levels
+
+
+def _log_levels_file() -> str:
+    """Return the path of the log levels state file shared by the workers."""
+    if settings.LOG_LEVELS_FILE:
+        return settings.LOG_LEVELS_FILE
+    return os.path.join(
+        tempfile.gettempdir(),
+        "{0:s}-log-levels-{1:d}.json".format(
+            settings.PROJECT_NAME, _master_pid or os.getpid()
+        ),
+    )
+
+
+def reload_log_levels() -> bool:
+    """Apply the levels of the state file written by set_log_levels.
+
+    Returns:
+        bool: Whether levels were loaded.
+
+    """
+    if _log_levels is None:
+        return False
+
+    try:
+        return _log_levels.load(_log_levels_file())
+    except (OSError, ValueError, KeyError):
+        logger.exception("Could not reload the log levels")
+        return False
+
+
+def set_log_levels(
+    default: Optional[Union[str, int]] = None,
+    loggers: Optional[Dict[str, Optional[Union[str, int]]]] = None,
+):
+    """Change log levels in the current process and in every worker.
+
+    The levels are applied right away and written to the state file. Under
+    gunicorn the master is then sent SIGUSR1, it forwards the signal to all
+    workers which reload the state file, see install_log_level_signal.
+
+    Args:
+        default (Union[str, int], optional): New default level.
+        loggers (Dict[str, Union[str, int]], optional): Levels by logger or
+            module name, OFF disables a logger, None restores the default.
+
+    Raises:
+        ValueError: If a level or logger name is invalid.
+        RuntimeError: If global_log_config has not run yet.
+
+    """
+    if _log_levels is None:
+        raise RuntimeError("Log levels are not configured yet")
+
+    _log_levels.set_levels(default, loggers)
+    _log_levels.save(_log_levels_file())
+
+    if _master_pid is not None:
+        os.kill(_master_pid, signal.SIGUSR1)
+
+
+def install_log_level_signal(master_pid: int):
+    """Reload the log levels of a gunicorn worker on SIGUSR1.
+
+    Meant for the gunicorn ``post_worker_init`` hook: uvicorn workers reset
+    the gunicorn signal handlers. The levels in effect are loaded right
+    away, so respawned workers get them too. The reload runs in a thread, a
+    signal handler must not wait for the loguru locks.
+
+    Args:
+        master_pid (int): Gunicorn master process id.
+
+    """
+    global _master_pid
+
+    _master_pid = master_pid
+    reload_log_levels()
+
+    def handle_usr1(signum, frame):
+        threading.Thread(target=reload_log_levels, daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, handle_usr1)
 
 
 def global_log_config(
     log_level: Union[str, int] = logging.INFO, json: bool = True
 ):
-    """global_log_config [summary].
-
-    [extended_summary]
+    """Route stdlib logging to loguru and configure the loguru handlers.
 
     Args:
-        log_level (Union[str, int], optional): [description].
-            Defaults to logging.INFO.
-        json (bool, optional): [description]. Defaults to True.
+        log_level (Union[str, int], optional): Default level name or number.
+            Unknown names fall back to INFO. Defaults to logging.INFO.
+        json (bool, optional): Whether to write JSON lines instead of text
+            logs. Defaults to True.
 
     Returns:
-        [type]: [description]
+        loguru.Logger: Configured logger.
+
     """
-    if isinstance(log_level, str) and (log_level in logging._nameToLevel):
+    try:
+        log_level = parse_level(log_level)
+    except ValueError:
+        log_level = None
+    if log_level is None:
         log_level = logging.INFO
 
-    intercept_handler = InterceptHandler()
+    global _log_levels, _log_rate_limiter, _request_log_buffer
+
+    # Stdlib loggers are gated by their own level, set by the controller.
+    intercept_handler = InterceptHandler(level=logging.NOTSET)
     # logging.basicConfig(handlers=[intercept_handler], level=LOG_LEVEL)
     # logging.root.handlers = [intercept_handler]
-    logging.root.setLevel(log_level)
 
     seen = set()
     for name in [
@@ -215,33 +742,76 @@ def global_log_config(
             seen.add(name.split(".")[0])
             logging.getLogger(name).handlers = [intercept_handler]
 
-    if json:
-        logger.configure(
-            handlers=[
-                {
-                    "sink": orjson_log_sink,
-                    "serialize": json,
-                    "diagnose": True,
-                    "backtrace": True,
-                }
-            ]
+    if _log_levels is not None:
+        # Enable the loggers switched OFF by the previous configuration.
+        _log_levels.on_min_level = None
+        _log_levels.reset(log_level)
+
+    # With tail buffering, records below their level are still created and
+    # bridged, the buffer filter decides whether they are written.
+    # Bridged stdlib records are logged from this module, they are only
+    # switched OFF by name.
+    _log_levels = LogLevelController(
+        log_level,
+        buffered=settings.LOG_TAIL_BUFFER,
+        keep_enabled=(__name__,),
+    )
+    _request_log_buffer = None
+    level_filter = _log_levels
+    if settings.LOG_TAIL_BUFFER:
+        _request_log_buffer = level_filter = RequestLogBuffer(
+            log_level,
+            max_request_records=settings.LOG_TAIL_BUFFER_RECORDS,
+            max_records=settings.LOG_TAIL_BUFFER_TOTAL,
+            level_filter=_log_levels,
+        )
+
+    if _log_rate_limiter is not None:
+        _log_rate_limiter.close()
+    _log_rate_limiter = None
+    if settings.LOG_RATE_LIMITS:
+        _log_rate_limiter = CallSiteRateLimiter(
+            settings.LOG_RATE_LIMITS,
+            burst=settings.LOG_RATE_LIMIT_BURST,
+            summary_interval=settings.LOG_RATE_LIMIT_SUMMARY_INTERVAL,
         )
-    else:
-        logger.configure(
-            handlers=[
-                {
-                    "sink": stdout,
-                    # https://loguru.readthedocs.io/en/stable/api/logger.html#sink
-                    # "sink": "./somefile.log",
-                    # "rotation": "10 MB",
-                    "serialize": False,
-                    "format": format_record,
-                    "diagnose": True,
-                    "backtrace": True,
-                    "enqueue": True,
-                }
-            ]
+    fingerprinter = None
+    if settings.LOG_EXCEPTION_WINDOW:
+        fingerprinter = ExceptionFingerprinter(
+            window=settings.LOG_EXCEPTION_WINDOW,
+            budget=settings.LOG_EXCEPTION_RENDER_BUDGET,
         )
+    # Records under their level or buffered are not accounted by the rate
+    # limiter, and only the records written by the fingerprinter, last.
+    log_filter = _chain_filters(level_filter, _log_rate_limiter, fingerprinter)
+
+    _log_metrics.report_interval = settings.LOG_METRICS_INTERVAL
+    _log_metrics.report = _report_log_metrics
+
+    # The log aggregator relays newline terminated records only.
+    binary = settings.LOG_BINARY and not settings.LOG_AGGREGATOR_SOCKET
+    if json:
+        global _serialize_record
+        fields = settings.LOG_JSON_FIELDS or DEFAULT_FIELDS
+        if binary:
+            _serialize_record = BinaryRecordEncoder(fields)
+        else:
+            _serialize_record = build_record_serializer(fields)
+
+    def configure_handlers(level: int):
+        logger.configure(handlers=_log_handlers(json, level, log_filter))
+
+    _log_levels.on_min_level = configure_handlers
+    # Applies the default level to the stdlib root logger too.
+    _log_levels.reset(log_level)
+    configure_handlers(_log_levels.min_level)
+
     logger.configure(patcher=set_log_extras)
 
+    if json and settings.LOG_BINARY and not binary:
+        logger.warning(
+            "LOG_BINARY is not supported with LOG_AGGREGATOR_SOCKET, writing"
+            " JSON lines"
+        )
+
     return logger
@@ -31,7 +31,8 @@ def run_dev_wsgi(
             workers=int(workers),
             lifespan="off",
             log_config=None,
-            access_log=True,
+            # Replaced by AccessLogMiddleware when enabled.
+            access_log=not settings.LOG_ACCESS,
         )
     )
 
@@ -0,0 +1,66 @@
+import pytest
+from mvc_demo.config import settings
+from mvc_demo.core.loguru_logs import get_log_levels
+
+
+@pytest.fixture
+def admin(app, tmp_path):
+    settings.ADMIN_TOKEN = "secret"
+    settings.LOG_LEVELS_FILE = str(tmp_path / "levels.json")
+    default = get_log_levels().default
+    yield app
+    get_log_levels().reset(default)
+    settings.ADMIN_TOKEN = None
+    settings.LOG_LEVELS_FILE = None
+
+
+HEADERS = {"Authorization": "Bearer secret"}
+
+
+def test_admin_disabled(app):
+    response = app.get("/api/admin/log-level")
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize(
+    "headers", [{}, {"Authorization": "Bearer wrong"}, {"Authorization": "x"}]
+)
+def test_admin_invalid_token(admin, headers):
+    response = admin.get("/api/admin/log-level", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["error"]["status"] == "UNAUTHORIZED"
+
+
+def test_get_log_level(admin):
+    response = admin.get("/api/admin/log-level", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json() == get_log_levels().to_dict()
+
+
+def test_put_log_level(admin, tmp_path):
+    response = admin.put(
+        "/api/admin/log-level",
+        headers=HEADERS,
+        json={"loggers": {"mvc_demo.app.utils.redis": "debug"}},
+    )
+    assert response.status_code == 200
+    assert response.json()["loggers"] == {"mvc_demo.app.utils.redis": "DEBUG"}
+    assert (tmp_path / "levels.json").exists()
+
+
+def test_put_log_level_invalid(admin):
+    response = admin.put(
+        "/api/admin/log-level",
+        headers=HEADERS,
+        json={"default": "LOUD"},
+    )
+    assert response.status_code == 400
+
+
+def test_log_level_not_configured(admin, monkeypatch):
+    monkeypatch.setattr("mvc_demo.core.loguru_logs._log_levels", None)
+    for method in ("get", "put"):
+        response = admin.request(
+            method, "/api/admin/log-level", headers=HEADERS, json={}
+        )
+        assert response.status_code == 503
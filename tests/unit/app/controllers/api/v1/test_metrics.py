@@ -0,0 +1,47 @@
+from loguru import logger
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils.circuit_breaker import CircuitBreaker
+from mvc_demo.app.utils.redis_cache import ClientSideCache
+
+
+def test_metrics(app):
+    logger.info("Counted")
+    response = app.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE log_sink_seconds histogram" in response.text
+    assert 'level="INFO"' in response.text
+
+
+def test_metrics_redis_pool(app):
+    RedisClient.redis_client = None
+    RedisClient.open_redis_client()
+    response = app.get("/api/metrics")
+    assert "# TYPE redis_pool_connections gauge" in response.text
+    assert 'state="in_use"} 0' in response.text
+    assert "redis_pool_max_connections{pid=" in response.text
+
+
+def test_metrics_redis_cache(app):
+    RedisClient.redis_client = None
+    RedisClient.open_redis_client()
+    RedisClient.cache = ClientSideCache(RedisClient.redis_client, 1024)
+    RedisClient.cache.hits = 3
+    response = app.get("/api/metrics")
+    RedisClient.cache = None
+    assert "# TYPE redis_cache_hits_total counter" in response.text
+    assert "redis_cache_hits_total{pid=" in response.text
+
+
+def test_metrics_redis_circuit_breaker(app):
+    RedisClient.redis_client = None
+    RedisClient.open_redis_client()
+    RedisClient.breaker = CircuitBreaker()
+    RedisClient.breaker._open()
+    response = app.get("/api/metrics")
+    RedisClient.breaker = None
+    assert 'redis_circuit_state{pid="' in response.text
+    assert 'state="open"} 1' in response.text
+    assert 'state="closed"} 0' in response.text
+    assert "# TYPE redis_circuit_transitions_total counter" in response.text
+    assert "redis_circuit_rejected_total{pid=" in response.text
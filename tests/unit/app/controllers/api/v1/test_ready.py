@@ -1,3 +1,6 @@
+import mock
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils.circuit_breaker import CircuitBreaker
 from mvc_demo.config import settings
 
 
@@ -24,3 +27,22 @@ def test_ready_invalid_with_redis(app):
             "status": "BAD_GATEWAY",
         }
     }
+
+
+def test_ready_circuit_breaker(app):
+    settings.USE_REDIS = True
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.breaker = CircuitBreaker()
+    response = app.get("/api/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "redis_circuit": "closed"}
+
+    RedisClient.breaker._open()
+    response = app.get("/api/ready")
+    assert response.status_code == 502
+    assert response.json()["error"]["message"] == (
+        "Redis circuit breaker is open"
+    )
+    RedisClient.breaker = None
+    RedisClient.redis_client = None
+    settings.USE_REDIS = False
@@ -0,0 +1,253 @@
+import asyncio
+import time
+
+import aioredis
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from mvc_demo.app.controllers.cache import CacheEntry, RouteCache, cached
+from mvc_demo.app.utils import RedisClient
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.data = {}
+        self.error = None
+
+    async def get(self, key):
+        if self.error:
+            raise self.error
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if self.error:
+            raise self.error
+        elif nx and key in self.data:
+            return None
+        if isinstance(value, str):
+            value = value.encode()
+        self.data[key] = value
+        return True
+
+    async def evalsha(self, sha, numkeys, key, token):
+        if self.data.get(key) == token.encode():
+            del self.data[key]
+            return 1
+        return 0
+
+
+@pytest.fixture
+def redis():
+    RedisClient.redis_client = FakeRedis()
+    yield RedisClient.redis_client
+    RedisClient.redis_client = None
+
+
+@pytest.fixture
+def client(redis):
+    app = FastAPI()
+    app.calls = 0
+
+    @app.get("/items")
+    @cached(ttl=60, vary=["Accept-Language"])
+    async def list_items(page: int = 1):
+        app.calls += 1
+        return {"page": page, "calls": app.calls}
+
+    @app.get("/text")
+    @cached(ttl=60)
+    def text(request: Request):
+        app.calls += 1
+        return PlainTextResponse(request.url.path)
+
+    @app.get("/missing")
+    @cached(ttl=60)
+    async def missing():
+        app.calls += 1
+        return PlainTextResponse("missing", status_code=404)
+
+    with TestClient(app) as client:
+        client.calls = lambda: app.calls
+        yield client
+
+
+def make_request(query=b"", headers=()):
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/items",
+            "query_string": query,
+            "headers": list(headers),
+        }
+    )
+
+
+def test_cached_route(client, redis):
+    response = client.get("/items?page=2")
+    assert response.status_code == 200
+    assert response.json() == {"page": 2, "calls": 1}
+    assert response.headers["x-cache"] == "miss"
+
+    response = client.get("/items?page=2")
+    assert response.json() == {"page": 2, "calls": 1}
+    assert response.headers["x-cache"] == "hit"
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["content-length"] == str(len(response.content))
+
+    assert client.get("/items?page=3").json() == {"page": 3, "calls": 2}
+    response = client.get("/items?page=2", headers={"Accept-Language": "fr"})
+    assert response.json() == {"page": 2, "calls": 3}
+    # Requested the lock, cached the response and released the lock.
+    assert len(redis.data) == 3
+
+
+def test_cached_route_request(client):
+    assert client.get("/text").text == "/text"
+    response = client.get("/text")
+    assert response.text == "/text"
+    assert response.headers["x-cache"] == "hit"
+    assert client.calls() == 1
+
+
+def test_not_cacheable(client, redis):
+    for _ in range(2):
+        response = client.get("/missing")
+        assert response.status_code == 404
+        assert "x-cache" not in response.headers
+    assert client.calls() == 2
+    assert redis.data == {}
+
+
+def test_redis_disabled(client):
+    RedisClient.redis_client = None
+    for _ in range(2):
+        response = client.get("/items")
+        assert "x-cache" not in response.headers
+    assert client.calls() == 2
+
+
+def test_redis_unavailable(client, redis):
+    redis.error = aioredis.ConnectionError("Mock error")
+    for _ in range(2):
+        response = client.get("/items")
+        assert response.status_code == 200
+    assert client.calls() == 2
+
+
+def test_key():
+    cache = RouteCache(ttl=60, vary=["Accept-Language"])
+    key = cache.key(make_request(b"b=2&a=1"))
+    assert key.startswith("mvc_demo:route:GET:/items:")
+    assert key == cache.key(make_request(b"a=1&b=2"))
+    assert key != cache.key(make_request(b"a=1&b=3"))
+    assert key != cache.key(
+        make_request(b"a=1&b=2", [(b"accept-language", b"fr")])
+    )
+
+
+def test_entry():
+    entry = CacheEntry(200, [["x-a", "b\nc"]], b"body\n", 10.0, 0.5)
+    assert CacheEntry.unpack(entry.pack()) == entry
+
+
+@pytest.mark.asyncio
+async def test_coalesced_misses(redis):
+    cache = RouteCache(ttl=60)
+    gate = asyncio.Event()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await gate.wait()
+        return PlainTextResponse("value")
+
+    requests = [
+        asyncio.ensure_future(cache.serve(make_request(), compute))
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0.01)
+    gate.set()
+    responses = await asyncio.gather(*requests)
+    assert [response.body for response in responses] == [b"value"] * 5
+    assert len(calls) == 1
+    assert cache.misses == 5
+
+
+@pytest.mark.asyncio
+async def test_lock_held_by_another_process(redis):
+    cache = RouteCache(ttl=60, poll_interval=0.01)
+    key = cache.key(make_request())
+    redis.data[key + ":lock"] = b"other"
+
+    async def compute():
+        raise AssertionError("Computed by the other process")
+
+    request = asyncio.ensure_future(cache.serve(make_request(), compute))
+    await asyncio.sleep(0.03)
+    assert not request.done()
+    entry = CacheEntry(200, [], b"value", time.time() + 60, 0.1)
+    redis.data[key] = entry.pack()
+    response = await request
+    assert response.body == b"value"
+    assert response.headers["x-cache"] == "miss"
+    # Not ours to release.
+    assert redis.data[key + ":lock"] == b"other"
+
+
+@pytest.mark.asyncio
+async def test_lock_timeout(redis):
+    cache = RouteCache(ttl=60, lock_timeout=0.03, poll_interval=0.01)
+    key = cache.key(make_request())
+    redis.data[key + ":lock"] = b"other"
+
+    async def compute():
+        return PlainTextResponse("value")
+
+    response = await cache.serve(make_request(), compute)
+    assert response.body == b"value"
+    assert key in redis.data
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate(redis):
+    cache = RouteCache(ttl=60, stale_ttl=60)
+    key = cache.key(make_request())
+    redis.data[key] = CacheEntry(200, [], b"old", time.time(), 0.1).pack()
+
+    async def compute():
+        return PlainTextResponse("new")
+
+    response = await cache.serve(make_request(), compute)
+    assert response.body == b"old"
+    assert response.headers["x-cache"] == "stale"
+    await asyncio.sleep(0.01)
+    assert cache.refreshes == 1
+    assert CacheEntry.unpack(redis.data[key]).body == b"new"
+    assert key + ":lock" not in redis.data
+
+
+@pytest.mark.asyncio
+async def test_early_recomputation(redis, monkeypatch):
+    cache = RouteCache(ttl=60, beta=1.0)
+    key = cache.key(make_request())
+    entry = CacheEntry(200, [], b"old", time.time() + 1, 0.5)
+    redis.data[key] = entry.pack()
+
+    async def compute():
+        return PlainTextResponse("new")
+
+    # -log(1 - 0.1) * 0.5 is below the second left.
+    monkeypatch.setattr("mvc_demo.app.controllers.cache.random", lambda: 0.1)
+    await cache.serve(make_request(), compute)
+    assert cache.refreshes == 0
+
+    # -log(1 - 0.9) * 0.5 is above it.
+    monkeypatch.setattr("mvc_demo.app.controllers.cache.random", lambda: 0.9)
+    response = await cache.serve(make_request(), compute)
+    assert response.body == b"old"
+    assert response.headers["x-cache"] == "hit"
+    await asyncio.sleep(0.01)
+    assert cache.refreshes == 1
+    assert CacheEntry.unpack(redis.data[key]).body == b"new"
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from loguru import logger
+from mvc_demo.app.middlewares import AccessLogMiddleware
+
+
+@pytest.fixture
+def records():
+    records = []
+    handler_id = logger.add(
+        lambda message: records.append(message.record),
+        filter="mvc_demo.app.middlewares.access_log",
+    )
+    yield records
+    logger.remove(handler_id)
+
+
+def make_client(**kwargs):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"item_id": item_id}
+
+    @app.get("/fail", status_code=503)
+    async def fail():
+        return {}
+
+    @app.get("/slow")
+    def slow():
+        time.sleep(0.02)
+        return {}
+
+    app.add_middleware(AccessLogMiddleware, **kwargs)
+    return TestClient(app)
+
+
+def test_access_record(records):
+    response = make_client().get("/items/42")
+    assert response.status_code == 200
+
+    assert len(records) == 1
+    record = records[0]
+    assert record["level"].name == "INFO"
+    assert record["message"] == "GET /items/42 200"
+    extra = record["extra"]
+    assert extra["method"] == "GET"
+    assert extra["route"] == "/items/{item_id}"
+    assert extra["path"] == "/items/42"
+    assert extra["status"] == 200
+    assert extra["bytes"] == len(response.content)
+    assert extra["duration_ns"] > 0
+
+
+def test_unmatched_route(records):
+    make_client().get("/missing")
+    assert records[0]["extra"]["route"] is None
+    assert records[0]["extra"]["status"] == 404
+
+
+def test_sampling_keeps_failures(records):
+    client = make_client(sample_rate=0.0)
+    client.get("/items/1")
+    client.get("/fail")
+    assert [r["extra"]["status"] for r in records] == [503]
+
+
+def test_slow_requests_always_logged(records):
+    client = make_client(sample_rate=0.0, slow_ms=10)
+    client.get("/items/1")
+    client.get("/slow")
+    assert len(records) == 1
+    assert records[0]["extra"]["route"] == "/slow"
+    assert records[0]["level"].name == "WARNING"
@@ -0,0 +1,171 @@
+import aioredis
+import mock
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mvc_demo.app.asgi import get_app
+from mvc_demo.app.middlewares import RateLimitMiddleware
+from mvc_demo.app.middlewares.rate_limit import GCRA, Limit, TokenBucket
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.config import settings
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("mvc_demo.app.middlewares.rate_limit.monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def redis():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.evalsha.return_value = [1, 0]
+    yield RedisClient.redis_client
+    RedisClient.redis_client = None
+
+
+def make_client(**kwargs):
+    app = FastAPI()
+
+    @app.get("/items")
+    async def list_items():
+        return []
+
+    @app.get("/items/search")
+    async def search():
+        return []
+
+    @app.get("/health")
+    async def health():
+        return {}
+
+    app.add_middleware(RateLimitMiddleware, **kwargs)
+    return TestClient(app)
+
+
+def test_limit_parse():
+    assert Limit.parse("100/minute") == Limit(100, 60)
+    assert Limit.parse("10/2.5") == Limit(10, 2.5)
+    for value in ("100", "x/minute", "0/second", "1/week", "1/-1"):
+        with pytest.raises(ValueError):
+            Limit.parse(value)
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(Limit(2, 10))
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() == 5.0
+    clock.now += 4
+    assert bucket.take() == pytest.approx(1.0)
+    clock.now += 1
+    assert bucket.take() == 0
+
+
+def test_allowed(redis, clock):
+    client = make_client(default="10/minute")
+    response = client.get("/items")
+    assert response.status_code == 200
+    redis.evalsha.assert_called_once_with(
+        GCRA.sha, 1, "mvc_demo:ratelimit::testclient", 6000.0, 60000.0
+    )
+
+
+def test_rejected(redis, clock):
+    client = make_client(default="10/minute")
+    redis.evalsha.return_value = [0, 1500]
+    response = client.get("/items")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    assert response.json() == {
+        "error": {
+            "code": 429,
+            "message": "Too many requests",
+            "status": "TOO_MANY_REQUESTS",
+        }
+    }
+
+
+def test_local_precheck(redis, clock):
+    client = make_client(default="2/minute")
+    assert client.get("/items").status_code == 200
+    assert client.get("/items").status_code == 200
+    response = client.get("/items")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "30"
+    assert redis.evalsha.call_count == 2
+
+
+def test_routes_and_clients(redis, clock):
+    client = make_client(
+        default="1/minute",
+        routes={"/items": "5/second", "/health": None},
+        client_header="X-Forwarded-For",
+    )
+    client.get("/items/search", headers={"X-Forwarded-For": "1.2.3.4"})
+    client.get("/other")
+    for _ in range(3):
+        assert client.get("/health").status_code == 200
+    assert [call[0][2] for call in redis.evalsha.call_args_list] == [
+        "mvc_demo:ratelimit:/items:1.2.3.4",
+        "mvc_demo:ratelimit::testclient",
+    ]
+    assert redis.evalsha.call_args_list[0][0][3:] == (200.0, 1000.0)
+
+
+def test_spoofed_forwarded_for(redis, clock):
+    client = make_client(
+        default="1/minute",
+        client_header="X-Forwarded-For",
+        trusted_proxies=2,
+    )
+    # Added by the client, then by the two proxies.
+    for spoofed in ("1.1.1.1", "2.2.2.2"):
+        headers = {"X-Forwarded-For": spoofed + ", 5.6.7.8, 10.0.0.1"}
+        client.get("/items", headers=headers)
+    assert (
+        client.get(
+            "/items", headers={"X-Forwarded-For": "5.6.7.8, 10.0.0.1"}
+        ).status_code
+        == 429
+    )
+    assert [call[0][2] for call in redis.evalsha.call_args_list] == [
+        "mvc_demo:ratelimit::5.6.7.8"
+    ]
+
+
+def test_fail_open(redis, clock):
+    client = make_client(default="2/minute")
+    redis.evalsha.side_effect = aioredis.ConnectionError("Mock error")
+    assert client.get("/items").status_code == 200
+    assert client.get("/items").status_code == 200
+    # Still limited by the process.
+    assert client.get("/items").status_code == 429
+
+
+def test_redis_disabled(clock):
+    client = make_client(default="1/minute")
+    assert client.get("/items").status_code == 200
+    assert client.get("/items").status_code == 429
+
+
+def test_get_app():
+    settings.RATE_LIMIT = True
+    settings.RATE_LIMIT_ROUTES = {"/api/ready": None}
+    try:
+        app = get_app()
+        assert RateLimitMiddleware in [
+            middleware.cls for middleware in app.user_middleware
+        ]
+    finally:
+        settings.RATE_LIMIT = False
+        settings.RATE_LIMIT_ROUTES = {}
@@ -0,0 +1,78 @@
+import logging
+import time
+
+import pytest
+from asgi_correlation_id import CorrelationIdMiddleware
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from loguru import logger
+from mvc_demo.app.middlewares import TailLogMiddleware
+from mvc_demo.core.log_tailbuffer import RequestLogBuffer
+
+
+@pytest.fixture
+def buffer():
+    return RequestLogBuffer(logging.INFO)
+
+
+@pytest.fixture
+def messages(buffer):
+    messages = []
+    handler_id = logger.add(
+        lambda message: messages.append(message.record["message"]),
+        level="TRACE",
+        filter=buffer,
+    )
+    yield messages
+    logger.remove(handler_id)
+
+
+@pytest.fixture
+def client(buffer):
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok():
+        logger.debug("ok detail")
+        return {}
+
+    @app.get("/unavailable", status_code=503)
+    async def unavailable():
+        logger.debug("unavailable detail")
+        return {}
+
+    @app.get("/crash")
+    async def crash():
+        logger.debug("crash detail")
+        raise RuntimeError("crash")
+
+    @app.get("/slow")
+    def slow():
+        logger.debug("slow detail")
+        time.sleep(0.02)
+        return {}
+
+    app.add_middleware(TailLogMiddleware, buffer=buffer, slow_ms=10)
+    app.add_middleware(CorrelationIdMiddleware, header_name="X-Request-ID")
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_success_discarded(client, buffer, messages):
+    assert client.get("/ok").status_code == 200
+    assert "ok detail" not in messages
+    assert buffer.buffered == 0
+
+
+def test_server_error_flushed(client, messages):
+    assert client.get("/unavailable").status_code == 503
+    assert "unavailable detail" in messages
+
+
+def test_exception_flushed(client, messages):
+    assert client.get("/crash").status_code == 500
+    assert "crash detail" in messages
+
+
+def test_slow_request_flushed(client, messages):
+    client.get("/slow")
+    assert "slow detail" in messages
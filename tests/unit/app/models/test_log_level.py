@@ -0,0 +1,32 @@
+import pytest
+from mvc_demo.app.models.log_level import LogLevelRequest, LogLevelResponse
+from pydantic.error_wrappers import ValidationError
+
+
+def test_log_level_request():
+    request = LogLevelRequest(loggers={"mvc_demo": "DEBUG", "aioredis": None})
+    assert request.schema()["description"] == "Log level change request model."
+    assert request.default is None
+    assert request.loggers == {"mvc_demo": "DEBUG", "aioredis": None}
+    assert LogLevelRequest().loggers == {}
+
+
+def test_log_level_response():
+    response = LogLevelResponse(default="INFO", loggers={"mvc_demo": "OFF"})
+    assert response.schema()["description"] == "Log level response model."
+    assert response.dict() == {
+        "default": "INFO",
+        "loggers": {"mvc_demo": "OFF"},
+    }
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {"loggers": ["mvc_demo"]},
+        {"default": None, "loggers": {}},
+    ],
+)
+def test_log_level_response_invalid(value):
+    with pytest.raises(ValidationError):
+        LogLevelResponse(**value)
@@ -0,0 +1,205 @@
+import asyncio
+
+import aioredis
+import mock
+import pytest
+from aioredis.exceptions import ResponseError
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from mvc_demo.config import redis as redis_conf
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("mvc_demo.app.utils.circuit_breaker.monotonic", clock)
+    return clock
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail():
+    raise aioredis.ConnectionError("Mock error")
+
+
+async def calls(breaker, func, count):
+    for _ in range(count):
+        try:
+            await breaker.call(func)
+        except aioredis.ConnectionError:
+            pass
+
+
+@pytest.mark.asyncio
+async def test_opens_on_failure_rate(clock):
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=10, window=10)
+    await calls(breaker, succeed, 5)
+    # Not enough calls yet, then 5 failures out of 10.
+    await calls(breaker, fail, 4)
+    assert breaker.state == CLOSED
+    await calls(breaker, fail, 1)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.stats() == {
+        "state": OPEN,
+        "transitions": {CLOSED: 0, HALF_OPEN: 0, OPEN: 1},
+        "rejected": 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_window_slides(clock):
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window=10)
+    await calls(breaker, fail, 3)
+    clock.now += 11
+    await calls(breaker, succeed, 3)
+    await calls(breaker, fail, 1)
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_command_errors_are_successes(clock):
+    breaker = CircuitBreaker(min_calls=2)
+
+    async def wrong_type():
+        raise ResponseError("WRONGTYPE")
+
+    for _ in range(5):
+        with pytest.raises(ResponseError):
+            await breaker.call(wrong_type)
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_half_open_probes(clock):
+    breaker = CircuitBreaker(min_calls=1, cooldown=5, probes=2)
+    await calls(breaker, fail, 1)
+    assert breaker.state == OPEN
+
+    clock.now += 5
+    breaker.check()
+    gate = asyncio.Event()
+
+    async def slow():
+        await gate.wait()
+        return "slow"
+
+    probes = [asyncio.ensure_future(breaker.call(slow)) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert breaker.state == HALF_OPEN
+    # Every probe is in flight, other calls are still rejected.
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+    gate.set()
+    assert await asyncio.gather(*probes) == ["slow", "slow"]
+    assert breaker.state == CLOSED
+    assert breaker.transitions == {CLOSED: 1, HALF_OPEN: 1, OPEN: 1}
+
+
+@pytest.mark.asyncio
+async def test_half_open_probe_failure(clock):
+    breaker = CircuitBreaker(min_calls=1, cooldown=5)
+    await calls(breaker, fail, 1)
+    clock.now += 5
+    await calls(breaker, fail, 1)
+    assert breaker.state == OPEN
+    # The cooldown starts again.
+    clock.now += 4
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe(clock):
+    breaker = CircuitBreaker(min_calls=1, cooldown=5)
+    await calls(breaker, fail, 1)
+    clock.now += 5
+    probe = asyncio.ensure_future(breaker.call(asyncio.Event().wait))
+    await asyncio.sleep(0)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert breaker.state == HALF_OPEN
+    assert await breaker.call(succeed) == "ok"
+    assert breaker.state == CLOSED
+
+
+@pytest.fixture
+def breaker(clock):
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.breaker = CircuitBreaker(min_calls=2, cooldown=5)
+    yield RedisClient.breaker
+    RedisClient.breaker = None
+
+
+@pytest.mark.asyncio
+async def test_redis_client_fast_fail(breaker):
+    redis_client = RedisClient.redis_client
+    redis_client.get.side_effect = aioredis.TimeoutError("Mock error")
+    for _ in range(2):
+        with pytest.raises(aioredis.TimeoutError):
+            await RedisClient.get("key")
+    assert breaker.state == OPEN
+
+    with mock.patch.object(RedisClient.log, "exception") as log_exception:
+        with pytest.raises(CircuitOpenError):
+            await RedisClient.get("key")
+        with pytest.raises(CircuitOpenError):
+            await RedisClient.set("key", "value")
+        with pytest.raises(CircuitOpenError):
+            async with RedisClient.pipeline():
+                pass
+        assert await RedisClient.ping() is False
+    log_exception.assert_not_called()
+    assert redis_client.get.call_count == 2
+    redis_client.set.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_redis_client_recovers(breaker, clock):
+    redis_client = RedisClient.redis_client
+    redis_client.get.side_effect = aioredis.ConnectionError("Mock error")
+    for _ in range(2):
+        with pytest.raises(aioredis.ConnectionError):
+            await RedisClient.get("key")
+
+    clock.now += 5
+    redis_client.get.side_effect = None
+    redis_client.get.return_value = b"value"
+    assert await RedisClient.get("key") == b"value"
+    assert breaker.state == CLOSED
+
+
+def test_open_redis_client_breaker():
+    redis_conf.REDIS_CIRCUIT_BREAKER = True
+    redis_conf.REDIS_CIRCUIT_COOLDOWN = 2.0
+    RedisClient.redis_client = None
+    try:
+        RedisClient.open_redis_client()
+        assert RedisClient.breaker.cooldown == 2.0
+        assert RedisClient.breaker.state == CLOSED
+    finally:
+        RedisClient.redis_client = None
+        RedisClient.breaker = None
+        redis_conf.REDIS_CIRCUIT_BREAKER = False
+        redis_conf.REDIS_CIRCUIT_COOLDOWN = 5.0
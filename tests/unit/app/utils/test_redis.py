@@ -1,8 +1,18 @@
+import asyncio
+
+import aioredis
 import mock
 import pytest
 from aioredis import Redis
-from aioredis.exceptions import RedisError
+from aioredis.connection import BlockingConnectionPool, ConnectionPool
+from aioredis.exceptions import NoScriptError, RedisError, ResponseError
 from mvc_demo.app.utils import RedisClient
+from aioredis.sentinel import SentinelConnectionPool
+from mvc_demo.app.utils.redis import (
+    BlockingSentinelConnectionPool,
+    CommandBatcher,
+    Script,
+)
 from mvc_demo.config import redis as redis_conf
 
 
@@ -57,6 +67,16 @@ async def test_set_exception():
         await RedisClient.set("key", "value")
 
 
+@pytest.mark.asyncio
+async def test_set_expire_if_missing():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.set.return_value = None
+    assert await RedisClient.set("key", "value", ex=1.5, nx=True) is None
+    RedisClient.redis_client.set.assert_called_once_with(
+        "key", "value", None, 1500, True
+    )
+
+
 @pytest.mark.asyncio
 async def test_rpush():
     RedisClient.redis_client = mock.MagicMock()
@@ -115,3 +135,478 @@ async def test_lrange_exception():
     RedisClient.redis_client.lrange.side_effect = RedisError("Mock error")
     with pytest.raises(RedisError):
         await RedisClient.lrange("key", 1, -1)
+
+
+class FakePipeline(object):
+    def __init__(self, redis):
+        self.redis = redis
+        self.stack = []
+
+    def __getattr__(self, command):
+        def queue(*args):
+            self.stack.append((command, args))
+            return self
+
+        return queue
+
+    async def execute(self, raise_on_error=True):
+        self.redis.pipelines.append(list(self.stack))
+        if self.redis.broken:
+            raise ConnectionError("Mock error")
+        results = []
+        for command, args in self.stack:
+            if command == "lrange":
+                results.append(ResponseError("WRONGTYPE"))
+            else:
+                results.append("{0:s}:{1:s}".format(command, args[0]))
+        return results
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.pipelines = []
+        self.broken = False
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return "direct:{0:s}".format(key)
+
+
+@pytest.fixture
+def batcher():
+    redis = FakeRedis()
+    RedisClient.redis_client = redis
+    RedisClient.batcher = CommandBatcher(redis)
+    yield RedisClient.batcher
+    RedisClient.batcher = None
+
+
+@pytest.mark.asyncio
+async def test_auto_batch(batcher):
+    results = await asyncio.gather(
+        RedisClient.get("a"),
+        RedisClient.exists("b"),
+        RedisClient.get("c"),
+    )
+
+    assert results == ["get:a", "exists:b", "get:c"]
+    assert batcher.redis_client.pipelines == [
+        [("get", ("a",)), ("exists", ("b",)), ("get", ("c",))]
+    ]
+    assert (batcher.batches, batcher.commands) == (1, 3)
+
+
+@pytest.mark.asyncio
+async def test_auto_batch_single_command(batcher):
+    assert await RedisClient.get("a") == "direct:a"
+    assert batcher.redis_client.pipelines == []
+
+
+@pytest.mark.asyncio
+async def test_auto_batch_command_error(batcher):
+    results = await asyncio.gather(
+        RedisClient.get("a"),
+        RedisClient.lrange("b", 0, -1),
+        return_exceptions=True,
+    )
+
+    assert results[0] == "get:a"
+    assert isinstance(results[1], ResponseError)
+
+
+@pytest.mark.asyncio
+async def test_auto_batch_connection_error(batcher):
+    batcher.redis_client.broken = True
+    results = await asyncio.gather(
+        RedisClient.get("a"), RedisClient.get("b"), return_exceptions=True
+    )
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_auto_batch_max_batch(batcher):
+    batcher.max_batch = 2
+    await asyncio.gather(*(RedisClient.get(str(key)) for key in range(5)))
+    assert [len(commands) for commands in batcher.redis_client.pipelines] == [
+        2,
+        2,
+    ]
+    assert batcher.batches == 3
+
+
+@pytest.mark.asyncio
+async def test_auto_batch_cancelled_caller(batcher):
+    cancelled = asyncio.ensure_future(RedisClient.get("a"))
+    other = asyncio.ensure_future(RedisClient.get("b"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    assert await other == "get:b"
+
+
+@pytest.mark.asyncio
+async def test_pipeline():
+    RedisClient.redis_client = mock.MagicMock()
+    pipe = mock.MagicMock()
+    pipe.__len__.return_value = 1
+    RedisClient.redis_client.pipeline.return_value.__aenter__ = mock.AsyncMock(
+        return_value=pipe
+    )
+    RedisClient.redis_client.pipeline.return_value.__aexit__ = mock.AsyncMock(
+        return_value=False
+    )
+
+    async with RedisClient.pipeline() as queued:
+        queued.set("key", "value")
+
+    assert queued is pipe
+    RedisClient.redis_client.pipeline.assert_called_once_with(transaction=False)
+    pipe.set.assert_called_once_with("key", "value")
+    pipe.execute.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_exception():
+    RedisClient.redis_client = mock.MagicMock()
+    pipe = mock.MagicMock()
+    pipe.__len__.return_value = 1
+    pipe.execute.side_effect = RedisError("Mock error")
+    RedisClient.redis_client.pipeline.return_value.__aenter__ = mock.AsyncMock(
+        return_value=pipe
+    )
+    RedisClient.redis_client.pipeline.return_value.__aexit__ = mock.AsyncMock(
+        return_value=False
+    )
+
+    with pytest.raises(RedisError):
+        async with RedisClient.pipeline() as queued:
+            queued.set("key", "value")
+
+
+def test_open_redis_client_pool():
+    RedisClient.redis_client = None
+    redis_conf.REDIS_USE_SENTINEL = False
+    RedisClient.open_redis_client()
+    pool = RedisClient.redis_client.connection_pool
+    assert isinstance(pool, BlockingConnectionPool)
+    assert pool.max_connections == redis_conf.REDIS_MAX_CONNECTIONS
+    assert pool.timeout == redis_conf.REDIS_POOL_TIMEOUT
+    assert pool.connection_kwargs["socket_keepalive"] is True
+    assert pool.connection_kwargs["health_check_interval"] == 30
+    RedisClient.redis_client = None
+
+    redis_conf.REDIS_BLOCKING_POOL = False
+    redis_conf.REDIS_USE_SENTINEL = True
+    RedisClient.open_redis_client()
+    pool = RedisClient.redis_client.connection_pool
+    assert isinstance(pool, SentinelConnectionPool)
+    assert not isinstance(pool, BlockingConnectionPool)
+    assert pool.max_connections == redis_conf.REDIS_MAX_CONNECTIONS
+    RedisClient.redis_client = None
+
+    redis_conf.REDIS_BLOCKING_POOL = True
+    RedisClient.open_redis_client()
+    pool = RedisClient.redis_client.connection_pool
+    assert isinstance(pool, BlockingSentinelConnectionPool)
+    assert pool.is_master
+    assert pool.connection_kwargs["socket_timeout"] == 5.0
+    RedisClient.redis_client = None
+    redis_conf.REDIS_USE_SENTINEL = False
+
+
+@pytest.mark.asyncio
+async def test_pool_stats():
+    RedisClient.redis_client = mock.MagicMock()
+    pool = BlockingConnectionPool(max_connections=2)
+    RedisClient.redis_client.connection_pool = pool
+    assert RedisClient.pool_stats() == {
+        "in_use": 0,
+        "idle": 0,
+        "waiters": 0,
+        "max_connections": 2,
+    }
+
+    # Check out both connections, then wait for one.
+    pool.pool.get_nowait()
+    pool.pool.get_nowait()
+    waiter = asyncio.ensure_future(pool.pool.get())
+    await asyncio.sleep(0)
+    stats = RedisClient.pool_stats()
+    assert (stats["in_use"], stats["idle"], stats["waiters"]) == (2, 0, 1)
+
+    connection = mock.MagicMock()
+    pool.pool.put_nowait(connection)
+    assert await waiter is connection
+    pool.pool.put_nowait(connection)
+    stats = RedisClient.pool_stats()
+    assert (stats["in_use"], stats["idle"], stats["waiters"]) == (1, 1, 0)
+
+
+def test_pool_stats_non_blocking():
+    RedisClient.redis_client = mock.MagicMock()
+    pool = ConnectionPool(max_connections=4)
+    pool._available_connections.append(mock.MagicMock())
+    pool._in_use_connections.add(mock.MagicMock())
+    RedisClient.redis_client.connection_pool = pool
+    assert RedisClient.pool_stats() == {
+        "in_use": 1,
+        "idle": 1,
+        "waiters": 0,
+        "max_connections": 4,
+    }
+
+
+def test_open_redis_client_replicas():
+    RedisClient.redis_client = None
+    redis_conf.REDIS_USE_SENTINEL = True
+    redis_conf.REDIS_SENTINELS = ["sentinel-a:26379", "sentinel-b"]
+    redis_conf.REDIS_SENTINEL_SERVICE = "cache"
+    redis_conf.REDIS_READ_FROM_REPLICAS = True
+    RedisClient.open_redis_client()
+
+    master = RedisClient.redis_client.connection_pool
+    replicas = RedisClient.replica_client.connection_pool
+    assert (master.service_name, master.is_master) == ("cache", True)
+    assert (replicas.service_name, replicas.is_master) == ("cache", False)
+    sentinels = master.sentinel_manager.sentinels
+    assert [
+        (sentinel.connection_pool.connection_kwargs["host"],)
+        + (sentinel.connection_pool.connection_kwargs["port"],)
+        for sentinel in sentinels
+    ] == [("sentinel-a", 26379), ("sentinel-b", redis_conf.REDIS_PORT)]
+
+    RedisClient.redis_client = None
+    RedisClient.replica_client = None
+    redis_conf.REDIS_USE_SENTINEL = False
+    redis_conf.REDIS_SENTINELS = []
+    redis_conf.REDIS_SENTINEL_SERVICE = "mymaster"
+    redis_conf.REDIS_READ_FROM_REPLICAS = False
+
+
+@pytest.fixture
+def replicas():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.replica_client = mock.AsyncMock()
+    yield RedisClient.replica_client
+    RedisClient.replica_client = None
+
+
+@pytest.mark.asyncio
+async def test_read_from_replicas(replicas):
+    replicas.get.return_value = "replica"
+    assert await RedisClient.get("key") == "replica"
+    await RedisClient.exists("key")
+    await RedisClient.lrange("key", 0, -1)
+    await RedisClient.set("key", "value")
+
+    RedisClient.redis_client.get.assert_not_called()
+    replicas.exists.assert_called_once_with("key")
+    replicas.lrange.assert_called_once_with("key", 0, -1)
+    RedisClient.redis_client.set.assert_called_once_with("key", "value")
+    replicas.set.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_read_from_replicas_fallback(replicas):
+    replicas.get.side_effect = aioredis.ConnectionError("Mock error")
+    RedisClient.redis_client.get.return_value = "master"
+    assert await RedisClient.get("key") == "master"
+
+    # Command errors are not retried on the master.
+    replicas.get.side_effect = ResponseError("WRONGTYPE")
+    with pytest.raises(ResponseError):
+        await RedisClient.get("key")
+    RedisClient.redis_client.get.assert_called_once_with("key")
+
+
+@pytest.mark.asyncio
+async def test_cache_filled_from_master(replicas):
+    RedisClient.cache = mock.MagicMock()
+
+    async def cache_get(key, fill):
+        return await fill()
+
+    RedisClient.cache.get.side_effect = cache_get
+    RedisClient.redis_client.get.return_value = "master"
+    try:
+        assert await RedisClient.get("key") == "master"
+    finally:
+        RedisClient.cache = None
+    replicas.get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_exists_multiple_keys():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.exists.return_value = 2
+    assert await RedisClient.exists("a", "b", "c") == 2
+    RedisClient.redis_client.exists.assert_called_once_with("a", "b", "c")
+
+
+@pytest.mark.asyncio
+async def test_mget():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.mget.return_value = ["1", None]
+    assert await RedisClient.mget(("a", "b")) == ["1", None]
+    RedisClient.redis_client.mget.assert_called_once_with(["a", "b"])
+
+
+@pytest.mark.asyncio
+async def test_mget_exception():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.mget.side_effect = RedisError("Mock error")
+    with pytest.raises(RedisError):
+        await RedisClient.mget(["a", "b"])
+
+
+@pytest.mark.asyncio
+async def test_mset():
+    RedisClient.redis_client = mock.AsyncMock()
+    await RedisClient.mset({"a": "1", "b": "2"})
+    RedisClient.redis_client.mset.assert_called_once_with({"a": "1", "b": "2"})
+
+
+@pytest.mark.asyncio
+async def test_mset_exception():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.mset.side_effect = RedisError("Mock error")
+    with pytest.raises(RedisError):
+        await RedisClient.mset({"a": "1"})
+
+
+@pytest.mark.asyncio
+async def test_hmget():
+    RedisClient.redis_client = mock.AsyncMock()
+    await RedisClient.hmget("key", ("a", "b"))
+    RedisClient.redis_client.hmget.assert_called_once_with("key", ["a", "b"])
+
+
+@pytest.mark.asyncio
+async def test_hmget_exception():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.hmget.side_effect = RedisError("Mock error")
+    with pytest.raises(RedisError):
+        await RedisClient.hmget("key", ["a"])
+
+
+@pytest.mark.asyncio
+async def test_hset():
+    RedisClient.redis_client = mock.AsyncMock()
+    await RedisClient.hset("key", {"a": "1"})
+    RedisClient.redis_client.hset.assert_called_once_with(
+        "key", None, None, {"a": "1"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_hset_exception():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.hset.side_effect = RedisError("Mock error")
+    with pytest.raises(RedisError):
+        await RedisClient.hset("key", {"a": "1"})
+
+
+@pytest.mark.asyncio
+async def test_scan_iter():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.scan.side_effect = [
+        (7, ["a", "b"]),
+        (3, []),
+        (0, ["c"]),
+    ]
+    keys = [key async for key in RedisClient.scan_iter("*", 2)]
+    assert keys == ["a", "b", "c"]
+    assert RedisClient.redis_client.scan.call_args_list == [
+        mock.call(0, "*", 2),
+        mock.call(7, "*", 2),
+        mock.call(3, "*", 2),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_scan_iter_exception():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.scan.side_effect = RedisError("Mock error")
+    with pytest.raises(RedisError):
+        async for _ in RedisClient.scan_iter():
+            pass
+
+
+@pytest.mark.asyncio
+async def test_hscan_iter():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.hscan.side_effect = [
+        (5, {"a": "1"}),
+        (0, {"b": "2"}),
+    ]
+    fields = [item async for item in RedisClient.hscan_iter("key")]
+    assert fields == [("a", "1"), ("b", "2")]
+    RedisClient.redis_client.hscan.assert_called_with("key", 5, None, None)
+
+
+@pytest.mark.asyncio
+async def test_hscan_iter_exception():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.hscan.side_effect = RedisError("Mock error")
+    with pytest.raises(RedisError):
+        async for _ in RedisClient.hscan_iter("key"):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_lrange_iter():
+    values = [str(index) for index in range(5)]
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.lrange.side_effect = (
+        lambda key, start, end: values[start : end + 1]
+    )
+    assert [value async for value in RedisClient.lrange_iter("key", 2)] == (
+        values
+    )
+    assert RedisClient.redis_client.lrange.call_args_list == [
+        mock.call("key", 0, 1),
+        mock.call("key", 2, 3),
+        mock.call("key", 4, 5),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_lrange_iter_exception():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.lrange.side_effect = RedisError("Mock error")
+    with pytest.raises(RedisError):
+        async for _ in RedisClient.lrange_iter("key"):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_evalsha():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.evalsha.return_value = 1
+    script = Script("return redis.call('get', KEYS[1])")
+    assert script.sha == "4e6d8fc8bb01276962cce5371fa795a7763657ae"
+    assert await RedisClient.evalsha(script, ["key"], ["arg"]) == 1
+    RedisClient.redis_client.evalsha.assert_called_once_with(
+        script.sha, 1, "key", "arg"
+    )
+    RedisClient.redis_client.eval.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_evalsha_unknown_script():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.evalsha.side_effect = NoScriptError("NOSCRIPT")
+    RedisClient.redis_client.eval.return_value = 1
+    script = Script("return 1")
+    assert await RedisClient.evalsha(script) == 1
+    RedisClient.redis_client.eval.assert_called_once_with(script.source, 0)
+
+
+@pytest.mark.asyncio
+async def test_evalsha_exception():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.redis_client.evalsha.side_effect = ResponseError("Mock error")
+    with pytest.raises(ResponseError):
+        await RedisClient.evalsha(Script("return 1"))
+    RedisClient.redis_client.eval.assert_not_called()
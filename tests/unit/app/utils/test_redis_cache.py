@@ -0,0 +1,245 @@
+import asyncio
+
+import mock
+import pytest
+from aioredis.exceptions import ConnectionError
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils.redis_cache import TRACKING_CHANNEL, ClientSideCache
+
+
+class FakePubSub(object):
+    def __init__(self, redis):
+        self.redis = redis
+        self.channels = []
+
+    async def execute_command(self, *args):
+        self.redis.commands.append(args)
+
+    async def parse_response(self):
+        return 7
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def get_message(self, ignore_subscribe_messages, timeout):
+        try:
+            return await asyncio.wait_for(self.redis.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def reset(self):
+        self.redis.resets += 1
+
+
+class FakeTracker(object):
+    def __init__(self, redis):
+        self.redis = redis
+        self.connection = mock.AsyncMock()
+
+    async def client_id(self):
+        return self.redis.tracker_id
+
+    async def execute_command(self, *args):
+        self.redis.commands.append(args)
+
+    async def close(self):
+        pass
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.commands = []
+        self.messages = asyncio.Queue()
+        self.published = []
+        self.data = {}
+        self.resets = 0
+        self.tracker_id = 1
+        self.pubsubs = []
+        self.connection_pool = mock.AsyncMock()
+
+    def pubsub(self):
+        self.pubsubs.append(FakePubSub(self))
+        return self.pubsubs[-1]
+
+    def client(self):
+        return FakeTracker(self)
+
+    async def publish(self, channel, key):
+        self.published.append((channel, key))
+
+    async def get(self, key):
+        self.commands.append(("GET", key))
+        return self.data.get(key)
+
+    async def set(self, key, value):
+        self.data[key] = value
+
+    async def close(self):
+        pass
+
+    def invalidate(self, *keys):
+        self.messages.put_nowait(
+            {"type": "message", "channel": TRACKING_CHANNEL, "data": list(keys)}
+        )
+
+
+def gets(redis):
+    return [args for args in redis.commands if args[0] == "GET"]
+
+
+async def ready(cache, redis):
+    # The first GET starts the listener, it is not cached yet.
+    await cache.get("warmup", lambda: redis.get("warmup"))
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert cache.ready
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.mark.asyncio
+async def test_tracking(redis):
+    cache = ClientSideCache(redis, max_size=10000, prefixes=["user:"])
+    await ready(cache, redis)
+    assert ("CLIENT", "ID") in redis.commands
+    assert (
+        "CLIENT",
+        "TRACKING",
+        "ON",
+        "REDIRECT",
+        7,
+        "BCAST",
+        "PREFIX",
+        "user:",
+    ) in redis.commands
+    assert redis.pubsubs[0].channels == [TRACKING_CHANNEL]
+
+    redis.data["user:1"] = "a"
+    fetch = lambda: redis.get("user:1")  # noqa: E731
+    assert await cache.get("user:1", fetch) == "a"
+    assert await cache.get("user:1", fetch) == "a"
+    assert len(gets(redis)) == 2
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    redis.data["user:1"] = "b"
+    redis.invalidate(b"user:1")
+    await asyncio.sleep(0.01)
+    assert await cache.get("user:1", fetch) == "b"
+    assert cache.invalidations == 1
+
+    # Flushed database.
+    redis.messages.put_nowait({"data": None})
+    await asyncio.sleep(0.01)
+    assert cache.stats()["entries"] == 0
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_invalidated_in_flight(redis):
+    cache = ClientSideCache(redis, max_size=10000)
+    await ready(cache, redis)
+
+    async def fetch():
+        cache.invalidate("key")
+        return "stale"
+
+    assert await cache.get("key", fetch) == "stale"
+    assert cache.stats()["entries"] == 0
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_ttl(redis, monkeypatch):
+    cache = ClientSideCache(redis, max_size=150, ttl=10)
+    await ready(cache, redis)
+    for key in ("a", "b", "c", "a", "d"):
+        await cache.get(key, lambda: redis.get(key))
+
+    assert cache.evictions > 0
+    assert cache.size <= 150
+    assert "a" in cache._entries
+    assert "b" not in cache._entries
+
+    now = asyncio.get_running_loop().time()
+    monkeypatch.setattr(
+        "mvc_demo.app.utils.redis_cache.monotonic", lambda: now + 1e9
+    )
+    misses = cache.misses
+    await cache.get("a", lambda: redis.get("a"))
+    assert cache.misses == misses + 1
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_tracking_connection_reset(redis):
+    cache = ClientSideCache(
+        redis, max_size=10000, check_interval=0.001, retry_interval=0.001
+    )
+    await ready(cache, redis)
+    await cache.get("key", lambda: redis.get("key"))
+    assert cache.stats()["entries"] == 1
+
+    redis.tracker_id = 2
+    await asyncio.sleep(0.05)
+    # Cleared, then set up again.
+    assert redis.resets >= 1
+    assert cache.stats()["entries"] == 0
+    assert len(redis.pubsubs) >= 2
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_pubsub(redis):
+    cache = ClientSideCache(redis, max_size=10000, invalidation="pubsub")
+    await ready(cache, redis)
+    assert redis.pubsubs[0].channels == ["mvc_demo:invalidate"]
+    assert not any(args[0] == "CLIENT" for args in redis.commands)
+
+    await cache.publish("key")
+    assert redis.published == [("mvc_demo:invalidate", "key")]
+    await cache.close()
+
+
+def test_unknown_invalidation(redis):
+    with pytest.raises(ValueError):
+        ClientSideCache(redis, max_size=1, invalidation="resp3")
+
+
+@pytest.mark.asyncio
+async def test_redis_client_cache(redis):
+    RedisClient.redis_client = redis
+    RedisClient.cache = ClientSideCache(redis, max_size=10000)
+    await ready(RedisClient.cache, redis)
+
+    await RedisClient.set("key", "a")
+    assert await RedisClient.get("key") == "a"
+    assert await RedisClient.get("key") == "a"
+    assert len(gets(redis)) == 2
+
+    # Local writes invalidate right away.
+    await RedisClient.set("key", "b")
+    assert await RedisClient.get("key") == "b"
+
+    await RedisClient.close_redis_client()
+    RedisClient.cache = None
+    RedisClient.redis_client = None
+
+
+@pytest.mark.asyncio
+async def test_redis_client_cache_failed_write(redis):
+    RedisClient.redis_client = redis
+    RedisClient.cache = ClientSideCache(redis, max_size=10000)
+    await ready(RedisClient.cache, redis)
+    await RedisClient.get("key")
+    redis.set = mock.AsyncMock(side_effect=ConnectionError("Mock error"))
+
+    with pytest.raises(ConnectionError):
+        await RedisClient.set("key", "b")
+
+    assert "key" not in RedisClient.cache._entries
+    await RedisClient.cache.close()
+    RedisClient.cache = None
+    RedisClient.redis_client = None
@@ -0,0 +1,393 @@
+import asyncio
+
+import pytest
+from aioredis.exceptions import ResponseError
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils.redis_cluster import (
+    SLOTS,
+    ClusterError,
+    RedisCluster,
+    _routing_key,
+    key_slot,
+)
+from mvc_demo.config import redis as redis_conf
+
+
+class Error(str):
+    pass
+
+
+class Status(str):
+    pass
+
+
+def encode(value):
+    if value is None:
+        return b"$-1\r\n"
+    elif isinstance(value, Error):
+        return b"-" + value.encode() + b"\r\n"
+    elif isinstance(value, Status):
+        return b"+" + value.encode() + b"\r\n"
+    elif isinstance(value, int):
+        return b":%d\r\n" % value
+    elif isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(map(encode, value))
+    if isinstance(value, str):
+        value = value.encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def parse(buffer):
+    commands = []
+    position = 0
+    while True:
+        start = position
+        end = buffer.find(b"\r\n", position)
+        if end < 0:
+            return commands, buffer[start:]
+        count = int(buffer[position + 1 : end])
+        position = end + 2
+        args = []
+        for _ in range(count):
+            end = buffer.find(b"\r\n", position)
+            if end < 0:
+                return commands, buffer[start:]
+            size = int(buffer[position + 1 : end])
+            position = end + 2
+            if len(buffer) < position + size + 2:
+                return commands, buffer[start:]
+            args.append(buffer[position : position + size])
+            position += size + 2
+        commands.append(args)
+
+
+KEY_COMMANDS = {
+    b"GET": (1, 2),
+    b"SET": (1, 2),
+    b"RPUSH": (1, 2),
+    b"LRANGE": (1, 2),
+    b"EXISTS": (1, None),
+    b"DEL": (1, None),
+    b"MGET": (1, None),
+    b"MSET": (1, None, 2),
+}
+
+
+class Node(object):
+    def __init__(self, cluster, index):
+        self.cluster = cluster
+        self.index = index
+        self.data = {}
+        self.reads = 0
+        self.address = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.address = ("127.0.0.1", self.server.sockets[0].getsockname()[1])
+
+    async def handle(self, reader, writer):
+        buffer = b""
+        asking = False
+        while True:
+            chunk = await reader.read(64 * 1024)
+            if not chunk:
+                break
+            self.reads += 1
+            commands, buffer = parse(buffer + chunk)
+            replies = []
+            for args in commands:
+                reply = self.execute(args, asking)
+                asking = args[0].upper() == b"ASKING"
+                replies.append(encode(reply))
+            writer.write(b"".join(replies))
+            await writer.drain()
+        writer.close()
+
+    def location(self, slot):
+        return "{0:d} {1:s}:{2:d}".format(slot, *self.address)
+
+    def check(self, args, asking):
+        first, last, step = (KEY_COMMANDS[args[0].upper()] + (1,))[:3]
+        keys = args[first:last:step]
+        slots = {key_slot(key) for key in keys}
+        if len(slots) > 1:
+            return Error("CROSSSLOT Keys don't hash to the same slot")
+        slot = slots.pop()
+        owner = self.cluster.nodes[slot]
+        target = self.cluster.asks.get(slot)
+        if owner is self:
+            if target is not None and not all(k in self.data for k in keys):
+                return Error("ASK {0:s}".format(target.location(slot)))
+            return None
+        elif target is self and asking:
+            return None
+        return Error("MOVED {0:s}".format(owner.location(slot)))
+
+    def execute(self, args, asking):
+        command = args[0].upper()
+        if command == b"PING":
+            return Status("PONG")
+        elif command in (b"ASKING", b"AUTH"):
+            return Status("OK")
+        elif command == b"CLUSTER":
+            return self.cluster.slots_reply()
+        elif command == b"SCAN":
+            # Two pages, whatever the COUNT.
+            keys = sorted(self.data)
+            if args[1] == b"0":
+                return ["1", keys[: len(keys) // 2]]
+            return ["0", keys[len(keys) // 2 :]]
+        elif command not in KEY_COMMANDS:
+            return Error("ERR unknown command")
+        error = self.check(args, asking)
+        if error is not None:
+            return error
+        if command == b"GET":
+            return self.data.get(args[1])
+        elif command == b"SET":
+            self.data[args[1]] = args[2]
+            return Status("OK")
+        elif command == b"MSET":
+            for index in range(1, len(args), 2):
+                self.data[args[index]] = args[index + 1]
+            return Status("OK")
+        elif command == b"MGET":
+            return [self.data.get(key) for key in args[1:]]
+        elif command == b"EXISTS":
+            return sum(key in self.data for key in args[1:])
+        elif command == b"DEL":
+            return sum(self.data.pop(key, None) is not None for key in args[1:])
+        elif command == b"RPUSH":
+            self.data.setdefault(args[1], []).extend(args[2:])
+            return len(self.data[args[1]])
+        elif command == b"LRANGE":
+            values = self.data.get(args[1], [])
+            if isinstance(values, bytes):
+                return Error("WRONGTYPE Operation against a key")
+            return values[int(args[2]) : int(args[3]) + 1 or None]
+        return Error("ERR unknown command")
+
+
+class ClusterStandIn(object):
+    """In-process Redis Cluster, with three primaries."""
+
+    def __init__(self, size=3):
+        self.members = [Node(self, index) for index in range(size)]
+        self.nodes = [
+            self.members[slot * size // SLOTS] for slot in range(SLOTS)
+        ]
+        self.asks = {}
+
+    async def start(self):
+        for node in self.members:
+            await node.start()
+
+    def stop(self):
+        for node in self.members:
+            node.server.close()
+
+    def slots_reply(self):
+        reply = []
+        start = 0
+        for slot in range(1, SLOTS + 1):
+            if slot == SLOTS or self.nodes[slot] is not self.nodes[start]:
+                host, port = self.nodes[start].address
+                reply.append([start, slot - 1, [host, port, "id"]])
+                start = slot
+        return reply
+
+    def owner(self, key):
+        return self.nodes[key_slot(key)]
+
+    def move(self, key, target):
+        slot = key_slot(key)
+        source = self.nodes[slot]
+        for stored in list(source.data):
+            if key_slot(stored) == slot:
+                target.data[stored] = source.data.pop(stored)
+        self.nodes[slot] = target
+
+    def migrate(self, key, target):
+        slot = key_slot(key)
+        source = self.nodes[slot]
+        if key.encode() in source.data:
+            target.data[key.encode()] = source.data.pop(key.encode())
+        self.asks[slot] = target
+
+
+@pytest.fixture
+async def stand_in():
+    cluster = ClusterStandIn()
+    await cluster.start()
+    yield cluster
+    cluster.stop()
+
+
+@pytest.fixture
+def cluster(stand_in):
+    return RedisCluster([stand_in.members[0].address], encoding="utf-8")
+
+
+def other(stand_in, key):
+    return next(
+        node for node in stand_in.members if node is not stand_in.owner(key)
+    )
+
+
+def test_key_slot():
+    assert key_slot("123456789") == 12739
+    assert key_slot(b"123456789") == 12739
+    assert key_slot("{user1000}.following") == key_slot("{user1000}.followers")
+    assert key_slot("foo{{bar}}zap") == key_slot("{bar")
+
+
+def test_script_routing_key():
+    assert _routing_key("get", ("key",)) == "key"
+    assert _routing_key("mset", ({"a": 1, "b": 2},)) == "a"
+    assert _routing_key("evalsha", ("sha", 2, "a", "b", "arg")) == "a"
+    assert _routing_key("eval", ("return 1", 0)) == "return 1"
+
+
+@pytest.mark.asyncio
+async def test_routing(stand_in, cluster):
+    for index in range(30):
+        await cluster.set("key:{0:d}".format(index), str(index))
+
+    for index in range(30):
+        key = "key:{0:d}".format(index)
+        assert stand_in.owner(key).data[key.encode()] == str(index).encode()
+        assert await cluster.get(key) == str(index).encode()
+    assert len(cluster.nodes) == 3
+    assert await cluster.ping()
+
+
+@pytest.mark.asyncio
+async def test_moved(stand_in, cluster):
+    await cluster.set("key", "value")
+    target = other(stand_in, "key")
+    stand_in.move("key", target)
+
+    assert await cluster.get("key") == b"value"
+    # The slot is updated right away, the map is refreshed in background.
+    assert cluster.slots[key_slot("key")] == target.address
+    await cluster._refresh_task
+    reads = target.reads
+    assert await cluster.get("key") == b"value"
+    assert target.reads == reads + 1
+
+
+@pytest.mark.asyncio
+async def test_ask(stand_in, cluster):
+    await cluster.set("key", "value")
+    source = stand_in.owner("key")
+    target = other(stand_in, "key")
+    stand_in.migrate("key", target)
+
+    assert await cluster.get("key") == b"value"
+    # Migrating slots are not updated.
+    assert cluster.slots[key_slot("key")] == source.address
+
+
+@pytest.mark.asyncio
+async def test_too_many_redirections(stand_in, cluster):
+    await cluster.get("key")
+    # A slot migrating to its own node asks again and again.
+    stand_in.asks[key_slot("key")] = stand_in.owner("key")
+    cluster.max_redirects = 2
+    with pytest.raises(ClusterError):
+        await cluster.get("key")
+
+
+@pytest.mark.asyncio
+async def test_multi_key(stand_in, cluster):
+    keys = ["key:{0:d}".format(index) for index in range(50)]
+    await cluster.mset({key: key.upper() for key in keys[:40]})
+    assert await cluster.exists(*keys) == 40
+    assert (
+        await cluster.mget(keys)
+        == [key.upper().encode() for key in keys[:40]] + [None] * 10
+    )
+    # One pipeline per node.
+    reads = [node.reads for node in stand_in.members]
+    await cluster.mget(keys)
+    assert [
+        node.reads - read for node, read in zip(stand_in.members, reads)
+    ] == [1, 1, 1]
+
+    stand_in.move(keys[0], other(stand_in, keys[0]))
+    assert await cluster.delete(*keys) == 40
+
+
+@pytest.mark.asyncio
+async def test_pipeline(stand_in, cluster):
+    pipe = cluster.pipeline()
+    pipe.set("a", "1").set("b", "2").rpush("c", "x").lrange("a", 0, -1)
+    results = await pipe.execute(raise_on_error=False)
+    assert results[:3] == [True, True, 1]
+    assert isinstance(results[3], ResponseError)
+
+    pipe.get("a")
+    with pytest.raises(ValueError):
+        cluster.pipeline(transaction=True)
+    assert await pipe.execute() == [b"1"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_spanning_slots(stand_in, cluster):
+    keys = ["key:{0:d}".format(index) for index in range(10)]
+    pipe = cluster.pipeline()
+    pipe.mset({key: key for key in keys}).get(keys[0]).mget(keys)
+    pipe.exists(*keys)
+    assert await pipe.execute() == [
+        True,
+        keys[0].encode(),
+        [key.encode() for key in keys],
+        10,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_redis_client_cluster(stand_in):
+    host, port = stand_in.members[1].address
+    redis_conf.REDIS_USE_CLUSTER = True
+    redis_conf.REDIS_CLUSTER_NODES = ["{0:s}:{1:d}".format(host, port)]
+    RedisClient.redis_client = None
+    try:
+        RedisClient.open_redis_client()
+        assert isinstance(RedisClient.redis_client, RedisCluster)
+        await RedisClient.set("key", "value")
+        assert await RedisClient.get("key") == b"value"
+        assert await RedisClient.exists("key") == 1
+        keys = ["key:{0:d}".format(index) for index in range(20)]
+        await RedisClient.mset({key: "x" for key in keys})
+        assert await RedisClient.mget(keys) == [b"x"] * 20
+        assert await RedisClient.exists(*keys) == 20
+        scanned = [key async for key in RedisClient.scan_iter(count=5)]
+        assert sorted(scanned) == sorted(key.encode() for key in keys + ["key"])
+        async with RedisClient.pipeline() as pipe:
+            pipe.rpush("list", "a", "b")
+            pipe.lrange("list", 0, -1)
+            assert await pipe.execute() == [2, [b"a", b"b"]]
+        nodes = len(RedisClient.redis_client.nodes)
+        stats = RedisClient.pool_stats()
+        assert stats["in_use"] == 0
+        assert stats["max_connections"] == (
+            nodes * redis_conf.REDIS_MAX_CONNECTIONS
+        )
+        await RedisClient.close_redis_client()
+    finally:
+        RedisClient.redis_client = None
+        redis_conf.REDIS_USE_CLUSTER = False
+        redis_conf.REDIS_CLUSTER_NODES = []
+
+
+def test_redis_client_cluster_tracking():
+    redis_conf.REDIS_USE_CLUSTER = True
+    redis_conf.REDIS_CACHE = True
+    RedisClient.redis_client = None
+    try:
+        with pytest.raises(ValueError):
+            RedisClient.open_redis_client()
+    finally:
+        redis_conf.REDIS_USE_CLUSTER = False
+        redis_conf.REDIS_CACHE = False
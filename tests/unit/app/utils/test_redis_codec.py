@@ -0,0 +1,183 @@
+import mock
+import orjson
+import pytest
+from aioredis.exceptions import DataError
+from mvc_demo.app.utils import RedisClient
+from mvc_demo.app.utils import redis_codec
+from mvc_demo.app.utils.redis_codec import (
+    HEADER,
+    STORED,
+    ZLIB,
+    Codec,
+    Codecs,
+    CompressedCodec,
+    JSONCodec,
+    MsgpackCodec,
+    RawCodec,
+)
+from mvc_demo.config import redis as redis_conf
+
+
+def test_codec_is_abstract():
+    with pytest.raises(TypeError):
+        Codec()
+
+
+def test_raw():
+    codec = RawCodec()
+    assert codec.encode("value") == "value"
+    assert codec.decode(b"value") == b"value"
+
+
+def test_json():
+    codec = JSONCodec()
+    value = {"a": [1, 2.5, None, "x"]}
+    assert codec.encode(value) == b'{"a":[1,2.5,null,"x"]}'
+    assert codec.decode(codec.encode(value)) == value
+    with pytest.raises(DataError):
+        codec.encode(object())
+    with pytest.raises(DataError):
+        codec.decode(b"{")
+
+
+def test_msgpack_unavailable(monkeypatch):
+    monkeypatch.setattr(redis_codec, "msgpack", None)
+    with pytest.raises(ValueError):
+        MsgpackCodec()
+
+
+def test_msgpack():
+    if redis_codec.msgpack is None:
+        pytest.skip("msgpack is not installed")
+    codec = MsgpackCodec()
+    value = {"a": [1, 2.5, None, "x"]}
+    assert codec.decode(codec.encode(value)) == value
+
+
+def test_compression():
+    codec = CompressedCodec(JSONCodec(), threshold=100)
+    small = {"a": 1}
+    large = {"a": "x" * 1000}
+
+    assert codec.encode(small) == b'{"a":1}'
+    data = codec.encode(large)
+    assert data[:2] == HEADER + ZLIB
+    assert len(data) < 100
+    assert codec.decode(data) == large
+    # Written before the compression was enabled.
+    assert codec.decode(b'{"a":1}') == small
+
+
+def test_compression_framing():
+    codec = CompressedCodec(RawCodec(), threshold=100)
+    # Raw values starting with the header byte are escaped.
+    assert codec.encode(HEADER + b"x") == HEADER + STORED + HEADER + b"x"
+    assert codec.decode(HEADER + STORED + HEADER + b"x") == HEADER + b"x"
+    assert codec.encode("text") == b"text"
+    assert codec.encode(1.5) == b"1.5"
+    # Incompressible values are stored as is.
+    noise = bytes(range(256))
+    assert codec.encode(noise) == noise
+
+    with pytest.raises(DataError):
+        codec.decode(HEADER + ZLIB + b"garbage")
+    with pytest.raises(DataError):
+        codec.decode(HEADER + b"\x7f")
+    with pytest.raises(DataError):
+        codec.encode(True)
+
+
+def test_compression_unknown():
+    with pytest.raises(ValueError):
+        CompressedCodec(RawCodec(), threshold=1, compression="lzma")
+
+
+def test_codecs():
+    codecs = Codecs(
+        default="raw",
+        prefixes={"user:": "json", "user:raw:": "raw"},
+        threshold=64,
+    )
+    assert codecs.for_key("key").name == "raw"
+    assert codecs.for_key("user:1").name == "json"
+    assert codecs.for_key(b"user:1").name == "json"
+    assert codecs.for_key("user:raw:1").name == "raw"
+    assert codecs.for_key("user:1", "raw").name == "raw"
+    assert isinstance(codecs.for_key("key"), CompressedCodec)
+    assert codecs.for_key("key", RawCodec()).name == "raw"
+    with pytest.raises(ValueError):
+        Codecs(default="pickle")
+
+
+@pytest.fixture
+def codecs():
+    RedisClient.redis_client = mock.AsyncMock()
+    RedisClient.codecs = Codecs(prefixes={"json:": "json"}, threshold=64)
+    yield RedisClient.redis_client
+    RedisClient.codecs = Codecs()
+
+
+@pytest.mark.asyncio
+async def test_redis_client_codecs(codecs):
+    large = {"a": "x" * 1000}
+    await RedisClient.set("json:1", large)
+    data = codecs.set.call_args[0][1]
+    assert data[:2] == HEADER + ZLIB
+
+    codecs.get.return_value = data
+    assert await RedisClient.get("json:1") == large
+    codecs.get.return_value = data
+    assert await RedisClient.get("json:1", codec="raw") == orjson.dumps(large)
+    codecs.get.return_value = data
+    assert await RedisClient.get("json:1", codec=RawCodec()) == data
+    codecs.get.return_value = None
+    assert await RedisClient.get("json:1") is None
+
+    await RedisClient.mset({"json:1": [1], "key": "value"})
+    codecs.mset.assert_called_once_with({"json:1": b"[1]", "key": b"value"})
+    codecs.mget.return_value = [b"[1]", b"value", None]
+    assert await RedisClient.mget(["json:1", "key", "json:2"]) == [
+        [1],
+        b"value",
+        None,
+    ]
+
+    await RedisClient.rpush("json:list", [{"a": 1}, 2])
+    codecs.rpush.assert_called_once_with("json:list", [b'{"a":1}', b"2"])
+    codecs.lrange.return_value = [b'{"a":1}', b"2"]
+    assert await RedisClient.lrange("json:list", 0, -1) == [{"a": 1}, 2]
+
+    await RedisClient.hset("json:hash", {"a": {"b": 1}})
+    codecs.hset.assert_called_once_with(
+        "json:hash", None, None, {"a": b'{"b":1}'}
+    )
+    codecs.hmget.return_value = [b'{"b":1}', None]
+    assert await RedisClient.hmget("json:hash", ["a", "c"]) == [
+        {"b": 1},
+        None,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_redis_client_decode_error(codecs):
+    codecs.get.return_value = b"{"
+    with pytest.raises(DataError):
+        await RedisClient.get("json:1")
+
+
+def test_open_redis_client_codecs():
+    redis_conf.REDIS_CODEC = "json"
+    redis_conf.REDIS_CODEC_PREFIXES = {"raw:": "raw"}
+    redis_conf.REDIS_COMPRESSION_THRESHOLD = 1024
+    RedisClient.redis_client = None
+    try:
+        RedisClient.open_redis_client()
+        assert RedisClient.codecs.for_key("key").name == "json"
+        assert RedisClient.codecs.for_key("raw:key").name == "raw"
+        assert RedisClient.codecs.threshold == 1024
+    finally:
+        RedisClient.redis_client = None
+        RedisClient.codecs = Codecs()
+        redis_conf.REDIS_CODEC = "raw"
+        redis_conf.REDIS_CODEC_PREFIXES = {}
+        redis_conf.REDIS_COMPRESSION_THRESHOLD = 0
@@ -0,0 +1,208 @@
+import gzip
+
+import orjson
+import pytest
+from loguru import logger
+from mvc_demo.cli.commands.logs import log_paths, logs
+from mvc_demo.config import settings
+from mvc_demo.core.log_binary import BinaryRecordEncoder
+
+
+@pytest.fixture
+def binary_logs():
+    messages = []
+    handler_id = logger.add(messages.append, format="{message}")
+    for index in range(3):
+        logger.info("Hello {}", index)
+    logger.remove(handler_id)
+
+    encode = BinaryRecordEncoder()
+    yield b"".join(encode(message) for message in messages)
+
+
+def decoded_messages(output):
+    return [orjson.loads(line)["message"] for line in output.splitlines()]
+
+
+def test_logs_help(cli_runner):
+    result = cli_runner.invoke(logs, ["--help"])
+    assert result.exit_code == 0
+    result = cli_runner.invoke(logs, ["decode", "--help"])
+    assert result.exit_code == 0
+
+
+def test_decode_files(cli_runner, binary_logs, tmp_path):
+    plain = tmp_path / "app.bin"
+    plain.write_bytes(binary_logs)
+    compressed = tmp_path / "app.20220101-000000-000000.bin.gz"
+    compressed.write_bytes(gzip.compress(binary_logs))
+
+    result = cli_runner.invoke(logs, ["decode", str(plain), str(compressed)])
+
+    assert result.exit_code == 0
+    assert (
+        decoded_messages(result.stdout_bytes)
+        == [
+            "Hello 0",
+            "Hello 1",
+            "Hello 2",
+        ]
+        * 2
+    )
+
+
+def test_decode_stdin(cli_runner, binary_logs):
+    result = cli_runner.invoke(logs, ["decode"], input=binary_logs)
+
+    assert result.exit_code == 0
+    assert decoded_messages(result.stdout_bytes) == [
+        "Hello 0",
+        "Hello 1",
+        "Hello 2",
+    ]
+
+
+def test_decode_output(cli_runner, binary_logs, tmp_path):
+    source = tmp_path / "app.bin"
+    source.write_bytes(binary_logs)
+    output = tmp_path / "app.jsonl"
+
+    result = cli_runner.invoke(logs, ["decode", "-o", str(output), str(source)])
+
+    assert result.exit_code == 0
+    assert result.stdout_bytes == b""
+    assert decoded_messages(output.read_bytes()) == [
+        "Hello 0",
+        "Hello 1",
+        "Hello 2",
+    ]
+
+
+def test_decode_invalid(cli_runner, tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b'{"message": "JSON lines"}\n')
+
+    result = cli_runner.invoke(logs, ["decode", str(path)])
+
+    assert result.exit_code == 1
+    assert "Unknown binary log frame type" in result.output
+
+
+def test_decode_missing_file(cli_runner):
+    result = cli_runner.invoke(logs, ["decode", "/does/not/exist.bin"])
+    assert result.exit_code == 2
+
+
+@pytest.fixture
+def json_logs(tmp_path):
+    for segment, start in (
+        ("20220101-000000-000000", 0),
+        ("20220101-000010-000000", 10),
+    ):
+        (tmp_path / "app.{0:s}.log".format(segment)).write_bytes(
+            b"".join(
+                orjson.dumps(
+                    {
+                        "time": "2022-01-01T00:00:{0:02d}+00:00".format(index),
+                        "message": "Hello {0:d}".format(index),
+                        "extra": {"request_id": "req-{0:d}".format(index % 2)},
+                    },
+                    option=orjson.OPT_APPEND_NEWLINE,
+                )
+                for index in range(start, start + 10)
+            )
+        )
+    yield tmp_path
+
+
+def test_find_request_id(cli_runner, json_logs):
+    result = cli_runner.invoke(
+        logs, ["find", "--request-id", "req-1", str(json_logs)]
+    )
+
+    assert result.exit_code == 0
+    assert decoded_messages(result.stdout_bytes) == [
+        "Hello {0:d}".format(index) for index in range(1, 20, 2)
+    ]
+    assert len(list(json_logs.glob("*.idx"))) == 2
+
+    # Searched with the saved indexes.
+    result = cli_runner.invoke(
+        logs,
+        [
+            "find",
+            "-r",
+            "req-1",
+            "--since",
+            "2022-01-01T00:00:15+00:00",
+            str(json_logs),
+        ],
+    )
+    assert result.exit_code == 0
+    assert decoded_messages(result.stdout_bytes) == [
+        "Hello 15",
+        "Hello 17",
+        "Hello 19",
+    ]
+
+
+def test_find_time_range(cli_runner, json_logs):
+    result = cli_runner.invoke(
+        logs,
+        [
+            "find",
+            "--no-save",
+            "--since",
+            "2022-01-01T00:00:08+00:00",
+            "--until",
+            "2022-01-01T00:00:11+00:00",
+            str(json_logs),
+        ],
+    )
+
+    assert result.exit_code == 0
+    assert decoded_messages(result.stdout_bytes) == [
+        "Hello 8",
+        "Hello 9",
+        "Hello 10",
+        "Hello 11",
+    ]
+    assert not list(json_logs.glob("*.idx"))
+
+
+def test_find_skips_partial_segments(cli_runner, json_logs):
+    # Being compressed, the source segment is still there.
+    source = json_logs / "app.20220101-000000-000000.log"
+    with gzip.open(str(source) + ".gz.part", "wb") as partial:
+        partial.write(source.read_bytes()[:100])
+
+    assert log_paths([str(json_logs)]) == [
+        str(path) for path in sorted(json_logs.glob("*.log"))
+    ]
+
+    result = cli_runner.invoke(logs, ["find", "-r", "req-0", str(json_logs)])
+
+    assert result.exit_code == 0
+    assert len(decoded_messages(result.stdout_bytes)) == 10
+    assert len(list(json_logs.glob("*.idx"))) == 2
+
+
+def test_find_log_file_setting(cli_runner, json_logs, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_FILE", str(json_logs / "app.log"))
+
+    result = cli_runner.invoke(logs, ["find", "-r", "req-0"])
+
+    assert result.exit_code == 0
+    assert len(decoded_messages(result.stdout_bytes)) == 10
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["find"],
+        ["find", "--since", "yesterday", "."],
+    ],
+)
+def test_find_usage(cli_runner, args):
+    result = cli_runner.invoke(logs, args)
+    assert result.exit_code == 2
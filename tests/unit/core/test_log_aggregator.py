@@ -0,0 +1,152 @@
+import io
+import os
+import time
+
+import pytest
+from mvc_demo.core.log_aggregator import AggregatorStream, LogAggregator
+from mvc_demo.core.log_writer import BatchedLogWriter
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to ~100 characters.
+    path = "/tmp/mvc-demo-test-{0:d}.sock".format(os.getpid())
+    yield path
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_aggregate_complete_lines(socket_path):
+    output = io.BytesIO()
+    aggregator = LogAggregator(socket_path, stream=output)
+    aggregator.start()
+
+    first = AggregatorStream(socket_path, fallback=io.BytesIO())
+    second = AggregatorStream(socket_path, fallback=io.BytesIO())
+    first.write(b"first worker ")
+    second.write(b"second worker\n")
+    assert wait_for(lambda: output.getvalue() == b"second worker\n")
+
+    first.write(b"line\n")
+    assert wait_for(lambda: output.getvalue().endswith(b"first worker line\n"))
+    assert first.fallbacks == second.fallbacks == 0
+
+    first.close()
+    second.close()
+    aggregator.stop()
+    assert not os.path.exists(socket_path)
+    assert aggregator.received == 32
+
+
+def test_partial_line_written_on_disconnect(socket_path):
+    output = io.BytesIO()
+    aggregator = LogAggregator(socket_path, stream=output)
+    aggregator.start()
+
+    stream = AggregatorStream(socket_path)
+    stream.write(b"unterminated")
+    assert wait_for(lambda: aggregator.connections == 1)
+    stream.close()
+    assert wait_for(lambda: output.getvalue() == b"unterminated\n")
+    assert wait_for(lambda: aggregator.connections == 0)
+    aggregator.stop()
+
+
+def test_fallback_without_aggregator(socket_path):
+    fallback = io.BytesIO()
+    stream = AggregatorStream(socket_path, fallback=fallback)
+    stream.write(b"record\n")
+    assert fallback.getvalue() == b"record\n"
+    assert stream.fallbacks == 1
+
+
+def test_reconnect_after_retry_interval(socket_path):
+    fallback = io.BytesIO()
+    stream = AggregatorStream(socket_path, fallback=fallback, retry_interval=0)
+    stream.write(b"lost\n")
+
+    output = io.BytesIO()
+    aggregator = LogAggregator(socket_path, stream=output)
+    aggregator.start()
+    stream.write(b"sent\n")
+    assert wait_for(lambda: output.getvalue() == b"sent\n")
+    assert fallback.getvalue() == b"lost\n"
+
+    stream.close()
+    aggregator.stop()
+
+
+def test_batched_writer_to_aggregator(socket_path):
+    output = io.BytesIO()
+    aggregator = LogAggregator(socket_path, stream=output)
+    aggregator.start()
+
+    writer = BatchedLogWriter(
+        stream=AggregatorStream(socket_path), flush_interval=60
+    )
+    for index in range(100):
+        writer.put("record {0:d}\n".format(index).encode())
+    writer.close()
+    aggregator.stop()
+
+    lines = output.getvalue().splitlines()
+    assert lines == ["record {0:d}".format(i).encode() for i in range(100)]
+
+
+class TornSocket(object):
+    def __init__(self):
+        self.sent = b""
+
+    def send(self, data):
+        if self.sent:
+            raise BrokenPipeError()
+        self.sent = bytes(data[:6])
+        return 6
+
+    def close(self):
+        pass
+
+
+def test_fallback_after_partial_send(socket_path):
+    fallback = io.BytesIO()
+    stream = AggregatorStream(socket_path, fallback=fallback)
+    sock = stream._sock = TornSocket()
+    stream.write(b"first\nsecond\n")
+    assert sock.sent == b"first\n"
+    assert fallback.getvalue() == b"second\n"
+    assert stream._sock is None
+
+
+def test_pending_line_bounded(socket_path, monkeypatch):
+    monkeypatch.setattr("mvc_demo.core.log_aggregator.MAX_PENDING", 8)
+    output = io.BytesIO()
+    aggregator = LogAggregator(socket_path, stream=output)
+    aggregator.start()
+
+    stream = AggregatorStream(socket_path)
+    stream.write(b"0123456789")
+    assert wait_for(lambda: output.getvalue() == b"0123456789\n")
+    assert aggregator.split_lines == 1
+    stream.close()
+    aggregator.stop()
+
+
+def test_close_inherited(socket_path):
+    aggregator = LogAggregator(socket_path, stream=io.BytesIO())
+    aggregator.start()
+    selector = aggregator._selector
+
+    pid = os.fork()
+    if not pid:
+        aggregator.close_inherited()
+        os._exit(0 if selector.get_map() is None else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    aggregator.stop()
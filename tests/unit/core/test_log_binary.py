@@ -0,0 +1,162 @@
+import io
+import os
+
+import orjson
+import pytest
+from loguru import logger
+from mvc_demo.core.log_binary import (
+    BinaryLogDecoder,
+    BinaryRecordEncoder,
+    decode_stream,
+    dumps_record,
+)
+from mvc_demo.core.log_files import RotatingFileStream
+from mvc_demo.core.log_serializer import build_record_serializer
+
+
+@pytest.fixture
+def messages():
+    messages = []
+    handler_id = logger.add(messages.append, format="{message}")
+    yield messages
+    logger.remove(handler_id)
+
+
+def log_records():
+    log = logger.bind(app_name="mvc-demo", request_id=None)
+    for index in range(3):
+        log.info("Hello {}", index)
+    log.bind(user="abc", payload={"a": [1, 2]}).warning("Hi")
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.exception("Boom")
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        None,
+        ["time", "level.name", "message", "extra.user"],
+        ["exception", "message", "thread"],
+    ],
+)
+def test_round_trip(messages, fields):
+    log_records()
+    args = () if fields is None else (fields,)
+    encode = BinaryRecordEncoder(*args)
+    serialize = build_record_serializer(*args)
+
+    data = b"".join(encode(message) for message in messages)
+    lines = b"".join(serialize(message) for message in messages)
+    records = BinaryLogDecoder().feed(data)
+
+    assert b"".join(dumps_record(record) for record in records) == lines
+    assert len(data) < len(lines)
+
+
+def test_strings_are_interned(messages):
+    log_records()
+    encode = BinaryRecordEncoder()
+
+    first, second = encode(messages[0]), encode(messages[1])
+
+    assert first.count(b"MainThread") == 1
+    assert b"MainThread" not in second
+    assert len(second) < len(first)
+
+
+def test_dictionary_full(messages):
+    log_records()
+    encode = BinaryRecordEncoder(max_strings=2)
+
+    data = b"".join(encode(message) for message in messages)
+    records = BinaryLogDecoder().feed(data)
+
+    assert [record["message"] for record in records][:2] == [
+        "Hello 0",
+        "Hello 1",
+    ]
+    assert records[0]["function"] == "log_records"
+
+
+def test_feed_in_chunks(messages):
+    log_records()
+    encode = BinaryRecordEncoder()
+    data = b"".join(encode(message) for message in messages)
+    decoder = BinaryLogDecoder()
+
+    records = []
+    for start in range(0, len(data), 7):
+        records += decoder.feed(data[start : start + 7])
+    decoder.close()
+
+    assert len(records) == len(messages)
+    assert decoder.records == len(messages)
+
+
+def test_truncated_stream(messages):
+    log_records()
+    data = BinaryRecordEncoder()(messages[0])
+    decoder = BinaryLogDecoder()
+
+    decoder.feed(data[:-3])
+    with pytest.raises(ValueError):
+        decoder.close()
+
+
+def test_invalid_stream():
+    with pytest.raises(ValueError):
+        BinaryLogDecoder().feed(b'{"message": "not binary"}\n' * 2)
+
+
+def test_preallocated_tail(messages):
+    log_records()
+    data = BinaryRecordEncoder()(messages[0]) + b"\0" * 64
+    decoder = BinaryLogDecoder()
+
+    assert len(decoder.feed(data)) == 1
+    decoder.close()
+
+
+def test_rotated_segments_decode_alone(messages, tmp_path):
+    log_records()
+    encode = BinaryRecordEncoder()
+    stream = RotatingFileStream(
+        str(tmp_path / "app.bin"),
+        max_bytes=600,
+        compression=None,
+        header=encode.header,
+    )
+    for message in messages:
+        stream.write(encode(message))
+    stream.close()
+
+    segments = sorted(tmp_path.iterdir())
+    assert len(segments) > 1
+    records = []
+    for segment in segments:
+        output = io.BytesIO()
+        with open(segment, "rb") as source:
+            decode_stream(source, output.write)
+        records += [
+            orjson.loads(line) for line in output.getvalue().splitlines()
+        ]
+    assert [record["message"] for record in records] == [
+        message.record["message"] for message in messages
+    ]
+
+
+def test_interleaved_processes(messages):
+    log_records()
+    parent = BinaryRecordEncoder()
+    child = BinaryRecordEncoder()
+    child._pid = os.getpid() + 1
+
+    data = b"".join(
+        encode(message) for message in messages for encode in (parent, child)
+    )
+    records = BinaryLogDecoder().feed(data)
+
+    assert len(records) == 2 * len(messages)
+    assert records[0] == records[1]
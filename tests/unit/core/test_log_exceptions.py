@@ -0,0 +1,163 @@
+import mock
+import pytest
+from loguru import logger
+from mvc_demo.core.log_exceptions import (
+    ExceptionFingerprinter,
+    exception_fingerprint,
+)
+from mvc_demo.core.loguru_logs import _chain_filters
+
+
+@pytest.fixture
+def sink():
+    return []
+
+
+@pytest.fixture
+def fingerprinted(sink):
+    # Removes the handlers of the application configuration, whose filters
+    # could deduplicate the exceptions of the shared records first.
+    logger.remove()
+    handler_ids = []
+
+    def add(log_filter=None, **kwargs):
+        # Last of the filters, as configured by global_log_config.
+        fingerprinter = ExceptionFingerprinter(**kwargs)
+        handler_ids.append(
+            logger.add(
+                lambda message: sink.append((message.record, str(message))),
+                format="{message}",
+                filter=_chain_filters(log_filter, fingerprinter),
+            )
+        )
+        return fingerprinter
+
+    yield add
+    for handler_id in handler_ids:
+        logger.remove(handler_id)
+
+
+def fail(value):
+    raise ValueError(value)
+
+
+def fail_elsewhere(value):
+    raise ValueError(value)
+
+
+def log_failure(function=fail, value="boom", level="ERROR"):
+    try:
+        function(value)
+    except ValueError:
+        logger.opt(exception=True).log(level, "Request failed")
+
+
+def test_fingerprint_ignores_message():
+    fingerprints = set()
+    for value in ("a", "b"):
+        try:
+            fail(value)
+        except ValueError as exc:
+            fingerprints.add(
+                exception_fingerprint(type(exc), exc.__traceback__)
+            )
+    try:
+        fail_elsewhere("a")
+    except ValueError as exc:
+        other = exception_fingerprint(type(exc), exc.__traceback__)
+
+    assert len(fingerprints) == 1
+    assert len(fingerprints.pop()) == 12
+    assert other not in fingerprints
+
+
+def test_repeats_are_referenced(fingerprinted, sink):
+    fingerprinter = fingerprinted(window=60)
+
+    for value in ("first", "second", "third"):
+        log_failure(value=value)
+    logger.info("No exception")
+
+    (first, text), (second, short), (third, _), (info, _) = sink
+    fingerprint = first["extra"]["exception_id"]
+    assert "Traceback" in text
+    assert first["extra"]["exception_count"] == 1
+    assert second["exception"] is None
+    assert "Traceback" not in short
+    assert (
+        short.strip()
+        == "Request failed [ValueError: second, {0:s} x2]".format(fingerprint)
+    )
+    assert third["extra"]["exception_count"] == 3
+    assert "exception_id" not in info["extra"]
+    assert fingerprinter.deduplicated == 2
+
+
+def test_distinct_exceptions_are_rendered(fingerprinted, sink):
+    fingerprinted(window=60)
+
+    log_failure()
+    log_failure(function=fail_elsewhere)
+
+    assert all("Traceback" in text for _, text in sink)
+
+
+@mock.patch("mvc_demo.core.log_exceptions.time.monotonic")
+def test_window_expiry(monotonic, fingerprinted, sink):
+    monotonic.return_value = 100.0
+    fingerprinted(window=10)
+
+    log_failure()
+    log_failure()
+    monotonic.return_value = 110.0
+    log_failure()
+
+    assert [record["extra"]["exception_count"] for record, _ in sink] == [
+        1,
+        2,
+        1,
+    ]
+    assert sink[2][0]["exception"] is not None
+
+
+@mock.patch("mvc_demo.core.log_exceptions.time.monotonic")
+def test_render_budget(monotonic, fingerprinted, sink):
+    monotonic.return_value = 100.0
+    fingerprinter = fingerprinted(window=60, budget=1)
+
+    log_failure()
+    log_failure(function=fail_elsewhere)
+    monotonic.return_value = 101.0
+    log_failure(function=lambda value: fail(value + "!"))
+
+    (first, _), (plain, text), (refilled, _) = sink
+    assert first["exception"] is not None
+    assert plain["exception"] is None
+    assert "Traceback (most recent call last)" in text
+    assert "fail_elsewhere" in text
+    assert refilled["exception"] is not None
+    assert fingerprinter.over_budget == 1
+
+
+def test_filtered_occurrences_are_not_accounted(fingerprinted, sink):
+    fingerprinter = fingerprinted(
+        log_filter=lambda record: record["level"].no >= 40, window=60
+    )
+
+    log_failure(level="DEBUG")
+    log_failure(value="second")
+
+    ((record, text),) = sink
+    assert "Traceback" in text
+    assert record["extra"]["exception_count"] == 1
+    assert fingerprinter.deduplicated == 0
+
+
+def test_fingerprints_are_bounded():
+    fingerprinter = ExceptionFingerprinter(window=60, max_fingerprints=4)
+
+    for index in range(10):
+        fingerprinter._account(str(index))
+
+    assert len(fingerprinter._seen) <= 4
+    assert "9" in fingerprinter._seen
@@ -0,0 +1,247 @@
+import gzip
+import os
+
+import mock
+import pytest
+from mvc_demo.core.log_files import (
+    RotatingFileStream,
+    index_path,
+    parse_rotation,
+)
+from mvc_demo.core.log_index import index_segment
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("100 MB", (100 * 1000 ** 2, None)),
+        ("1 KiB", (1024, None)),
+        ("1 h", (None, 3600.0)),
+        ("10MB, 1 d", (10 * 1000 ** 2, 86400.0)),
+        ("", (None, None)),
+    ],
+)
+def test_parse_rotation(value, expected):
+    assert parse_rotation(value) == expected
+
+
+@pytest.mark.parametrize("value", ["100", "1 parsec", "MB"])
+def test_parse_rotation_invalid(value):
+    with pytest.raises(ValueError):
+        parse_rotation(value)
+
+
+def test_invalid_compression(tmp_path):
+    with pytest.raises(ValueError):
+        RotatingFileStream(str(tmp_path / "app.log"), compression="rar")
+
+
+def segments(directory):
+    return sorted(name for name in os.listdir(directory) if name != "app.log")
+
+
+def test_preallocate_and_truncate_on_close(tmp_path):
+    path = tmp_path / "app.log"
+    stream = RotatingFileStream(str(path), max_bytes=4096, compression=None)
+    stream.write(b"first\n")
+    assert os.path.getsize(path) == 4096
+    stream.close()
+
+    rotated = segments(tmp_path)
+    assert len(rotated) == 1
+    assert (tmp_path / rotated[0]).read_bytes() == b"first\n"
+
+
+def test_rotate_on_size(tmp_path):
+    stream = RotatingFileStream(
+        str(tmp_path / "app.log"), max_bytes=10, compression=None
+    )
+    for line in (b"aaaa\n", b"bbbb\n", b"cccc\n"):
+        stream.write(line)
+    assert stream.rotations == 1
+    stream.close()
+
+    contents = [(tmp_path / name).read_bytes() for name in segments(tmp_path)]
+    assert contents == [b"aaaa\nbbbb\n", b"cccc\n"]
+
+
+def test_rotate_on_interval(tmp_path):
+    stream = RotatingFileStream(
+        str(tmp_path / "app.log"), interval=60, compression=None
+    )
+    stream.write(b"old\n")
+    stream._opened_at -= 60
+    stream.write(b"new\n")
+    assert stream.rotations == 1
+    assert (tmp_path / "app.log").read_bytes().rstrip(b"\0") == b"new\n"
+    stream.close()
+
+
+def test_compression(tmp_path):
+    stream = RotatingFileStream(str(tmp_path / "app.log"), compression="gzip")
+    stream.write(b"compressed\n")
+    stream.close()
+
+    rotated = segments(tmp_path)
+    assert len(rotated) == 1 and rotated[0].endswith(".log.gz")
+    assert gzip.decompress((tmp_path / rotated[0]).read_bytes()) == (
+        b"compressed\n"
+    )
+
+
+def test_compression_at_interpreter_shutdown(tmp_path):
+    stream = RotatingFileStream(str(tmp_path / "app.log"), compression="gzip")
+    stream.write(b"exiting\n")
+    pool = mock.Mock()
+    pool.submit.side_effect = RuntimeError(
+        "cannot schedule new futures after interpreter shutdown"
+    )
+    with mock.patch.object(stream, "_compression_pool", return_value=pool):
+        stream.close()
+
+    rotated = segments(tmp_path)
+    assert len(rotated) == 1 and rotated[0].endswith(".log.gz")
+    assert gzip.decompress((tmp_path / rotated[0]).read_bytes()) == (
+        b"exiting\n"
+    )
+
+
+def test_retention_count(tmp_path):
+    stream = RotatingFileStream(
+        str(tmp_path / "app.log"),
+        max_bytes=4,
+        compression=None,
+        retention_count=2,
+    )
+    for index in range(5):
+        stream.write("{0:d}...\n".format(index).encode())
+    stream.close()
+
+    contents = [(tmp_path / name).read_bytes() for name in segments(tmp_path)]
+    assert contents == [b"3...\n", b"4...\n"]
+
+
+def test_retention_bytes(tmp_path):
+    stream = RotatingFileStream(
+        str(tmp_path / "app.log"),
+        max_bytes=4,
+        compression=None,
+        retention_bytes=12,
+    )
+    for index in range(5):
+        stream.write("{0:d}...\n".format(index).encode())
+    stream.close()
+
+    assert len(segments(tmp_path)) == 2
+
+
+def test_seal_segment_left_behind(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes(b"crashed\n" + b"\0" * 100)
+
+    stream = RotatingFileStream(str(path), compression=None)
+    stream.write(b"restarted\n")
+    stream.close()
+
+    contents = [(tmp_path / name).read_bytes() for name in segments(tmp_path)]
+    assert contents == [b"crashed\n", b"restarted\n"]
+
+
+def test_per_process_names(tmp_path):
+    stream = RotatingFileStream(
+        str(tmp_path / "app.log"), compression=None, per_process=True
+    )
+    stream.write(b"worker\n")
+    assert stream.active_path.endswith("app.{0:d}.log".format(os.getpid()))
+    assert os.path.exists(stream.active_path)
+    stream.close()
+
+    rotated = segments(tmp_path)
+    assert rotated[0].endswith(".{0:d}.log".format(os.getpid()))
+
+
+def test_segment_header(tmp_path):
+    stream = RotatingFileStream(
+        str(tmp_path / "app.log"),
+        max_bytes=16,
+        compression=None,
+        header=lambda: b"#h\n",
+    )
+    for line in (b"aaaa\n", b"bbbb\n", b"cccc\n", b"dddd\n"):
+        stream.write(line)
+    stream.close()
+
+    contents = [(tmp_path / name).read_bytes() for name in segments(tmp_path)]
+    assert contents == [b"#h\naaaa\nbbbb\n", b"#h\ncccc\ndddd\n"]
+
+
+def test_index_path():
+    assert index_path("logs/app.1.log.gz") == "logs/app.1.log.idx"
+    assert index_path("logs/app.1.log.zst") == "logs/app.1.log.idx"
+    assert index_path("logs/app.1.log") == "logs/app.1.log.idx"
+
+
+def test_indexer_and_retention(tmp_path):
+    stream = RotatingFileStream(
+        str(tmp_path / "app.log"),
+        max_bytes=32,
+        compression="gzip",
+        retention_count=1,
+        indexer=index_segment,
+    )
+    for index in range(2):
+        stream.write(b'{"extra":{"request_id":"%d"}}\n' % index)
+    stream.close()
+
+    rotated = segments(tmp_path)
+    assert len(rotated) == 2
+    assert rotated[0].endswith(".log.gz") and rotated[1].endswith(".log.idx")
+    assert index_path(str(tmp_path / rotated[0])) == str(tmp_path / rotated[1])
+
+
+def test_seal_orphaned_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "mvc_demo.core.log_files._process_alive", lambda pid: pid == 5678
+    )
+    (tmp_path / "app.1234.log").write_bytes(b"exited\n" + b"\0" * 100)
+    (tmp_path / "app.5678.log").write_bytes(b"running\n" + b"\0" * 100)
+
+    stream = RotatingFileStream(
+        str(tmp_path / "app.log"), compression=None, per_process=True
+    )
+    stream.write(b"started\n")
+    stream.close()
+
+    rotated = segments(tmp_path)
+    assert "app.5678.log" in rotated
+    orphan = [name for name in rotated if name.endswith(".1234.log")]
+    assert len(orphan) == 1
+    assert (tmp_path / orphan[0]).read_bytes() == b"exited\n"
+
+
+def test_retention_skips_segments_being_compressed(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "mvc_demo.core.log_files._process_alive", lambda pid: pid == 5678
+    )
+    # Being compressed by another worker.
+    compressing = "app.20200101-000000-000000.5678.log"
+    (tmp_path / compressing).write_bytes(b"compressing\n")
+    (tmp_path / (compressing + ".gz.part")).write_bytes(b"partial")
+    # Left uncompressed by a worker which exited.
+    (tmp_path / "app.20200101-000000-000000.1234.log").write_bytes(b"left\n")
+
+    stream = RotatingFileStream(
+        str(tmp_path / "app.log"),
+        max_bytes=4,
+        compression="gzip",
+        retention_count=1,
+        per_process=True,
+    )
+    for index in range(2):
+        stream.write("{0:d}...\n".format(index).encode())
+    stream.close()
+
+    rotated = segments(tmp_path)
+    assert rotated[:2] == [compressing, compressing + ".gz.part"]
+    assert len(rotated) == 3 and rotated[2].endswith(".log.gz")
+    assert gzip.decompress((tmp_path / rotated[2]).read_bytes()) == b"1...\n"
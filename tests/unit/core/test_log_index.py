@@ -0,0 +1,149 @@
+import gzip
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+from mvc_demo.core import log_index
+from mvc_demo.core.log_index import (
+    SegmentIndex,
+    find_records,
+    index_segment,
+    segment_index,
+)
+
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+SEGMENT = "app.20220101-000000-000000.log"
+
+
+def record_lines(count):
+    return b"".join(
+        orjson.dumps(
+            {
+                "time": (START + timedelta(seconds=index)).isoformat(),
+                "message": "Hello {0:d}".format(index),
+                "extra": {"request_id": "req-{0:d}".format(index % 10)},
+            },
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+        for index in range(count)
+    )
+
+
+def messages(lines):
+    return [orjson.loads(line)["message"] for line in lines]
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(log_index, "BLOCK_SIZE", 1024)
+
+
+def test_find_request_id(tmp_path):
+    path = tmp_path / SEGMENT
+    path.write_bytes(record_lines(100))
+
+    index = SegmentIndex.build(str(path))
+    assert len(index.find("req-3")) == 10
+    assert index.find("req-missing") == []
+
+    lines = list(find_records([str(path)], "req-3"))
+    assert messages(lines) == [
+        "Hello {0:d}".format(i) for i in range(3, 100, 10)
+    ]
+
+
+def test_time_range(tmp_path, small_blocks):
+    path = tmp_path / SEGMENT
+    path.write_bytes(record_lines(100))
+
+    index = SegmentIndex.build(str(path))
+    assert len(index.block_starts) > 1
+    since = (START + timedelta(seconds=50)).timestamp()
+    ranges = index.ranges(since=since)
+    assert ranges[0][0] > 0
+    assert ranges[-1][1] == index.size
+
+    lines = list(
+        find_records(
+            [str(path)],
+            since=START + timedelta(seconds=50),
+            until=START + timedelta(seconds=52),
+        )
+    )
+    assert messages(lines) == ["Hello 50", "Hello 51", "Hello 52"]
+
+    lines = list(
+        find_records([str(path)], "req-1", since=START + timedelta(seconds=50))
+    )
+    assert messages(lines) == [
+        "Hello 51",
+        "Hello 61",
+        "Hello 71",
+        "Hello 81",
+        "Hello 91",
+    ]
+
+
+def test_sidecar(tmp_path):
+    path = tmp_path / SEGMENT
+    path.write_bytes(record_lines(20))
+    index_segment(str(path))
+
+    sidecar = tmp_path / "app.20220101-000000-000000.log.idx"
+    index = SegmentIndex.load(str(sidecar))
+    assert index.size == path.stat().st_size
+    assert list(index.find("req-2")) == list(
+        SegmentIndex.build(str(path)).find("req-2")
+    )
+    index.close()
+
+    sidecar.write_bytes(b"garbage")
+    with pytest.raises(ValueError):
+        SegmentIndex.load(str(sidecar))
+    # Invalid indexes are rebuilt and saved again.
+    segment_index(str(path)).close()
+    SegmentIndex.load(str(sidecar)).close()
+
+
+def test_active_segment_not_saved(tmp_path):
+    path = tmp_path / "app.log"
+    # Preallocated tail of the active segment.
+    path.write_bytes(record_lines(10) + b"\0" * 4096)
+
+    lines = list(find_records([str(path)], "req-9"))
+
+    assert messages(lines) == ["Hello 9"]
+    assert not (tmp_path / "app.log.idx").exists()
+
+
+def test_compressed_segment(tmp_path, small_blocks):
+    path = tmp_path / (SEGMENT + ".gz")
+    path.write_bytes(gzip.compress(record_lines(100)))
+
+    lines = list(find_records([str(path)], "req-7"))
+    assert messages(lines) == [
+        "Hello {0:d}".format(i) for i in range(7, 100, 10)
+    ]
+    # The index holds offsets in the decompressed content.
+    assert (tmp_path / (SEGMENT + ".idx")).exists()
+
+    lines = list(find_records([str(path)], since=START + timedelta(seconds=98)))
+    assert messages(lines) == ["Hello 98", "Hello 99"]
+
+
+def test_request_id_verified(tmp_path, monkeypatch):
+    path = tmp_path / SEGMENT
+    path.write_bytes(record_lines(10))
+    # Every request id collides.
+    monkeypatch.setattr(log_index, "_hash", lambda key: 0)
+
+    lines = list(find_records([str(path)], "req-4", save=False))
+
+    assert messages(lines) == ["Hello 4"]
+
+
+def test_empty_segment(tmp_path):
+    path = tmp_path / SEGMENT
+    path.write_bytes(b"")
+
+    assert list(find_records([str(path)], "req-1")) == []
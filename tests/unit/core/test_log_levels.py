@@ -0,0 +1,133 @@
+import logging
+
+import pytest
+from loguru import logger
+from mvc_demo.core.log_levels import LogLevelController, level_name, parse_level
+
+
+@pytest.fixture
+def controller():
+    root_level = logging.root.level
+    controller = LogLevelController(logging.INFO)
+    yield controller
+    controller.reset(logging.INFO)
+    logging.root.setLevel(root_level)
+
+
+@pytest.fixture
+def records(controller):
+    records = []
+    handler_id = logger.add(
+        lambda message: records.append(message.record),
+        level="TRACE",
+        filter=controller,
+    )
+    yield records
+    logger.remove(handler_id)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("DEBUG", logging.DEBUG),
+        ("warning", logging.WARNING),
+        ("TRACE", 5),
+        ("SUCCESS", 25),
+        ("15", 15),
+        (logging.ERROR, logging.ERROR),
+        ("off", None),
+    ],
+)
+def test_parse_level(value, expected):
+    assert parse_level(value) == expected
+
+
+def test_parse_level_invalid():
+    with pytest.raises(ValueError):
+        parse_level("LOUD")
+
+
+def test_level_name():
+    assert level_name(logging.INFO) == "INFO"
+    assert level_name(5) == "TRACE"
+    assert level_name(None) == "OFF"
+    assert level_name(12) == "12"
+
+
+def test_level_for(controller):
+    controller.set_levels(loggers={"mvc_demo.app": "DEBUG", "aioredis": "OFF"})
+    assert controller.level_for("mvc_demo.app.utils.redis") == logging.DEBUG
+    assert controller.level_for("mvc_demo.core") == logging.INFO
+    assert controller.level_for("aioredis.connection") is None
+    assert controller.level_for(None) == logging.INFO
+    assert controller.min_level == logging.DEBUG
+
+
+def test_filter(controller, records):
+    logger.debug("hidden")
+    controller.set_levels(loggers={__name__: "DEBUG"})
+    logger.debug("shown")
+    controller.set_levels(loggers={__name__: None})
+    logger.debug("hidden again")
+    assert [r["message"] for r in records] == ["shown"]
+
+
+def test_off_disables_loguru_module(controller, records):
+    controller.set_levels(loggers={__name__: "OFF"})
+    logger.error("disabled")
+    controller.set_levels(loggers={__name__: None})
+    logger.error("enabled")
+    assert [r["message"] for r in records] == ["enabled"]
+
+
+def test_stdlib_levels(controller):
+    controller.set_levels(default="WARNING", loggers={"levels.test": "DEBUG"})
+    assert logging.root.level == logging.WARNING
+    assert logging.getLogger("levels.test").level == logging.DEBUG
+
+    controller.set_levels(loggers={"levels.test": "OFF"})
+    assert not logging.getLogger("levels.test").isEnabledFor(logging.CRITICAL)
+
+    controller.reset("INFO")
+    assert logging.getLogger("levels.test").level == logging.NOTSET
+
+
+def test_buffered_levels():
+    controller = LogLevelController(logging.WARNING, buffered=True)
+    controller.set_levels(loggers={"levels.test": "ERROR"})
+    assert controller.min_level == 5
+    assert logging.getLogger("levels.test").level == logging.DEBUG
+    controller.reset(logging.INFO)
+
+
+def test_invalid_levels(controller):
+    with pytest.raises(ValueError):
+        controller.set_levels(default="OFF")
+    with pytest.raises(ValueError):
+        controller.set_levels(loggers={"": "DEBUG"})
+    with pytest.raises(ValueError):
+        controller.set_levels(loggers={"mvc_demo": "LOUD"})
+    assert controller.loggers == {}
+
+
+def test_on_min_level(controller):
+    calls = []
+    controller.on_min_level = calls.append
+    controller.set_levels(loggers={"mvc_demo": "DEBUG"})
+    controller.set_levels(loggers={"aioredis": "ERROR"})
+    controller.set_levels(loggers={"mvc_demo": None})
+    assert calls == [logging.DEBUG, logging.INFO]
+
+
+def test_save_and_load(controller, tmp_path):
+    path = str(tmp_path / "levels.json")
+    controller.set_levels(default="WARNING", loggers={"mvc_demo": "DEBUG"})
+    controller.save(path)
+
+    other = LogLevelController(logging.INFO)
+    assert other.load(path)
+    assert other.to_dict() == {
+        "default": "WARNING",
+        "loggers": {"mvc_demo": "DEBUG"},
+    }
+    assert not other.load(str(tmp_path / "missing.json"))
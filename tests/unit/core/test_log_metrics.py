@@ -0,0 +1,110 @@
+import io
+import threading
+
+import mock
+from loguru import logger
+from mvc_demo.core.log_metrics import (
+    LogMetrics,
+    MeteredStream,
+    format_prometheus,
+)
+
+
+class Level(object):
+    def __init__(self, name, no):
+        self.name = name
+        self.no = no
+
+
+INFO = Level("INFO", 20)
+DEBUG = Level("DEBUG", 10)
+
+
+def test_observe_and_snapshot():
+    metrics = LogMetrics(buckets=(0.001, 0.01))
+    metrics.observe(INFO, 100, 0.0, 0.0005)
+    metrics.observe(INFO, 50, 0.0, 0.005)
+    metrics.observe(DEBUG, 10, 0.0, 1.0)
+
+    levels = metrics.snapshot(dropped={10: 3})
+
+    assert levels["INFO"]["records"] == 2
+    assert levels["INFO"]["bytes"] == 150
+    assert levels["INFO"]["dropped"] == 0
+    assert levels["INFO"]["latency"]["buckets"] == [
+        (0.001, 1),
+        (0.01, 2),
+        (float("inf"), 2),
+    ]
+    assert levels["INFO"]["latency"]["count"] == 2
+    assert levels["DEBUG"]["dropped"] == 3
+    assert levels["DEBUG"]["latency"]["buckets"][-1] == (float("inf"), 1)
+
+
+def test_snapshot_dropped_only():
+    metrics = LogMetrics(buckets=(0.001,))
+    metrics.observe(INFO, 1, 0.0, 0.0)
+    levels = metrics.snapshot(dropped={10: 2, 5: 1, 20: 4})
+    assert levels["INFO"]["dropped"] == 4
+    assert levels["DEBUG"]["records"] == 0
+    assert levels["DEBUG"]["dropped"] == 2
+    assert levels["DEBUG"]["latency"]["count"] == 0
+    assert levels["TRACE"]["dropped"] == 1
+
+
+def test_report_interval():
+    reported = threading.Event()
+    metrics = LogMetrics(report_interval=10, report=reported.set)
+
+    metrics.observe(INFO, 1, 0.0, 1.0)
+    metrics.observe(INFO, 1, 1.0, 5.0)
+    assert not reported.wait(0.05)
+    metrics.observe(INFO, 1, 5.0, 11.0)
+    assert reported.wait(1)
+
+
+def test_reset():
+    metrics = LogMetrics()
+    metrics.observe(INFO, 1, 0.0, 0.0)
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_format_prometheus():
+    metrics = LogMetrics(buckets=(0.001,))
+    metrics.observe(INFO, 100, 0.0, 0.0005)
+
+    text = format_prometheus(metrics.snapshot(), labels={"pid": 42})
+
+    assert "# TYPE log_records_total counter" in text
+    assert 'log_records_total{pid="42",level="INFO"} 1' in text
+    assert 'log_bytes_total{pid="42",level="INFO"} 100' in text
+    assert 'log_dropped_total{pid="42",level="INFO"} 0' in text
+    assert 'log_sink_seconds_bucket{pid="42",level="INFO",le="0.001"} 1' in (
+        text
+    )
+    assert 'log_sink_seconds_bucket{pid="42",level="INFO",le="+Inf"} 1' in (
+        text
+    )
+    assert 'log_sink_seconds_count{pid="42",level="INFO"} 1' in text
+
+
+def test_metered_stream():
+    metrics = LogMetrics()
+    stream = io.StringIO()
+    handler_id = logger.add(
+        MeteredStream(stream, metrics), format="{message}", colorize=False
+    )
+    logger.info("Hello")
+    logger.info("Héllo")
+    logger.remove(handler_id)
+
+    assert stream.getvalue() == "Hello\nHéllo\n"
+    assert metrics.snapshot()["INFO"]["records"] == 2
+    assert metrics.snapshot()["INFO"]["bytes"] == 13
+
+
+def test_metered_stream_isatty():
+    stream = mock.Mock()
+    stream.isatty.return_value = True
+    assert MeteredStream(stream, LogMetrics()).isatty()
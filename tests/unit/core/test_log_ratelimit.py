@@ -0,0 +1,133 @@
+import threading
+
+import mock
+import pytest
+from loguru import logger
+from mvc_demo.core.log_ratelimit import CallSiteRateLimiter
+
+
+@pytest.fixture
+def sink():
+    records = []
+    handler_ids = []
+    limiters = []
+
+    def add_sink(limiter):
+        limiters.append(limiter)
+        handler_ids.append(
+            logger.add(
+                lambda message: records.append(message.record),
+                filter=limiter,
+                format="{message}",
+            )
+        )
+        return records
+
+    yield add_sink
+    for limiter in limiters:
+        limiter.close()
+    for handler_id in handler_ids:
+        logger.remove(handler_id)
+
+
+def test_limit_for():
+    limiter = CallSiteRateLimiter(
+        {
+            "ERROR": 1,
+            "mvc_demo": 2,
+            "mvc_demo.app.utils.redis": 3,
+            "mvc_demo.app.utils.redis:DEBUG": 4,
+        }
+    )
+    assert limiter.limit_for("other", "ERROR") == 1
+    assert limiter.limit_for("other", "INFO") is None
+    assert limiter.limit_for("mvc_demo.app.asgi", "ERROR") == 2
+    assert limiter.limit_for("mvc_demo.app.utils.redis", "ERROR") == 3
+    assert limiter.limit_for("mvc_demo.app.utils.redis", "DEBUG") == 4
+    assert limiter.limit_for("mvc_demo.app.utils.redisx", "DEBUG") == 2
+    assert limiter.limit_for(None, "ERROR") == 1
+
+
+def test_rate_limit_per_call_site(sink):
+    limiter = CallSiteRateLimiter({"ERROR": 0.001}, burst=2)
+    records = sink(limiter)
+
+    for _ in range(5):
+        logger.error("Could not connect to Redis")
+    logger.error("Another call site")
+    logger.info("Not limited")
+
+    messages = [record["message"] for record in records]
+    assert messages == [
+        "Could not connect to Redis",
+        "Could not connect to Redis",
+        "Another call site",
+        "Not limited",
+    ]
+    assert limiter.suppressed == 3
+    assert limiter.dropped_levels == {40: 3}
+
+
+def test_summary(sink):
+    limiter = CallSiteRateLimiter({"ERROR": 0.001}, burst=1)
+    records = sink(limiter)
+
+    with mock.patch("mvc_demo.core.log_ratelimit.time.monotonic") as clock:
+        for now in (100.0, 100.0, 100.0, 100.0, 111.0):
+            clock.return_value = now
+            logger.error("Flood")
+
+    messages = [record["message"] for record in records]
+    assert messages[0] == "Flood"
+    assert messages[1].startswith("Suppressed 4 similar messages from ")
+    assert records[1]["line"] == records[0]["line"]
+    assert records[1]["level"].name == "ERROR"
+    assert len(records) == 2
+
+
+def test_shared_between_handlers(sink):
+    limiter = CallSiteRateLimiter({"INFO": 0.001}, burst=1)
+    sink(limiter)
+    records = sink(limiter)
+
+    for _ in range(2):
+        logger.info("Twice")
+
+    assert len(records) == 2
+    assert limiter.suppressed == 1
+
+
+def test_flush(sink):
+    limiter = CallSiteRateLimiter({"ERROR": 0.001}, burst=1)
+    records = sink(limiter)
+
+    for _ in range(3):
+        logger.error("Flood")
+    limiter.flush(due_only=True)
+    assert len(records) == 1
+    limiter.flush()
+    assert records[1]["message"].startswith("Suppressed 2 similar messages")
+    assert records[1]["line"] == records[0]["line"]
+    limiter.flush()
+    assert len(records) == 2
+
+
+def test_summary_timer(sink):
+    limiter = CallSiteRateLimiter(
+        {"ERROR": 0.001}, burst=1, summary_interval=0.05
+    )
+    records = sink(limiter)
+    reported = threading.Event()
+    handler_id = logger.add(
+        lambda message: reported.set(),
+        filter=lambda record: record["message"].startswith("Suppressed"),
+    )
+
+    try:
+        for _ in range(3):
+            logger.error("Flood")
+        # No further record from the call site, the timer reports the flood.
+        assert reported.wait(2)
+    finally:
+        logger.remove(handler_id)
+    assert records[1]["message"].startswith("Suppressed 2 similar messages")
@@ -0,0 +1,77 @@
+import orjson
+import pytest
+from loguru import logger
+from mvc_demo.core.log_serializer import build_record_serializer
+
+
+class Unserializable(object):
+    def __str__(self):
+        return "unserializable"
+
+
+@pytest.fixture
+def messages():
+    messages = []
+    handler_id = logger.add(messages.append, format="{message}")
+    yield messages
+    logger.remove(handler_id)
+
+
+def test_default_fields(messages):
+    logger.bind(user="abc").info("Hello {}", "world")
+    rec = orjson.loads(build_record_serializer()(messages[0]))
+    assert rec["message"] == "Hello world"
+    assert rec["level"] == {"name": "INFO", "no": 20}
+    assert rec["file"] == {"path": __file__}
+    assert rec["extra"]["user"] == "abc"
+    assert isinstance(rec["elapsed"], float)
+    assert "exception" not in rec
+
+
+def test_allow_list(messages):
+    logger.bind(user="abc", payload={1: 2}).warning("Hi")
+    serialize = build_record_serializer(
+        ["time", "level.name", "message", "extra.user"]
+    )
+    data = serialize(messages[0])
+    assert data.endswith(b"\n")
+    rec = orjson.loads(data)
+    assert list(rec) == ["time", "level", "message", "extra"]
+    assert rec["level"] == {"name": "WARNING"}
+    assert rec["extra"] == {"user": "abc"}
+
+
+def test_unserializable_extra(messages):
+    logger.bind(obj=Unserializable()).info("Hi")
+    rec = orjson.loads(build_record_serializer(["extra"])(messages[0]))
+    assert rec["extra"]["obj"] == "unserializable"
+
+
+def test_exception(messages):
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("Boom")
+
+    rec = orjson.loads(build_record_serializer(["exception"])(messages[0]))
+    assert rec["exception"].startswith("Traceback")
+    assert "ZeroDivisionError" in rec["exception"]
+
+
+@pytest.mark.parametrize("field", ["nope", "level.nope", "time.now"])
+def test_unknown_field(field):
+    with pytest.raises(ValueError):
+        build_record_serializer([field])
+
+
+def test_time_is_iso_formatted(messages):
+    logger.info("Hi")
+    rec = orjson.loads(build_record_serializer(["time"])(messages[0]))
+    assert rec["time"] == messages[0].record["time"].isoformat()
+
+
+def test_private_extra_skipped(messages):
+    logger.bind(obj=1, _private=2).info("Hi")
+    rec = orjson.loads(build_record_serializer(["extra"])(messages[0]))
+    assert rec["extra"]["obj"] == 1
+    assert "_private" not in rec["extra"]
@@ -0,0 +1,90 @@
+import logging
+
+import pytest
+from asgi_correlation_id.context import correlation_id
+from loguru import logger
+from mvc_demo.core.log_tailbuffer import RequestLogBuffer
+
+
+@pytest.fixture
+def buffer():
+    return RequestLogBuffer(logging.INFO, max_request_records=3, max_records=5)
+
+
+@pytest.fixture
+def records(buffer):
+    records = []
+    handler_id = logger.add(
+        lambda message: records.append(message.record),
+        level="TRACE",
+        filter=buffer,
+    )
+    yield records
+    logger.remove(handler_id)
+
+
+@pytest.fixture
+def request_id():
+    token = correlation_id.set("tail-test")
+    yield "tail-test"
+    correlation_id.reset(token)
+
+
+def test_high_level_records_pass(buffer, records, request_id):
+    buffer.begin(request_id)
+    logger.info("written")
+    assert [r["message"] for r in records] == ["written"]
+    assert buffer.discard(request_id) == 0
+
+
+def test_untracked_records_dropped(buffer, records, request_id):
+    logger.debug("no request")
+    assert records == []
+    assert buffer.buffered == 0
+
+
+def test_flush(buffer, records, request_id):
+    buffer.begin(request_id)
+    logger.debug("first")
+    logger.trace("second")
+    assert records == [] and buffer.buffered == 2
+
+    assert buffer.flush(request_id) == 2
+    assert [r["message"] for r in records] == ["first", "second"]
+    assert [r["level"].name for r in records] == ["DEBUG", "TRACE"]
+    assert records[0]["function"] == "test_flush"
+    assert buffer.buffered == 0
+
+
+def test_discard(buffer, records, request_id):
+    buffer.begin(request_id)
+    logger.debug("dropped")
+    assert buffer.discard(request_id) == 1
+    assert records == []
+    logger.debug("after the request")
+    assert buffer.buffered == 0
+
+
+def test_bounds(buffer, records, request_id):
+    buffer.begin(request_id)
+    buffer.begin("other")
+    for index in range(4):
+        logger.debug("record {}", index)
+    assert buffer.dropped == 1
+
+    token = correlation_id.set("other")
+    for index in range(3):
+        logger.debug("other {}", index)
+    correlation_id.reset(token)
+    # 3 records of the first request plus 2 of the other one.
+    assert buffer.buffered == 5
+    assert buffer.dropped == 2
+    assert buffer.dropped_levels == {10: 2}
+
+    buffer.flush(request_id)
+    assert [r["message"] for r in records] == [
+        "record 1",
+        "record 2",
+        "record 3",
+    ]
+    assert buffer.discard("other") == 2
@@ -0,0 +1,91 @@
+import io
+import logging
+
+import pytest
+from mvc_demo.core.log_writer import (
+    BatchedLogWriter,
+    OVERFLOW_DROP_DEBUG,
+    OVERFLOW_DROP_OLDEST,
+)
+
+
+def test_invalid_overflow_policy():
+    with pytest.raises(ValueError):
+        BatchedLogWriter(stream=io.BytesIO(), overflow="explode")
+
+
+def test_put_and_flush():
+    stream = io.BytesIO()
+    writer = BatchedLogWriter(stream=stream, flush_interval=60)
+    assert writer.put(b"first\n")
+    assert writer.put(b"second\n")
+    assert writer.flush(timeout=5)
+    assert stream.getvalue() == b"first\nsecond\n"
+    assert writer.flushed == 2
+    assert writer.flushes == 1
+    assert writer.written_bytes == 13
+    writer.close()
+
+
+def test_flush_on_size_threshold():
+    stream = io.BytesIO()
+    writer = BatchedLogWriter(stream=stream, flush_bytes=4, flush_interval=60)
+    writer.put(b"12345\n")
+    writer.close()
+    assert stream.getvalue() == b"12345\n"
+    assert writer.flushed == 1
+
+
+def test_close_and_restart():
+    stream = io.BytesIO()
+    writer = BatchedLogWriter(stream=stream, flush_interval=60)
+    writer.put(b"a\n")
+    writer.close()
+    assert stream.getvalue() == b"a\n"
+    writer.put(b"b\n")
+    writer.close()
+    assert stream.getvalue() == b"a\nb\n"
+
+
+def test_drop_oldest():
+    writer = BatchedLogWriter(
+        stream=io.BytesIO(),
+        max_records=2,
+        overflow=OVERFLOW_DROP_OLDEST,
+    )
+    # Pretend the writer thread is running but not draining the buffer.
+    writer._thread = "stub"
+    writer._buffer.extend([(b"1\n", logging.INFO), (b"2\n", logging.INFO)])
+    assert writer.put(b"3\n")
+    assert writer.dropped == 1
+    assert writer.dropped_levels == {logging.INFO: 1}
+    assert [data for data, _ in writer._buffer] == [b"2\n", b"3\n"]
+
+
+def test_drop_debug():
+    writer = BatchedLogWriter(
+        stream=io.BytesIO(),
+        max_records=1,
+        overflow=OVERFLOW_DROP_DEBUG,
+    )
+    writer._thread = "stub"
+    writer._buffer.append((b"1\n", logging.INFO))
+    assert writer.put(b"2\n", logging.DEBUG) is False
+    assert writer.dropped == 1
+    assert writer.dropped_levels == {logging.DEBUG: 1}
+
+
+def test_write_failure_counts_dropped():
+    class BrokenStream(object):
+        def write(self, data):
+            raise OSError("Mock error")
+
+        def flush(self):
+            pass
+
+    writer = BatchedLogWriter(stream=BrokenStream(), flush_interval=60)
+    writer.put(b"lost\n", logging.ERROR)
+    writer.close()
+    assert writer.dropped == 1
+    assert writer.dropped_levels == {logging.ERROR: 1}
+    assert writer.flushed == 0
@@ -0,0 +1,202 @@
+import inspect
+import logging
+import os
+
+import mock
+import pytest
+from loguru import logger
+from mvc_demo.config import settings
+from mvc_demo.core import loguru_logs
+from mvc_demo.core.log_levels import LogLevelController
+from mvc_demo.core.log_metrics import LogMetrics
+from mvc_demo.core.loguru_logs import (
+    InterceptHandler,
+    PRETTY_PAYLOAD_KEY,
+    PrettyPayload,
+    format_record,
+    refresh_static_log_extras,
+    set_log_extras,
+)
+
+
+def test_set_log_extras():
+    record = {"extra": {}}
+    set_log_extras(record)
+    assert record["extra"]["pid"] == os.getpid()
+    assert record["extra"]["app_name"] == settings.PROJECT_NAME
+    assert record["extra"]["host"]
+    assert record["extra"]["datetime"].tzinfo is not None
+    assert record["extra"]["request_id"] is None
+
+
+def test_refresh_static_log_extras():
+    with mock.patch("mvc_demo.core.loguru_logs.os.getpid") as getpid:
+        getpid.return_value = 4242
+        refresh_static_log_extras()
+        record = {"extra": {}}
+        set_log_extras(record)
+        assert record["extra"]["pid"] == 4242
+
+    refresh_static_log_extras()
+    assert loguru_logs._STATIC_LOG_EXTRAS["pid"] == os.getpid()
+
+
+def test_format_record():
+    plain = format_record({"extra": {}, "exception": None})
+    assert plain.endswith("<level>{message}</level>\n")
+    assert "{exception}" not in plain
+
+    exception = format_record({"extra": {}, "exception": object()})
+    assert exception.endswith("{message}</level>\n{exception}")
+
+
+def test_format_record_payload():
+    payload = {"users": [{"name": "Nick", "age": 87}]}
+    record = {"extra": {"payload": payload}, "exception": None}
+
+    with mock.patch("mvc_demo.core.loguru_logs.pformat") as pformat_mock:
+        pformat_mock.return_value = "pretty"
+        fmt = format_record(record)
+        pretty = record["extra"][PRETTY_PAYLOAD_KEY]
+        pformat_mock.assert_not_called()
+        assert "{extra[%s]}" % PRETTY_PAYLOAD_KEY in fmt
+        assert "{0}|{0}".format(pretty) == "pretty|pretty"
+        pformat_mock.assert_called_once()
+
+    # The payload itself is left untouched for the other sinks.
+    assert record["extra"]["payload"] is payload
+    assert format_record(record) == fmt
+    assert record["extra"][PRETTY_PAYLOAD_KEY] is pretty
+
+
+def test_pretty_payload():
+    assert str(PrettyPayload({"a": 1})) == "{'a': 1}"
+
+
+@pytest.fixture
+def records():
+    records = []
+    handler_id = logger.add(
+        lambda message: records.append(message.record), format="{message}"
+    )
+    yield records
+    logger.remove(handler_id)
+
+
+@pytest.fixture
+def stdlib_logger():
+    stdlib_logger = logging.getLogger("tests.intercept")
+    stdlib_logger.propagate = False
+    stdlib_logger.setLevel(logging.DEBUG)
+    yield stdlib_logger
+    stdlib_logger.handlers = []
+
+
+def test_intercept_handler(records, stdlib_logger):
+    stdlib_logger.handlers = [InterceptHandler()]
+    stdlib_logger.warning("Hello %s {not a field}", "world")
+    line = inspect.currentframe().f_lineno - 1
+
+    record = records[-1]
+    assert record["message"] == "Hello world {not a field}"
+    assert record["level"].name == "WARNING"
+    assert record["name"] == "tests.intercept"
+    assert record["function"] == "test_intercept_handler"
+    assert record["line"] == line
+    assert record["file"].path == __file__
+    assert record["exception"] is None
+
+
+def test_intercept_handler_custom_level(records, stdlib_logger):
+    stdlib_logger.handlers = [InterceptHandler()]
+    stdlib_logger.log(25, "Custom level")
+    assert records[-1]["level"].no == 25
+
+
+def test_intercept_handler_exception(records, stdlib_logger):
+    stdlib_logger.handlers = [InterceptHandler()]
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        stdlib_logger.exception("Boom")
+
+    assert records[-1]["level"].name == "ERROR"
+    assert records[-1]["exception"].type is ZeroDivisionError
+
+
+def test_intercept_handler_level(records, stdlib_logger):
+    stdlib_logger.handlers = [InterceptHandler(level=logging.INFO)]
+    message = mock.MagicMock()
+    stdlib_logger.debug(message)
+    message.__str__.assert_not_called()
+    assert not records
+
+
+def test_report_log_metrics_dropped_only(monkeypatch):
+    metrics = LogMetrics()
+    monkeypatch.setattr(loguru_logs, "_log_metrics", metrics)
+    monkeypatch.setattr(loguru_logs, "_log_writer", mock.Mock())
+    loguru_logs._log_writer.dropped_levels = {10: 3}
+    records = []
+    handler_id = logger.add(records.append, format="{message}")
+    try:
+        loguru_logs._report_log_metrics()
+    finally:
+        logger.remove(handler_id)
+    assert records[0].record["extra"]["log_metrics"]["DEBUG"] == {
+        "records": 0,
+        "bytes": 0,
+        "dropped": 3,
+        "latency_us": 0.0,
+    }
+
+
+def test_get_log_metrics_dropped(monkeypatch):
+    monkeypatch.setattr(loguru_logs, "_log_metrics", LogMetrics())
+    for stage, dropped in (
+        ("_log_rate_limiter", {40: 2}),
+        ("_request_log_buffer", {10: 1}),
+        ("_log_writer", {10: 3}),
+    ):
+        monkeypatch.setattr(
+            loguru_logs, stage, mock.Mock(dropped_levels=dropped)
+        )
+    levels = loguru_logs.get_log_metrics()
+    assert levels["DEBUG"]["dropped"] == 4
+    assert levels["ERROR"]["dropped"] == 2
+
+
+def test_flush_logs_reports_suppressed(monkeypatch):
+    limiter = mock.Mock()
+    monkeypatch.setattr(loguru_logs, "_log_rate_limiter", limiter)
+    monkeypatch.setattr(loguru_logs, "_log_writer", None)
+    loguru_logs.flush_logs()
+    limiter.flush.assert_called_once_with()
+    loguru_logs.close_logs()
+    limiter.close.assert_called_once_with()
+
+
+def test_intercept_handler_parent_off(stdlib_logger):
+    controller = LogLevelController(
+        logging.INFO, keep_enabled=(loguru_logs.__name__,)
+    )
+    records = []
+    handler_id = logger.add(
+        records.append, format="{message}", filter=controller
+    )
+    root_level = logging.root.level
+    try:
+        controller.set_levels(loggers={"mvc_demo": "OFF"})
+        stdlib_logger.handlers = [InterceptHandler()]
+        stdlib_logger.warning("Bridged")
+    finally:
+        controller.reset(logging.INFO)
+        logging.root.setLevel(root_level)
+        logger.remove(handler_id)
+    assert [record.record["message"] for record in records] == ["Bridged"]
+
+
+def test_set_log_levels_not_configured(monkeypatch):
+    monkeypatch.setattr(loguru_logs, "_log_levels", None)
+    with pytest.raises(RuntimeError):
+        loguru_logs.set_log_levels("DEBUG")